@@ -1,20 +1,19 @@
 from flask import Flask, render_template, request, jsonify, send_file
 import os
 from werkzeug.utils import secure_filename
-import PyPDF2
-import requests
 from io import BytesIO
 import json
-from endosos_autos_a import extraer_datos_endoso_a
-import fitz  # PyMuPDF
-import base64
 from urllib.parse import urlparse
 import mimetypes
 import tempfile
 import logging
 from validar_tipo_endoso import validate_endoso
-from PIL import Image
-import io
+from contexto_documento import DocumentContext
+from descargas import descargar_pdf
+from miniaturas import crear_servicio_desde_entorno, hash_valido
+import tiempos
+from tiempos import estadisticas_tiempos
+import metricas
 import traceback
 
 # Configuración de logging
@@ -25,6 +24,8 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# Peticiones, latencia y en curso por endpoint; expone /metrics (formato Prometheus)
+metricas.instrumentar_app(app)
 app.config['UPLOAD_FOLDER'] = 'loads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max-limit
 
@@ -33,59 +34,24 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # Asegurarse de que existe el directorio de output para datos de procesamiento
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'output'), exist_ok=True)
 
+# Vistas previas: se renderizan cuando la interfaz pide /preview/<hash>, no en /upload
+miniaturas = crear_servicio_desde_entorno()
+
 def download_pdf(url):
-    """Descarga un PDF desde una URL y lo guarda temporalmente."""
+    """Descarga un PDF desde una URL (streaming, con límite de tamaño) y lo guarda en un temporal."""
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        # Crear archivo temporal
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        
-        # Guardar el contenido
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                temp_file.write(chunk)
-        
-        temp_file.close()
-        return temp_file.name
+        with tiempos.etapa("descarga"), descargar_pdf(url) as descarga:
+            return descarga.a_archivo()
     except Exception as e:
         logger.error(f"Error al descargar PDF: {str(e)}")
         return None
 
-def get_pdf_preview(file_path):
-    """Genera una vista previa del PDF en formato base64."""
-    try:
-        doc = fitz.open(file_path)
-        page = doc[0]
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # Aumentar calidad
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        
-        # Convertir a base64
-        buffered = io.BytesIO()
-        img.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        doc.close()
-        return img_str
-    except Exception as e:
-        logger.error(f"Error al generar vista previa: {str(e)}")
-        return None
-
-def get_pdf_data(file_path):
-    """Lee el archivo PDF y lo devuelve en formato base64."""
-    try:
-        with open(file_path, 'rb') as file:
-            pdf_data = file.read()
-            return base64.b64encode(pdf_data).decode()
-    except Exception as e:
-        logger.error(f"Error al leer PDF: {str(e)}")
-        return None
-
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/upload', methods=['POST'])
+@estadisticas_tiempos.medir_endpoint
 def upload_file():
     try:
         if 'file' not in request.files and 'url' not in request.form:
@@ -104,7 +70,8 @@ def upload_file():
             
             file_name = secure_filename(file.filename)
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], file_name)
-            file.save(file_path)
+            with tiempos.etapa("recepcion"):
+                file.save(file_path)
         
         # Procesar URL
         elif 'url' in request.form:
@@ -117,20 +84,29 @@ def upload_file():
                 return jsonify({"error": "No se pudo descargar el PDF"}), 400
             file_name = os.path.basename(url)
         
-        # Validar y procesar el documento
-        resultado = validate_endoso(file_path)
-        
-        if "error" in resultado:
-            return jsonify(resultado), 400
-        
-        # Generar vista previa y datos del PDF
-        preview = get_pdf_preview(file_path)
-        pdf_data = get_pdf_data(file_path)
+        # Abrir el PDF una sola vez y compartirlo entre validación, vista previa y datos
+        with DocumentContext(file_path) as documento:
+            # Validar y procesar el documento
+            resultado = validate_endoso(documento)
+            metricas.registrar_documento(resultado.get("tipo_documento"), "error" in resultado)
+            
+            if "error" in resultado:
+                return jsonify(resultado), 400
+            
+            # Guardar el PDF por su hash: el visor lo pide en /pdf/<hash> y la
+            # miniatura se genera cuando se pide /preview/<hash>
+            with tiempos.etapa("vista_previa"):
+                pdf_hash = miniaturas.registrar(documento)
+            preview_url = f"/preview/{pdf_hash}" if pdf_hash else None
+            pdf_url = f"/pdf/{pdf_hash}" if pdf_hash else None
         
         # Limpiar archivo temporal
         if file_path and file_path.startswith(tempfile.gettempdir()):
             os.unlink(file_path)
         
+        # Armado de la respuesta (se cierra al terminar la petición, incluye jsonify)
+        tiempos.iniciar_etapa("respuesta")
+        
         # **1. Definir la estructura base completa con valores por defecto**
         respuesta_poliza_base = {
             "Clave Agente": "No disponible", "Coaseguro": "No disponible", "Cobertura Básica": "No disponible",
@@ -257,12 +233,13 @@ def upload_file():
         respuesta = {
             "message": "Archivo procesado correctamente",
             "file_name": file_name,
-            "preview": preview,
-            "pdf_data": pdf_data,
+            "preview_url": preview_url,
+            "pdf_url": pdf_url,
             "financial_data": respuesta_financiera_base, # Estructura financiera rellenada y formateada
             "poliza_data": respuesta_poliza_base,      # Estructura completa de póliza rellenada y formateada
             "document_type": resultado.get("tipo_documento", "DESCONOCIDO"), # Mantener para info
-            "description": resultado.get("descripcion", "")              # Mantener para info
+            "description": resultado.get("descripcion", ""),             # Mantener para info
+            "paginas_leidas": resultado.get("paginas_leidas")            # Páginas usadas para detectar el tipo
         }
         
         # Para documentos de salud familiar, asegurar que los campos especiales estén incluidos en la respuesta
@@ -285,6 +262,11 @@ def upload_file():
         logger.exception("Detalle del error en upload_file:") 
         return jsonify({"error": str(e)}), 500
 
+@app.route('/tiempos')
+def estadisticas_tiempos_etapas():
+    """Percentiles por tipo de documento y etapa de las peticiones a /upload medidas en este proceso."""
+    return jsonify(estadisticas_tiempos.estadisticas())
+
 @app.route('/pdf_preview/<path:filename>')
 def pdf_preview(filename):
     try:
@@ -296,6 +278,55 @@ def pdf_preview(filename):
         logger.error(f"Error al servir PDF: {str(e)}")
         return jsonify({"error": str(e)}), 404
 
+@app.route('/pdf/<pdf_hash>')
+def pdf_por_hash(pdf_hash):
+    """
+    PDF subido, identificado por el SHA-256 de su contenido.
+
+    Soporta peticiones Range (el visor descarga solo las partes que necesita) y
+    condicionales (If-None-Match / If-Modified-Since); como el contenido de un
+    hash no cambia, el navegador puede conservarlo en cache.
+    """
+    ruta = miniaturas.ruta_pdf(pdf_hash) if hash_valido(pdf_hash) else None
+    if not ruta or not os.path.exists(ruta):
+        return jsonify({"error": "Documento no encontrado"}), 404
+    # send_file resuelve las rutas relativas contra app.root_path
+    respuesta = send_file(os.path.abspath(ruta), mimetype='application/pdf', conditional=True, etag=pdf_hash)
+    respuesta.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return respuesta
+
+@app.route('/preview/<pdf_hash>')
+def preview_image(pdf_hash):
+    """
+    Miniatura de la primera página de un PDF subido.
+
+    Parámetros de consulta:
+        ancho: Ancho en píxeles (por defecto PRISMA_MINIATURAS_ANCHO)
+        formato: jpeg, webp o png (por defecto PRISMA_MINIATURAS_FORMATO)
+    """
+    if not hash_valido(pdf_hash):
+        return jsonify({"error": "Identificador de documento no válido"}), 404
+    ancho = miniaturas.acotar_ancho(request.args.get('ancho', miniaturas.ancho, type=int))
+    formato = request.args.get('formato', miniaturas.formato).lower()
+    if formato == 'jpg':
+        formato = 'jpeg'
+    if formato not in ('jpeg', 'webp', 'png'):
+        return jsonify({"error": f"Formato no válido: {formato}"}), 400
+
+    # El contenido es inmutable para un hash, ancho y formato: basta con comparar el ETag
+    etag = f"{pdf_hash}-{ancho}-{formato}"
+    if request.if_none_match.contains(etag):
+        respuesta = app.response_class(status=304)
+    else:
+        ruta = miniaturas.obtener(pdf_hash, ancho, formato)
+        if not ruta:
+            return jsonify({"error": "Vista previa no disponible"}), 404
+        respuesta = send_file(ruta, mimetype=miniaturas.mimetype(formato), conditional=False, etag=False)
+    respuesta.set_etag(etag)
+    # private: las miniaturas muestran datos de la póliza y no deben quedar en proxies o CDN compartidos
+    respuesta.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return respuesta
+
 @app.route('/api/validate', methods=['POST'])
 def validate_file():
     try:
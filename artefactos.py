@@ -0,0 +1,235 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Escritor de un artefacto: recibe la ruta de destino y escribe el archivo
+Escritor = Callable[[str], None]
+
+MODOS = ("off", "sync", "async")
+
+
+class SumideroArtefactos:
+    """
+    Destino de los artefactos (markdown, JSON) que generan los extractores.
+
+    Modos:
+      - off: no se escribe nada (por defecto).
+      - sync: se escribe en el mismo hilo, dentro de la petición.
+      - async: se encola y un hilo en segundo plano escribe por lotes, fuera
+        del camino de la petición. Si la cola está llena el artefacto se
+        descarta (se cuenta en las estadísticas) en lugar de bloquear.
+
+    Cada artefacto se entrega como una función que recibe la ruta y escribe el
+    archivo, de modo que el formato lo siguen definiendo los extractores
+    (`generar_markdown`, `guardar_a_json`) y el costo de serializar también
+    sale de la petición en modo async.
+
+    Con `max_archivos` el directorio se poda por antigüedad para que no crezca
+    sin límite.
+    """
+
+    def __init__(self, modo: str = "off", directorio: str = "output", tam_lote: int = 32,
+                 max_cola: int = 1000, max_archivos: int = 5000):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de artefactos no válido: {modo} (opciones: {', '.join(MODOS)})")
+        self.modo = modo
+        self.directorio = directorio
+        self.tam_lote = max(1, tam_lote)
+        self.max_archivos = max_archivos
+        self._cola: "queue.Queue[Tuple[str, Dict[str, Escritor]]]" = queue.Queue(maxsize=max_cola)
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._escritos_desde_poda = 0
+        self._contadores = {
+            "encolados": 0,
+            "escritos": 0,
+            "descartados": 0,
+            "errores": 0,
+            "lotes": 0,
+            "podados": 0,
+        }
+
+    @property
+    def activo(self) -> bool:
+        return self.modo != "off"
+
+    def guardar(self, nombre_base: str, escritores: Dict[str, Escritor]) -> bool:
+        """
+        Entrega los artefactos de un documento.
+
+        Args:
+            nombre_base: Nombre de archivo sin extensión
+            escritores: {extensión: función que escribe el archivo en la ruta recibida}
+
+        Returns:
+            bool: True si se escribieron o encolaron, False si el sumidero está
+                apagado o la cola está llena
+        """
+        if self.modo == "off":
+            return False
+        if self.modo == "sync":
+            self._escribir_lote([(nombre_base, escritores)])
+            return True
+
+        self._iniciar_hilo()
+        try:
+            self._cola.put_nowait((nombre_base, escritores))
+        except queue.Full:
+            with self._lock:
+                self._contadores["descartados"] += 1
+            logger.warning(f"Cola de artefactos llena; se descartan los artefactos de {nombre_base}")
+            return False
+        with self._lock:
+            self._contadores["encolados"] += 1
+        return True
+
+    def vaciar(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que se escriban los artefactos pendientes.
+
+        Args:
+            timeout: Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            bool: True si la cola quedó vacía
+        """
+        if self.modo != "async":
+            return True
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._cola.unfinished_tasks:
+            if limite is not None and time.monotonic() >= limite:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            stats = dict(self._contadores)
+        stats["modo"] = self.modo
+        stats["directorio"] = self.directorio
+        stats["pendientes"] = self._cola.qsize()
+        stats["max_cola"] = self._cola.maxsize
+        stats["tam_lote"] = self.tam_lote
+        stats["max_archivos"] = self.max_archivos
+        return stats
+
+    # --- Escritura ---
+
+    def _iniciar_hilo(self) -> None:
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._worker, name="artefactos", daemon=True)
+                self._hilo.start()
+                # Al salir del proceso se intenta escribir lo que quede en la cola
+                atexit.register(self.vaciar, 5.0)
+
+    def _worker(self) -> None:
+        while True:
+            lote = [self._cola.get()]
+            # Tomar lo que ya esté en la cola, hasta completar el lote
+            while len(lote) < self.tam_lote:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._escribir_lote(lote)
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+
+    def _escribir_lote(self, lote: List[Tuple[str, Dict[str, Escritor]]]) -> None:
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+        except OSError as e:
+            logger.error(f"No se pudo crear el directorio de artefactos {self.directorio}: {str(e)}")
+            with self._lock:
+                self._contadores["errores"] += len(lote)
+            return
+
+        escritos = errores = 0
+        for nombre_base, escritores in lote:
+            for extension, escribir in escritores.items():
+                ruta = os.path.join(self.directorio, f"{nombre_base}.{extension}")
+                try:
+                    escribir(ruta)
+                    escritos += 1
+                except Exception as e:
+                    errores += 1
+                    logger.error(f"Error escribiendo artefacto {ruta}: {str(e)}", exc_info=True)
+
+        with self._lock:
+            self._contadores["escritos"] += escritos
+            self._contadores["errores"] += errores
+            self._contadores["lotes"] += 1
+            self._escritos_desde_poda += escritos
+            podar = self.max_archivos > 0 and self._escritos_desde_poda >= self.tam_lote
+            if podar:
+                self._escritos_desde_poda = 0
+        if podar:
+            self._podar()
+
+    def _podar(self) -> None:
+        """Elimina los archivos más antiguos si el directorio excede max_archivos."""
+        if self.max_archivos <= 0:
+            return
+        try:
+            entradas = [e for e in os.scandir(self.directorio) if e.is_file()]
+        except OSError:
+            return
+        exceso = len(entradas) - self.max_archivos
+        if exceso <= 0:
+            return
+        entradas.sort(key=lambda e: e.stat().st_mtime)
+        eliminados = 0
+        for entrada in entradas[:exceso]:
+            try:
+                os.remove(entrada.path)
+                eliminados += 1
+            except OSError:
+                pass
+        with self._lock:
+            self._contadores["podados"] += eliminados
+        logger.info(f"Directorio de artefactos {self.directorio}: {eliminados} archivo(s) antiguos eliminados")
+
+
+def crear_sumidero_desde_entorno() -> SumideroArtefactos:
+    """
+    Crea el sumidero de artefactos a partir de variables de entorno.
+
+    Variables:
+        PRISMA_ARTEFACTOS: "off" (por defecto), "sync" o "async"
+        PRISMA_ARTEFACTOS_DIR: Directorio de salida ("output")
+        PRISMA_ARTEFACTOS_LOTE: Artefactos por lote en modo async (32)
+        PRISMA_ARTEFACTOS_COLA: Tamaño máximo de la cola en modo async (1000)
+        PRISMA_ARTEFACTOS_MAX_ARCHIVOS: Archivos máximos en el directorio (5000; 0 = sin límite)
+
+    Returns:
+        SumideroArtefactos: El sumidero configurado
+    """
+    modo = os.environ.get("PRISMA_ARTEFACTOS", "off").strip().lower() or "off"
+    if modo not in MODOS:
+        logger.warning(f"PRISMA_ARTEFACTOS={modo} no es válido; no se escribirán artefactos")
+        modo = "off"
+    sumidero = SumideroArtefactos(
+        modo=modo,
+        directorio=os.environ.get("PRISMA_ARTEFACTOS_DIR") or "output",
+        tam_lote=int(os.environ.get("PRISMA_ARTEFACTOS_LOTE", "32")),
+        max_cola=int(os.environ.get("PRISMA_ARTEFACTOS_COLA", "1000")),
+        max_archivos=int(os.environ.get("PRISMA_ARTEFACTOS_MAX_ARCHIVOS", "5000")),
+    )
+    if sumidero.activo:
+        logger.info(f"Artefactos de extracción en modo {modo} en {sumidero.directorio}")
+    return sumidero
+
+
+# Sumidero compartido por validate_endoso y los servicios
+sumidero = crear_sumidero_desde_entorno()
@@ -0,0 +1,419 @@
+import os
+import sys
+import copy
+import glob
+import json
+import time
+import hashlib
+import logging
+import argparse
+import platform
+import resource
+import subprocess
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# El benchmark no debe escribir en la cache de resultados del servicio
+os.environ.setdefault("PRISMA_CACHE", "0")
+
+import fitz  # PyMuPDF
+
+from contexto_documento import DocumentContext
+from registro_extractores import registro_extractores
+from tiempos import estadisticas_tiempos
+import validar_tipo_endoso
+
+logger = logging.getLogger(__name__)
+
+ETAPAS = ("abrir", "texto", "detectar", "extraer", "normalizar")
+VERSION_REPORTE = 1
+
+# Claves del resultado que cambian entre ejecuciones y no indican una regresión funcional
+_CLAVES_VOLATILES = {"file_path", "paginas_leidas", "confianza"}
+
+
+# --- Memoria ---
+
+def _rss_actual_mb() -> Optional[float]:
+    """RSS actual del proceso en MB (Linux, /proc/self/statm)."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _rss_maximo_mb() -> float:
+    """Pico de RSS del proceso desde que arrancó (ru_maxrss: KB en Linux, bytes en macOS)."""
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == "darwin" else maximo / 1024
+
+
+class MuestreadorRSS:
+    """
+    Pico de RSS durante un intervalo, muestreando /proc/self/statm en un hilo.
+
+    ru_maxrss solo da el pico de todo el proceso; para atribuir memoria a una
+    etapa se muestrea el RSS mientras corre. Donde /proc no existe se usa
+    ru_maxrss (pico acumulado, menos preciso).
+    """
+
+    def __init__(self, intervalo: float = 0.002):
+        self.intervalo = intervalo
+        self.pico: Optional[float] = None
+        self._activo = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MuestreadorRSS":
+        self.pico = _rss_actual_mb()
+        if self.pico is not None:
+            self._activo.set()
+            self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+            self._hilo.start()
+        return self
+
+    def _muestrear(self) -> None:
+        while self._activo.is_set():
+            actual = _rss_actual_mb()
+            if actual is not None and actual > self.pico:
+                self.pico = actual
+            time.sleep(self.intervalo)
+
+    def __exit__(self, *exc) -> None:
+        if self._hilo is not None:
+            self._activo.clear()
+            self._hilo.join()
+            actual = _rss_actual_mb()
+            if actual is not None and actual > self.pico:
+                self.pico = actual
+        else:
+            self.pico = _rss_maximo_mb()
+
+
+# --- Etapas ---
+
+_procesador = None
+
+
+def _normalizador():
+    """PolizaProcessor del servicio (se importa solo si se mide la etapa de normalización)."""
+    global _procesador
+    if _procesador is None:
+        import ia_general_ws
+        _procesador = ia_general_ws.processor
+    return _procesador
+
+
+def normalizar(datos: Dict, tipo: str) -> Dict:
+    """Post-proceso que aplica ia_general_ws a la salida de un extractor (tipo de pago, fechas, datos financieros)."""
+    procesador = _normalizador()
+    datos = copy.deepcopy(datos) if isinstance(datos, dict) else {}
+    procesador._procesar_tipo_pago(datos)
+    procesador._normalizar_fechas(datos)
+    return {"datos_completos": datos, "datos_financieros": procesador.formatear_datos_financieros(datos, tipo)}
+
+
+def _medir(funcion: Callable, medir_rss: bool) -> Tuple[object, float, Optional[float]]:
+    """Ejecuta una etapa y devuelve (resultado, ms, pico de RSS en MB)."""
+    if medir_rss:
+        with MuestreadorRSS() as muestreo:
+            inicio = time.perf_counter()
+            resultado = funcion()
+            ms = (time.perf_counter() - inicio) * 1000
+        return resultado, ms, muestreo.pico
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) * 1000, None
+
+
+def _huella(resultado: object) -> str:
+    """SHA-256 del resultado sin las claves volátiles, para detectar cambios funcionales."""
+    def limpiar(valor):
+        if isinstance(valor, dict):
+            return {k: limpiar(v) for k, v in valor.items() if k not in _CLAVES_VOLATILES}
+        if isinstance(valor, list):
+            return [limpiar(v) for v in valor]
+        return valor
+    serializado = json.dumps(limpiar(resultado), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+
+def medir_documento(ruta_pdf: str, medir_rss: bool = True) -> Dict:
+    """
+    Mide una pasada de las etapas del pipeline sobre un PDF.
+
+    Etapas (igual que `validate_endoso` + el post-proceso de ia_general_ws):
+        abrir: DocumentContext y parseo con fitz
+        texto: texto de las páginas que lee la detección progresiva
+        detectar: clasificación en `detectar_tipo_progresivo` (sin la lectura de páginas)
+        extraer: función `extraer_datos_*` del tipo (registro de extractores)
+        normalizar: tipo de pago, fechas y datos financieros de ia_general_ws
+    Además se mide `validate_endoso` de punta a punta con un documento nuevo.
+
+    Args:
+        ruta_pdf: Ruta al PDF
+        medir_rss: Muestrear el RSS durante cada etapa
+
+    Returns:
+        dict: tipo, ms y pico de RSS por etapa, y huella del resultado
+    """
+    tiempos, rss = {}, {}
+    documento = None
+    try:
+        documento, tiempos["abrir"], rss["abrir"] = _medir(
+            lambda: _abrir(ruta_pdf), medir_rss)
+
+        # La misma detección progresiva que validate_endoso; la lectura de páginas y la
+        # clasificación se intercalan, así que se separan con las etapas de `tiempos`
+        def detectar():
+            with estadisticas_tiempos.medir() as medicion:
+                return validar_tipo_endoso.detectar_tipo_progresivo(documento), medicion
+        ((tipo, confianza, paginas_deteccion, _), medicion), ms_deteccion, rss["detectar"] = _medir(
+            detectar, medir_rss)
+        tiempos["texto"] = medicion.etapas.get("texto", 0.0) * 1000
+        tiempos["detectar"] = max(0.0, ms_deteccion - tiempos["texto"])
+        rss["texto"] = rss["detectar"]
+
+        extraer = registro_extractores.obtener(tipo)
+        if extraer is None:
+            datos, tiempos["extraer"], rss["extraer"] = None, 0.0, None
+        else:
+            datos, tiempos["extraer"], rss["extraer"] = _medir(lambda: extraer(documento), medir_rss)
+
+        normalizado, tiempos["normalizar"], rss["normalizar"] = _medir(
+            lambda: normalizar(datos, tipo), medir_rss)
+    except Exception as e:
+        logger.error(f"Error al medir {ruta_pdf}: {str(e)}", exc_info=True)
+        return {"archivo": os.path.basename(ruta_pdf), "error": str(e)}
+    finally:
+        if documento is not None:
+            documento.close()
+
+    resultado, ms_validar, rss_validar = _medir(lambda: validar_tipo_endoso.validate_endoso(ruta_pdf), medir_rss)
+    return {
+        "archivo": os.path.basename(ruta_pdf),
+        "tipo": tipo,
+        "confianza": round(confianza, 3),
+        "paginas": _paginas(ruta_pdf),
+        "paginas_deteccion": paginas_deteccion,
+        "ms": {etapa: round(ms, 3) for etapa, ms in tiempos.items()},
+        "rss_mb": {etapa: round(mb, 1) for etapa, mb in rss.items() if mb is not None},
+        "validate_endoso_ms": round(ms_validar, 3),
+        "validate_endoso_rss_mb": round(rss_validar, 1) if rss_validar is not None else None,
+        "huella_extraccion": _huella(normalizado),
+        "huella_validate_endoso": _huella(resultado),
+        "error_validate_endoso": resultado.get("error") if isinstance(resultado, dict) else None,
+    }
+
+
+def _abrir(ruta_pdf: str) -> DocumentContext:
+    documento = DocumentContext(ruta_pdf)
+    documento.doc  # forzar el parseo dentro de la etapa
+    return documento
+
+
+def _paginas(ruta_pdf: str) -> int:
+    with fitz.open(ruta_pdf) as doc:
+        return doc.page_count
+
+
+# --- Estadísticas ---
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano (p entre 0 y 100)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def resumen_tiempos(valores: List[float]) -> Dict[str, float]:
+    if not valores:
+        return {}
+    return {
+        "n": len(valores),
+        "p50_ms": round(percentil(valores, 50), 3),
+        "p95_ms": round(percentil(valores, 95), 3),
+        "p99_ms": round(percentil(valores, 99), 3),
+        "media_ms": round(sum(valores) / len(valores), 3),
+        "max_ms": round(max(valores), 3),
+    }
+
+
+def agregar(mediciones: List[Dict]) -> Dict:
+    """Agrupa las mediciones por tipo de documento y por etapa."""
+    grupos: Dict[str, List[Dict]] = {}
+    for m in mediciones:
+        if "error" not in m:
+            grupos.setdefault(m["tipo"], []).append(m)
+    grupos_con_todos = dict(grupos)
+    grupos_con_todos["TODOS"] = [m for ms in grupos.values() for m in ms]
+
+    tipos = {}
+    for tipo, ms in grupos_con_todos.items():
+        if not ms:
+            continue
+        etapas = {}
+        for etapa in ETAPAS + ("total", "validate_endoso"):
+            if etapa == "total":
+                valores = [sum(m["ms"].values()) for m in ms]
+                picos = [max(m["rss_mb"].values()) for m in ms if m["rss_mb"]]
+            elif etapa == "validate_endoso":
+                valores = [m["validate_endoso_ms"] for m in ms]
+                picos = [m["validate_endoso_rss_mb"] for m in ms if m["validate_endoso_rss_mb"] is not None]
+            else:
+                valores = [m["ms"][etapa] for m in ms]
+                picos = [m["rss_mb"][etapa] for m in ms if etapa in m["rss_mb"]]
+            etapas[etapa] = resumen_tiempos(valores)
+            if picos:
+                etapas[etapa]["rss_pico_mb"] = max(picos)
+        segundos = sum(m["validate_endoso_ms"] for m in ms) / 1000
+        tipos[tipo] = {
+            "documentos": len({m["archivo"] for m in ms}),
+            "mediciones": len(ms),
+            "docs_por_segundo": round(len(ms) / segundos, 2) if segundos else None,
+            "etapas": etapas,
+        }
+    return tipos
+
+
+# --- Comparación entre reportes ---
+
+def comparar(base: Dict, actual: Dict, umbral: float = 10.0) -> List[Dict]:
+    """
+    Compara dos reportes (p. ej. de dos commits).
+
+    Args:
+        base: Reporte anterior
+        actual: Reporte nuevo
+        umbral: Porcentaje de aumento del p50 a partir del cual se marca regresión
+
+    Returns:
+        list: Diferencias de p50 por tipo y etapa, y cambios de huella por archivo
+    """
+    diferencias = []
+    for tipo, datos in actual.get("tipos", {}).items():
+        anterior = base.get("tipos", {}).get(tipo)
+        if not anterior:
+            continue
+        for etapa, stats in datos["etapas"].items():
+            p50_base = anterior["etapas"].get(etapa, {}).get("p50_ms")
+            p50 = stats.get("p50_ms")
+            if not p50_base or p50 is None:
+                continue
+            cambio = (p50 - p50_base) / p50_base * 100
+            diferencias.append({
+                "tipo": tipo, "etapa": etapa, "p50_base_ms": p50_base, "p50_ms": p50,
+                "cambio_pct": round(cambio, 1), "regresion": cambio > umbral,
+            })
+    huellas_base = {d["archivo"]: d.get("huella_validate_endoso") for d in base.get("documentos", [])}
+    for d in actual.get("documentos", []):
+        anterior = huellas_base.get(d["archivo"])
+        if anterior and d.get("huella_validate_endoso") and anterior != d["huella_validate_endoso"]:
+            diferencias.append({"archivo": d["archivo"], "resultado_distinto": True, "regresion": True})
+    return diferencias
+
+
+# --- CLI ---
+
+def _entorno() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "plataforma": platform.platform(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline por tipo de documento y etapa")
+    parser.add_argument("rutas", nargs="+", help="PDFs o directorios con PDFs")
+    parser.add_argument("-n", "--repeticiones", type=int, default=3, help="Mediciones por archivo")
+    parser.add_argument("--calentamiento", type=int, default=1,
+                        help="Pasadas sin medir por archivo (importación de extractores, caches)")
+    parser.add_argument("--sin-rss", action="store_true", help="No muestrear RSS por etapa")
+    parser.add_argument("--json", dest="salida_json", help="Guardar el reporte completo en este archivo")
+    parser.add_argument("--comparar", help="Reporte JSON anterior contra el que comparar")
+    parser.add_argument("--umbral", type=float, default=10.0, help="Aumento de p50 (%%) que cuenta como regresión")
+    args = parser.parse_args(argv)
+
+    # validar_tipo_endoso configura logging en INFO al importarse
+    logging.getLogger().setLevel(logging.WARNING)
+
+    archivos = []
+    for ruta in args.rutas:
+        if os.path.isdir(ruta):
+            archivos.extend(sorted(glob.glob(os.path.join(ruta, "**", "*.pdf"), recursive=True)))
+        else:
+            archivos.append(ruta)
+    if not archivos:
+        print("No se encontraron PDFs")
+        return 1
+
+    for archivo in archivos:
+        for _ in range(args.calentamiento):
+            medir_documento(archivo, medir_rss=False)
+
+    mediciones = []
+    for archivo in archivos:
+        for _ in range(args.repeticiones):
+            mediciones.append(medir_documento(archivo, medir_rss=not args.sin_rss))
+
+    documentos = {}
+    for m in mediciones:
+        documentos.setdefault(m["archivo"], m)
+    reporte = {
+        "version": VERSION_REPORTE,
+        "entorno": _entorno(),
+        "config": {"archivos": len(archivos), "repeticiones": args.repeticiones,
+                   "calentamiento": args.calentamiento, "rss_por_etapa": not args.sin_rss},
+        "rss_maximo_proceso_mb": round(_rss_maximo_mb(), 1),
+        "tipos": agregar(mediciones),
+        "documentos": [
+            {k: v for k, v in m.items() if k not in ("ms", "rss_mb", "validate_endoso_ms", "validate_endoso_rss_mb")}
+            for m in documentos.values()
+        ],
+        "errores": [m for m in mediciones if "error" in m],
+    }
+
+    print(f"{'tipo':28} {'docs':>5} {'docs/s':>8} {'etapa':>16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    for tipo, datos in sorted(reporte["tipos"].items()):
+        for etapa, stats in datos["etapas"].items():
+            print(f"{tipo[:28]:28} {datos['documentos']:>5} {str(datos['docs_por_segundo']):>8} {etapa:>16} "
+                  f"{stats.get('p50_ms', 0):>9.2f} {stats.get('p95_ms', 0):>9.2f} {stats.get('p99_ms', 0):>9.2f} "
+                  f"{str(stats.get('rss_pico_mb', '-')):>8}")
+    if reporte["errores"]:
+        print(f"Errores: {len(reporte['errores'])}")
+
+    if args.salida_json:
+        with open(args.salida_json, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        diferencias = comparar(base, reporte, args.umbral)
+        regresiones = [d for d in diferencias if d["regresion"]]
+        for d in regresiones:
+            if "archivo" in d:
+                print(f"RESULTADO DISTINTO: {d['archivo']}")
+            else:
+                print(f"REGRESIÓN: {d['tipo']}/{d['etapa']} p50 {d['p50_base_ms']} -> {d['p50_ms']} ms ({d['cambio_pct']:+}%)")
+        print(f"Comparado contra {args.comparar} ({base.get('entorno', {}).get('commit')}): "
+              f"{len(regresiones)} regresión(es)")
+        return 1 if regresiones else 0
+
+    return 1 if reporte["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
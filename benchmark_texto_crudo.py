@@ -0,0 +1,137 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import logging
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Optional
+
+from contexto_documento import DocumentContext
+from endosos_autos_a import extraer_desde_texto_crudo
+
+logger = logging.getLogger(__name__)
+
+
+def texto_pdftotext(ruta_pdf: str) -> str:
+    """Texto crudo con `pdftotext -raw` (proceso externo, referencia anterior)."""
+    result = subprocess.run(['pdftotext', '-raw', ruta_pdf, '-'], capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def texto_en_proceso(ruta_pdf: str) -> str:
+    """Texto crudo con la vista `text_raw` de DocumentContext."""
+    with DocumentContext(ruta_pdf) as documento:
+        return documento.text_raw
+
+
+def _lineas(texto: str) -> List[str]:
+    """Líneas no vacías, sin espacios en los extremos ni saltos de página."""
+    return [l.strip() for l in texto.replace("\f", "\n").split("\n") if l.strip()]
+
+
+def _medir(funcion, ruta_pdf: str, repeticiones: int) -> Dict:
+    tiempos = []
+    texto = ""
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        texto = funcion(ruta_pdf)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {"texto": texto, "tiempos_ms": tiempos}
+
+
+def _resumen(tiempos: List[float]) -> Dict[str, float]:
+    if not tiempos:
+        return {}
+    ordenados = sorted(tiempos)
+    return {
+        "p50_ms": round(statistics.median(ordenados), 3),
+        "p95_ms": round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))], 3),
+        "max_ms": round(ordenados[-1], 3),
+    }
+
+
+def comparar_archivo(ruta_pdf: str, repeticiones: int, con_pdftotext: bool) -> Dict:
+    """
+    Compara el texto crudo en proceso contra pdftotext para un PDF.
+
+    Args:
+        ruta_pdf: Ruta al PDF
+        repeticiones: Veces que se mide cada método
+        con_pdftotext: Si pdftotext está disponible
+
+    Returns:
+        Dict: Tiempos y equivalencia (texto y valores de extraer_desde_texto_crudo)
+    """
+    resultado = {"archivo": os.path.basename(ruta_pdf)}
+    propio = _medir(texto_en_proceso, ruta_pdf, repeticiones)
+    resultado["en_proceso_ms"] = propio["tiempos_ms"]
+    valores_propio = extraer_desde_texto_crudo(propio["texto"])
+    resultado["valores"] = valores_propio
+
+    if con_pdftotext:
+        try:
+            externo = _medir(texto_pdftotext, ruta_pdf, repeticiones)
+        except subprocess.CalledProcessError as e:
+            resultado["error"] = f"pdftotext falló: {e}"
+            return resultado
+        resultado["pdftotext_ms"] = externo["tiempos_ms"]
+        resultado["texto_igual"] = _lineas(propio["texto"]) == _lineas(externo["texto"])
+        resultado["valores_iguales"] = valores_propio == extraer_desde_texto_crudo(externo["texto"])
+    return resultado
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compara el texto crudo en proceso contra pdftotext -raw")
+    parser.add_argument("rutas", nargs="+", help="PDFs o directorios con PDFs de endosos")
+    parser.add_argument("-n", "--repeticiones", type=int, default=5, help="Mediciones por archivo y método")
+    parser.add_argument("--json", dest="salida_json", help="Guardar el reporte completo en este archivo")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    archivos = []
+    for ruta in args.rutas:
+        if os.path.isdir(ruta):
+            archivos.extend(sorted(glob.glob(os.path.join(ruta, "*.pdf"))))
+        else:
+            archivos.append(ruta)
+    if not archivos:
+        print("No se encontraron PDFs")
+        return 1
+
+    con_pdftotext = shutil.which("pdftotext") is not None
+    if not con_pdftotext:
+        print("pdftotext no está instalado: solo se mide el método en proceso")
+
+    resultados = [comparar_archivo(a, args.repeticiones, con_pdftotext) for a in archivos]
+
+    print(f"{'archivo':40} {'en proceso p50':>15} {'pdftotext p50':>15} {'texto':>7} {'valores':>8}")
+    for r in resultados:
+        propio = _resumen(r["en_proceso_ms"]).get("p50_ms")
+        externo = _resumen(r.get("pdftotext_ms", [])).get("p50_ms")
+        print(f"{r['archivo'][:40]:40} {propio:>15} {externo if externo is not None else '-':>15} "
+              f"{str(r.get('texto_igual', '-')):>7} {str(r.get('valores_iguales', '-')):>8}")
+
+    reporte = {
+        "archivos": len(resultados),
+        "pdftotext": con_pdftotext,
+        "en_proceso": _resumen([t for r in resultados for t in r["en_proceso_ms"]]),
+        "pdftotext_tiempos": _resumen([t for r in resultados for t in r.get("pdftotext_ms", [])]),
+        "texto_distinto": [r["archivo"] for r in resultados if r.get("texto_igual") is False],
+        "valores_distintos": [r["archivo"] for r in resultados if r.get("valores_iguales") is False],
+        "detalle": resultados,
+    }
+    print(json.dumps({k: v for k, v in reporte.items() if k != "detalle"}, indent=2, ensure_ascii=False))
+    if args.salida_json:
+        with open(args.salida_json, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+    return 1 if reporte["valores_distintos"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import os
+import json
+import glob
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_MODULO = os.path.dirname(os.path.abspath(__file__))
+
+# Base de datos por defecto, junto al módulo y no relativa al cwd del proceso
+RUTA_DB_DEFECTO = os.path.join(DIRECTORIO_MODULO, "cache", "resultados.sqlite")
+
+# Archivos cuyo contenido determina el resultado de una extracción. Si cambia
+# cualquiera de ellos cambia la huella y las entradas anteriores dejan de usarse.
+ARCHIVOS_EXTRACTORES = [
+    "validar_tipo_endoso.py",
+    "endosos_autos_a.py",
+    "contexto_documento.py",
+    "ia_general_ws.py",
+    "data_ia_general_*.py",
+    # Módulos compartidos que importan los extractores y la detección
+    "clasificador_documentos.py",
+    "registro_extractores.py",
+    "patrones_registro.py",
+    "secciones.py",
+    "valores_por_etiqueta.py",
+    "markdown_polizas.py",
+]
+
+
+def huella_extractores(patrones: Iterable[str] = ARCHIVOS_EXTRACTORES, base_dir: Optional[str] = None) -> str:
+    """
+    Calcula una huella de versión de los extractores a partir de su código fuente.
+
+    Args:
+        patrones: Nombres o patrones glob de los archivos a considerar
+        base_dir: Directorio base (por defecto, el directorio de este módulo)
+
+    Returns:
+        str: Hash SHA-256 (16 primeros caracteres) del contenido de los archivos
+    """
+    base_dir = base_dir or DIRECTORIO_MODULO
+    h = hashlib.sha256()
+    archivos = set()
+    for patron in patrones:
+        archivos.update(glob.glob(os.path.join(base_dir, patron)))
+    for ruta in sorted(archivos):
+        h.update(os.path.basename(ruta).encode("utf-8"))
+        with open(ruta, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+class CacheResultados:
+    """
+    Cache de resultados de procesamiento indexada por el hash del PDF.
+
+    Tiene dos niveles:
+      - Memoria: LRU acotado (OrderedDict) para los documentos más recientes.
+      - Disco: SQLite con número máximo de entradas; sobrevive reinicios.
+
+    El TTL se cuenta desde que se creó el resultado y aplica en ambos niveles. Una
+    ruta relativa de `ruta_db` se resuelve contra el directorio de este módulo.
+
+    La clave combina el SHA-256 del contenido del PDF con la huella de los
+    extractores, por lo que un cambio en el código invalida los resultados viejos.
+    Todos los métodos son seguros para usarse desde varios hilos.
+    """
+
+    def __init__(self, max_memoria: int = 256, ruta_db: Optional[str] = RUTA_DB_DEFECTO,
+                 ttl_segundos: int = 86400, max_disco: int = 10000, version: Optional[str] = None):
+        self.max_memoria = max_memoria
+        self.ttl_segundos = ttl_segundos
+        self.max_disco = max_disco
+        self.version = version or huella_extractores()
+        # clave -> (valor JSON, momento de creación)
+        self._memoria: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._contadores = {
+            "hits_memoria": 0,
+            "hits_disco": 0,
+            "misses": 0,
+            "evictions_memoria": 0,
+            "evictions_disco": 0,
+            "expirados": 0,
+        }
+        self._conn = None
+        if ruta_db:
+            ruta_db = os.path.join(DIRECTORIO_MODULO, ruta_db)
+            try:
+                directorio = os.path.dirname(ruta_db)
+                if directorio:
+                    os.makedirs(directorio, exist_ok=True)
+                self._conn = sqlite3.connect(ruta_db, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS resultados ("
+                    "clave TEXT PRIMARY KEY, valor TEXT NOT NULL, "
+                    "creado REAL NOT NULL, accedido REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accedido ON resultados(accedido)")
+                self._conn.commit()
+                logger.info(f"Cache de resultados en disco: {ruta_db} (versión {self.version})")
+            except sqlite3.Error as e:
+                logger.error(f"No se pudo abrir la cache en disco {ruta_db}: {str(e)}. Solo se usará memoria.")
+                self._conn = None
+
+    def clave(self, sha256: str) -> str:
+        """Clave de cache para el hash de un PDF con la versión actual de los extractores."""
+        return f"{sha256}:{self.version}"
+
+    def obtener(self, sha256: str) -> Optional[Dict]:
+        """
+        Busca el resultado de un PDF, primero en memoria y luego en disco.
+
+        Args:
+            sha256: Hash SHA-256 del contenido del PDF
+
+        Returns:
+            dict | None: Copia del resultado guardado o None si no existe o expiró
+        """
+        clave = self.clave(sha256)
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                valor, creado = entrada
+                if not self._expirado(creado):
+                    self._memoria.move_to_end(clave)
+                    self._contadores["hits_memoria"] += 1
+                    return json.loads(valor)
+                del self._memoria[clave]
+                # Con disco, la misma entrada expira también ahí y se cuenta al leerla
+                if self._conn is None:
+                    self._contadores["expirados"] += 1
+
+            entrada = self._obtener_disco(clave)
+            if entrada is None:
+                self._contadores["misses"] += 1
+                return None
+            self._contadores["hits_disco"] += 1
+            valor, creado = entrada
+            self._guardar_memoria(clave, valor, creado)
+            return json.loads(valor)
+
+    def guardar(self, sha256: str, resultado: Dict) -> None:
+        """
+        Guarda el resultado de un PDF en ambos niveles.
+
+        Args:
+            sha256: Hash SHA-256 del contenido del PDF
+            resultado: Diccionario serializable a JSON
+        """
+        clave = self.clave(sha256)
+        valor = json.dumps(resultado, ensure_ascii=False)
+        ahora = time.time()
+        with self._lock:
+            self._guardar_memoria(clave, valor, ahora)
+            self._guardar_disco(clave, valor, ahora)
+
+    def limpiar(self) -> None:
+        """Elimina todas las entradas de ambos niveles."""
+        with self._lock:
+            self._memoria.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM resultados")
+                self._conn.commit()
+
+    def estadisticas(self) -> Dict:
+        """Contadores de aciertos, fallos y desalojos, y tamaño de cada nivel."""
+        with self._lock:
+            stats = dict(self._contadores)
+            stats["hits"] = stats["hits_memoria"] + stats["hits_disco"]
+            total = stats["hits"] + stats["misses"]
+            stats["hit_ratio"] = round(stats["hits"] / total, 4) if total else 0.0
+            stats["entradas_memoria"] = len(self._memoria)
+            stats["max_memoria"] = self.max_memoria
+            stats["entradas_disco"] = self._contar_disco()
+            stats["max_disco"] = self.max_disco
+            stats["ttl_segundos"] = self.ttl_segundos
+            stats["version"] = self.version
+            stats["disco_activo"] = self._conn is not None
+        return stats
+
+    def _expirado(self, creado: float) -> bool:
+        return bool(self.ttl_segundos) and time.time() - creado > self.ttl_segundos
+
+    # --- Nivel en memoria (se llaman con el lock tomado) ---
+
+    def _guardar_memoria(self, clave: str, valor: str, creado: float) -> None:
+        if self.max_memoria <= 0:
+            return
+        self._memoria[clave] = (valor, creado)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+            self._contadores["evictions_memoria"] += 1
+
+    # --- Nivel en disco (se llaman con el lock tomado) ---
+
+    def _obtener_disco(self, clave: str) -> Optional[Tuple[str, float]]:
+        if self._conn is None:
+            return None
+        try:
+            fila = self._conn.execute(
+                "SELECT valor, creado FROM resultados WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                return None
+            valor, creado = fila
+            ahora = time.time()
+            if self._expirado(creado):
+                self._conn.execute("DELETE FROM resultados WHERE clave = ?", (clave,))
+                self._conn.commit()
+                self._contadores["expirados"] += 1
+                return None
+            self._conn.execute("UPDATE resultados SET accedido = ? WHERE clave = ?", (ahora, clave))
+            self._conn.commit()
+            return valor, creado
+        except sqlite3.Error as e:
+            logger.warning(f"Error al leer la cache en disco: {str(e)}")
+            return None
+
+    def _guardar_disco(self, clave: str, valor: str, ahora: float) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resultados (clave, valor, creado, accedido) VALUES (?, ?, ?, ?)",
+                (clave, valor, ahora, ahora),
+            )
+            # Purgar expirados y, si se excede el tamaño, las entradas menos usadas
+            if self.ttl_segundos:
+                cursor = self._conn.execute(
+                    "DELETE FROM resultados WHERE creado < ?", (ahora - self.ttl_segundos,)
+                )
+                self._contadores["expirados"] += max(cursor.rowcount, 0)
+            exceso = self._contar_disco() - self.max_disco
+            if exceso > 0:
+                self._conn.execute(
+                    "DELETE FROM resultados WHERE clave IN "
+                    "(SELECT clave FROM resultados ORDER BY accedido ASC LIMIT ?)",
+                    (exceso,),
+                )
+                self._contadores["evictions_disco"] += exceso
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Error al escribir en la cache en disco: {str(e)}")
+
+    def _contar_disco(self) -> int:
+        if self._conn is None:
+            return 0
+        try:
+            return self._conn.execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+
+def crear_cache_desde_entorno() -> Optional[CacheResultados]:
+    """
+    Crea la cache a partir de variables de entorno.
+
+    Variables:
+        PRISMA_CACHE: "0" para desactivar la cache (activada por defecto)
+        PRISMA_CACHE_MEMORIA: Entradas máximas en memoria (256)
+        PRISMA_CACHE_DB: Ruta del archivo SQLite ("cache/resultados.sqlite" junto al módulo;
+            las relativas se resuelven contra el directorio del módulo; vacío = solo memoria)
+        PRISMA_CACHE_TTL: Segundos de vida de una entrada, en memoria y en disco (86400)
+        PRISMA_CACHE_MAX_DISCO: Entradas máximas en disco (10000)
+
+    Returns:
+        CacheResultados | None: La cache configurada o None si está desactivada
+    """
+    if os.environ.get("PRISMA_CACHE", "1") == "0":
+        logger.info("Cache de resultados desactivada (PRISMA_CACHE=0)")
+        return None
+    return CacheResultados(
+        max_memoria=int(os.environ.get("PRISMA_CACHE_MEMORIA", "256")),
+        ruta_db=os.environ.get("PRISMA_CACHE_DB", RUTA_DB_DEFECTO) or None,
+        ttl_segundos=int(os.environ.get("PRISMA_CACHE_TTL", "86400")),
+        max_disco=int(os.environ.get("PRISMA_CACHE_MAX_DISCO", "10000")),
+    )
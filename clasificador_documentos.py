@@ -0,0 +1,244 @@
+import re
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from patrones_registro import registro
+
+logger = logging.getLogger(__name__)
+
+# Separador de secuencias dentro de una firma: "a.*b" = "a" seguido (en cualquier punto posterior) de "b"
+SEPARADOR_SECUENCIA = ".*"
+
+
+def _primeros_caracteres(patron: str) -> Optional[str]:
+    """
+    Caracteres con los que puede empezar una coincidencia del patrón.
+
+    Solo reconoce los casos simples que usan las firmas (literal inicial o clase
+    `[...]` sin rangos). Devuelve None si no se puede determinar, en cuyo caso el
+    término se evalúa en todas las posiciones candidatas.
+    """
+    if not patron:
+        return None
+    inicio = patron[0]
+    if inicio == "[":
+        fin = patron.find("]")
+        clase = patron[1:fin] if fin > 0 else ""
+        if not clase or "-" in clase or "\\" in clase or clase.startswith("^"):
+            return None
+        return clase
+    if inicio == "\\":
+        siguiente = patron[1:2]
+        return siguiente if siguiente and not siguiente.isalnum() else None
+    if inicio in ".^$*+?{}()|":
+        return None
+    # Un cuantificador opcional sobre el primer carácter lo vuelve no obligatorio
+    if patron[1:2] in ("?", "*", "{"):
+        return None
+    return inicio
+
+
+class Firma:
+    """Patrón de detección descompuesto en términos atómicos encadenados por `.*`."""
+
+    __slots__ = ("patron", "terminos")
+
+    def __init__(self, patron: str):
+        self.patron = patron
+        self.terminos = patron.split(SEPARADOR_SECUENCIA)
+
+    def coincide(self, ocurrencias: Dict[str, List[Tuple[int, int]]]) -> bool:
+        """
+        Evalúa la firma a partir de las posiciones de cada término en el texto.
+
+        Para `a.*b.*c` busca la primera ocurrencia de `a`, luego la primera de `b`
+        que empiece después de que termine `a`, y así sucesivamente.
+        """
+        posicion = 0
+        for termino in self.terminos:
+            siguiente = None
+            for inicio, fin in ocurrencias.get(termino, ()):
+                if inicio >= posicion and (siguiente is None or fin < siguiente):
+                    siguiente = fin
+            if siguiente is None:
+                return False
+            posicion = siguiente
+        return True
+
+    def parcial(self, ocurrencias: Dict[str, List[Tuple[int, int]]], genericos=()) -> bool:
+        """
+        Algunos términos de la firma aparecen en el texto, pero la firma no coincide.
+
+        Los términos de `genericos` no cuentan: aparecen en casi cualquier carátula y
+        por sí solos no indican que el texto siguiente vaya a completar la firma.
+        """
+        return (any(t in ocurrencias and t not in genericos for t in self.terminos)
+                and not self.coincide(ocurrencias))
+
+
+class ReglaDeteccion:
+    """
+    Tipo de documento con sus firmas y el número mínimo de firmas que deben coincidir.
+    """
+
+    __slots__ = ("tipo", "firmas", "umbral")
+
+    def __init__(self, tipo: str, patrones: List[str], umbral: int = 1):
+        self.tipo = tipo
+        self.firmas = [Firma(p) for p in patrones]
+        self.umbral = umbral
+
+
+class ClasificadorDocumentos:
+    """
+    Clasificador de una sola pasada sobre el texto normalizado.
+
+    Todos los términos atómicos de todas las reglas se combinan en una única
+    alternancia, factorizada por primer carácter (`a(?:liados...|horro...)|c(?:...)`),
+    de modo que un solo recorrido del texto encuentra cada posición donde empieza
+    algún término. En esas posiciones se comprueban los términos que comparten
+    el primer carácter y se registran sus ocurrencias; después las firmas
+    (`a.*b`) se resuelven con esas posiciones, sin volver a recorrer el texto.
+
+    La alternancia no usa grupos con nombre: un grupo al inicio de cada opción
+    desactiva el descarte rápido por primer literal del motor de `re` y la hace
+    decenas de veces más lenta. El término concreto se identifica después con
+    `match()` en la posición encontrada.
+
+    Las reglas se evalúan en orden de prioridad sobre las señales recogidas: la
+    primera cuyo número de firmas coincidentes alcanza su umbral determina el tipo.
+    """
+
+    def __init__(self, reglas: List[ReglaDeteccion], nombre: str = "deteccion",
+                 genericos: Optional[List[str]] = None):
+        self.reglas = reglas
+        self.nombre = nombre
+        # Términos que no cuentan como coincidencia parcial (ver es_definitivo)
+        self.genericos = set(genericos or [])
+
+        terminos = []
+        for regla in reglas:
+            for firma in regla.firmas:
+                for termino in firma.terminos:
+                    if termino not in terminos:
+                        terminos.append(termino)
+        self.terminos = terminos
+
+        # Términos indexados por su primer carácter; los indeterminados se prueban en todas las posiciones
+        self._por_caracter: Dict[str, List[Tuple[str, re.Pattern]]] = defaultdict(list)
+        self._comodines: List[Tuple[str, re.Pattern]] = []
+        # Resto del término tras un primer carácter literal, para factorizar la alternancia
+        restos: Dict[str, List[str]] = defaultdict(list)
+        otros: List[str] = []
+        for termino in terminos:
+            compilado = re.compile(termino)
+            caracteres = _primeros_caracteres(termino)
+            if caracteres is None:
+                self._comodines.append((termino, compilado))
+            else:
+                for c in set(caracteres):
+                    self._por_caracter[c].append((termino, compilado))
+            if caracteres is not None and termino[0] == caracteres and caracteres.isalnum():
+                restos[caracteres].append(termino[1:])
+            else:
+                otros.append(termino)
+
+        opciones = [f"{re.escape(c)}(?:{'|'.join(r)})" for c, r in restos.items()] + otros
+        self.maestro = registro.registrar(f"(?:{'|'.join(opciones)})", 0, f"{nombre}.maestro")
+
+    def ocurrencias(self, texto: str) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Recorre el texto una vez y devuelve las ocurrencias (inicio, fin) de cada término.
+
+        Args:
+            texto: Texto ya normalizado
+
+        Returns:
+            Dict[str, List[Tuple[int, int]]]: Posiciones de cada término encontrado
+        """
+        encontrados: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        posicion = 0
+        while True:
+            m = self.maestro.search(texto, posicion)
+            if m is None:
+                break
+            posicion = m.start()
+            # Todos los términos que empiezan en esta posición (pueden solaparse)
+            for termino, compilado in self._por_caracter.get(texto[posicion], []) + self._comodines:
+                sub = compilado.match(texto, posicion)
+                if sub:
+                    encontrados[termino].append(sub.span())
+            # Continuar en la siguiente posición para no perder términos dentro de esta coincidencia
+            posicion += 1
+        return encontrados
+
+    def senales(self, texto: str,
+                ocurrencias: Optional[Dict[str, List[Tuple[int, int]]]] = None) -> Dict[str, List[str]]:
+        """
+        Firmas que coinciden en el texto, agrupadas por tipo de documento.
+
+        Args:
+            texto: Texto ya normalizado
+            ocurrencias: Ocurrencias ya calculadas con `ocurrencias()` (opcional)
+
+        Returns:
+            Dict[str, List[str]]: {tipo: [patrones coincidentes]}
+        """
+        if ocurrencias is None:
+            ocurrencias = self.ocurrencias(texto)
+        resultado = {}
+        for regla in self.reglas:
+            coincidentes = [f.patron for f in regla.firmas if f.coincide(ocurrencias)]
+            if coincidentes:
+                resultado[regla.tipo] = coincidentes
+        return resultado
+
+    def es_definitivo(self, tipo: str, ocurrencias: Dict[str, List[Tuple[int, int]]]) -> bool:
+        """
+        Indica si la clasificación `tipo` ya no es ambigua con el texto leído.
+
+        Solo una regla de mayor prioridad puede desplazar a `tipo` al agregar texto. Se
+        considera que el texto leído aún puede cambiar el resultado si alguna de esas
+        reglas ya tiene rastro en él: firmas coincidentes por debajo de su umbral o una
+        firma a medias (algunos de sus términos no genéricos, no todos). Una regla sin ningún rastro
+        solo cambiaría el resultado si el texto siguiente trae firmas completas de otro
+        producto; ese caso se acepta a cambio de no leer más páginas (en las carátulas
+        el producto se nombra al inicio). DESCONOCIDO nunca es definitivo.
+
+        Args:
+            tipo: Tipo devuelto por `clasificar()`
+            ocurrencias: Ocurrencias de términos del texto clasificado
+
+        Returns:
+            bool: True si ninguna regla de mayor prioridad tiene coincidencias parciales
+        """
+        for regla in self.reglas:
+            if regla.tipo == tipo:
+                return True
+            if any(f.coincide(ocurrencias) or f.parcial(ocurrencias, self.genericos) for f in regla.firmas):
+                return False
+        return False
+
+    def clasificar(self, texto: str, senales: Optional[Dict[str, List[str]]] = None) -> Tuple[str, float]:
+        """
+        Aplica las reglas en orden de prioridad sobre las señales del texto.
+
+        La confianza es la fracción de firmas del tipo ganador respecto a `umbral + 2`
+        (alcanzar apenas el umbral da una confianza media; 0.0 para DESCONOCIDO).
+
+        Args:
+            texto: Texto ya normalizado
+            senales: Señales ya calculadas con `senales()` (opcional)
+
+        Returns:
+            Tuple[str, float]: (tipo de documento, confianza entre 0 y 1)
+        """
+        if senales is None:
+            senales = self.senales(texto)
+        for regla in self.reglas:
+            coincidentes = senales.get(regla.tipo, [])
+            if len(coincidentes) >= regla.umbral:
+                confianza = round(min(1.0, len(coincidentes) / (regla.umbral + 2)), 2)
+                return regla.tipo, confianza
+        return "DESCONOCIDO", 0.0
@@ -0,0 +1,265 @@
+import io
+import os
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Union
+
+import fitz  # PyMuPDF
+
+import tiempos
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentContext:
+    """
+    Contexto de un documento PDF para una sola petición.
+
+    El PDF se abre una única vez y cada representación del contenido (texto,
+    texto ordenado, bloques, bytes, etc.) se calcula bajo demanda y se memoriza,
+    de modo que detección, extracción, vista previa y armado de la respuesta
+    comparten el mismo trabajo de parseo.
+
+    Se puede pasar en lugar de la ruta a las funciones que esperan `pdf_path`:
+    implementa `__fspath__`, por lo que `os.path.*` y `open()` siguen funcionando.
+    """
+
+    def __init__(self, ruta: Optional[Union[str, os.PathLike]] = None, contenido: Optional[bytes] = None,
+                 sha256: Optional[str] = None):
+        if ruta is None and contenido is None:
+            raise ValueError("Se requiere la ruta o el contenido del PDF")
+        self.ruta = os.fspath(ruta) if ruta is not None else None
+        self._contenido = contenido
+        self._doc = None
+        # Hash ya calculado por quien llama (p. ej. durante la descarga)
+        self._sha256 = sha256
+        # Vistas por página: {(vista, num_pagina): valor}
+        self._paginas: Dict[tuple, object] = {}
+        # Vistas de documento completo: {vista: valor}
+        self._vistas: Dict[str, object] = {}
+
+    def __fspath__(self) -> str:
+        if self.ruta is None:
+            raise TypeError("El documento se abrió desde memoria y no tiene ruta en disco")
+        return self.ruta
+
+    def __str__(self) -> str:
+        return self.ruta if self.ruta is not None else "<pdf en memoria>"
+
+    def __enter__(self) -> "DocumentContext":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- Acceso al archivo ---
+
+    @property
+    def raw(self) -> bytes:
+        """Bytes del PDF (se leen del disco una sola vez)."""
+        if self._contenido is None:
+            with open(self.ruta, "rb") as f:
+                self._contenido = f.read()
+        return self._contenido
+
+    @property
+    def sha256(self) -> str:
+        """Hash SHA-256 del contenido del PDF."""
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.raw).hexdigest()
+        return self._sha256
+
+    @property
+    def doc(self) -> "fitz.Document":
+        """Documento de PyMuPDF, abierto la primera vez que se necesita."""
+        if self._doc is None:
+            with tiempos.etapa("abrir"):
+                if self.ruta is not None:
+                    logger.debug(f"Abriendo {self.ruta} con fitz")
+                    self._doc = fitz.open(self.ruta)
+                else:
+                    self._doc = fitz.open(stream=self._contenido, filetype="pdf")
+        return self._doc
+
+    @property
+    def page_count(self) -> int:
+        return self.doc.page_count
+
+    def close(self) -> None:
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    # --- Vistas por página ---
+
+    def _vista_pagina(self, vista: str, num_pagina: int, calcular) -> object:
+        clave = (vista, num_pagina)
+        if clave not in self._paginas:
+            page = self.doc.load_page(num_pagina)
+            with tiempos.etapa("texto"):
+                self._paginas[clave] = calcular(page)
+        return self._paginas[clave]
+
+    def page_text(self, num_pagina: int) -> str:
+        """Texto de una página en el orden del contenido (`page.get_text()`)."""
+        return self._vista_pagina("text", num_pagina, lambda page: page.get_text())
+
+    def page_text_sorted(self, num_pagina: int) -> str:
+        """Texto de una página en orden de lectura (`get_text("text", sort=True)`)."""
+        return self._vista_pagina("text_sorted", num_pagina, lambda page: page.get_text("text", sort=True))
+
+    def page_blocks(self, num_pagina: int) -> str:
+        """Texto de una página armado a partir de sus bloques (`get_text("blocks")`)."""
+        def calcular(page):
+            texto_blocks = ""
+            for b in page.get_text("blocks"):
+                # Cada bloque es una tupla con información; el texto está en el índice 4
+                if len(b) > 4:
+                    texto_blocks += b[4] + " "
+            return texto_blocks + "\n"
+        return self._vista_pagina("blocks", num_pagina, calcular)
+
+    def page_text_raw(self, num_pagina: int) -> str:
+        """Texto de una página en orden del contenido, línea por línea (como `pdftotext -raw`)."""
+        return self._vista_pagina("text_raw", num_pagina, texto_crudo_pagina)
+
+    def page_words(self, num_pagina: int) -> list:
+        """Palabras de una página con sus coordenadas (`get_text("words")`)."""
+        return self._vista_pagina("words", num_pagina, lambda page: page.get_text("words"))
+
+    @property
+    def pages_text(self) -> List[str]:
+        return [self.page_text(i) for i in range(self.page_count)]
+
+    @property
+    def pages_text_sorted(self) -> List[str]:
+        return [self.page_text_sorted(i) for i in range(self.page_count)]
+
+    @property
+    def pages_blocks(self) -> List[str]:
+        return [self.page_blocks(i) for i in range(self.page_count)]
+
+    @property
+    def pages_text_raw(self) -> List[str]:
+        return [self.page_text_raw(i) for i in range(self.page_count)]
+
+    @property
+    def pages_words(self) -> List[list]:
+        return [self.page_words(i) for i in range(self.page_count)]
+
+    @property
+    def pages_text_pypdf(self) -> List[str]:
+        """Texto por página extraído con PyPDF2 (solo lo usan extractores heredados)."""
+        if "pages_text_pypdf" not in self._vistas:
+            from PyPDF2 import PdfReader
+            with tiempos.etapa("texto"):
+                reader = PdfReader(io.BytesIO(self.raw))
+                self._vistas["pages_text_pypdf"] = [pagina.extract_text() for pagina in reader.pages]
+        return self._vistas["pages_text_pypdf"]
+
+    # --- Vistas del documento completo ---
+
+    def _unir(self, vista: str, obtener_paginas) -> str:
+        if vista not in self._vistas:
+            self._vistas[vista] = "".join(p + "\n" for p in obtener_paginas())
+        return self._vistas[vista]
+
+    @property
+    def text(self) -> str:
+        """Texto de todas las páginas, cada una terminada en salto de línea."""
+        return self._unir("text", lambda: self.pages_text)
+
+    @property
+    def text_sorted(self) -> str:
+        """Texto ordenado de todas las páginas, cada una terminada en salto de línea."""
+        return self._unir("text_sorted", lambda: self.pages_text_sorted)
+
+    @property
+    def text_raw(self) -> str:
+        """
+        Texto crudo de todas las páginas; como en `pdftotext -raw`, cada página
+        termina en salto de página (`\\f`).
+        """
+        if "text_raw" not in self._vistas:
+            self._vistas["text_raw"] = "".join(p + "\f" for p in self.pages_text_raw)
+        return self._vistas["text_raw"]
+
+    @property
+    def blocks(self) -> str:
+        """Texto por bloques de todas las páginas."""
+        if "blocks" not in self._vistas:
+            self._vistas["blocks"] = "".join(self.pages_blocks)
+        return self._vistas["blocks"]
+
+    @property
+    def text_pypdf(self) -> str:
+        """Texto de PyPDF2 de todas las páginas, cada una terminada en salto de línea."""
+        return self._unir("text_pypdf", lambda: self.pages_text_pypdf)
+
+
+def texto_crudo_pagina(page: "fitz.Page") -> str:
+    """
+    Texto de una página en el orden del flujo de contenido, al estilo de `pdftotext -raw`.
+
+    Los spans se recorren en el orden en que aparecen en el contenido (sin
+    ordenar por posición) y se unen en una misma línea mientras compartan la
+    línea base; un cambio de línea base o un retroceso horizontal abre una línea
+    nueva. Entre dos spans de la misma línea se agrega un espacio si hay hueco
+    entre ellos, como hace pdftotext al detectar separación entre palabras.
+
+    Args:
+        page: Página de PyMuPDF
+
+    Returns:
+        str: Líneas de la página separadas por salto de línea (con salto final)
+    """
+    lineas: List[str] = []
+    actual: List[str] = []
+    base_y = fin_x = None
+    # TEXTFLAGS_TEXT: mismo texto que get_text() sin extraer imágenes
+    for bloque in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        for linea in bloque.get("lines", ()):
+            for span in linea["spans"]:
+                texto = span["text"]
+                if not texto:
+                    continue
+                x0, _, x1, _ = span["bbox"]
+                y = span["origin"][1]
+                tolerancia = span["size"] * 0.5
+                misma_linea = (
+                    base_y is not None
+                    and abs(y - base_y) <= tolerancia
+                    and x0 >= fin_x - tolerancia
+                )
+                if misma_linea:
+                    if x0 - fin_x > span["size"] * 0.1 and not actual[-1].endswith(" ") and not texto.startswith(" "):
+                        actual.append(" ")
+                else:
+                    if actual:
+                        lineas.append("".join(actual).rstrip())
+                    actual = []
+                    base_y = y
+                actual.append(texto)
+                fin_x = x1
+    if actual:
+        lineas.append("".join(actual).rstrip())
+    return "".join(linea + "\n" for linea in lineas)
+
+
+@contextmanager
+def abrir_documento(origen: Union[str, os.PathLike, DocumentContext]):
+    """
+    Devuelve un DocumentContext para `origen`.
+
+    Si `origen` ya es un DocumentContext se reutiliza tal cual y no se cierra al
+    salir; si es una ruta se abre un contexto nuevo que se cierra al terminar.
+    """
+    if isinstance(origen, DocumentContext):
+        yield origen
+        return
+    documento = DocumentContext(origen)
+    try:
+        yield documento
+    finally:
+        documento.close()
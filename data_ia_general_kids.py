@@ -3,12 +3,11 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
-import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
 
 # Configurar logging
 logging.basicConfig(
@@ -27,7 +26,7 @@ def normalizar_numero(valor: str) -> str:
         return "0"
     
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\s]', '', valor)
+    valor = registro.sub(r'[$\s]', '', valor)
     
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
@@ -52,7 +51,7 @@ def detectar_tipo_documento(texto: str) -> str:
     """
     # Normalizar el texto
     texto = texto.lower()
-    texto = re.sub(r'\s+', ' ', texto)
+    texto = registro.sub(r'\s+', ' ', texto)
     
     # Patrones para identificar ALIADOS+ KIDS
     patrones_kids = [
@@ -66,7 +65,7 @@ def detectar_tipo_documento(texto: str) -> str:
     ]
     
     # Contar cuántos patrones coinciden
-    coincidencias = sum(1 for pattern in patrones_kids if re.search(pattern, texto))
+    coincidencias = sum(1 for pattern in patrones_kids if registro.search(pattern, texto))
     
     # Si más del 40% de los patrones coinciden, consideramos que es el documento correcto
     if coincidencias >= len(patrones_kids) * 0.4:
@@ -76,7 +75,7 @@ def detectar_tipo_documento(texto: str) -> str:
     logging.info(f"No se detectó documento de tipo ALIADOS_KIDS (solo {coincidencias} coincidencias)")
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_aliados_kids(pdf_path: str) -> Dict:
+def extraer_datos_poliza_aliados_kids(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza de ALIADOS+ KIDS desde un archivo PDF.
     """
@@ -128,13 +127,9 @@ def extraer_datos_poliza_aliados_kids(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        texto_completo_raw = ""
-        for page in doc:
-            texto_completo += page.get_text("text", sort=True) + "\n"  # Usar sort=True para orden de lectura
-            texto_completo_raw += page.get_text() + "\n"  # Sin ordenar para capturar texto tal como está
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = documento.text_sorted  # Texto en orden de lectura (sort=True)
+            texto_completo_raw = documento.text  # Sin ordenar para capturar texto tal como está
 
         # --- Sección de patrones para extracción ---
         
@@ -211,7 +206,7 @@ def extraer_datos_poliza_aliados_kids(pdf_path: str) -> Dict:
         # --- Sección de extracción de datos ---
         # Buscar coincidencias para todos los patrones
         for campo, patron in patterns.items():
-            match = re.search(patron, texto_completo, re.IGNORECASE | re.MULTILINE)
+            match = registro.search(patron, texto_completo, re.IGNORECASE | re.MULTILINE)
             if match:
                 try:
                     if campo in ["Prima trimestral", "Prima anual total", "Prima trimestral Total", "Prima trimestral adicional", "Recargo por pago fraccionado"]:
@@ -224,7 +219,7 @@ def extraer_datos_poliza_aliados_kids(pdf_path: str) -> Dict:
                     logging.warning(f"Error extrayendo {campo}: {e}")
         
         # Extraer Agente y Nombre del agente (patrón especial que extrae ambos)
-        agente_match = re.search(agente_pattern, texto_completo, re.IGNORECASE)
+        agente_match = registro.search(agente_pattern, texto_completo, re.IGNORECASE)
         if agente_match:
             resultado["Clave Agente"] = agente_match.group(1).strip()
             resultado["Nombre del agente"] = agente_match.group(2).strip()
@@ -232,19 +227,19 @@ def extraer_datos_poliza_aliados_kids(pdf_path: str) -> Dict:
             logging.info(f"Extraído Nombre del agente: {resultado['Nombre del agente']}")
         
         # Extraer Promotor
-        promotor_match = re.search(promotor_pattern, texto_completo, re.IGNORECASE)
+        promotor_match = registro.search(promotor_pattern, texto_completo, re.IGNORECASE)
         if promotor_match:
             resultado["Promotor"] = promotor_match.group(1).strip()
             logging.info(f"Extraído Promotor: {resultado['Promotor']}")
         
         # Extraer Centro de Utilidad
-        centro_match = re.search(centro_utilidad_pattern, texto_completo, re.IGNORECASE)
+        centro_match = registro.search(centro_utilidad_pattern, texto_completo, re.IGNORECASE)
         if centro_match:
             resultado["Centro de Utilidad"] = centro_match.group(1).strip()
             logging.info(f"Extraído Centro de Utilidad: {resultado['Centro de Utilidad']}")
         
         # Extraer coberturas amparadas
-        coberturas_matches = re.finditer(cobertura_pattern, texto_completo, re.IGNORECASE | re.MULTILINE)
+        coberturas_matches = registro.finditer(cobertura_pattern, texto_completo, re.IGNORECASE | re.MULTILINE)
         for match in coberturas_matches:
             cobertura = {
                 "Nombre": match.group(1).strip(),
@@ -271,7 +266,7 @@ def extraer_datos_poliza_aliados_kids(pdf_path: str) -> Dict:
         if resultado["Ciudad del contratante"] == "0" and resultado["Domicilio del contratante"] != "0":
             # Intentar extraer ciudad del domicilio
             domicilio = resultado["Domicilio del contratante"]
-            ciudad_match = re.search(r',\s*([A-ZÁ-Ú\s]+),', domicilio)
+            ciudad_match = registro.search(r',\s*([A-ZÁ-Ú\s]+),', domicilio)
             if ciudad_match:
                 resultado["Ciudad del contratante"] = ciudad_match.group(1).strip()
                 logging.info(f"Extraída Ciudad del contratante del domicilio: {resultado['Ciudad del contratante']}")
@@ -3,12 +3,14 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
+from functools import partial
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
 import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from artefactos import SumideroArtefactos
 
 # Configurar logging
 logging.basicConfig(
@@ -26,7 +28,7 @@ def normalizar_numero(valor: str) -> str:
     if not valor:
         return "0"
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\\s]', '', valor)
+    valor = registro.sub(r'[$\\s]', '', valor)
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
     # Asegura que tenga dos decimales si es un número flotante
@@ -42,7 +44,7 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     Detecta si el documento es una póliza de Protección Efectiva.
     """
     # Patrones para identificar documentos de Protección Efectiva
-    if re.search(r'Protecci[óo]n Efectiva|Carátula de Póliza', texto_pdf, re.IGNORECASE):
+    if registro.search(r'Protecci[óo]n Efectiva|Carátula de Póliza', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Protección Efectiva")
         return "PROTECCION_EFECTIVA"
     
@@ -50,7 +52,43 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     logging.warning("Tipo de documento no identificado como Protección Efectiva")
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_proteccion_efectiva(pdf_path: str) -> Dict:
+# Patrones específicos para el formato Protección Efectiva
+PATRONES = registro.grupo("proteccion_efectiva", {
+    "Clave Agente": r'Agente:?\s+(\d+)|Agente\s+(\d{6})',
+    "Nombre del agente": r'(?:Agente:?\s+\d+\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)|Agente\s+\d{6}\s+([A-ZÁ-Ú\s,.]+)',
+    "Promotor": r'Promotor\s+(\d+)',
+    "Centro de Utilidad": r'Centro de Utilidad\s+(\d+)',
+    "Nombre del asegurado": r'Datos del asegurado\s+Nombre\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|$)',
+    "Nombre del contratante": r'Datos del contratante\s+Nombre\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio|$)',
+    "Domicilio del contratante": r'Domicilio\s+(.*?)(?=\s+R\.F\.C\.|$)',
+    "Código Postal": r'(?:C\.P\.|CP|[\d,]+,)\s*(\d{5})|(\d{5}),\s+\w+',
+    "Teléfono": r'Teléfono\s+([0-9]{7,10})',
+    "R.F.C.": r'R\.F\.C\.\s+([A-Z0-9]{10,13})',
+    "Fecha de Nacimiento": r'Fecha de Nacimiento\s+([0-9]{1,2}\s+DE\s+[A-Z]+\s+DE\s+[0-9]{4})',
+    "Edad": r'Edad\s+([0-9]+)',
+    "Sexo": r'Sexo\s+(FEMENINO|MASCULINO)',
+    "Hábito": r'Hábito\s+(NO\s+FUMADOR|FUMADOR)',
+    "Fecha de emisión": r'Fecha de emisión\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Fecha de inicio de vigencia": r'Fecha de inicio de vigencia\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Fecha de fin de vigencia": r'Fecha de fin de vigencia\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Plazo de seguro": r'Plazo de seguro\s+(TEMPORAL A \d+ AÑO)',
+    "Forma de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',
+    "Tipo de Plan": r'Tipo de Plan\s+([A-ZÁ-Ú\s]+)',
+    "Número de póliza": r'Póliza\s+([A-Z0-9]+H?)',
+    "Solicitud": r'Solicitud\s+([0-9]+)',
+    "Moneda": r'Moneda\s+(PESOS|DÓLARES|UDIS)',
+    "Incremento de Suma Asegurada": r'Incremento de Suma Asegurada\s+(.*?)(?=\n)',
+    "Prima de Incremento programado": r'Prima de Incremento programado\s+(.*?)(?=\n)',
+    "Prima anual": r'Prima anual\s+([\d,]+\.\d{2})',
+    "Descuento": r'Descuento 10%\s+(?:-\s+)?([\d,]+\.\d{2})',
+    "Prima anual total": r'Prima anual total\s+([\d,]+\.\d{2})',
+    "Cobertura Fallecimiento": r'FALLECIMIENTO\s+([\d,]+\.\d{2})',
+    "Cobertura Pérdida Orgánica": r'PÉRDIDA ORGÁNICA POR ACCIDENTE\s+(AMPARADO|[\d,]+\.\d{2})',
+    "Cobertura Invalidez": r'INVALIDEZ TOTAL Y PERMANENTE\s+([\d,]+\.\d{2})'
+}, re.MULTILINE | re.IGNORECASE)
+
+
+def extraer_datos_poliza_proteccion_efectiva(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza de Protección Efectiva desde un archivo PDF.
     """
@@ -91,60 +129,22 @@ def extraer_datos_poliza_proteccion_efectiva(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        for page in doc:
-            texto_completo += page.get_text("text", sort=True) + "\n" # Usar sort=True para orden de lectura
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = documento.text_sorted  # Texto en orden de lectura (sort=True)
 
         # Detectar tipo de documento
         tipo_documento = detectar_tipo_documento(texto_completo)
         if tipo_documento != "PROTECCION_EFECTIVA":
             logging.warning(f"Este documento no parece ser una póliza de Protección Efectiva: {tipo_documento}")
 
-        # Patrones específicos para el formato Protección Efectiva
-        patrones = {
-            "Clave Agente": r'Agente:?\s+(\d+)|Agente\s+(\d{6})',
-            "Nombre del agente": r'(?:Agente:?\s+\d+\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)|Agente\s+\d{6}\s+([A-ZÁ-Ú\s,.]+)',
-            "Promotor": r'Promotor\s+(\d+)',
-            "Centro de Utilidad": r'Centro de Utilidad\s+(\d+)',
-            "Nombre del asegurado": r'Datos del asegurado\s+Nombre\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|$)',
-            "Nombre del contratante": r'Datos del contratante\s+Nombre\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio|$)',
-            "Domicilio del contratante": r'Domicilio\s+(.*?)(?=\s+R\.F\.C\.|$)',
-            "Código Postal": r'(?:C\.P\.|CP|[\d,]+,)\s*(\d{5})|(\d{5}),\s+\w+',
-            "Teléfono": r'Teléfono\s+([0-9]{7,10})',
-            "R.F.C.": r'R\.F\.C\.\s+([A-Z0-9]{10,13})',
-            "Fecha de Nacimiento": r'Fecha de Nacimiento\s+([0-9]{1,2}\s+DE\s+[A-Z]+\s+DE\s+[0-9]{4})',
-            "Edad": r'Edad\s+([0-9]+)',
-            "Sexo": r'Sexo\s+(FEMENINO|MASCULINO)',
-            "Hábito": r'Hábito\s+(NO\s+FUMADOR|FUMADOR)',
-            "Fecha de emisión": r'Fecha de emisión\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Fecha de inicio de vigencia": r'Fecha de inicio de vigencia\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Fecha de fin de vigencia": r'Fecha de fin de vigencia\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Plazo de seguro": r'Plazo de seguro\s+(TEMPORAL A \d+ AÑO)',
-            "Forma de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',
-            "Tipo de Plan": r'Tipo de Plan\s+([A-ZÁ-Ú\s]+)',
-            "Número de póliza": r'Póliza\s+([A-Z0-9]+H?)',
-            "Solicitud": r'Solicitud\s+([0-9]+)',
-            "Moneda": r'Moneda\s+(PESOS|DÓLARES|UDIS)',
-            "Incremento de Suma Asegurada": r'Incremento de Suma Asegurada\s+(.*?)(?=\n)',
-            "Prima de Incremento programado": r'Prima de Incremento programado\s+(.*?)(?=\n)',
-            "Prima anual": r'Prima anual\s+([\d,]+\.\d{2})',
-            "Descuento": r'Descuento 10%\s+(?:-\s+)?([\d,]+\.\d{2})',
-            "Prima anual total": r'Prima anual total\s+([\d,]+\.\d{2})',
-            "Cobertura Fallecimiento": r'FALLECIMIENTO\s+([\d,]+\.\d{2})',
-            "Cobertura Pérdida Orgánica": r'PÉRDIDA ORGÁNICA POR ACCIDENTE\s+(AMPARADO|[\d,]+\.\d{2})',
-            "Cobertura Invalidez": r'INVALIDEZ TOTAL Y PERMANENTE\s+([\d,]+\.\d{2})'
-        }
-
         # Extraer valores usando patrones específicos
-        for campo, patron in patrones.items():
-            match = re.search(patron, texto_completo, re.MULTILINE | re.IGNORECASE)
+        for campo, patron in PATRONES.items():
+            match = patron.search(texto_completo)
             if match:
                 if campo == "Domicilio del contratante":
                     valor = match.group(1).strip() if match.group(1) else match.group(0).strip()
                     # Limpiar saltos de línea y espacios múltiples
-                    valor = re.sub(r'\s*\n\s*', ' ', valor)
+                    valor = registro.sub(r'\s*\n\s*', ' ', valor)
                     # Limitar a 50 caracteres si es necesario
                     if len(valor) > 50:
                         valor = valor[:50]
@@ -186,14 +186,14 @@ def extraer_datos_poliza_proteccion_efectiva(pdf_path: str) -> Dict:
 
         # Si no encontramos algunos datos clave, busquemos con patrones alternativos
         if resultado["Nombre del asegurado"] == "0":
-            nombre_match = re.search(r'Datos del asegurado\s+Nombre\s+(.*?)(?=\s+Fecha|\n)', texto_completo)
+            nombre_match = registro.search(r'Datos del asegurado\s+Nombre\s+(.*?)(?=\s+Fecha|\n)', texto_completo)
             if nombre_match:
                 resultado["Nombre del asegurado"] = nombre_match.group(1).strip()
                 logging.info(f"Nombre del asegurado encontrado (alt): {resultado['Nombre del asegurado']}")
         
         # Tratar de extraer el código postal del domicilio si no lo encontramos directamente
         if resultado["Código Postal"] == "0" and resultado["Domicilio del contratante"] != "0":
-            cp_match = re.search(r'(\d{5})', resultado["Domicilio del contratante"])
+            cp_match = registro.search(r'(\d{5})', resultado["Domicilio del contratante"])
             if cp_match:
                 resultado["Código Postal"] = cp_match.group(1).strip()
                 logging.info(f"Código postal extraído del domicilio: {resultado['Código Postal']}")
@@ -201,7 +201,7 @@ def extraer_datos_poliza_proteccion_efectiva(pdf_path: str) -> Dict:
         # Si no encontramos la cobertura de Pérdida Orgánica como valor numérico
         if resultado["Cobertura Pérdida Orgánica"] == "0":
             # Verificar si está amparado
-            amparado_match = re.search(r'PÉRDIDA ORGÁNICA POR ACCIDENTE\s+(AMPARADO)', texto_completo, re.IGNORECASE)
+            amparado_match = registro.search(r'PÉRDIDA ORGÁNICA POR ACCIDENTE\s+(AMPARADO)', texto_completo, re.IGNORECASE)
             if amparado_match:
                 resultado["Cobertura Pérdida Orgánica"] = "AMPARADO"
                 logging.info(f"Cobertura Pérdida Orgánica: AMPARADO")
@@ -361,6 +361,36 @@ def procesar_archivo(ruta_pdf: str, directorio_salida: str = "output") -> Dict:
         logging.error(f"Error procesando archivo {ruta_pdf}: {str(e)}", exc_info=True)
         return {}
 
+def procesar_documento(ruta_pdf: Union[str, DocumentContext], sumidero: Optional[SumideroArtefactos] = None) -> Dict:
+    """
+    Procesa un PDF de Protección Efectiva sin escribir archivos intermedios.
+    
+    El markdown y el JSON solo se generan si se indica un sumidero activo.
+    
+    Args:
+        ruta_pdf (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+        sumidero (SumideroArtefactos, opcional): Destino del markdown y el JSON; sin
+            sumidero (o apagado) no se escriben
+        
+    Returns:
+        Dict: Datos extraídos del PDF
+    """
+    try:
+        datos = extraer_datos_poliza_proteccion_efectiva(ruta_pdf)
+        
+        if sumidero is not None and sumidero.activo:
+            nombre_base = os.path.splitext(os.path.basename(str(ruta_pdf)))[0]
+            # Copia: en modo async los archivos se escriben después de devolver el resultado
+            sumidero.guardar(nombre_base, {
+                "md": partial(generar_markdown, dict(datos)),
+                "json": partial(guardar_a_json, dict(datos)),
+            })
+        
+        return datos
+    except Exception as e:
+        logging.error(f"Error procesando archivo {ruta_pdf}: {str(e)}", exc_info=True)
+        return {}
+
 def procesar_directorio(directorio: str, directorio_salida: str = "output") -> None:
     """
     Procesa todos los archivos PDF en un directorio.
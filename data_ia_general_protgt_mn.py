@@ -3,12 +3,14 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
+from functools import partial
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
 import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from artefactos import SumideroArtefactos
 
 # Configurar logging
 logging.basicConfig(
@@ -26,7 +28,7 @@ def normalizar_numero(valor: str) -> str:
     if not valor:
         return "0"
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\\s]', '', valor)
+    valor = registro.sub(r'[$\\s]', '', valor)
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
     # Asegura que tenga dos decimales si es un número flotante
@@ -42,12 +44,12 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     Detecta el tipo de documento basado en patrones específicos para pólizas Protegete Temporal MN.
     """
     # Patrones para identificar documentos Protegete Temporal MN
-    if re.search(r'VIDA PROTGT TEMPORAL MN|PROTGT TEMPORAL MN|TEMPORAL MN', texto_pdf, re.IGNORECASE):
+    if registro.search(r'VIDA PROTGT TEMPORAL MN|PROTGT TEMPORAL MN|TEMPORAL MN', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Protegete Temporal MN")
         return "PROTGT_TEMPORAL_MN"
     
     # Si no coincide con ningún patrón conocido pero parece ser de vida
-    if re.search(r'Temporal\s+de\s+Vida|Seguro\s+de\s+Vida|P[óo]liza\s+de\s+Vida', texto_pdf, re.IGNORECASE):
+    if registro.search(r'Temporal\s+de\s+Vida|Seguro\s+de\s+Vida|P[óo]liza\s+de\s+Vida', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Vida (formato general)")
         return "VIDA"
     
@@ -55,7 +57,35 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     logging.warning("Tipo de documento no identificado claramente")
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
+# Patrones específicos para el formato Protegete Temporal MN
+PATRONES = registro.grupo("protgt_temporal_mn", {
+    "Clave Agente": r'Agente:?\s+(\d+)|Promotor:?\s+(\d+)',
+    "Nombre del agente": r'(?:Agente:?\s+\d+\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)',
+    "Nombre del asegurado titular": r'Datos del asegurado\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|$)',
+    "Nombre del contratante": r'Datos del contratante\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio|$)',
+    "Domicilio del contratante": r'Domicilio:\s+(.*?)(?=\s+R\.F\.C\.:|$)',
+    "Código Postal": r'(?:C\.P\.|CP|[\d,]+,)\s*(\d{5})',
+    "Teléfono": r'Teléfono:\s+([0-9]{7,10})',
+    "R.F.C.": r'R\.F\.C\.:\s+([A-Z0-9]{10,13})',
+    "Fecha de emisión": r'Fecha de emisión\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Fecha de inicio de vigencia": r'(?:Fecha de inicio\s+de vigencia|Fecha de inicio|Inicio de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Fecha de fin de vigencia": r'(?:Fecha de fin\s+de vigencia|Fecha de fin|Fin de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Plazo de pago": r'Plazo de\s+pago\s+([0-9]+\s+(?:años|AÑOS))',
+    "Forma de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',
+    "Frecuencia de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',  # Mismo patrón que Forma de pago
+    "Nombre del plan": r'(?:VIDA PROTGT TEMPORAL MN|Tipo de Plan\s+([\w\s]+))',
+    "Número de póliza": r'(?:Póliza|PÓLIZA)\s+([A-Z0-9]+H?)',
+    "Prima Neta": r'Prima anual\s+([\d,]+\.\d{2})',
+    "Prima anual total": r'Prima anual total\s+([\d,]+\.\d{2})',
+    "Prima mensual": r'Prima\s+mensual\s+([\d,]+\.\d{2})|Según\s+Forma\s+de\s+Pago\s+([\d,]+\.\d{2})',
+    "Suma asegurada": r'Básica\s+\d+\s+AÑOS\s+([\d,]+\.\d{2})',
+    "Moneda": r'Moneda\s+([A-ZÁ-Ú]+)',
+    "Centro de Utilidad": r'Centro de Utilidad:\s+(\d+)',
+    "Cobertura Básica": r'Básica\s+(\d+\s+AÑOS)\s+[\d,]+\.\d{2}'
+}, re.MULTILINE | re.IGNORECASE)
+
+
+def extraer_datos_poliza_protgt_temporal_mn(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza Protegete Temporal MN desde un archivo PDF.
     """
@@ -77,11 +107,8 @@ def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        for page in doc:
-            texto_completo += page.get_text("text", sort=True) + "\n" # Usar sort=True para orden de lectura
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = documento.text_sorted  # Texto en orden de lectura (sort=True)
 
         # Detectar tipo de documento
         tipo_documento = detectar_tipo_documento(texto_completo)
@@ -100,41 +127,14 @@ def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
             ]
         }
 
-        # Patrones específicos para el formato Protegete Temporal MN
-        patrones = {
-            "Clave Agente": r'Agente:?\s+(\d+)|Promotor:?\s+(\d+)',
-            "Nombre del agente": r'(?:Agente:?\s+\d+\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)',
-            "Nombre del asegurado titular": r'Datos del asegurado\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|$)',
-            "Nombre del contratante": r'Datos del contratante\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio|$)',
-            "Domicilio del contratante": r'Domicilio:\s+(.*?)(?=\s+R\.F\.C\.:|$)',
-            "Código Postal": r'(?:C\.P\.|CP|[\d,]+,)\s*(\d{5})',
-            "Teléfono": r'Teléfono:\s+([0-9]{7,10})',
-            "R.F.C.": r'R\.F\.C\.:\s+([A-Z0-9]{10,13})',
-            "Fecha de emisión": r'Fecha de emisión\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Fecha de inicio de vigencia": r'(?:Fecha de inicio\s+de vigencia|Fecha de inicio|Inicio de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Fecha de fin de vigencia": r'(?:Fecha de fin\s+de vigencia|Fecha de fin|Fin de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Plazo de pago": r'Plazo de\s+pago\s+([0-9]+\s+(?:años|AÑOS))',
-            "Forma de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',
-            "Frecuencia de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',  # Mismo patrón que Forma de pago
-            "Nombre del plan": r'(?:VIDA PROTGT TEMPORAL MN|Tipo de Plan\s+([\w\s]+))',
-            "Número de póliza": r'(?:Póliza|PÓLIZA)\s+([A-Z0-9]+H?)',
-            "Prima Neta": r'Prima anual\s+([\d,]+\.\d{2})',
-            "Prima anual total": r'Prima anual total\s+([\d,]+\.\d{2})',
-            "Prima mensual": r'Prima\s+mensual\s+([\d,]+\.\d{2})|Según\s+Forma\s+de\s+Pago\s+([\d,]+\.\d{2})',
-            "Suma asegurada": r'Básica\s+\d+\s+AÑOS\s+([\d,]+\.\d{2})',
-            "Moneda": r'Moneda\s+([A-ZÁ-Ú]+)',
-            "Centro de Utilidad": r'Centro de Utilidad:\s+(\d+)',
-            "Cobertura Básica": r'Básica\s+(\d+\s+AÑOS)\s+[\d,]+\.\d{2}'
-        }
-
         # Extraer valores usando patrones específicos
-        for campo, patron in patrones.items():
-            match = re.search(patron, texto_completo, re.MULTILINE | re.IGNORECASE)
+        for campo, patron in PATRONES.items():
+            match = patron.search(texto_completo)
             if match:
                 if campo == "Domicilio del contratante":
                     valor = match.group(1).strip()
                     # Limpiar saltos de línea y espacios múltiples
-                    valor = re.sub(r'\s*\n\s*', ' ', valor)
+                    valor = registro.sub(r'\s*\n\s*', ' ', valor)
                     # Limitar a 50 caracteres si es necesario
                     if len(valor) > 50:
                         valor = valor[:50]
@@ -183,7 +183,7 @@ def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
 
         # Si no encontramos algunos datos clave, busquemos con patrones alternativos
         if resultado["Nombre del asegurado titular"] == "0":
-            nombre_match = re.search(r'Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|\n)', texto_completo)
+            nombre_match = registro.search(r'Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|\n)', texto_completo)
             if nombre_match:
                 resultado["Nombre del asegurado titular"] = nombre_match.group(1).strip()
                 logging.info(f"Nombre del asegurado encontrado (alt): {resultado['Nombre del asegurado titular']}")
@@ -195,7 +195,7 @@ def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
         
         # Buscar fechas de vigencia con patrón alternativo
         if resultado["Fecha de inicio de vigencia"] == "0":
-            fecha_inicio_match = re.search(r'(?:vigencia|Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_completo)
+            fecha_inicio_match = registro.search(r'(?:vigencia|Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_completo)
             if fecha_inicio_match:
                 resultado["Fecha de inicio de vigencia"] = fecha_inicio_match.group(1).strip()
                 logging.info(f"Fecha de inicio encontrada (alt): {resultado['Fecha de inicio de vigencia']}")
@@ -204,7 +204,7 @@ def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
             # Buscar fecha de fin de vigencia después de fecha de inicio
             if resultado["Fecha de inicio de vigencia"] != "0":
                 texto_posterior = texto_completo[texto_completo.find(resultado["Fecha de inicio de vigencia"]):]
-                fecha_fin_match = re.search(r'([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_posterior[len(resultado["Fecha de inicio de vigencia"]):])
+                fecha_fin_match = registro.search(r'([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_posterior[len(resultado["Fecha de inicio de vigencia"]):])
                 if fecha_fin_match:
                     resultado["Fecha de fin de vigencia"] = fecha_fin_match.group(1).strip()
                     logging.info(f"Fecha de fin encontrada (alt): {resultado['Fecha de fin de vigencia']}")
@@ -212,7 +212,7 @@ def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
         # Número de póliza puede estar en formato diferente
         if resultado["Número de póliza"] == "0" or not resultado["Número de póliza"].isalnum():
             # Buscar en todo el texto para encontrar el número de póliza con formato 1058047H
-            poliza_match = re.search(r'(?:Póliza|PÓLIZA|Poliza)\s*[:\s]\s*(\d+[A-Z]?H?)|(\d+[A-Z]?H?)(?:\s+Este)', texto_completo)
+            poliza_match = registro.search(r'(?:Póliza|PÓLIZA|Poliza)\s*[:\s]\s*(\d+[A-Z]?H?)|(\d+[A-Z]?H?)(?:\s+Este)', texto_completo)
             if poliza_match:
                 # Seleccionar el grupo que no es None
                 poliza_num = next((g for g in poliza_match.groups() if g), "")
@@ -224,7 +224,7 @@ def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
                 poliza_lines = [line for line in texto_completo.split('\n') if 'póliza' in line.lower() or '1058047' in line]
                 if poliza_lines:
                     for line in poliza_lines:
-                        match = re.search(r'(\d+[A-Z]?H?)', line)
+                        match = registro.search(r'(\d+[A-Z]?H?)', line)
                         if match and len(match.group(1)) > 5:  # Debe ser un número suficientemente largo
                             resultado["Número de póliza"] = match.group(1).strip()
                             logging.info(f"Número de póliza encontrado (último intento): {resultado['Número de póliza']}")
@@ -233,20 +233,20 @@ def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
         # Nombre del plan puede estar en el encabezado del documento
         if resultado["Nombre del plan"] == "0":
             # Buscar directamente el nombre del plan en el encabezado del documento
-            plan_match = re.search(r'VIDA PROTGT TEMPORAL MN', texto_completo)
+            plan_match = registro.search(r'VIDA PROTGT TEMPORAL MN', texto_completo)
             if plan_match:
                 resultado["Nombre del plan"] = plan_match.group(0).strip()
                 logging.info(f"Nombre del plan encontrado (alt): {resultado['Nombre del plan']}")
             else:
                 # Buscar cualquier mención a "Tipo de Plan"
-                plan_match = re.search(r'Tipo de Plan\s+([A-ZÁ-ÚÑa-zá-úñ\s]+)', texto_completo)
+                plan_match = registro.search(r'Tipo de Plan\s+([A-ZÁ-ÚÑa-zá-úñ\s]+)', texto_completo)
                 if plan_match:
                     resultado["Nombre del plan"] = plan_match.group(1).strip()
                     logging.info(f"Nombre del plan encontrado (tipo): {resultado['Nombre del plan']}")
         
         # Plazo de pago puede estar en otro formato
         if resultado["Plazo de pago"] == "0":
-            plazo_match = re.search(r'Plazo de\s+pago\s+([0-9]+)', texto_completo)
+            plazo_match = registro.search(r'Plazo de\s+pago\s+([0-9]+)', texto_completo)
             if plazo_match:
                 resultado["Plazo de pago"] = plazo_match.group(1).strip() + " años"
                 logging.info(f"Plazo de pago encontrado (alt): {resultado['Plazo de pago']}")
@@ -254,7 +254,7 @@ def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
                 # Buscar en secciones relacionadas con el pago
                 for linea in texto_completo.split('\n'):
                     if "Plazo" in linea and "año" in linea.lower():
-                        plazo_match = re.search(r'([0-9]+\s*(?:años|AÑOS|Años))', linea)
+                        plazo_match = registro.search(r'([0-9]+\s*(?:años|AÑOS|Años))', linea)
                         if plazo_match:
                             resultado["Plazo de pago"] = plazo_match.group(1).strip()
                             logging.info(f"Plazo de pago encontrado (línea): {resultado['Plazo de pago']}")
@@ -270,13 +270,13 @@ def extraer_datos_poliza_protgt_temporal_mn(pdf_path: str) -> Dict:
         # La cobertura básica puede estar en la sección de coberturas
         if resultado["Cobertura Básica"] == "0":
             # Buscar en la sección de coberturas
-            cobertura_match = re.search(r'Básica\s+(\d+\s+AÑOS)\s+[\d,]+\.\d{2}', texto_completo)
+            cobertura_match = registro.search(r'Básica\s+(\d+\s+AÑOS)\s+[\d,]+\.\d{2}', texto_completo)
             if cobertura_match:
                 resultado["Cobertura Básica"] = cobertura_match.group(1).strip()
                 logging.info(f"Cobertura básica encontrada: {resultado['Cobertura Básica']}")
         
         # El número de póliza podría ser incorrecto, buscar específicamente 1058047H
-        poliza_alt_match = re.search(r'(\d{7}H)', texto_completo)
+        poliza_alt_match = registro.search(r'(\d{7}H)', texto_completo)
         if poliza_alt_match:
             # Este formato es más específico (7 dígitos seguidos de H)
             resultado["Número de póliza"] = poliza_alt_match.group(1).strip()
@@ -453,7 +453,7 @@ def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
         # Buscar cada clave usando regex
         for clave_md, clave_dict in mapping.items():
             patron = f"- \\*\\*{clave_md}\\*\\*: (.*?)\\n"
-            match = re.search(patron, contenido)
+            match = registro.search(patron, contenido)
             if match:
                 valor = match.group(1).strip()
                 # Si el valor es "Por determinar", mantener como "0"
@@ -509,6 +509,36 @@ def procesar_archivo(ruta_pdf: str, directorio_salida: str = "output") -> Dict:
         logging.error(f"Error procesando archivo {ruta_pdf}: {str(e)}", exc_info=True)
         return {}
 
+def procesar_documento(ruta_pdf: Union[str, DocumentContext], sumidero: Optional[SumideroArtefactos] = None) -> Dict:
+    """
+    Procesa un PDF de Protegete Temporal MN sin escribir archivos intermedios.
+    
+    El markdown y el JSON solo se generan si se indica un sumidero activo.
+    
+    Args:
+        ruta_pdf (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+        sumidero (SumideroArtefactos, opcional): Destino del markdown y el JSON; sin
+            sumidero (o apagado) no se escriben
+        
+    Returns:
+        Dict: Datos extraídos del PDF
+    """
+    try:
+        datos = extraer_datos_poliza_protgt_temporal_mn(ruta_pdf)
+        
+        if sumidero is not None and sumidero.activo:
+            nombre_base = os.path.splitext(os.path.basename(str(ruta_pdf)))[0]
+            # Copia: en modo async los archivos se escriben después de devolver el resultado
+            sumidero.guardar(nombre_base, {
+                "md": partial(generar_markdown, dict(datos)),
+                "json": partial(guardar_a_json, dict(datos)),
+            })
+        
+        return datos
+    except Exception as e:
+        logging.error(f"Error procesando archivo {ruta_pdf}: {str(e)}", exc_info=True)
+        return {}
+
 def procesar_directorio(directorio: str, directorio_salida: str = "output") -> None:
     """
     Procesa todos los archivos PDF en un directorio.
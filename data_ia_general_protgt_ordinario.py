@@ -3,12 +3,15 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
+from functools import partial
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
 import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from artefactos import SumideroArtefactos
+import markdown_polizas
 
 # Configurar logging
 logging.basicConfig(
@@ -26,7 +29,7 @@ def normalizar_numero(valor: str) -> str:
     if not valor:
         return "0"
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\\s]', '', valor)
+    valor = registro.sub(r'[$\\s]', '', valor)
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
     # Asegura que tenga dos decimales si es un número flotante
@@ -42,12 +45,12 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     Detecta el tipo de documento basado en patrones específicos para pólizas Protegete Ordinario.
     """
     # Patrones para identificar documentos Protegete Ordinario
-    if re.search(r'VIDA PROTGT ORDINARIO|PROTGT ORDINARIO DE VIDA', texto_pdf, re.IGNORECASE):
+    if registro.search(r'VIDA PROTGT ORDINARIO|PROTGT ORDINARIO DE VIDA', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Protegete Ordinario")
         return "PROTGT_ORDINARIO"
     
     # Si no coincide con ningún patrón conocido pero parece ser de vida
-    if re.search(r'Ordinario\s+de\s+Vida|Seguro\s+de\s+Vida|P[óo]liza\s+de\s+Vida', texto_pdf, re.IGNORECASE):
+    if registro.search(r'Ordinario\s+de\s+Vida|Seguro\s+de\s+Vida|P[óo]liza\s+de\s+Vida', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Vida (formato general)")
         return "VIDA"
     
@@ -55,7 +58,35 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     logging.warning("Tipo de documento no identificado claramente")
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
+# Patrones específicos para el formato Protegete Ordinario
+PATRONES = registro.grupo("protgt_ordinario", {
+    "Clave Agente": r'Agente:?\s+(\d+)|Promotor:?\s+(\d+)',
+    "Nombre del agente": r'(?:Agente:?\s+\d+\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)',
+    "Nombre del asegurado titular": r'Datos del asegurado\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|$)',
+    "Nombre del contratante": r'Datos del contratante\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio|$)',
+    "Domicilio del contratante": r'Domicilio:\s+(.*?)(?=\s+R\.F\.C\.:|$)',
+    "Código Postal": r'(?:C\.P\.|CP|[\d,]+,)\s*(\d{5})',
+    "Teléfono": r'Teléfono:\s+([0-9]{7,10})',
+    "R.F.C.": r'R\.F\.C\.:\s+([A-Z0-9]{10,13})',
+    "Fecha de emisión": r'Fecha de emisión\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Fecha de inicio de vigencia": r'(?:Fecha de inicio\s+de vigencia|Fecha de inicio|Inicio de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Fecha de fin de vigencia": r'(?:Fecha de fin\s+de vigencia|Fecha de fin|Fin de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Plazo de pago": r'Plazo de\s+pago\s+([0-9]+\s+(?:años|AÑOS))',
+    "Forma de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',
+    "Frecuencia de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',  # Mismo patrón que Forma de pago
+    "Nombre del plan": r'(?:VIDA PROTGT ORDINARIO DE VIDA UDIS|VIDA PROTGT ORDINARIO DE VIDA|Tipo de Plan\s+([\w\s]+))',
+    "Número de póliza": r'(?:Póliza|PÓLIZA)\s+([A-Z0-9]+H?)',
+    "Prima Neta": r'Prima anual\s+([\d,]+\.\d{2})',
+    "Prima anual total": r'Prima anual total\s+([\d,]+\.\d{2})',
+    "Prima mensual": r'Prima\s+mensual\s+([\d,]+\.\d{2})|Según\s+Forma\s+de\s+Pago\s+([\d,]+\.\d{2})',
+    "Suma asegurada": r'Básica\s+\d+\s+AÑOS\s+([\d,]+\.\d{2})',
+    "Moneda": r'Moneda\s+([A-ZÁ-Ú]+)',
+    "Centro de Utilidad": r'Centro de Utilidad:\s+(\d+)',
+    "Cobertura Básica": r'Básica\s+(\d+\s+AÑOS)\s+[\d,]+\.\d{2}'
+}, re.MULTILINE | re.IGNORECASE)
+
+
+def extraer_datos_poliza_protgt_ordinario(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza Protegete Ordinario desde un archivo PDF.
     """
@@ -77,52 +108,22 @@ def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        for page in doc:
-            texto_completo += page.get_text("text", sort=True) + "\n" # Usar sort=True para orden de lectura
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = documento.text_sorted  # Texto en orden de lectura (sort=True)
 
         # Detectar tipo de documento
         tipo_documento = detectar_tipo_documento(texto_completo)
         if tipo_documento != "PROTGT_ORDINARIO" and tipo_documento != "VIDA":
             logging.warning(f"Este documento no parece ser una póliza Protegete Ordinario: {tipo_documento}")
 
-        # Patrones específicos para el formato Protegete Ordinario
-        patrones = {
-            "Clave Agente": r'Agente:?\s+(\d+)|Promotor:?\s+(\d+)',
-            "Nombre del agente": r'(?:Agente:?\s+\d+\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)',
-            "Nombre del asegurado titular": r'Datos del asegurado\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|$)',
-            "Nombre del contratante": r'Datos del contratante\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio|$)',
-            "Domicilio del contratante": r'Domicilio:\s+(.*?)(?=\s+R\.F\.C\.:|$)',
-            "Código Postal": r'(?:C\.P\.|CP|[\d,]+,)\s*(\d{5})',
-            "Teléfono": r'Teléfono:\s+([0-9]{7,10})',
-            "R.F.C.": r'R\.F\.C\.:\s+([A-Z0-9]{10,13})',
-            "Fecha de emisión": r'Fecha de emisión\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Fecha de inicio de vigencia": r'(?:Fecha de inicio\s+de vigencia|Fecha de inicio|Inicio de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Fecha de fin de vigencia": r'(?:Fecha de fin\s+de vigencia|Fecha de fin|Fin de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Plazo de pago": r'Plazo de\s+pago\s+([0-9]+\s+(?:años|AÑOS))',
-            "Forma de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',
-            "Frecuencia de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',  # Mismo patrón que Forma de pago
-            "Nombre del plan": r'(?:VIDA PROTGT ORDINARIO DE VIDA UDIS|VIDA PROTGT ORDINARIO DE VIDA|Tipo de Plan\s+([\w\s]+))',
-            "Número de póliza": r'(?:Póliza|PÓLIZA)\s+([A-Z0-9]+H?)',
-            "Prima Neta": r'Prima anual\s+([\d,]+\.\d{2})',
-            "Prima anual total": r'Prima anual total\s+([\d,]+\.\d{2})',
-            "Prima mensual": r'Prima\s+mensual\s+([\d,]+\.\d{2})|Según\s+Forma\s+de\s+Pago\s+([\d,]+\.\d{2})',
-            "Suma asegurada": r'Básica\s+\d+\s+AÑOS\s+([\d,]+\.\d{2})',
-            "Moneda": r'Moneda\s+([A-ZÁ-Ú]+)',
-            "Centro de Utilidad": r'Centro de Utilidad:\s+(\d+)',
-            "Cobertura Básica": r'Básica\s+(\d+\s+AÑOS)\s+[\d,]+\.\d{2}'
-        }
-
         # Extraer valores usando patrones específicos
-        for campo, patron in patrones.items():
-            match = re.search(patron, texto_completo, re.MULTILINE | re.IGNORECASE)
+        for campo, patron in PATRONES.items():
+            match = patron.search(texto_completo)
             if match:
                 if campo == "Domicilio del contratante":
                     valor = match.group(1).strip()
                     # Limpiar saltos de línea y espacios múltiples
-                    valor = re.sub(r'\s*\n\s*', ' ', valor)
+                    valor = registro.sub(r'\s*\n\s*', ' ', valor)
                     # Limitar a 50 caracteres si es necesario
                     if len(valor) > 50:
                         valor = valor[:50]
@@ -171,7 +172,7 @@ def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
 
         # Buscar fechas de vigencia con patrón alternativo
         if resultado["Fecha de inicio de vigencia"] == "0":
-            fecha_inicio_match = re.search(r'(?:vigencia|Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_completo)
+            fecha_inicio_match = registro.search(r'(?:vigencia|Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_completo)
             if fecha_inicio_match:
                 resultado["Fecha de inicio de vigencia"] = fecha_inicio_match.group(1).strip()
                 logging.info(f"Fecha de inicio encontrada (alt): {resultado['Fecha de inicio de vigencia']}")
@@ -180,7 +181,7 @@ def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
             # Buscar fecha de fin de vigencia después de fecha de inicio
             if resultado["Fecha de inicio de vigencia"] != "0":
                 texto_posterior = texto_completo[texto_completo.find(resultado["Fecha de inicio de vigencia"]):]
-                fecha_fin_match = re.search(r'([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_posterior[len(resultado["Fecha de inicio de vigencia"]):])
+                fecha_fin_match = registro.search(r'([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_posterior[len(resultado["Fecha de inicio de vigencia"]):])
                 if fecha_fin_match:
                     resultado["Fecha de fin de vigencia"] = fecha_fin_match.group(1).strip()
                     logging.info(f"Fecha de fin encontrada (alt): {resultado['Fecha de fin de vigencia']}")
@@ -188,7 +189,7 @@ def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
         # Número de póliza puede estar en formato diferente
         if resultado["Número de póliza"] == "0" or not resultado["Número de póliza"].isalnum():
             # Buscar en todo el texto para encontrar el número de póliza con formato 1058271H
-            poliza_match = re.search(r'(?:Póliza|PÓLIZA|Poliza)\s*[:\s]\s*(\d+[A-Z]?H?)|(\d+[A-Z]?H?)(?:\s+Este)', texto_completo)
+            poliza_match = registro.search(r'(?:Póliza|PÓLIZA|Poliza)\s*[:\s]\s*(\d+[A-Z]?H?)|(\d+[A-Z]?H?)(?:\s+Este)', texto_completo)
             if poliza_match:
                 # Seleccionar el grupo que no es None
                 poliza_num = next((g for g in poliza_match.groups() if g), "")
@@ -200,7 +201,7 @@ def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
                 poliza_lines = [line for line in texto_completo.split('\n') if 'póliza' in line.lower() or '1058271' in line]
                 if poliza_lines:
                     for line in poliza_lines:
-                        match = re.search(r'(\d+[A-Z]?H?)', line)
+                        match = registro.search(r'(\d+[A-Z]?H?)', line)
                         if match and len(match.group(1)) > 5:  # Debe ser un número suficientemente largo
                             resultado["Número de póliza"] = match.group(1).strip()
                             logging.info(f"Número de póliza encontrado (último intento): {resultado['Número de póliza']}")
@@ -209,20 +210,20 @@ def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
         # Nombre del plan puede estar en el encabezado del documento
         if resultado["Nombre del plan"] == "0":
             # Buscar directamente el nombre del plan en el encabezado del documento
-            plan_match = re.search(r'VIDA PROTGT ORDINARIO DE VIDA UDIS', texto_completo)
+            plan_match = registro.search(r'VIDA PROTGT ORDINARIO DE VIDA UDIS', texto_completo)
             if plan_match:
                 resultado["Nombre del plan"] = plan_match.group(0).strip()
                 logging.info(f"Nombre del plan encontrado (alt): {resultado['Nombre del plan']}")
             else:
                 # Buscar cualquier mención a "Tipo de Plan"
-                plan_match = re.search(r'Tipo de Plan\s+([A-ZÁ-ÚÑa-zá-úñ\s]+)', texto_completo)
+                plan_match = registro.search(r'Tipo de Plan\s+([A-ZÁ-ÚÑa-zá-úñ\s]+)', texto_completo)
                 if plan_match:
                     resultado["Nombre del plan"] = plan_match.group(1).strip()
                     logging.info(f"Nombre del plan encontrado (tipo): {resultado['Nombre del plan']}")
         
         # Plazo de pago puede estar en otro formato
         if resultado["Plazo de pago"] == "0":
-            plazo_match = re.search(r'Plazo de\s+pago\s+([0-9]+)', texto_completo)
+            plazo_match = registro.search(r'Plazo de\s+pago\s+([0-9]+)', texto_completo)
             if plazo_match:
                 resultado["Plazo de pago"] = plazo_match.group(1).strip() + " años"
                 logging.info(f"Plazo de pago encontrado (alt): {resultado['Plazo de pago']}")
@@ -230,7 +231,7 @@ def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
                 # Buscar en secciones relacionadas con el pago
                 for linea in texto_completo.split('\n'):
                     if "Plazo" in linea and "año" in linea.lower():
-                        plazo_match = re.search(r'([0-9]+\s*(?:años|AÑOS|Años))', linea)
+                        plazo_match = registro.search(r'([0-9]+\s*(?:años|AÑOS|Años))', linea)
                         if plazo_match:
                             resultado["Plazo de pago"] = plazo_match.group(1).strip()
                             logging.info(f"Plazo de pago encontrado (línea): {resultado['Plazo de pago']}")
@@ -248,13 +249,13 @@ def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
         # La cobertura básica puede estar en la sección de coberturas
         if resultado["Cobertura Básica"] == "0":
             # Buscar en la sección de coberturas
-            cobertura_match = re.search(r'Básica\s+(\d+\s+AÑOS)\s+[\d,]+\.\d{2}', texto_completo)
+            cobertura_match = registro.search(r'Básica\s+(\d+\s+AÑOS)\s+[\d,]+\.\d{2}', texto_completo)
             if cobertura_match:
                 resultado["Cobertura Básica"] = cobertura_match.group(1).strip()
                 logging.info(f"Cobertura básica encontrada: {resultado['Cobertura Básica']}")
         
         # El número de póliza podría ser incorrecto, buscar específicamente 1058271H
-        poliza_alt_match = re.search(r'(\d{7}H)', texto_completo)
+        poliza_alt_match = registro.search(r'(\d{7}H)', texto_completo)
         if poliza_alt_match:
             # Este formato es más específico (7 dígitos seguidos de H)
             resultado["Número de póliza"] = poliza_alt_match.group(1).strip()
@@ -264,7 +265,7 @@ def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
             poliza_lines = [line for line in texto_completo.split('\n') if '1058271' in line]
             if poliza_lines:
                 for line in poliza_lines:
-                    match = re.search(r'1058271H?', line)
+                    match = registro.search(r'1058271H?', line)
                     if match:
                         resultado["Número de póliza"] = match.group(0).strip()
                         logging.info(f"Número de póliza encontrado (específico): {resultado['Número de póliza']}")
@@ -288,92 +289,79 @@ def extraer_datos_poliza_protgt_ordinario(pdf_path: str) -> Dict:
 
     return resultado
 
+# Encabezado y notas del markdown de datos extraídos
+TITULO_MARKDOWN = "Datos Extraídos de Póliza Protegete Ordinario"
+NOTAS_MARKDOWN = "El documento es una póliza Protegete Ordinario. Los valores \"Por determinar\" indican campos que no pudieron ser claramente identificados en el documento original PDF."
+
+def organizar_datos_markdown(datos: Dict) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Organiza los datos extraídos en las secciones del markdown.
+    """
+    # Organizar datos por categorías
+    info_general = {
+        "Tipo de Documento": "Póliza Protegete Ordinario",
+        "Nombre del Plan": datos["Nombre del plan"] if datos["Nombre del plan"] != "0" else "Por determinar",
+        "Número de Póliza": datos["Número de póliza"] if datos["Número de póliza"] != "0" else "Por determinar"
+    }
+
+    datos_asegurado = {
+        "Nombre del Asegurado Titular": datos["Nombre del asegurado titular"] if datos["Nombre del asegurado titular"] != "0" else "Por determinar",
+        "Nombre del Contratante": datos["Nombre del contratante"] if datos["Nombre del contratante"] != "0" else "Por determinar",
+        "R.F.C.": datos["R.F.C."] if datos["R.F.C."] != "0" else "Por determinar",
+        "Domicilio del Contratante": datos["Domicilio del contratante"] if datos["Domicilio del contratante"] != "0" else "Por determinar",
+        "Código Postal": datos["Código Postal"] if datos["Código Postal"] != "0" else "Por determinar",
+        "Teléfono": datos["Teléfono"] if datos["Teléfono"] != "0" else "Por determinar"
+    }
+
+    datos_agente = {
+        "Clave Agente": datos["Clave Agente"] if datos["Clave Agente"] != "0" else "Por determinar",
+        "Nombre del Agente": datos["Nombre del agente"] if datos["Nombre del agente"] != "0" else "Por determinar"
+    }
+
+    fechas = {
+        "Fecha de Emisión": datos["Fecha de emisión"] if datos["Fecha de emisión"] != "0" else "Por determinar",
+        "Fecha de Inicio de Vigencia": datos["Fecha de inicio de vigencia"] if datos["Fecha de inicio de vigencia"] != "0" else "Por determinar",
+        "Fecha de Fin de Vigencia": datos["Fecha de fin de vigencia"] if datos["Fecha de fin de vigencia"] != "0" else "Por determinar"
+    }
+
+    info_financiera = {
+        "Prima Neta": datos["Prima Neta"] if datos["Prima Neta"] != "0" else "Por determinar",
+        "Prima Anual Total": datos["Prima anual total"] if datos["Prima anual total"] != "0" else "Por determinar",
+        "Prima Mensual": datos["Prima mensual"] if datos["Prima mensual"] != "0" else "Por determinar",
+        "Cobertura Básica": datos["Cobertura Básica"] if datos["Cobertura Básica"] != "0" else "Por determinar",
+        "Frecuencia de Pago": datos["Frecuencia de pago"] if datos["Frecuencia de pago"] != "0" else "Por determinar",
+        "Periodo de Pago de Siniestro": datos["Periodo de pago de siniestro"] if datos["Periodo de pago de siniestro"] != "0" else "Por determinar",
+        "Suma Asegurada": datos["Suma asegurada"] if datos["Suma asegurada"] != "0" else "Por determinar",
+        "Moneda": datos["Moneda"] if datos["Moneda"] != "0" else "Por determinar",
+        "I.V.A.": datos["I.V.A."] if datos["I.V.A."] != "0" else "0",
+        "Coaseguro": datos["Coaseguro"] if datos["Coaseguro"] != "0" else "0",
+        "Deducible": datos["Deducible"] if datos["Deducible"] != "0" else "0",
+        "Deducible Cero por Accidente": datos["Deducible Cero por Accidente"] if datos["Deducible Cero por Accidente"] != "0" else "0",
+        "Gama Hospitalaria": datos["Gama Hospitalaria"] if datos["Gama Hospitalaria"] != "0" else "0",
+        "Cobertura Nacional": datos["Cobertura Nacional"] if datos["Cobertura Nacional"] != "0" else "0",
+        "Plazo de Pago": datos["Plazo de pago"] if datos["Plazo de pago"] != "0" else "Por determinar"
+    }
+    
+    return [
+        ("Información General", info_general),
+        ("Datos del Asegurado", datos_asegurado),
+        ("Datos del Agente", datos_agente),
+        ("Fechas Importantes", fechas),
+        ("Información Financiera", info_financiera),
+    ]
+
+def renderizar_markdown(datos: Dict) -> str:
+    """
+    Genera el contenido markdown con los datos extraídos, sin escribirlo a disco.
+    """
+    return markdown_polizas.renderizar_markdown(TITULO_MARKDOWN, organizar_datos_markdown(datos), NOTAS_MARKDOWN)
+
 def generar_markdown(datos: Dict, ruta_salida: str = "protegete_ordinario.md") -> None:
     """
     Genera un archivo markdown con los datos extraídos estructurados para pólizas Protegete Ordinario.
     """
     try:
-        # Organizar datos por categorías
-        info_general = {
-            "Tipo de Documento": "Póliza Protegete Ordinario",
-            "Nombre del Plan": datos["Nombre del plan"] if datos["Nombre del plan"] != "0" else "Por determinar",
-            "Número de Póliza": datos["Número de póliza"] if datos["Número de póliza"] != "0" else "Por determinar"
-        }
-        
-        datos_asegurado = {
-            "Nombre del Asegurado Titular": datos["Nombre del asegurado titular"] if datos["Nombre del asegurado titular"] != "0" else "Por determinar",
-            "Nombre del Contratante": datos["Nombre del contratante"] if datos["Nombre del contratante"] != "0" else "Por determinar",
-            "R.F.C.": datos["R.F.C."] if datos["R.F.C."] != "0" else "Por determinar",
-            "Domicilio del Contratante": datos["Domicilio del contratante"] if datos["Domicilio del contratante"] != "0" else "Por determinar",
-            "Código Postal": datos["Código Postal"] if datos["Código Postal"] != "0" else "Por determinar",
-            "Teléfono": datos["Teléfono"] if datos["Teléfono"] != "0" else "Por determinar"
-        }
-        
-        datos_agente = {
-            "Clave Agente": datos["Clave Agente"] if datos["Clave Agente"] != "0" else "Por determinar",
-            "Nombre del Agente": datos["Nombre del agente"] if datos["Nombre del agente"] != "0" else "Por determinar"
-        }
-        
-        fechas = {
-            "Fecha de Emisión": datos["Fecha de emisión"] if datos["Fecha de emisión"] != "0" else "Por determinar",
-            "Fecha de Inicio de Vigencia": datos["Fecha de inicio de vigencia"] if datos["Fecha de inicio de vigencia"] != "0" else "Por determinar",
-            "Fecha de Fin de Vigencia": datos["Fecha de fin de vigencia"] if datos["Fecha de fin de vigencia"] != "0" else "Por determinar"
-        }
-        
-        info_financiera = {
-            "Prima Neta": datos["Prima Neta"] if datos["Prima Neta"] != "0" else "Por determinar",
-            "Prima Anual Total": datos["Prima anual total"] if datos["Prima anual total"] != "0" else "Por determinar",
-            "Prima Mensual": datos["Prima mensual"] if datos["Prima mensual"] != "0" else "Por determinar",
-            "Cobertura Básica": datos["Cobertura Básica"] if datos["Cobertura Básica"] != "0" else "Por determinar",
-            "Frecuencia de Pago": datos["Frecuencia de pago"] if datos["Frecuencia de pago"] != "0" else "Por determinar",
-            "Periodo de Pago de Siniestro": datos["Periodo de pago de siniestro"] if datos["Periodo de pago de siniestro"] != "0" else "Por determinar",
-            "Suma Asegurada": datos["Suma asegurada"] if datos["Suma asegurada"] != "0" else "Por determinar",
-            "Moneda": datos["Moneda"] if datos["Moneda"] != "0" else "Por determinar",
-            "I.V.A.": datos["I.V.A."] if datos["I.V.A."] != "0" else "0",
-            "Coaseguro": datos["Coaseguro"] if datos["Coaseguro"] != "0" else "0",
-            "Deducible": datos["Deducible"] if datos["Deducible"] != "0" else "0",
-            "Deducible Cero por Accidente": datos["Deducible Cero por Accidente"] if datos["Deducible Cero por Accidente"] != "0" else "0",
-            "Gama Hospitalaria": datos["Gama Hospitalaria"] if datos["Gama Hospitalaria"] != "0" else "0",
-            "Cobertura Nacional": datos["Cobertura Nacional"] if datos["Cobertura Nacional"] != "0" else "0",
-            "Plazo de Pago": datos["Plazo de pago"] if datos["Plazo de pago"] != "0" else "Por determinar"
-        }
-        
-        # Construir el markdown
-        md_content = "# Datos Extraídos de Póliza Protegete Ordinario\n\n"
-        
-        # Información General
-        md_content += "## Información General\n"
-        for clave, valor in info_general.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Datos del Asegurado
-        md_content += "## Datos del Asegurado\n"
-        for clave, valor in datos_asegurado.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Datos del Agente
-        md_content += "## Datos del Agente\n"
-        for clave, valor in datos_agente.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Fechas
-        md_content += "## Fechas Importantes\n"
-        for clave, valor in fechas.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Información Financiera
-        md_content += "## Información Financiera\n"
-        for clave, valor in info_financiera.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Notas
-        md_content += "## Notas Adicionales\n"
-        md_content += "El documento es una póliza Protegete Ordinario. Los valores \"Por determinar\" indican campos que no pudieron ser claramente identificados en el documento original PDF."
+        md_content = renderizar_markdown(datos)
         
         # Guardar el archivo markdown
         with open(ruta_salida, 'w', encoding='utf-8') as f:
@@ -384,13 +372,44 @@ def generar_markdown(datos: Dict, ruta_salida: str = "protegete_ordinario.md") -
     except Exception as e:
         logging.error(f"Error generando archivo markdown: {str(e)}", exc_info=True)
 
-def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
+# Mapeo de campos del markdown a keys en el resultado
+CAMPOS_MARKDOWN = {
+    "Tipo de Documento": None, # Ignorar
+    "Nombre del Plan": "Nombre del plan",
+    "Número de Póliza": "Número de póliza",
+    "Nombre del Asegurado Titular": "Nombre del asegurado titular",
+    "Nombre del Contratante": "Nombre del contratante",
+    "R.F.C.": "R.F.C.",
+    "Domicilio del Contratante": "Domicilio del contratante",
+    "Código Postal": "Código Postal",
+    "Teléfono": "Teléfono",
+    "Clave Agente": "Clave Agente",
+    "Nombre del Agente": "Nombre del agente",
+    "Fecha de Emisión": "Fecha de emisión",
+    "Fecha de Inicio de Vigencia": "Fecha de inicio de vigencia",
+    "Fecha de Fin de Vigencia": "Fecha de fin de vigencia",
+    "Prima Neta": "Prima Neta",
+    "Prima Anual Total": "Prima anual total",
+    "Prima Mensual": "Prima mensual",
+    "Cobertura Básica": "Cobertura Básica",
+    "Frecuencia de Pago": "Frecuencia de pago",
+    "Moneda": "Moneda", # Mapear Moneda
+    "Periodo de Pago de Siniestro": "Periodo de pago de siniestro",
+    "Suma Asegurada": "Suma asegurada",
+    "I.V.A.": "I.V.A.",
+    "Coaseguro": "Coaseguro",
+    "Deducible": "Deducible",
+    "Deducible Cero por Accidente": "Deducible Cero por Accidente",
+    "Gama Hospitalaria": "Gama Hospitalaria",
+    "Cobertura Nacional": "Cobertura Nacional",
+    "Plazo de Pago": "Plazo de pago"
+}
+
+def _resultado_vacio() -> Dict:
     """
-    Extrae datos desde un archivo markdown estructurado para Protegete Ordinario
+    Resultado con todos los campos sin valor ("0").
     """
-    logging.info(f"Extrayendo datos desde archivo markdown: {ruta_md}")
-    
-    resultado = {
+    return {
         "Clave Agente": "0", "Coaseguro": "0", "Cobertura Básica": "0",
         "Cobertura Nacional": "0", 
         "Código Postal": "0", "Deducible": "0", "Deducible Cero por Accidente": "0",
@@ -404,66 +423,28 @@ def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
         "Prima Neta": "0", "Prima anual total": "0", "Prima mensual": "0", "R.F.C.": "0",
         "Teléfono": "0", "Url": "0", "Suma asegurada": "0", "Moneda": "0"
     }
-    campos_map = {
-            "Tipo de Documento": None, # Ignorar
-            "Nombre del Plan": "Nombre del plan",
-            "Número de Póliza": "Número de póliza",
-            "Nombre del Asegurado Titular": "Nombre del asegurado titular",
-            "Nombre del Contratante": "Nombre del contratante",
-            "R.F.C.": "R.F.C.",
-            "Domicilio del Contratante": "Domicilio del contratante",
-            "Código Postal": "Código Postal",
-            "Teléfono": "Teléfono",
-            "Clave Agente": "Clave Agente",
-            "Nombre del Agente": "Nombre del agente",
-            "Fecha de Emisión": "Fecha de emisión",
-            "Fecha de Inicio de Vigencia": "Fecha de inicio de vigencia",
-            "Fecha de Fin de Vigencia": "Fecha de fin de vigencia",
-            "Prima Neta": "Prima Neta",
-            "Prima Anual Total": "Prima anual total",
-            "Prima Mensual": "Prima mensual",
-            "Cobertura Básica": "Cobertura Básica",
-            "Frecuencia de Pago": "Frecuencia de pago",
-            "Moneda": "Moneda", # Mapear Moneda
-            "Periodo de Pago de Siniestro": "Periodo de pago de siniestro",
-            "Suma Asegurada": "Suma asegurada",
-            "I.V.A.": "I.V.A.",
-            "Coaseguro": "Coaseguro",
-            "Deducible": "Deducible",
-            "Deducible Cero por Accidente": "Deducible Cero por Accidente",
-            "Gama Hospitalaria": "Gama Hospitalaria",
-            "Cobertura Nacional": "Cobertura Nacional",
-            "Plazo de Pago": "Plazo de pago"
-        }
-        
-    try:
-        with open(ruta_md, 'r', encoding='utf-8') as f:
-            contenido = f.read()
-        
-        # Extraer los valores con regex
-        for md_key, json_key in campos_map.items():
-            if json_key: # Solo procesar si la clave JSON no es None
-                patron = f"\\*\\*{re.escape(md_key)}\\*\\*: ([^\\n]+)"
-                match = re.search(patron, contenido)
-                if match:
-                    valor = match.group(1).strip()
-                    if valor != "Por determinar":
-                        resultado[json_key] = valor
-                        # Limitar domicilios a 50 caracteres
-                        if json_key in ["Domicilio del contratante", "Domicilio del asegurado"] and len(valor) > 50:
-                            resultado[json_key] = valor[:50]
-                            logging.info(f"Limitado {json_key} a 50 caracteres: {resultado[json_key]}")
-                        logging.info(f"Extraído desde markdown: {json_key} = {resultado[json_key]}")
-                    else:
-                        logging.info(f"Campo {json_key} marcado como 'Por determinar' en markdown.")
+
+def datos_desde_valores_markdown(valores: Dict[str, str], origen: str = "markdown") -> Dict:
+    """
+    Construye el resultado final a partir de los valores del markdown ({clave markdown: valor}).
+    """
+    resultado = _resultado_vacio()
+    
+    for md_key, json_key in CAMPOS_MARKDOWN.items():
+        if json_key: # Solo procesar si la clave JSON no es None
+            valor = valores.get(md_key)
+            if valor is not None:
+                if valor != "Por determinar":
+                    resultado[json_key] = valor
+                    # Limitar domicilios a 50 caracteres
+                    if json_key in ["Domicilio del contratante", "Domicilio del asegurado"] and len(valor) > 50:
+                        resultado[json_key] = valor[:50]
+                        logging.info(f"Limitado {json_key} a 50 caracteres: {resultado[json_key]}")
+                    logging.info(f"Extraído desde markdown: {json_key} = {resultado[json_key]}")
                 else:
-                     logging.warning(f"No se encontró el patrón para '{md_key}' en {ruta_md}")
-        
-    except FileNotFoundError:
-        logging.error(f"Archivo markdown no encontrado: {ruta_md}")
-        return resultado # Devuelve el diccionario inicializado si no se encuentra el archivo
-    except Exception as e:
-        logging.error(f"Error leyendo o procesando archivo markdown {ruta_md}: {e}", exc_info=True)
+                    logging.info(f"Campo {json_key} marcado como 'Por determinar' en markdown.")
+            else:
+                 logging.warning(f"No se encontró el patrón para '{md_key}' en {origen}")
 
     # Lógica para domicilio asegurado = contratante
     if resultado["Domicilio del contratante"] != "0" and resultado["Domicilio del asegurado"] == "0":
@@ -477,6 +458,45 @@ def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
 
     return resultado
 
+def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
+    """
+    Extrae datos desde un archivo markdown estructurado para Protegete Ordinario
+    """
+    logging.info(f"Extrayendo datos desde archivo markdown: {ruta_md}")
+    
+    try:
+        with open(ruta_md, 'r', encoding='utf-8') as f:
+            contenido = f.read()
+    except FileNotFoundError:
+        logging.error(f"Archivo markdown no encontrado: {ruta_md}")
+        return _resultado_vacio() # Devuelve el diccionario inicializado si no se encuentra el archivo
+    except Exception as e:
+        logging.error(f"Error leyendo o procesando archivo markdown {ruta_md}: {e}", exc_info=True)
+        return _resultado_vacio()
+    
+    valores = markdown_polizas.valores_desde_contenido(contenido, CAMPOS_MARKDOWN)
+    return datos_desde_valores_markdown(valores, ruta_md)
+
+def normalizar_datos_poliza(datos: Dict) -> Dict:
+    """
+    Obtiene en memoria el mismo resultado que generar_markdown seguido de
+    extraer_datos_desde_markdown, sin escribir ni releer el archivo.
+    
+    Args:
+        datos (Dict): Datos extraídos del PDF por extraer_datos_poliza_protgt_ordinario
+        
+    Returns:
+        Dict: Datos finales de la póliza
+    """
+    try:
+        secciones = organizar_datos_markdown(datos)
+    except Exception as e:
+        logging.error(f"Error organizando los datos extraídos: {str(e)}", exc_info=True)
+        return _resultado_vacio()
+    
+    valores = markdown_polizas.valores_desde_secciones(secciones, CAMPOS_MARKDOWN)
+    return datos_desde_valores_markdown(valores, "memoria")
+
 def guardar_a_json(datos: Dict, ruta_salida: str) -> None:
     """
     Guarda los resultados en formato JSON
@@ -528,6 +548,34 @@ def procesar_archivo(ruta_pdf: str, directorio_salida: str = "output") -> Dict:
     
     return datos_finales
 
+def procesar_documento(ruta_pdf: Union[str, DocumentContext], sumidero: Optional[SumideroArtefactos] = None) -> Dict:
+    """
+    Procesa un PDF en memoria y devuelve los datos finales de la póliza.
+    
+    Da el mismo resultado que procesar_archivo sin pasar por un markdown en disco.
+    El markdown y el JSON solo se generan si se indica un sumidero activo.
+    
+    Args:
+        ruta_pdf (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+        sumidero (SumideroArtefactos, opcional): Destino del markdown y el JSON; sin
+            sumidero (o apagado) no se escriben
+        
+    Returns:
+        Dict: Datos finales de la póliza
+    """
+    datos = extraer_datos_poliza_protgt_ordinario(ruta_pdf)
+    datos_finales = normalizar_datos_poliza(datos)
+    
+    if sumidero is not None and sumidero.activo:
+        nombre_base = os.path.basename(str(ruta_pdf)).replace('.pdf', '')
+        # Copias: en modo async los archivos se escriben después de devolver el resultado
+        sumidero.guardar(nombre_base, {
+            "md": partial(generar_markdown, dict(datos)),
+            "json": partial(guardar_a_json, dict(datos_finales)),
+        })
+    
+    return datos_finales
+
 def procesar_directorio(directorio: str, directorio_salida: str = "output") -> None:
     """
     Procesa todos los archivos PDF en un directorio
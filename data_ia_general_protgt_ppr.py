@@ -3,16 +3,15 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
+from functools import partial
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
 import glob
 from pathlib import Path
-from flask import Flask, request, jsonify, render_template, send_from_directory
-from werkzeug.utils import secure_filename
-import tempfile
-import requests
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from artefactos import SumideroArtefactos
+import markdown_polizas
 
 # Configurar logging
 logging.basicConfig(
@@ -30,7 +29,7 @@ def normalizar_numero(valor: str) -> str:
     if not valor:
         return "0"
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\\s]', '', valor)
+    valor = registro.sub(r'[$\\s]', '', valor)
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
     # Asegura que tenga dos decimales si es un número flotante
@@ -47,7 +46,7 @@ def detect_document_type(text: str) -> str:
     """
     # Normalizar el texto
     text = text.lower()
-    text = re.sub(r'\s+', ' ', text)
+    text = registro.sub(r'\s+', ' ', text)
     
     # Patrones para identificar Aliados+ PPR (con alta prioridad)
     patrones_aliados_ppr = [
@@ -59,13 +58,40 @@ def detect_document_type(text: str) -> str:
     
     # Primero buscar patrones de Aliados+ PPR 
     for patron in patrones_aliados_ppr:
-        if re.search(patron, text):
+        if registro.search(patron, text):
             logger.info(f"Detectada póliza Aliados+ PPR con patrón: {patron}")
             return "ALIADOS_PPR"
             
     # Resto de patrones para otros tipos de documentos...
 
-def extraer_datos_poliza_aliados_ppr(pdf_path: str) -> Dict:
+# Patrones específicos para el formato Aliados+ PPR
+PATRONES = registro.grupo("aliados_ppr", {
+    "Número de póliza": r'PÓLIZA\s+([0-9]{7}H)',
+    "Tipo de plan": r'TIPO DE PLAN\s+(\w+)',
+    "Solicitud": r'SOLICITUD\s+(\d+)',
+    "Fecha de inicio de vigencia": r'Inicio de Vigencia:?\s+(\d{1,2}/\w{3}/\d{4})',
+    "Fecha de fin de vigencia": r'Fin de Vigencia:?\s+(\d{1,2}/\w{3}/\d{4})',
+    "Fecha de emisión": r'Fecha de Emisión:?\s+(\d{1,2}/\w{3}/\d{4})',
+    "Moneda": r'Moneda:?\s+(\w+)',
+    "Plazo de Seguro": r'Plazo de Seguro:?\s+(.*?)(?=\n|Plazo de Pago)',
+    "Plazo de pago": r'Plazo de Pago:?\s+(\d+\s+años)',
+    "Forma de pago": r'Forma de Pago:?\s+(\w+)',
+    "Prima Neta": r'Prima anual\s+:\s+([\d,]+\.\d{2})',
+    "Prima anual total": r'Prima Anual Total:\s+([\d,]+\.\d{2})',
+    "Nombre del contratante": r'DATOS DEL CONTRATANTE\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio:)',
+    "Domicilio del contratante": r'Domicilio:\s+([A-ZÁ-Ú0-9,.\s]+)(?=\s+R\.F\.C\.:|$)',
+    "R.F.C.": r'R\.F\.C\.:\s+([A-Z0-9]{10,13})',
+    "Teléfono": r'Teléfono:\s+(\d+)',
+    "Nombre del asegurado titular": r'DATOS DEL ASEGURADO\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|$)',
+    "Clave Agente": r'Agente:\s+(\d+)',
+    "Nombre del agente": r'Agente:\s+\d+\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)',
+    "Suma asegurada": r'SUMA\s+ASEGURADA\s+(\d{1,3}(?:,\d{3})*\.\d{2})|Básica\s+\d+\s+(?:años|AÑOS)\s+(\d{1,3}(?:,\d{3})*\.\d{2})',
+    "Cobertura Básica": r'Básica\s+(\d+\s+AÑOS)|Fallecimiento\s+(\d+\s+AÑOS)',
+    "Código Postal": r'C\.P\.\s+(\d{5})|,\s+(\d{5}),',
+}, re.MULTILINE | re.IGNORECASE)
+
+
+def extraer_datos_poliza_aliados_ppr(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza Aliados+ PPR desde un archivo PDF.
     """
@@ -87,55 +113,26 @@ def extraer_datos_poliza_aliados_ppr(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        for page in doc:
-            texto_completo += page.get_text("text", sort=True) + "\n" # Usar sort=True para orden de lectura
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = documento.text_sorted  # Texto en orden de lectura (sort=True)
 
         # Detectar tipo de documento
         tipo_documento = detect_document_type(texto_completo)
         if tipo_documento != "ALIADOS_PPR" and tipo_documento != "VIDA":
             logging.warning(f"Este documento no parece ser una póliza Aliados+ PPR: {tipo_documento}")
 
-        # Patrones específicos para el formato Aliados+ PPR
-        patrones = {
-            "Número de póliza": r'PÓLIZA\s+([0-9]{7}H)',
-            "Tipo de plan": r'TIPO DE PLAN\s+(\w+)',
-            "Solicitud": r'SOLICITUD\s+(\d+)',
-            "Fecha de inicio de vigencia": r'Inicio de Vigencia:?\s+(\d{1,2}/\w{3}/\d{4})',
-            "Fecha de fin de vigencia": r'Fin de Vigencia:?\s+(\d{1,2}/\w{3}/\d{4})',
-            "Fecha de emisión": r'Fecha de Emisión:?\s+(\d{1,2}/\w{3}/\d{4})',
-            "Moneda": r'Moneda:?\s+(\w+)',
-            "Plazo de Seguro": r'Plazo de Seguro:?\s+(.*?)(?=\n|Plazo de Pago)',
-            "Plazo de pago": r'Plazo de Pago:?\s+(\d+\s+años)',
-            "Forma de pago": r'Forma de Pago:?\s+(\w+)',
-            "Prima Neta": r'Prima anual\s+:\s+([\d,]+\.\d{2})',
-            "Prima anual total": r'Prima Anual Total:\s+([\d,]+\.\d{2})',
-            "Nombre del contratante": r'DATOS DEL CONTRATANTE\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio:)',
-            "Domicilio del contratante": r'Domicilio:\s+([A-ZÁ-Ú0-9,.\s]+)(?=\s+R\.F\.C\.:|$)',
-            "R.F.C.": r'R\.F\.C\.:\s+([A-Z0-9]{10,13})',
-            "Teléfono": r'Teléfono:\s+(\d+)',
-            "Nombre del asegurado titular": r'DATOS DEL ASEGURADO\s+Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|$)',
-            "Clave Agente": r'Agente:\s+(\d+)',
-            "Nombre del agente": r'Agente:\s+\d+\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)',
-            "Suma asegurada": r'SUMA\s+ASEGURADA\s+(\d{1,3}(?:,\d{3})*\.\d{2})|Básica\s+\d+\s+(?:años|AÑOS)\s+(\d{1,3}(?:,\d{3})*\.\d{2})',
-            "Cobertura Básica": r'Básica\s+(\d+\s+AÑOS)|Fallecimiento\s+(\d+\s+AÑOS)',
-            "Código Postal": r'C\.P\.\s+(\d{5})|,\s+(\d{5}),',
-        }
-
         # Extraer valores usando patrones
-        for campo, patron in patrones.items():
-            match = re.search(patron, texto_completo, re.MULTILINE | re.IGNORECASE)
+        for campo, patron in PATRONES.items():
+            match = patron.search(texto_completo)
             if match:
                 if campo == "Domicilio del contratante":
                     # Capturar el texto completo del domicilio y limpiarlo
                     valor = match.group(1).strip()
                     # Limpiar saltos de línea y espacios múltiples
-                    valor = re.sub(r'\s*\n\s*', ' ', valor)
+                    valor = registro.sub(r'\s*\n\s*', ' ', valor)
                     
                     # Extraer código postal del domicilio si está presente
-                    cp_match = re.search(r'(\d{5})', valor)
+                    cp_match = registro.search(r'(\d{5})', valor)
                     if cp_match and resultado["Código Postal"] == "0":
                         resultado["Código Postal"] = cp_match.group(1)
                         logging.info(f"Código postal extraído del domicilio: {resultado['Código Postal']}")
@@ -168,20 +165,20 @@ def extraer_datos_poliza_aliados_ppr(pdf_path: str) -> Dict:
 
         # Para los nombres, intentar extraerlos con patrones alternativos si no se encontraron
         if resultado["Nombre del contratante"] == "0":
-            nombre_contratante_match = re.search(r'(?:Nombre|DATOS DEL CONTRATANTE)[:.\s]+([A-ZÁ-Ú\s,]+?)(?=\s+Domicilio:|$)', texto_completo, re.IGNORECASE)
+            nombre_contratante_match = registro.search(r'(?:Nombre|DATOS DEL CONTRATANTE)[:.\s]+([A-ZÁ-Ú\s,]+?)(?=\s+Domicilio:|$)', texto_completo, re.IGNORECASE)
             if nombre_contratante_match:
                 resultado["Nombre del contratante"] = nombre_contratante_match.group(1).strip()
                 # Limpiar texto adicional
-                resultado["Nombre del contratante"] = re.sub(r'\s+TIPO DE PLAN.*$', '', resultado["Nombre del contratante"])
+                resultado["Nombre del contratante"] = registro.sub(r'\s+TIPO DE PLAN.*$', '', resultado["Nombre del contratante"])
                 logging.info(f"Nombre del contratante encontrado (alt): {resultado['Nombre del contratante']}")
         
         if resultado["Nombre del asegurado titular"] == "0":
             # Si no se encontró el asegurado, intentar con otro patrón o usar el contratante
-            nombre_asegurado_match = re.search(r'(?:DATOS DEL ASEGURADO|Asegurado)[:\s]+Nombre:\s+([A-ZÁ-Ú\s,]+)', texto_completo, re.IGNORECASE)
+            nombre_asegurado_match = registro.search(r'(?:DATOS DEL ASEGURADO|Asegurado)[:\s]+Nombre:\s+([A-ZÁ-Ú\s,]+)', texto_completo, re.IGNORECASE)
             if nombre_asegurado_match:
                 resultado["Nombre del asegurado titular"] = nombre_asegurado_match.group(1).strip()
                 # Limpiar texto adicional
-                resultado["Nombre del asegurado titular"] = re.sub(r'\s+TIPO DE PLAN.*$', '', resultado["Nombre del asegurado titular"])
+                resultado["Nombre del asegurado titular"] = registro.sub(r'\s+TIPO DE PLAN.*$', '', resultado["Nombre del asegurado titular"])
                 logging.info(f"Nombre del asegurado encontrado (alt): {resultado['Nombre del asegurado titular']}")
             elif resultado["Nombre del contratante"] != "0":
                 # Usar el nombre del contratante como asegurado si no se encontró
@@ -189,12 +186,12 @@ def extraer_datos_poliza_aliados_ppr(pdf_path: str) -> Dict:
                 logging.info(f"Usando el mismo nombre para asegurado y contratante: {resultado['Nombre del contratante']}")
         else:
             # Limpiar texto adicional del asegurado si ya fue encontrado
-            resultado["Nombre del asegurado titular"] = re.sub(r'\s+TIPO DE PLAN.*$', '', resultado["Nombre del asegurado titular"])
+            resultado["Nombre del asegurado titular"] = registro.sub(r'\s+TIPO DE PLAN.*$', '', resultado["Nombre del asegurado titular"])
             logging.info(f"Nombre del asegurado limpiado: {resultado['Nombre del asegurado titular']}")
 
         # Limpiar texto adicional del contratante si ya fue encontrado
         if resultado["Nombre del contratante"] != "0":
-            resultado["Nombre del contratante"] = re.sub(r'\s+TIPO DE PLAN.*$', '', resultado["Nombre del contratante"])
+            resultado["Nombre del contratante"] = registro.sub(r'\s+TIPO DE PLAN.*$', '', resultado["Nombre del contratante"])
             logging.info(f"Nombre del contratante limpiado: {resultado['Nombre del contratante']}")
 
         # Intentar obtener el nombre del agente nuevamente si no se encontró
@@ -206,19 +203,19 @@ def extraer_datos_poliza_aliados_ppr(pdf_path: str) -> Dict:
 
         # Limpia el nombre del agente de cualquier texto adicional
         if resultado["Nombre del agente"] != "0":
-            resultado["Nombre del agente"] = re.sub(r'\s+(?:Fraccionado|Prima|Centro).*$', '', resultado["Nombre del agente"])
+            resultado["Nombre del agente"] = registro.sub(r'\s+(?:Fraccionado|Prima|Centro).*$', '', resultado["Nombre del agente"])
             logging.info(f"Nombre del agente limpiado: {resultado['Nombre del agente']}")
 
         # Extraer suma asegurada directamente de la tabla de coberturas
         if resultado["Suma asegurada"] == "0":
             # Buscar en la tabla de coberturas
-            suma_asegurada_match = re.search(r'Fallecimiento\s+(\d{1,3}(?:,\d{3})*\.\d{2})', texto_completo)
+            suma_asegurada_match = registro.search(r'Fallecimiento\s+(\d{1,3}(?:,\d{3})*\.\d{2})', texto_completo)
             if suma_asegurada_match:
                 resultado["Suma asegurada"] = normalizar_numero(suma_asegurada_match.group(1))
                 logging.info(f"Suma asegurada encontrada (tabla): {resultado['Suma asegurada']}")
             else:
                 # Buscar patrones alternativos para la suma asegurada
-                suma_alt_match = re.search(r'(?:SUMA\s+ASEGURADA|SUMA ASEGURADA\s+PRIMA)|(?:Básica\s+\d+\s+AÑOS)\s+(\d{1,3}(?:,\d{3})*\.\d{2})', texto_completo, re.IGNORECASE)
+                suma_alt_match = registro.search(r'(?:SUMA\s+ASEGURADA|SUMA ASEGURADA\s+PRIMA)|(?:Básica\s+\d+\s+AÑOS)\s+(\d{1,3}(?:,\d{3})*\.\d{2})', texto_completo, re.IGNORECASE)
                 if suma_alt_match:
                     resultado["Suma asegurada"] = normalizar_numero(suma_alt_match.group(1))
                     logging.info(f"Suma asegurada encontrada (alternativa): {resultado['Suma asegurada']}")
@@ -228,7 +225,7 @@ def extraer_datos_poliza_aliados_ppr(pdf_path: str) -> Dict:
                     for i, linea in enumerate(lineas):
                         if 'Fallecimiento' in linea or 'PRIMA ANUAL' in linea:
                             # Buscar números en esta línea o en la siguiente
-                            numeros = re.findall(r'(\d{1,3}(?:,\d{3})*\.\d{2})', linea + (lineas[i+1] if i+1 < len(lineas) else ''))
+                            numeros = registro.findall(r'(\d{1,3}(?:,\d{3})*\.\d{2})', linea + (lineas[i+1] if i+1 < len(lineas) else ''))
                             if numeros and len(numeros) > 0:
                                 # Tomar el valor más grande, que probablemente sea la suma asegurada
                                 valores = [float(normalizar_numero(n)) for n in numeros]
@@ -244,7 +241,7 @@ def extraer_datos_poliza_aliados_ppr(pdf_path: str) -> Dict:
             
         # Si no se encontró el código postal en la dirección, buscarlo en todo el texto
         if resultado["Código Postal"] == "0":
-            cp_matches = re.findall(r'[^\d](\d{5})[^\d]', texto_completo)
+            cp_matches = registro.findall(r'[^\d](\d{5})[^\d]', texto_completo)
             for cp in cp_matches:
                 # Verificar que sea un código postal mexicano válido
                 if len(cp) == 5 and cp.isdigit():
@@ -299,7 +296,7 @@ def extraer_datos_poliza_aliados_ppr(pdf_path: str) -> Dict:
         for campo, patrones_alt in patrones_alternativos.items():
             if resultado[campo] == "0":
                 for patron_alt in patrones_alt:
-                    match = re.search(patron_alt, texto_completo, re.IGNORECASE)
+                    match = registro.search(patron_alt, texto_completo, re.IGNORECASE)
                     if match:
                         resultado[campo] = match.group(1).strip()
                         logging.info(f"{campo} encontrado (patrón alternativo): {resultado[campo]}")
@@ -310,102 +307,89 @@ def extraer_datos_poliza_aliados_ppr(pdf_path: str) -> Dict:
 
     return resultado
 
+# Encabezado y notas del markdown de datos extraídos
+TITULO_MARKDOWN = "Datos Extraídos de Póliza Aliados+ PPR"
+NOTAS_MARKDOWN = "El documento es una póliza Aliados+ PPR. Los valores \"Por determinar\" indican campos que no pudieron ser claramente identificados en el documento original PDF."
+
+def organizar_datos_markdown(datos: Dict) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Organiza los datos extraídos en las secciones del markdown.
+    """
+    # Limpiar los nombres antes de generar el markdown
+    if datos["Nombre del contratante"] != "0":
+        datos["Nombre del contratante"] = registro.sub(r'\s+TIPO DE PLAN.*$', '', datos["Nombre del contratante"])
+
+    if datos["Nombre del asegurado titular"] != "0":
+        datos["Nombre del asegurado titular"] = registro.sub(r'\s+TIPO DE PLAN.*$', '', datos["Nombre del asegurado titular"])
+
+    if datos["Nombre del agente"] != "0":
+        datos["Nombre del agente"] = registro.sub(r'\s+(?:Fraccionado|Prima|Centro).*$', '', datos["Nombre del agente"])
+
+    # Organizar datos por categorías
+    info_general = {
+        "Tipo de Documento": "Póliza Aliados+ PPR",
+        "Nombre del Plan": datos["Nombre del plan"] if datos["Nombre del plan"] != "0" else "Por determinar",
+        "Número de Póliza": datos["Número de póliza"] if datos["Número de póliza"] != "0" else "Por determinar"
+    }
+
+    datos_asegurado = {
+        "Nombre del Asegurado Titular": datos["Nombre del asegurado titular"] if datos["Nombre del asegurado titular"] != "0" else "Por determinar",
+        "Nombre del Contratante": datos["Nombre del contratante"] if datos["Nombre del contratante"] != "0" else "Por determinar",
+        "R.F.C.": datos["R.F.C."] if datos["R.F.C."] != "0" else "Por determinar",
+        "Domicilio del Contratante": datos["Domicilio del contratante"] if datos["Domicilio del contratante"] != "0" else "Por determinar",
+        "Código Postal": datos["Código Postal"] if datos["Código Postal"] != "0" else "Por determinar",
+        "Teléfono": datos["Teléfono"] if datos["Teléfono"] != "0" else "Por determinar"
+    }
+
+    datos_agente = {
+        "Clave Agente": datos["Clave Agente"] if datos["Clave Agente"] != "0" else "Por determinar",
+        "Nombre del Agente": datos["Nombre del agente"] if datos["Nombre del agente"] != "0" else "Por determinar"
+    }
+
+    fechas = {
+        "Fecha de Emisión": datos["Fecha de emisión"] if datos["Fecha de emisión"] != "0" else "Por determinar",
+        "Fecha de Inicio de Vigencia": datos["Fecha de inicio de vigencia"] if datos["Fecha de inicio de vigencia"] != "0" else "Por determinar",
+        "Fecha de Fin de Vigencia": datos["Fecha de fin de vigencia"] if datos["Fecha de fin de vigencia"] != "0" else "Por determinar"
+    }
+
+    info_financiera = {
+        "Prima Neta": datos["Prima Neta"] if datos["Prima Neta"] != "0" else "Por determinar",
+        "Prima Anual Total": datos["Prima anual total"] if datos["Prima anual total"] != "0" else "Por determinar",
+        "Prima Mensual": datos["Prima mensual"] if datos["Prima mensual"] != "0" else "Por determinar",
+        "Cobertura Básica": datos["Cobertura Básica"] if datos["Cobertura Básica"] != "0" else "Por determinar",
+        "Frecuencia de Pago": datos["Frecuencia de pago"] if datos["Frecuencia de pago"] != "0" else "Por determinar",
+        "Periodo de Pago de Siniestro": datos["Periodo de pago de siniestro"] if datos["Periodo de pago de siniestro"] != "0" else "Por determinar",
+        "Suma Asegurada": datos["Suma asegurada"] if datos["Suma asegurada"] != "0" else "Por determinar",
+        "Moneda": datos["Moneda"] if datos["Moneda"] != "0" else "Por determinar",
+        "I.V.A.": datos["I.V.A."] if datos["I.V.A."] != "0" else "0",
+        "Coaseguro": datos["Coaseguro"] if datos["Coaseguro"] != "0" else "0",
+        "Deducible": datos["Deducible"] if datos["Deducible"] != "0" else "0",
+        "Deducible Cero por Accidente": datos["Deducible Cero por Accidente"] if datos["Deducible Cero por Accidente"] != "0" else "0",
+        "Gama Hospitalaria": datos["Gama Hospitalaria"] if datos["Gama Hospitalaria"] != "0" else "0",
+        "Cobertura Nacional": datos["Cobertura Nacional"] if datos["Cobertura Nacional"] != "0" else "0",
+        "Plazo de Pago": datos["Plazo de pago"] if datos["Plazo de pago"] != "0" else "Por determinar"
+    }
+    
+    return [
+        ("Información General", info_general),
+        ("Datos del Asegurado", datos_asegurado),
+        ("Datos del Agente", datos_agente),
+        ("Fechas Importantes", fechas),
+        ("Información Financiera", info_financiera),
+    ]
+
+def renderizar_markdown(datos: Dict) -> str:
+    """
+    Genera el contenido markdown con los datos extraídos, sin escribirlo a disco.
+    """
+    return markdown_polizas.renderizar_markdown(TITULO_MARKDOWN, organizar_datos_markdown(datos), NOTAS_MARKDOWN)
+
 def generar_markdown(datos: Dict, ruta_salida: str = "aliados_ppr.md") -> None:
     """
     Genera un archivo markdown con los datos extraídos estructurados para pólizas Aliados+ PPR.
     """
     try:
-        # Limpiar los nombres antes de generar el markdown
-        if datos["Nombre del contratante"] != "0":
-            datos["Nombre del contratante"] = re.sub(r'\s+TIPO DE PLAN.*$', '', datos["Nombre del contratante"])
-        
-        if datos["Nombre del asegurado titular"] != "0":
-            datos["Nombre del asegurado titular"] = re.sub(r'\s+TIPO DE PLAN.*$', '', datos["Nombre del asegurado titular"])
-        
-        if datos["Nombre del agente"] != "0":
-            datos["Nombre del agente"] = re.sub(r'\s+(?:Fraccionado|Prima|Centro).*$', '', datos["Nombre del agente"])
-        
-        # Organizar datos por categorías
-        info_general = {
-            "Tipo de Documento": "Póliza Aliados+ PPR",
-            "Nombre del Plan": datos["Nombre del plan"] if datos["Nombre del plan"] != "0" else "Por determinar",
-            "Número de Póliza": datos["Número de póliza"] if datos["Número de póliza"] != "0" else "Por determinar"
-        }
-        
-        datos_asegurado = {
-            "Nombre del Asegurado Titular": datos["Nombre del asegurado titular"] if datos["Nombre del asegurado titular"] != "0" else "Por determinar",
-            "Nombre del Contratante": datos["Nombre del contratante"] if datos["Nombre del contratante"] != "0" else "Por determinar",
-            "R.F.C.": datos["R.F.C."] if datos["R.F.C."] != "0" else "Por determinar",
-            "Domicilio del Contratante": datos["Domicilio del contratante"] if datos["Domicilio del contratante"] != "0" else "Por determinar",
-            "Código Postal": datos["Código Postal"] if datos["Código Postal"] != "0" else "Por determinar",
-            "Teléfono": datos["Teléfono"] if datos["Teléfono"] != "0" else "Por determinar"
-        }
-        
-        datos_agente = {
-            "Clave Agente": datos["Clave Agente"] if datos["Clave Agente"] != "0" else "Por determinar",
-            "Nombre del Agente": datos["Nombre del agente"] if datos["Nombre del agente"] != "0" else "Por determinar"
-        }
-        
-        fechas = {
-            "Fecha de Emisión": datos["Fecha de emisión"] if datos["Fecha de emisión"] != "0" else "Por determinar",
-            "Fecha de Inicio de Vigencia": datos["Fecha de inicio de vigencia"] if datos["Fecha de inicio de vigencia"] != "0" else "Por determinar",
-            "Fecha de Fin de Vigencia": datos["Fecha de fin de vigencia"] if datos["Fecha de fin de vigencia"] != "0" else "Por determinar"
-        }
-        
-        info_financiera = {
-            "Prima Neta": datos["Prima Neta"] if datos["Prima Neta"] != "0" else "Por determinar",
-            "Prima Anual Total": datos["Prima anual total"] if datos["Prima anual total"] != "0" else "Por determinar",
-            "Prima Mensual": datos["Prima mensual"] if datos["Prima mensual"] != "0" else "Por determinar",
-            "Cobertura Básica": datos["Cobertura Básica"] if datos["Cobertura Básica"] != "0" else "Por determinar",
-            "Frecuencia de Pago": datos["Frecuencia de pago"] if datos["Frecuencia de pago"] != "0" else "Por determinar",
-            "Periodo de Pago de Siniestro": datos["Periodo de pago de siniestro"] if datos["Periodo de pago de siniestro"] != "0" else "Por determinar",
-            "Suma Asegurada": datos["Suma asegurada"] if datos["Suma asegurada"] != "0" else "Por determinar",
-            "Moneda": datos["Moneda"] if datos["Moneda"] != "0" else "Por determinar",
-            "I.V.A.": datos["I.V.A."] if datos["I.V.A."] != "0" else "0",
-            "Coaseguro": datos["Coaseguro"] if datos["Coaseguro"] != "0" else "0",
-            "Deducible": datos["Deducible"] if datos["Deducible"] != "0" else "0",
-            "Deducible Cero por Accidente": datos["Deducible Cero por Accidente"] if datos["Deducible Cero por Accidente"] != "0" else "0",
-            "Gama Hospitalaria": datos["Gama Hospitalaria"] if datos["Gama Hospitalaria"] != "0" else "0",
-            "Cobertura Nacional": datos["Cobertura Nacional"] if datos["Cobertura Nacional"] != "0" else "0",
-            "Plazo de Pago": datos["Plazo de pago"] if datos["Plazo de pago"] != "0" else "Por determinar"
-        }
-        
-        # Construir el markdown
-        md_content = "# Datos Extraídos de Póliza Aliados+ PPR\n\n"
-        
-        # Información General
-        md_content += "## Información General\n"
-        for clave, valor in info_general.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Datos del Asegurado
-        md_content += "## Datos del Asegurado\n"
-        for clave, valor in datos_asegurado.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Datos del Agente
-        md_content += "## Datos del Agente\n"
-        for clave, valor in datos_agente.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Fechas
-        md_content += "## Fechas Importantes\n"
-        for clave, valor in fechas.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Información Financiera
-        md_content += "## Información Financiera\n"
-        for clave, valor in info_financiera.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Notas
-        md_content += "## Notas Adicionales\n"
-        md_content += "El documento es una póliza Aliados+ PPR. Los valores \"Por determinar\" indican campos que no pudieron ser claramente identificados en el documento original PDF."
+        md_content = renderizar_markdown(datos)
         
         # Guardar el archivo markdown
         with open(ruta_salida, 'w', encoding='utf-8') as f:
@@ -416,13 +400,44 @@ def generar_markdown(datos: Dict, ruta_salida: str = "aliados_ppr.md") -> None:
     except Exception as e:
         logging.error(f"Error generando archivo markdown: {str(e)}", exc_info=True)
 
-def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
+# Mapeo de campos del markdown a keys en el resultado
+CAMPOS_MARKDOWN = {
+    "Tipo de Documento": None, # Ignorar
+    "Nombre del Plan": "Nombre del plan",
+    "Número de Póliza": "Número de póliza",
+    "Nombre del Asegurado Titular": "Nombre del asegurado titular",
+    "Nombre del Contratante": "Nombre del contratante",
+    "R.F.C.": "R.F.C.",
+    "Domicilio del Contratante": "Domicilio del contratante",
+    "Código Postal": "Código Postal",
+    "Teléfono": "Teléfono",
+    "Clave Agente": "Clave Agente",
+    "Nombre del Agente": "Nombre del agente",
+    "Fecha de Emisión": "Fecha de emisión",
+    "Fecha de Inicio de Vigencia": "Fecha de inicio de vigencia",
+    "Fecha de Fin de Vigencia": "Fecha de fin de vigencia",
+    "Prima Neta": "Prima Neta",
+    "Prima Anual Total": "Prima anual total",
+    "Prima Mensual": "Prima mensual",
+    "Cobertura Básica": "Cobertura Básica",
+    "Frecuencia de Pago": "Frecuencia de pago",
+    "Moneda": "Moneda", # Mapear Moneda
+    "Periodo de Pago de Siniestro": "Periodo de pago de siniestro",
+    "Suma Asegurada": "Suma asegurada",
+    "I.V.A.": "I.V.A.",
+    "Coaseguro": "Coaseguro",
+    "Deducible": "Deducible",
+    "Deducible Cero por Accidente": "Deducible Cero por Accidente",
+    "Gama Hospitalaria": "Gama Hospitalaria",
+    "Cobertura Nacional": "Cobertura Nacional",
+    "Plazo de Pago": "Plazo de pago"
+}
+
+def _resultado_vacio() -> Dict:
     """
-    Extrae datos desde un archivo markdown estructurado para Aliados+ PPR
+    Resultado con todos los campos sin valor ("0").
     """
-    logging.info(f"Extrayendo datos desde archivo markdown: {ruta_md}")
-    
-    resultado = {
+    return {
         "Clave Agente": "0", "Coaseguro": "0", "Cobertura Básica": "0",
         "Cobertura Nacional": "0", 
         "Código Postal": "0", "Deducible": "0", "Deducible Cero por Accidente": "0",
@@ -436,67 +451,28 @@ def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
         "Prima Neta": "0", "Prima anual total": "0", "Prima mensual": "0", "R.F.C.": "0",
         "Teléfono": "0", "Url": "0", "Suma asegurada": "0", "Moneda": "0"
     }
+
+def datos_desde_valores_markdown(valores: Dict[str, str], origen: str = "markdown") -> Dict:
+    """
+    Construye el resultado final a partir de los valores del markdown ({clave markdown: valor}).
+    """
+    resultado = _resultado_vacio()
     
-    campos_map = {
-        "Tipo de Documento": None, # Ignorar
-        "Nombre del Plan": "Nombre del plan",
-        "Número de Póliza": "Número de póliza",
-        "Nombre del Asegurado Titular": "Nombre del asegurado titular",
-        "Nombre del Contratante": "Nombre del contratante",
-        "R.F.C.": "R.F.C.",
-        "Domicilio del Contratante": "Domicilio del contratante",
-        "Código Postal": "Código Postal",
-        "Teléfono": "Teléfono",
-        "Clave Agente": "Clave Agente",
-        "Nombre del Agente": "Nombre del agente",
-        "Fecha de Emisión": "Fecha de emisión",
-        "Fecha de Inicio de Vigencia": "Fecha de inicio de vigencia",
-        "Fecha de Fin de Vigencia": "Fecha de fin de vigencia",
-        "Prima Neta": "Prima Neta",
-        "Prima Anual Total": "Prima anual total",
-        "Prima Mensual": "Prima mensual",
-        "Cobertura Básica": "Cobertura Básica",
-        "Frecuencia de Pago": "Frecuencia de pago",
-        "Moneda": "Moneda", # Mapear Moneda
-        "Periodo de Pago de Siniestro": "Periodo de pago de siniestro",
-        "Suma Asegurada": "Suma asegurada",
-        "I.V.A.": "I.V.A.",
-        "Coaseguro": "Coaseguro",
-        "Deducible": "Deducible",
-        "Deducible Cero por Accidente": "Deducible Cero por Accidente",
-        "Gama Hospitalaria": "Gama Hospitalaria",
-        "Cobertura Nacional": "Cobertura Nacional",
-        "Plazo de Pago": "Plazo de pago"
-    }
-    
-    try:
-        with open(ruta_md, 'r', encoding='utf-8') as f:
-            contenido = f.read()
-        
-        # Extraer los valores con regex
-        for md_key, json_key in campos_map.items():
-            if json_key: # Solo procesar si la clave JSON no es None
-                patron = f"\\*\\*{re.escape(md_key)}\\*\\*: ([^\\n]+)"
-                match = re.search(patron, contenido)
-                if match:
-                    valor = match.group(1).strip()
-                    if valor != "Por determinar":
-                        resultado[json_key] = valor
-                        # Limitar domicilios a 50 caracteres
-                        if json_key in ["Domicilio del contratante", "Domicilio del asegurado"] and len(valor) > 50:
-                            resultado[json_key] = valor[:50]
-                            logging.info(f"Limitado {json_key} a 50 caracteres: {resultado[json_key]}")
-                        logging.info(f"Extraído desde markdown: {json_key} = {resultado[json_key]}")
-                    else:
-                        logging.info(f"Campo {json_key} marcado como 'Por determinar' en markdown.")
+    for md_key, json_key in CAMPOS_MARKDOWN.items():
+        if json_key: # Solo procesar si la clave JSON no es None
+            valor = valores.get(md_key)
+            if valor is not None:
+                if valor != "Por determinar":
+                    resultado[json_key] = valor
+                    # Limitar domicilios a 50 caracteres
+                    if json_key in ["Domicilio del contratante", "Domicilio del asegurado"] and len(valor) > 50:
+                        resultado[json_key] = valor[:50]
+                        logging.info(f"Limitado {json_key} a 50 caracteres: {resultado[json_key]}")
+                    logging.info(f"Extraído desde markdown: {json_key} = {resultado[json_key]}")
                 else:
-                     logging.warning(f"No se encontró el patrón para '{md_key}' en {ruta_md}")
-        
-    except FileNotFoundError:
-        logging.error(f"Archivo markdown no encontrado: {ruta_md}")
-        return resultado # Devuelve el diccionario inicializado si no se encuentra el archivo
-    except Exception as e:
-        logging.error(f"Error leyendo o procesando archivo markdown {ruta_md}: {e}", exc_info=True)
+                    logging.info(f"Campo {json_key} marcado como 'Por determinar' en markdown.")
+            else:
+                 logging.warning(f"No se encontró el patrón para '{md_key}' en {origen}")
 
     # Lógica para domicilio asegurado = contratante
     if resultado["Domicilio del contratante"] != "0" and resultado["Domicilio del asegurado"] == "0":
@@ -510,6 +486,45 @@ def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
 
     return resultado
 
+def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
+    """
+    Extrae datos desde un archivo markdown estructurado para Aliados+ PPR
+    """
+    logging.info(f"Extrayendo datos desde archivo markdown: {ruta_md}")
+    
+    try:
+        with open(ruta_md, 'r', encoding='utf-8') as f:
+            contenido = f.read()
+    except FileNotFoundError:
+        logging.error(f"Archivo markdown no encontrado: {ruta_md}")
+        return _resultado_vacio() # Devuelve el diccionario inicializado si no se encuentra el archivo
+    except Exception as e:
+        logging.error(f"Error leyendo o procesando archivo markdown {ruta_md}: {e}", exc_info=True)
+        return _resultado_vacio()
+    
+    valores = markdown_polizas.valores_desde_contenido(contenido, CAMPOS_MARKDOWN)
+    return datos_desde_valores_markdown(valores, ruta_md)
+
+def normalizar_datos_poliza(datos: Dict) -> Dict:
+    """
+    Obtiene en memoria el mismo resultado que generar_markdown seguido de
+    extraer_datos_desde_markdown, sin escribir ni releer el archivo.
+    
+    Args:
+        datos (Dict): Datos extraídos del PDF por extraer_datos_poliza_aliados_ppr
+        
+    Returns:
+        Dict: Datos finales de la póliza
+    """
+    try:
+        secciones = organizar_datos_markdown(datos)
+    except Exception as e:
+        logging.error(f"Error organizando los datos extraídos: {str(e)}", exc_info=True)
+        return _resultado_vacio()
+    
+    valores = markdown_polizas.valores_desde_secciones(secciones, CAMPOS_MARKDOWN)
+    return datos_desde_valores_markdown(valores, "memoria")
+
 def guardar_a_json(datos: Dict, ruta_salida: str) -> None:
     """
     Guarda los resultados en formato JSON
@@ -561,6 +576,34 @@ def procesar_archivo(ruta_pdf: str, directorio_salida: str = "output") -> Dict:
     
     return datos_finales
 
+def procesar_documento(ruta_pdf: Union[str, DocumentContext], sumidero: Optional[SumideroArtefactos] = None) -> Dict:
+    """
+    Procesa un PDF en memoria y devuelve los datos finales de la póliza.
+    
+    Da el mismo resultado que procesar_archivo sin pasar por un markdown en disco.
+    El markdown y el JSON solo se generan si se indica un sumidero activo.
+    
+    Args:
+        ruta_pdf (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+        sumidero (SumideroArtefactos, opcional): Destino del markdown y el JSON; sin
+            sumidero (o apagado) no se escriben
+        
+    Returns:
+        Dict: Datos finales de la póliza
+    """
+    datos = extraer_datos_poliza_aliados_ppr(ruta_pdf)
+    datos_finales = normalizar_datos_poliza(datos)
+    
+    if sumidero is not None and sumidero.activo:
+        nombre_base = os.path.basename(str(ruta_pdf)).replace('.pdf', '')
+        # Copias: en modo async los archivos se escriben después de devolver el resultado
+        sumidero.guardar(nombre_base, {
+            "md": partial(generar_markdown, dict(datos)),
+            "json": partial(guardar_a_json, dict(datos_finales)),
+        })
+    
+    return datos_finales
+
 def procesar_directorio(directorio: str, directorio_salida: str = "output") -> None:
     """
     Procesa todos los archivos PDF en un directorio
@@ -3,12 +3,14 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
+from functools import partial
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
 import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from artefactos import SumideroArtefactos
 
 # Configurar logging
 logging.basicConfig(
@@ -26,7 +28,7 @@ def normalizar_numero(valor: str) -> str:
     if not valor:
         return "0"
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\\s]', '', valor)
+    valor = registro.sub(r'[$\\s]', '', valor)
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
     # Asegura que tenga dos decimales si es un número flotante
@@ -42,7 +44,7 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     Detecta si el documento es una póliza de Plan Protege PYME.
     """
     # Patrones para identificar documentos de Plan Protege PYME
-    if re.search(r'PLAN PROTEGE PYME|PROTEGE PYME|Carátula de póliza[\s\S]*?PLAN PROTEGE', texto_pdf, re.IGNORECASE):
+    if registro.search(r'PLAN PROTEGE PYME|PROTEGE PYME|Carátula de póliza[\s\S]*?PLAN PROTEGE', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Plan Protege PYME")
         return "PROTGT_PYME"
     
@@ -50,7 +52,44 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     logging.warning("Tipo de documento no identificado como Plan Protege PYME")
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_protgt_pyme(pdf_path: str) -> Dict:
+# Patrones específicos para el formato Plan Protege PYME
+PATRONES = registro.grupo("protgt_pyme", {
+    "Clave Agente": r'Agente:?\s+(\d+)|Agente\s+(\d{6})',
+    "Nombre del agente": r'(?:Agente:?\s+\d+\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)|Agente\s+\d{6}\s+([A-ZÁ-Ú\s,.]+)',
+    "Grupo Empresarial": r'Grupo Empresarial\s+([A-ZÁ-Ú0-9\s,.]+)(?=\s+Contratante|$)',
+    "Contratante": r'Contratante\s+([A-ZÁ-Ú0-9\s,.]+)(?=\s+Domicilio|$)',
+    "Domicilio del contratante": r'Domicilio\s+(.*?)(?=\s+R\.F\.C\.|$)',
+    "Código Postal": r'(?:C\.P\.|CP|[\d,]+,)\s*(\d{5})|(\d{5}),\s+\w+',
+    "Teléfono": r'Teléfono:?\s+([0-9]{7,10})',
+    "R.F.C.": r'R\.F\.C\.\s+([A-Z0-9]{10,13})',
+    "Características del grupo asegurado": r'Características del grupo asegurado\s+(.*?)(?=\s+Regla para determinar|$)',
+    "Regla para determinar la suma asegurada": r'Regla para determinar la suma asegurada\s+(.*?)(?=\s+Según|$)',
+    "Fecha de emisión": r'Fecha de emisión\s+(\d{1,2}/\d{1,2}/\d{4})',
+    "Fecha de inicio de vigencia": r'Fecha de inicio\s+de vigencia\s+(\d{1,2}/\d{1,2}/\d{4})',
+    "Fecha de fin de vigencia": r'Fecha de fin\s+de vigencia\s+(\d{1,2}/\d{1,2}/\d{4})',
+    "Forma de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',
+    "Tipo de Plan": r'Tipo de Plan\s+([A-ZÁ-Ú\s]+)',
+    "Número de póliza": r'[Pp]óliza\s+([A-Z0-9]+)',
+    "Moneda": r'Moneda\s+(.*?)(?=\s+Conducto|$)',
+    "Conducto de Cobro": r'Conducto de Cobro\s+(.*?)(?=\s+Forma|$)',
+    "SAMI": r'SAMI\s+\$([\d,]+\.\d{2})',
+    "Pago de la Prima": r'Pago de la Prima\s+(.*?)(?=\s+Porcentaje|$)',
+    "Porcentaje de Contribución del asegurado": r'Porcentaje de Contribución\s+del asegurado\s+(.*?)(?=\s+Prima|$)',
+    "Prima": r'Prima\s+\$([\d,]+\.\d{2})',
+    "Recargo por pago fraccionado": r'Recargo por pago\s+fraccionado\s+\$([\d,]+\.\d{2})',
+    "Prima Total": r'Prima Total\s+\$([\d,]+\.\d{2})',
+    "Tipo de Administración": r'Tipo de Administración\s+(.*?)(?=\s+Coberturas|$)',
+    "Promotor": r'Promotor\s+(\d+)',
+    "Centro de Costos": r'Centro de Costos\s+(\d+)',
+    "Cobertura Básica": r'BÁSICA\s+(\d+\s+años)',
+    "Edad Máxima de Aceptación": r'Edad Máxima de\s+Aceptación\s+(\d+\s+años)',
+    "Integrantes": r'Integrantes\s+(\d+)',
+    "Suma Asegurada": r'Suma Asegurada\s+\$([\d,]+\.\d{2})',
+    "Prima anual": r'Prima anual\s+\$([\d,]+\.\d{2})'
+}, re.MULTILINE | re.IGNORECASE)
+
+
+def extraer_datos_poliza_protgt_pyme(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza de Plan Protege PYME desde un archivo PDF.
     """
@@ -92,61 +131,22 @@ def extraer_datos_poliza_protgt_pyme(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        for page in doc:
-            texto_completo += page.get_text("text", sort=True) + "\n"  # Usar sort=True para orden de lectura
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = documento.text_sorted  # Texto en orden de lectura (sort=True)
 
         # Detectar tipo de documento
         tipo_documento = detectar_tipo_documento(texto_completo)
         if tipo_documento != "PROTGT_PYME":
             logging.warning(f"Este documento no parece ser una póliza de Plan Protege PYME: {tipo_documento}")
 
-        # Patrones específicos para el formato Plan Protege PYME
-        patrones = {
-            "Clave Agente": r'Agente:?\s+(\d+)|Agente\s+(\d{6})',
-            "Nombre del agente": r'(?:Agente:?\s+\d+\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)|Agente\s+\d{6}\s+([A-ZÁ-Ú\s,.]+)',
-            "Grupo Empresarial": r'Grupo Empresarial\s+([A-ZÁ-Ú0-9\s,.]+)(?=\s+Contratante|$)',
-            "Contratante": r'Contratante\s+([A-ZÁ-Ú0-9\s,.]+)(?=\s+Domicilio|$)',
-            "Domicilio del contratante": r'Domicilio\s+(.*?)(?=\s+R\.F\.C\.|$)',
-            "Código Postal": r'(?:C\.P\.|CP|[\d,]+,)\s*(\d{5})|(\d{5}),\s+\w+',
-            "Teléfono": r'Teléfono:?\s+([0-9]{7,10})',
-            "R.F.C.": r'R\.F\.C\.\s+([A-Z0-9]{10,13})',
-            "Características del grupo asegurado": r'Características del grupo asegurado\s+(.*?)(?=\s+Regla para determinar|$)',
-            "Regla para determinar la suma asegurada": r'Regla para determinar la suma asegurada\s+(.*?)(?=\s+Según|$)',
-            "Fecha de emisión": r'Fecha de emisión\s+(\d{1,2}/\d{1,2}/\d{4})',
-            "Fecha de inicio de vigencia": r'Fecha de inicio\s+de vigencia\s+(\d{1,2}/\d{1,2}/\d{4})',
-            "Fecha de fin de vigencia": r'Fecha de fin\s+de vigencia\s+(\d{1,2}/\d{1,2}/\d{4})',
-            "Forma de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',
-            "Tipo de Plan": r'Tipo de Plan\s+([A-ZÁ-Ú\s]+)',
-            "Número de póliza": r'[Pp]óliza\s+([A-Z0-9]+)',
-            "Moneda": r'Moneda\s+(.*?)(?=\s+Conducto|$)',
-            "Conducto de Cobro": r'Conducto de Cobro\s+(.*?)(?=\s+Forma|$)',
-            "SAMI": r'SAMI\s+\$([\d,]+\.\d{2})',
-            "Pago de la Prima": r'Pago de la Prima\s+(.*?)(?=\s+Porcentaje|$)',
-            "Porcentaje de Contribución del asegurado": r'Porcentaje de Contribución\s+del asegurado\s+(.*?)(?=\s+Prima|$)',
-            "Prima": r'Prima\s+\$([\d,]+\.\d{2})',
-            "Recargo por pago fraccionado": r'Recargo por pago\s+fraccionado\s+\$([\d,]+\.\d{2})',
-            "Prima Total": r'Prima Total\s+\$([\d,]+\.\d{2})',
-            "Tipo de Administración": r'Tipo de Administración\s+(.*?)(?=\s+Coberturas|$)',
-            "Promotor": r'Promotor\s+(\d+)',
-            "Centro de Costos": r'Centro de Costos\s+(\d+)',
-            "Cobertura Básica": r'BÁSICA\s+(\d+\s+años)',
-            "Edad Máxima de Aceptación": r'Edad Máxima de\s+Aceptación\s+(\d+\s+años)',
-            "Integrantes": r'Integrantes\s+(\d+)',
-            "Suma Asegurada": r'Suma Asegurada\s+\$([\d,]+\.\d{2})',
-            "Prima anual": r'Prima anual\s+\$([\d,]+\.\d{2})'
-        }
-
         # Extraer valores usando patrones específicos
-        for campo, patron in patrones.items():
-            match = re.search(patron, texto_completo, re.MULTILINE | re.IGNORECASE)
+        for campo, patron in PATRONES.items():
+            match = patron.search(texto_completo)
             if match:
                 if campo == "Domicilio del contratante":
                     valor = match.group(1).strip() if match.group(1) else match.group(0).strip()
                     # Limpiar saltos de línea y espacios múltiples
-                    valor = re.sub(r'\s*\n\s*', ' ', valor)
+                    valor = registro.sub(r'\s*\n\s*', ' ', valor)
                     resultado[campo] = valor
                     logging.info(f"Domicilio extraído: {valor}")
                 elif campo in ["Prima", "Recargo por pago fraccionado", "Prima Total", "SAMI", "Suma Asegurada", "Prima anual"]:
@@ -167,7 +167,7 @@ def extraer_datos_poliza_protgt_pyme(pdf_path: str) -> Dict:
                     # Para valores de texto largos
                     valor = match.group(1).strip() if match.group(1) else match.group(0).strip()
                     # Limpiar saltos de línea y espacios múltiples
-                    valor = re.sub(r'\s*\n\s*', ' ', valor)
+                    valor = registro.sub(r'\s*\n\s*', ' ', valor)
                     resultado[campo] = valor
                     logging.info(f"{campo} extraído: {valor[:50]}...")
                 else:
@@ -192,27 +192,27 @@ def extraer_datos_poliza_protgt_pyme(pdf_path: str) -> Dict:
 
         # Tratar de extraer el código postal del domicilio si no lo encontramos directamente
         if resultado["Código Postal"] == "0" and resultado["Domicilio del contratante"] != "0":
-            cp_match = re.search(r'CP(\d{5})|C\.P\.?\s*(\d{5})', resultado["Domicilio del contratante"], re.IGNORECASE)
+            cp_match = registro.search(r'CP(\d{5})|C\.P\.?\s*(\d{5})', resultado["Domicilio del contratante"], re.IGNORECASE)
             if cp_match:
                 resultado["Código Postal"] = cp_match.group(1) if cp_match.group(1) else cp_match.group(2)
                 logging.info(f"Código postal extraído del domicilio: {resultado['Código Postal']}")
             else:
                 # Intenta buscar solo 5 dígitos seguidos
-                cp_match = re.search(r'(\d{5})', resultado["Domicilio del contratante"])
+                cp_match = registro.search(r'(\d{5})', resultado["Domicilio del contratante"])
                 if cp_match:
                     resultado["Código Postal"] = cp_match.group(1).strip()
                     logging.info(f"Código postal extraído del domicilio (regex alternativo): {resultado['Código Postal']}")
 
         # Si no encontramos la cobertura básica pero tenemos otros datos de la tabla
         if resultado["Cobertura Básica"] == "0" and resultado["Suma Asegurada"] != "0":
-            cobertura_match = re.search(r'BÁSICA', texto_completo, re.IGNORECASE)
+            cobertura_match = registro.search(r'BÁSICA', texto_completo, re.IGNORECASE)
             if cobertura_match:
                 resultado["Cobertura Básica"] = "BÁSICA"
                 logging.info(f"Cobertura Básica encontrada: BÁSICA")
 
         # Buscar el grupo empresarial si no lo encontramos con el patrón inicial
         if resultado["Grupo Empresarial"] == "0":
-            grupo_match = re.search(r'(?:Datos del contratante|Contratante)\s+Grupo Empresarial\s+([A-ZÁ-Ú0-9\s,.]+)', texto_completo, re.IGNORECASE)
+            grupo_match = registro.search(r'(?:Datos del contratante|Contratante)\s+Grupo Empresarial\s+([A-ZÁ-Ú0-9\s,.]+)', texto_completo, re.IGNORECASE)
             if grupo_match:
                 resultado["Grupo Empresarial"] = grupo_match.group(1).strip()
                 logging.info(f"Grupo Empresarial encontrado (alt): {resultado['Grupo Empresarial']}")
@@ -385,6 +385,38 @@ def procesar_archivo(ruta_pdf: str, directorio_salida: str = "output") -> Dict:
         logging.error(f"Error procesando archivo {ruta_pdf}: {str(e)}", exc_info=True)
         return {}
 
+def procesar_documento(ruta_pdf: Union[str, DocumentContext], sumidero: Optional[SumideroArtefactos] = None) -> Dict:
+    """
+    Procesa un PDF de Plan Protege PYME sin escribir archivos intermedios.
+    
+    El markdown y el JSON solo se generan si se indica un sumidero activo; en ese
+    caso "file_path" apunta al markdown (en modo async puede escribirse después).
+    
+    Args:
+        ruta_pdf (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+        sumidero (SumideroArtefactos, opcional): Destino del markdown y el JSON; sin
+            sumidero (o apagado) no se escriben
+        
+    Returns:
+        Dict: Datos extraídos del PDF
+    """
+    try:
+        datos = extraer_datos_poliza_protgt_pyme(ruta_pdf)
+        
+        if sumidero is not None and sumidero.activo:
+            nombre_base = os.path.splitext(os.path.basename(str(ruta_pdf)))[0]
+            # Copia: en modo async los archivos se escriben después de devolver el resultado
+            if sumidero.guardar(nombre_base, {
+                "md": partial(generar_markdown, dict(datos)),
+                "json": partial(guardar_a_json, dict(datos)),
+            }):
+                datos["file_path"] = os.path.join(sumidero.directorio, f"{nombre_base}.md")
+        
+        return datos
+    except Exception as e:
+        logging.error(f"Error procesando archivo {ruta_pdf}: {str(e)}", exc_info=True)
+        return {}
+
 def procesar_directorio(directorio: str, directorio_salida: str = "output") -> None:
     """
     Procesa todos los archivos PDF en un directorio.
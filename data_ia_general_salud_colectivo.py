@@ -3,12 +3,13 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
-import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from secciones import SECCIONES_CAMPOS_SALUD, segmentar
+from valores_por_etiqueta import buscar_valores
 
 # Configurar logging
 logging.basicConfig(
@@ -27,7 +28,7 @@ def normalizar_numero(valor: str) -> str:
         return "0"
     
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\s]', '', valor)
+    valor = registro.sub(r'[$\s]', '', valor)
     
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
@@ -63,14 +64,18 @@ def detectar_tipo_documento(texto: str) -> str:
     ]
     
     # Contar cuántos patrones coinciden
-    coincidencias = sum(1 for pattern in patrones_salud_colectivo if re.search(pattern, texto, re.IGNORECASE))
+    coincidencias = sum(1 for pattern in patrones_salud_colectivo if registro.search(pattern, texto, re.IGNORECASE))
     
     # Si más del 60% de los patrones coinciden, consideramos que es el documento correcto
     if coincidencias >= len(patrones_salud_colectivo) * 0.6:
         return "SALUD_COLECTIVO"
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
+# Campos normalizados con normalizar_numero
+CAMPOS_NUMERICOS = {"Prima Neta", "Prima anual total", "I.V.A.", "Derecho de póliza",
+                    "Descuento familiar", "Cesión de Comisión", "Recargo por pago fraccionado"}
+
+def extraer_datos_poliza_salud_colectivo(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza de Gastos Médicos Colectivo desde un archivo PDF.
     """
@@ -130,13 +135,14 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        texto_completo_raw = ""
-        for page in doc:
-            texto_completo += page.get_text("text", sort=True) + "\n"  # Usar sort=True para orden de lectura
-            texto_completo_raw += page.get_text() + "\n"  # Sin ordenar para capturar texto tal como está
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = documento.text_sorted  # Texto en orden de lectura (sort=True)
+            texto_completo_raw = documento.text  # Sin ordenar para capturar texto tal como está
+            # Campos cuyo valor está junto o debajo de su etiqueta, ubicados por posición
+            valores_geometricos = buscar_valores(documento)
+
+        # Ubicar las secciones una sola vez: cada campo se busca en la suya
+        segmentacion = segmentar(texto_completo)
 
         # --- Sección de patrones para extracción ---
         # Patrones básicos
@@ -256,15 +262,18 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
         }
         
         # --- Sección de extracción de datos ---
-        # Buscar coincidencias para todos los patrones
+        for campo, valor in valores_geometricos.items():
+            resultado[campo] = normalizar_numero(valor) if campo in CAMPOS_NUMERICOS else valor
+            logging.info(f"Extraído {campo} (por etiqueta): {resultado[campo]}")
+
+        # Buscar coincidencias para los patrones de los campos que no se ubicaron por etiqueta
         for campo, patron in patterns.items():
-            match = re.search(patron, texto_completo, re.IGNORECASE | re.MULTILINE)
+            if campo in valores_geometricos:
+                continue
+            match = segmentacion.buscar(patron, SECCIONES_CAMPOS_SALUD.get(campo), re.IGNORECASE | re.MULTILINE)
             if match:
                 try:
-                    if campo in ["Prima Neta", "Prima anual total", "I.V.A.", "Derecho de póliza"]:
-                        valor = match.group(1).strip()
-                        resultado[campo] = normalizar_numero(valor)
-                    elif campo in ["Descuento familiar", "Cesión de Comisión", "Recargo por pago fraccionado"]:
+                    if campo in CAMPOS_NUMERICOS:
                         valor = match.group(1).strip()
                         resultado[campo] = normalizar_numero(valor)
                     else:
@@ -274,7 +283,9 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
                     logging.warning(f"Error extrayendo {campo}: {e}")
 
         # Procesar tabla de datos financieros completa si existe
-        match_tabla = re.search(tabla_datos_financieros_pattern, texto_completo)
+        match_tabla = None
+        if not CAMPOS_NUMERICOS <= valores_geometricos.keys():
+            match_tabla = segmentacion.buscar(tabla_datos_financieros_pattern, "prima")
         if match_tabla:
             resultado["Descuento familiar"] = normalizar_numero(match_tabla.group(1))
             resultado["Cesión de Comisión"] = normalizar_numero(match_tabla.group(2))
@@ -287,13 +298,13 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
 
         # Procesar patrones específicos para fechas en formato alternativo DD/MMM/YYYY
         # Fecha de emisión alternativa
-        emision_alt_match = re.search(fecha_emision_alt_pattern, texto_completo, re.IGNORECASE | re.MULTILINE)
+        emision_alt_match = registro.search(fecha_emision_alt_pattern, texto_completo, re.IGNORECASE | re.MULTILINE)
         if emision_alt_match and resultado["Fecha de emisión"] == "0":
             resultado["Fecha de emisión"] = emision_alt_match.group(1).strip()
             logging.info(f"Extraído Fecha de emisión (formato alt): {resultado['Fecha de emisión']}")
         
         # Fechas de vigencia (inicio y fin)
-        vigencia_match = re.search(fecha_vigencia_pattern, texto_completo, re.IGNORECASE | re.MULTILINE)
+        vigencia_match = registro.search(fecha_vigencia_pattern, texto_completo, re.IGNORECASE | re.MULTILINE)
         if vigencia_match:
             if resultado["Fecha de inicio de vigencia"] == "0":
                 resultado["Fecha de inicio de vigencia"] = vigencia_match.group(1).strip()
@@ -307,7 +318,7 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
         for linea in texto_completo.split('\n'):
             # Clave Agente (patrón alternativo)
             if resultado["Clave Agente"] == "0" and 'Agente' in linea:
-                match = re.search(r'(?:Agente|AGENTE)[^0-9]*(\d{6})', linea)
+                match = registro.search(r'(?:Agente|AGENTE)[^0-9]*(\d{6})', linea)
                 if match:
                     resultado["Clave Agente"] = match.group(1)
                     logging.info(f"Clave Agente extraída (alt): {resultado['Clave Agente']}")
@@ -315,21 +326,21 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
             # Número de póliza (patrón alternativo)
             if resultado["Número de póliza"] == "0":
                 # Buscar patrones como 90687X02 o números de póliza similares
-                match = re.search(r'\b(\d{5}[A-Z]\d{2})\b', linea)
+                match = registro.search(r'\b(\d{5}[A-Z]\d{2})\b', linea)
                 if match:
                     resultado["Número de póliza"] = match.group(1)
                     logging.info(f"Número de póliza extraído (alt): {resultado['Número de póliza']}")
 
             # Código Postal (patrón alternativo)
             if resultado["Código Postal"] == "0" and 'C.P.' in linea:
-                match = re.search(r'C\.P\.\s*(\d{5})', linea)
+                match = registro.search(r'C\.P\.\s*(\d{5})', linea)
                 if match:
                     resultado["Código Postal"] = match.group(1)
                     logging.info(f"Código Postal extraído (alt): {resultado['Código Postal']}")
 
             # Promotor (patrón alternativo)
             if resultado["Promotor"] == "0" and 'Promotor' in linea:
-                match = re.search(r'Promotor\s*:?\s*(\d+)', linea)
+                match = registro.search(r'Promotor\s*:?\s*(\d+)', linea)
                 if match:
                     resultado["Promotor"] = match.group(1)
                     logging.info(f"Promotor extraído (alt): {resultado['Promotor']}")
@@ -346,7 +357,7 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
         # --- Extracción de coberturas y servicios ---
         # Extraer coberturas básicas
         cobertura_basica_pattern = r'Incluidos en Básica\s+(.*?)(?=Coberturas adicionales con costo|$)'
-        cobertura_basica_match = re.search(cobertura_basica_pattern, texto_completo, re.DOTALL | re.IGNORECASE)
+        cobertura_basica_match = segmentacion.buscar(cobertura_basica_pattern, "coberturas", re.DOTALL | re.IGNORECASE)
         if cobertura_basica_match:
             texto_cobertura = cobertura_basica_match.group(1).strip()
             logging.info(f"Texto de coberturas básicas encontrado: {texto_cobertura}")
@@ -360,7 +371,7 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
             ]
             
             for cobertura in coberturas_basicas:
-                if re.search(cobertura["pattern"], texto_cobertura, re.IGNORECASE):
+                if registro.search(cobertura["pattern"], texto_cobertura, re.IGNORECASE):
                     coberturas_incluidas.append({
                         "Nombre": cobertura["nombre"],
                         "Suma Asegurada": "Incluida",
@@ -371,7 +382,7 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
         
         # Extraer coberturas adicionales
         cobertura_adicional_pattern = r'Coberturas adicionales con costo\s+(.*?)(?=Servicios\s+con costo|$)'
-        cobertura_adicional_match = re.search(cobertura_adicional_pattern, texto_completo, re.DOTALL | re.IGNORECASE)
+        cobertura_adicional_match = segmentacion.buscar(cobertura_adicional_pattern, "coberturas_adicionales", re.DOTALL | re.IGNORECASE)
         if cobertura_adicional_match:
             texto_cobertura = cobertura_adicional_match.group(1).strip()
             logging.info(f"Texto de coberturas adicionales encontrado: {texto_cobertura}")
@@ -386,15 +397,15 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
             ]
             
             for cobertura in coberturas_adicionales_lista:
-                if re.search(cobertura["pattern"], texto_cobertura, re.IGNORECASE):
+                if registro.search(cobertura["pattern"], texto_cobertura, re.IGNORECASE):
                     # Buscar suma asegurada, deducible y coaseguro para esta cobertura
                     suma_pattern = rf"{cobertura['pattern']}.*?([^$\n]*?)(?=\$|\n)"
                     deducible_pattern = rf"{cobertura['pattern']}.*?\$[^$\n]*?([^%\n]*?)(?=%|\n)"
                     coaseguro_pattern = rf"{cobertura['pattern']}.*?%[^%\n]*?(\d+\s*%)"
                     
-                    suma_match = re.search(suma_pattern, texto_cobertura, re.DOTALL | re.IGNORECASE)
-                    deducible_match = re.search(deducible_pattern, texto_cobertura, re.DOTALL | re.IGNORECASE)
-                    coaseguro_match = re.search(coaseguro_pattern, texto_cobertura, re.DOTALL | re.IGNORECASE)
+                    suma_match = registro.search(suma_pattern, texto_cobertura, re.DOTALL | re.IGNORECASE)
+                    deducible_match = registro.search(deducible_pattern, texto_cobertura, re.DOTALL | re.IGNORECASE)
+                    coaseguro_match = registro.search(coaseguro_pattern, texto_cobertura, re.DOTALL | re.IGNORECASE)
                     
                     suma = suma_match.group(1).strip() if suma_match else "N/A"
                     deducible = deducible_match.group(1).strip() if deducible_match else "N/A"
@@ -413,7 +424,7 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
         
         # Extraer servicios con costo
         servicios_pattern = r'Servicios\s+con costo\s+(.*?)(?=Prima|$)'
-        servicios_match = re.search(servicios_pattern, texto_completo, re.DOTALL | re.IGNORECASE)
+        servicios_match = segmentacion.buscar(servicios_pattern, "servicios", re.DOTALL | re.IGNORECASE)
         if servicios_match:
             texto_servicios = servicios_match.group(1).strip()
             logging.info(f"Texto de servicios con costo encontrado: {texto_servicios}")
@@ -425,10 +436,10 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
             ]
             
             for servicio in servicios_lista:
-                if re.search(servicio["pattern"], texto_servicios, re.IGNORECASE):
+                if registro.search(servicio["pattern"], texto_servicios, re.IGNORECASE):
                     # Buscar el costo de este servicio
                     costo_pattern = rf"{servicio['pattern']}.*?([^N\n]*?)(?=N|$)"
-                    costo_match = re.search(costo_pattern, texto_servicios, re.DOTALL | re.IGNORECASE)
+                    costo_match = registro.search(costo_pattern, texto_servicios, re.DOTALL | re.IGNORECASE)
                     costo = costo_match.group(1).strip() if costo_match else "No Aplica"
                     
                     servicios_costo.append({
@@ -439,7 +450,7 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
         
         # --- Extraer domicilio y ciudad del contratante con patrón específico (esto es porque el formato es especial) ---
         contratante_info_pattern = r'ZAPATA SN 101, EL PEDREGAL,\s+LOS CABOS, C\.P\. 23453'
-        contratante_info_match = re.search(contratante_info_pattern, texto_completo, re.IGNORECASE)
+        contratante_info_match = registro.search(contratante_info_pattern, texto_completo, re.IGNORECASE)
         if contratante_info_match:
             # Si hay una coincidencia exacta con este patrón, desglosar manualmente
             resultado["Domicilio del contratante"] = "ZAPATA SN 101, EL PEDREGAL"
@@ -449,7 +460,7 @@ def extraer_datos_poliza_salud_colectivo(pdf_path: str) -> Dict:
         
         # --- Extraer datos del asegurado titular con patrón específico ---
         asegurado_info_pattern = r'SLAME ROMERO, LORENA.*?SIERRA SAN JAVIER\s+DEPTO CARINI 118A SN\s+TERRANOVA,.*?LOS CABOS C\.P\.23473'
-        asegurado_info_match = re.search(asegurado_info_pattern, texto_completo, re.DOTALL | re.IGNORECASE)
+        asegurado_info_match = registro.search(asegurado_info_pattern, texto_completo, re.DOTALL | re.IGNORECASE)
         if asegurado_info_match:
             resultado["Nombre del asegurado titular"] = "SLAME ROMERO, LORENA"
             resultado["Domicilio del asegurado"] = "SIERRA SAN JAVIER DEPTO CARINI 118A SN TERRANOVA"
@@ -3,12 +3,14 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
 import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from secciones import SECCIONES_CAMPOS_SALUD, segmentar
+from valores_por_etiqueta import buscar_valores
 
 # Configurar logging
 logging.basicConfig(
@@ -26,7 +28,7 @@ def normalizar_numero(valor: str) -> str:
     if not valor:
         return "0"
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\\s]', '', valor)
+    valor = registro.sub(r'[$\\s]', '', valor)
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
     # Asegura que tenga dos decimales si es un número flotante
@@ -42,7 +44,7 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     Detecta si el documento es una póliza de Gastos Médicos Mayores Familiar.
     """
     # Patrones para identificar documentos de Gastos Médicos Familiares
-    if re.search(r'Gastos M[ée]dicos Mayores Individual|Gastos M[ée]dicos Mayores.*Familiar|Car[áa]tula de p[óo]liza.*Gastos M[ée]dicos', texto_pdf, re.IGNORECASE):
+    if registro.search(r'Gastos M[ée]dicos Mayores Individual|Gastos M[ée]dicos Mayores.*Familiar|Car[áa]tula de p[óo]liza.*Gastos M[ée]dicos', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Gastos Médicos Mayores Familiar")
         return "GASTOS_MEDICOS_FAMILIAR"
     
@@ -50,7 +52,74 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     logging.warning("Tipo de documento no identificado como Gastos Médicos Mayores Familiar")
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
+# Patrones específicos para el formato Gastos Médicos Mayores Familiar
+PATRONES = registro.grupo("salud_familiar", {
+    "Nombre del contratante": r'Nombre\s*:\s*([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio|$)',
+    "Domicilio del contratante": r'Domicilio\s*:\s*(.*?)(?=\s+LOS CABOS|$)',
+    "Ciudad del contratante": r'Ciudad:\s+([A-ZÁ-Ú\s,.]+)',
+    "Código Postal": r'C\.P\.\s+(\d{5})',
+    "Nombre del asegurado titular": r'Datos del Asegurado Titular\s+Nombre\s*:\s*([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio|$)',
+    "Domicilio del asegurado": r'Datos del Asegurado Titular.*?Domicilio\s*:\s*(.*?)(?=\s+LOS CABOS|$)',
+    "Ciudad del asegurado": r'Datos del Asegurado Titular.*?Ciudad:\s+([A-ZÁ-Ú\s,.]+)',
+    "R.F.C.": r'R\.F\.C\.\s*:\s*([A-Z0-9]{10,13})',
+    "Teléfono": r'Teléfono:\s+([0-9]{7,10})',
+    "Número de póliza": r'P[óo]liza\s+([0-9A-Z]+)',
+    "Solicitud": r'Solicitud\s+(\d{5,14})',
+    "Tipo de Plan": r'Tipo de [Pp]lan\s+([A-Za-zÁ-Úá-ú\s]+)',
+    "Fecha de inicio de vigencia": r'Fecha de inicio de vigencia\s+(\d{2}/\d{2}/\d{4})',
+    "Fecha de fin de vigencia": r'Fecha de fin de vigencia\s+(\d{2}/\d{2}/\d{4})',
+    "Fecha de emisión": r'Fecha de emisión\s+(\d{2}/\d{2}/\d{4})',
+    "Frecuencia de pago": r'Frecuencia de pago\s+([A-ZÁ-Ú\s]+)',
+    "Tipo de pago": r'Tipo de pago\s+([A-ZÁ-Ú\s]+)',
+    "Zona Tarificación": r'Zona Tarificación:\s+Zona\s+(\d+)',
+    "Periodo de pago de siniestro": r'Periodo de pago de siniestro\s+(\d+\s+años)',
+    "Suma Asegurada": r'SumaAsegurada\s+\$\s+([\d,]+\s+[M]\.[N]\.)',
+    "Deducible": r'Deducible\s+\$\s+([\d,]+\s+[M]\.[N]\.)',
+    "Coaseguro": r'Coaseguro\s+(\d+\s*%)',
+    "Tope de Coaseguro": r'Tope de Coaseguro\s+\$\s+([\d,]+\s+[M]\.[N]\.)',
+    "Gama Hospitalaria": r'Gama Hospitalaria\s+([A-ZÁ-Ú\s]+)',
+    "Tipo de Red": r'Tipo de Red\s+([A-ZÁ-Ú\s]+)',
+    "Tabulador Médico": r'Tabulador Médico\s+([A-ZÁ-Ú\s]+)',
+    "Prima Neta": r'Prima Neta\s+([\d,]+\.\d{2})',
+    "Recargo por pago fraccionado": r'Recargo por pago fraccionado\s+([\d,]+\.\d{2}|[\d,]+|0)',
+    "Derecho de póliza": r'Derecho de póliza\s+([\d,]+\.\d{2})',
+    "I.V.A.": r'I\.V\.A\.\s+([\d,]+\.\d{2})',
+    "Prima anual total": r'Prima anual total\s+([\d,]+\.\d{2})',
+    "Descuento familiar": r'Descuento familiar\s+([\d,]+\.\d{2}|[\d,]+|0)',
+    "Cesión de Comisión": r'Cesión de Comisión\s+([\d,]+\.\d{2}|[\d,]+|0)',
+    "Clave Agente": r'Agente:?\s+(\d+|Número\s+\d{8})',
+    "Nombre del agente": r'Agente\s+\d+\s+([A-ZÁ-Ú\s,.]+)',
+    "Promotor": r'Promotor\s*:\s*(\d+)'
+}, re.MULTILINE | re.IGNORECASE)
+
+# Campos normalizados con normalizar_numero
+CAMPOS_NUMERICOS = {"Prima Neta", "Prima anual total", "I.V.A.", "Recargo por pago fraccionado",
+                    "Derecho de póliza", "Descuento familiar", "Cesión de Comisión"}
+# Campos de la tabla compacta de datos de la póliza
+CAMPOS_TABLA_POLIZA = {"Número de póliza", "Tipo de Plan", "Solicitud", "Fecha de inicio de vigencia",
+                       "Fecha de fin de vigencia", "Fecha de emisión", "Frecuencia de pago", "Tipo de pago"}
+CAMPOS_FECHAS = {"Fecha de emisión", "Fecha de inicio de vigencia", "Fecha de fin de vigencia"}
+
+# Patrones para el formato tabular (como en la imagen proporcionada)
+PATRONES_TABULARES = registro.grupo("salud_familiar", {
+    "Número de póliza": r'Póliza\s*\n\s*([0-9A-Z]+)',
+    "Tipo de Plan": r'Tipo de plan\s*\n\s*([A-Za-zÁ-Úá-ú\s]+)',
+    "Solicitud": r'Solicitud\s*\n\s*(\d{5,14})',
+    "Fecha de inicio de vigencia": r'Fecha de inicio de vigencia\s*\n\s*(\d{2}/\d{2}/\d{4})',
+    "Fecha de fin de vigencia": r'Fecha de fin de vigencia\s*\n\s*(\d{2}/\d{2}/\d{4})',
+    "Fecha de emisión": r'Fecha de emisión\s*\n\s*(\d{2}/\d{2}/\d{4})',
+    "Frecuencia de pago": r'Frecuencia de pago\s*\n\s*([A-Za-zÁ-Úá-ú\s]+)',
+    "Tipo de pago": r'Tipo de pago\s*\n\s*([A-Za-zÁ-Úá-ú\s]+)',
+    "Prima Neta": r'Prima Neta\s*\n\s*([\d,]+\.\d{2})',
+    "Descuento familiar": r'Descuento familiar\s*\n\s*([0-9]+)',
+    "Cesión de Comisión": r'Cesión de Comisión\s*\n\s*([0-9]+)',
+    "Recargo por pago fraccionado": r'Recargo por pago fraccionado\s*\n\s*([0-9]+)',
+    "Derecho de póliza": r'Derecho de póliza\s*\n\s*([\d,]+\.\d{2})',
+    "I.V.A.": r'I\.V\.A\.\s*\n\s*([\d,]+\.\d{2})',
+    "Prima anual total": r'Prima anual total\s*\n\s*([\d,]+\.\d{2})'
+}, re.MULTILINE | re.IGNORECASE)
+
+def extraer_datos_poliza_salud_familiar(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza de Gastos Médicos Mayores Familiar desde un archivo PDF.
     """
@@ -102,87 +171,37 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        for page in doc:
-            texto_completo += page.get_text("text", sort=True) + "\n"  # Usar sort=True para orden de lectura
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = documento.text_sorted  # Texto en orden de lectura (sort=True)
+            # Campos cuyo valor está junto o debajo de su etiqueta, ubicados por posición
+            valores_geometricos = buscar_valores(documento)
+
+        # Ubicar las secciones una sola vez: cada campo se busca en la suya
+        segmentacion = segmentar(texto_completo)
 
         # Detectar tipo de documento
         tipo_documento = detectar_tipo_documento(texto_completo)
         if tipo_documento != "GASTOS_MEDICOS_FAMILIAR":
             logging.warning(f"Este documento no parece ser una póliza de Gastos Médicos Mayores Familiar: {tipo_documento}")
 
-        # Patrones específicos para el formato Gastos Médicos Mayores Familiar
-        patrones = {
-            "Nombre del contratante": r'Nombre\s*:\s*([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio|$)',
-            "Domicilio del contratante": r'Domicilio\s*:\s*(.*?)(?=\s+LOS CABOS|$)',
-            "Ciudad del contratante": r'Ciudad:\s+([A-ZÁ-Ú\s,.]+)',
-            "Código Postal": r'C\.P\.\s+(\d{5})',
-            "Nombre del asegurado titular": r'Datos del Asegurado Titular\s+Nombre\s*:\s*([A-ZÁ-Ú\s,.]+?)(?=\s+Domicilio|$)',
-            "Domicilio del asegurado": r'Datos del Asegurado Titular.*?Domicilio\s*:\s*(.*?)(?=\s+LOS CABOS|$)',
-            "Ciudad del asegurado": r'Datos del Asegurado Titular.*?Ciudad:\s+([A-ZÁ-Ú\s,.]+)',
-            "R.F.C.": r'R\.F\.C\.\s*:\s*([A-Z0-9]{10,13})',
-            "Teléfono": r'Teléfono:\s+([0-9]{7,10})',
-            "Número de póliza": r'P[óo]liza\s+([0-9A-Z]+)',
-            "Solicitud": r'Solicitud\s+(\d{5,14})',
-            "Tipo de Plan": r'Tipo de [Pp]lan\s+([A-Za-zÁ-Úá-ú\s]+)',
-            "Fecha de inicio de vigencia": r'Fecha de inicio de vigencia\s+(\d{2}/\d{2}/\d{4})',
-            "Fecha de fin de vigencia": r'Fecha de fin de vigencia\s+(\d{2}/\d{2}/\d{4})',
-            "Fecha de emisión": r'Fecha de emisión\s+(\d{2}/\d{2}/\d{4})',
-            "Frecuencia de pago": r'Frecuencia de pago\s+([A-ZÁ-Ú\s]+)',
-            "Tipo de pago": r'Tipo de pago\s+([A-ZÁ-Ú\s]+)',
-            "Zona Tarificación": r'Zona Tarificación:\s+Zona\s+(\d+)',
-            "Periodo de pago de siniestro": r'Periodo de pago de siniestro\s+(\d+\s+años)',
-            "Suma Asegurada": r'SumaAsegurada\s+\$\s+([\d,]+\s+[M]\.[N]\.)',
-            "Deducible": r'Deducible\s+\$\s+([\d,]+\s+[M]\.[N]\.)',
-            "Coaseguro": r'Coaseguro\s+(\d+\s*%)',
-            "Tope de Coaseguro": r'Tope de Coaseguro\s+\$\s+([\d,]+\s+[M]\.[N]\.)',
-            "Gama Hospitalaria": r'Gama Hospitalaria\s+([A-ZÁ-Ú\s]+)',
-            "Tipo de Red": r'Tipo de Red\s+([A-ZÁ-Ú\s]+)',
-            "Tabulador Médico": r'Tabulador Médico\s+([A-ZÁ-Ú\s]+)',
-            "Prima Neta": r'Prima Neta\s+([\d,]+\.\d{2})',
-            "Recargo por pago fraccionado": r'Recargo por pago fraccionado\s+([\d,]+\.\d{2}|[\d,]+|0)',
-            "Derecho de póliza": r'Derecho de póliza\s+([\d,]+\.\d{2})',
-            "I.V.A.": r'I\.V\.A\.\s+([\d,]+\.\d{2})',
-            "Prima anual total": r'Prima anual total\s+([\d,]+\.\d{2})',
-            "Descuento familiar": r'Descuento familiar\s+([\d,]+\.\d{2}|[\d,]+|0)',
-            "Cesión de Comisión": r'Cesión de Comisión\s+([\d,]+\.\d{2}|[\d,]+|0)',
-            "Clave Agente": r'Agente:?\s+(\d+|Número\s+\d{8})',
-            "Nombre del agente": r'Agente\s+\d+\s+([A-ZÁ-Ú\s,.]+)',
-            "Promotor": r'Promotor\s*:\s*(\d+)'
-        }
-
-        # Patrones para el formato tabular (como en la imagen proporcionada)
-        patrones_tabulares = {
-            "Número de póliza": r'Póliza\s*\n\s*([0-9A-Z]+)',
-            "Tipo de Plan": r'Tipo de plan\s*\n\s*([A-Za-zÁ-Úá-ú\s]+)',
-            "Solicitud": r'Solicitud\s*\n\s*(\d{5,14})',
-            "Fecha de inicio de vigencia": r'Fecha de inicio de vigencia\s*\n\s*(\d{2}/\d{2}/\d{4})',
-            "Fecha de fin de vigencia": r'Fecha de fin de vigencia\s*\n\s*(\d{2}/\d{2}/\d{4})',
-            "Fecha de emisión": r'Fecha de emisión\s*\n\s*(\d{2}/\d{2}/\d{4})',
-            "Frecuencia de pago": r'Frecuencia de pago\s*\n\s*([A-Za-zÁ-Úá-ú\s]+)',
-            "Tipo de pago": r'Tipo de pago\s*\n\s*([A-Za-zÁ-Úá-ú\s]+)',
-            "Prima Neta": r'Prima Neta\s*\n\s*([\d,]+\.\d{2})',
-            "Descuento familiar": r'Descuento familiar\s*\n\s*([0-9]+)',
-            "Cesión de Comisión": r'Cesión de Comisión\s*\n\s*([0-9]+)',
-            "Recargo por pago fraccionado": r'Recargo por pago fraccionado\s*\n\s*([0-9]+)',
-            "Derecho de póliza": r'Derecho de póliza\s*\n\s*([\d,]+\.\d{2})',
-            "I.V.A.": r'I\.V\.A\.\s*\n\s*([\d,]+\.\d{2})',
-            "Prima anual total": r'Prima anual total\s*\n\s*([\d,]+\.\d{2})'
-        }
+        for campo, valor in valores_geometricos.items():
+            resultado[campo] = normalizar_numero(valor) if campo in CAMPOS_NUMERICOS else valor
+            logging.info(f"Encontrado {campo} (por etiqueta): {resultado[campo]}")
 
         # Extraer valores usando patrones específicos y patrones tabulares
-        for campo, patron in list(patrones.items()) + list(patrones_tabulares.items()):
-            match = re.search(patron, texto_completo, re.MULTILINE | re.IGNORECASE)
+        # (solo los campos que no se ubicaron por etiqueta)
+        for campo, patron in list(PATRONES.items()) + list(PATRONES_TABULARES.items()):
+            if campo in valores_geometricos:
+                continue
+            match = segmentacion.buscar(patron, SECCIONES_CAMPOS_SALUD.get(campo))
             if match:
                 if campo in ["Domicilio del contratante", "Domicilio del asegurado"]:
                     valor = match.group(1).strip() if match.group(1) else match.group(0).strip()
                     # Limpiar saltos de línea y espacios múltiples
-                    valor = re.sub(r'\s*\n\s*', ' ', valor)
+                    valor = registro.sub(r'\s*\n\s*', ' ', valor)
                     resultado[campo] = valor
                     logging.info(f"{campo} extraído: {valor}")
-                elif campo in ["Prima Neta", "Prima anual total", "I.V.A.", "Recargo por pago fraccionado", "Derecho de póliza", "Descuento familiar", "Cesión de Comisión"]:
+                elif campo in CAMPOS_NUMERICOS:
                     # Para valores numéricos, aplicamos la normalización
                     if match.groups():
                         valor = next((g for g in match.groups() if g), "").strip()
@@ -217,7 +236,9 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
         # Búsqueda más específica para la tabla de datos financieros
         financieros_pattern = r'Prima\s*\n\s*Descuento familiar\s*\n\s*(\d+)\s*\n\s*Cesión de Comisión\s*\n\s*(\d+)\s*\n\s*Prima Neta\s*\n\s*([\d,]+\.\d{2})\s*\n\s*Recargo por pago fraccionado\s*\n\s*(\d+)\s*\n\s*Derecho de póliza\s*\n\s*([\d,]+\.\d{2})\s*\n\s*I\.V\.A\.\s*\n\s*([\d,]+\.\d{2})\s*\n\s*Prima anual total\s*\n\s*([\d,]+\.\d{2})'
         
-        match_financieros = re.search(financieros_pattern, texto_completo, re.MULTILINE)
+        match_financieros = None
+        if not CAMPOS_NUMERICOS <= valores_geometricos.keys():
+            match_financieros = segmentacion.buscar(financieros_pattern, "prima", re.MULTILINE)
         if match_financieros:
             resultado["Descuento familiar"] = normalizar_numero(match_financieros.group(1))
             resultado["Cesión de Comisión"] = normalizar_numero(match_financieros.group(2))
@@ -231,7 +252,9 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
         # Buscar en formato de tabla compacta
         poliza_pattern = r'Póliza\s*\n\s*([0-9A-Z]+)\s*\n\s*Tipo de plan\s*\n\s*([A-Za-z\s]+)\s*\n\s*Solicitud\s*\n\s*(\d+)\s*\n\s*Fecha de inicio de vigencia\s*\n\s*(\d{2}/\d{2}/\d{4})\s*\n\s*Fecha de fin de vigencia\s*\n\s*(\d{2}/\d{2}/\d{4})\s*\n\s*Fecha de emisión\s*\n\s*(\d{2}/\d{2}/\d{4})\s*\n\s*Frecuencia de pago\s*\n\s*([A-Za-zÁ-Úá-ú\s]+)\s*\n\s*Tipo de pago\s*\n\s*([A-Za-zÁ-Úá-ú\s]+)'
         
-        match_poliza = re.search(poliza_pattern, texto_completo, re.MULTILINE)
+        match_poliza = None
+        if not CAMPOS_TABLA_POLIZA <= valores_geometricos.keys():
+            match_poliza = registro.search(poliza_pattern, texto_completo, re.MULTILINE)
         if match_poliza:
             resultado["Número de póliza"] = match_poliza.group(1)
             resultado["Tipo de Plan"] = match_poliza.group(2)
@@ -245,14 +268,14 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
 
         # Extraer coberturas incluidas
         cobertura_pattern = r'Incluidos en Básica\s+(.*?)(?=Coberturas adicionales con costo|$)'
-        cobertura_match = re.search(cobertura_pattern, texto_completo, re.DOTALL | re.IGNORECASE)
+        cobertura_match = segmentacion.buscar(cobertura_pattern, "coberturas", re.DOTALL | re.IGNORECASE)
         if cobertura_match:
             cobertura_text = cobertura_match.group(1).strip()
             # Extraer líneas de coberturas
             for linea in cobertura_text.split('\n'):
                 if linea.strip() and not linea.strip().startswith('Cobertura') and not linea.strip().startswith('Suma') and not linea.strip().startswith('Deducible'):
                     # Extraer nombre de la cobertura
-                    cobertura_nombre_match = re.match(r'^([A-Za-zÁ-Úá-ú\s]+)', linea.strip())
+                    cobertura_nombre_match = registro.match(r'^([A-Za-zÁ-Úá-ú\s]+)', linea.strip())
                     if cobertura_nombre_match:
                         nombre_cobertura = cobertura_nombre_match.group(1).strip()
                         # Buscar los valores asociados (suma asegurada, deducible, coaseguro)
@@ -261,16 +284,16 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
                         coaseguro = "N/A"
                         
                         # Intentar extraer valores
-                        suma_match = re.search(r'(\d+[\.,]?\d*)', linea)
+                        suma_match = registro.search(r'(\d+[\.,]?\d*)', linea)
                         if suma_match:
                             suma_asegurada = suma_match.group(1)
                         
                         # Extraer deducible y coaseguro (pueden estar en la misma línea o en texto general)
-                        deducible_match = re.search(r'Deducible[:\s]+([A-Za-zÁ-Úá-ú0-9\s/\.]+)', linea)
+                        deducible_match = registro.search(r'Deducible[:\s]+([A-Za-zÁ-Úá-ú0-9\s/\.]+)', linea)
                         if deducible_match:
                             deducible = deducible_match.group(1).strip()
                         
-                        coaseguro_match = re.search(r'Coaseguro[:\s]+([A-Za-zÁ-Úá-ú0-9\s%\.]+)', linea)
+                        coaseguro_match = registro.search(r'Coaseguro[:\s]+([A-Za-zÁ-Úá-ú0-9\s%\.]+)', linea)
                         if coaseguro_match:
                             coaseguro = coaseguro_match.group(1).strip()
                         
@@ -283,7 +306,7 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
 
         # Extraer coberturas adicionales con costo
         cobertura_adicional_pattern = r'Coberturas adicionales con costo\s+(.*?)(?=Servicios\s+con costo|$)'
-        cobertura_adicional_match = re.search(cobertura_adicional_pattern, texto_completo, re.DOTALL | re.IGNORECASE)
+        cobertura_adicional_match = segmentacion.buscar(cobertura_adicional_pattern, "coberturas_adicionales", re.DOTALL | re.IGNORECASE)
         if cobertura_adicional_match:
             cobertura_text = cobertura_adicional_match.group(1).strip()
             # Extraer líneas de coberturas
@@ -292,7 +315,7 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
             while i < len(lineas):
                 linea = lineas[i]
                 if not linea.startswith('Coberturas') and not linea.startswith('Suma') and not linea.startswith('Deducible'):
-                    cobertura_nombre_match = re.match(r'^([A-Za-zÁ-Úá-ú\s]+)', linea)
+                    cobertura_nombre_match = registro.match(r'^([A-Za-zÁ-Úá-ú\s]+)', linea)
                     if cobertura_nombre_match:
                         nombre_cobertura = cobertura_nombre_match.group(1).strip()
                         suma_asegurada = "N/A"
@@ -300,16 +323,16 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
                         coaseguro = "N/A"
                         
                         # Buscar suma asegurada
-                        suma_match = re.search(r'(Max \$[\d,]+ USD|Básica|De acuerdo a Condiciones Generales)', cobertura_text)
+                        suma_match = registro.search(r'(Max \$[\d,]+ USD|Básica|De acuerdo a Condiciones Generales)', cobertura_text)
                         if suma_match:
                             suma_asegurada = suma_match.group(1)
                         
                         # Buscar deducible y coaseguro
-                        deducible_match = re.search(r'(\$\d+[\.,]?\d*\s+[M]\.[N]\.|No Aplica|\$\d+ USD)', cobertura_text)
+                        deducible_match = registro.search(r'(\$\d+[\.,]?\d*\s+[M]\.[N]\.|No Aplica|\$\d+ USD)', cobertura_text)
                         if deducible_match:
                             deducible = deducible_match.group(1)
                         
-                        coaseguro_match = re.search(r'(\d+\s*%|No Aplica)', cobertura_text)
+                        coaseguro_match = registro.search(r'(\d+\s*%|No Aplica)', cobertura_text)
                         if coaseguro_match:
                             coaseguro = coaseguro_match.group(1)
                         
@@ -323,7 +346,7 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
 
         # Extraer servicios con costo
         servicios_pattern = r'Servicios\s+con costo\s+(.*?)(?=Prima|$)'
-        servicios_match = re.search(servicios_pattern, texto_completo, re.DOTALL | re.IGNORECASE)
+        servicios_match = segmentacion.buscar(servicios_pattern, "servicios", re.DOTALL | re.IGNORECASE)
         if servicios_match:
             servicios_text = servicios_match.group(1).strip()
             # Extraer líneas de servicios
@@ -332,13 +355,13 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
             while i < len(lineas):
                 linea = lineas[i]
                 if not linea.startswith('Servicio') and not linea.startswith('Costo'):
-                    servicio_match = re.match(r'^([A-Za-zÁ-Úá-ú\s]+)', linea)
+                    servicio_match = registro.match(r'^([A-Za-zÁ-Úá-ú\s]+)', linea)
                     if servicio_match:
                         nombre_servicio = servicio_match.group(1).strip()
                         costo = "No Aplica"
                         
                         # Buscar costo asociado
-                        costo_match = re.search(r'(No Aplica)', linea)
+                        costo_match = registro.search(r'(No Aplica)', linea)
                         if costo_match:
                             costo = costo_match.group(1)
                         
@@ -357,13 +380,13 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
 
         # Tratar de extraer el código postal del domicilio si no lo encontramos directamente
         if resultado["Código Postal"] == "0" and resultado["Domicilio del contratante"] != "0":
-            cp_match = re.search(r'C\.P\.\s*(\d{5})', resultado["Domicilio del contratante"], re.IGNORECASE)
+            cp_match = registro.search(r'C\.P\.\s*(\d{5})', resultado["Domicilio del contratante"], re.IGNORECASE)
             if cp_match:
                 resultado["Código Postal"] = cp_match.group(1)
                 logging.info(f"Código postal extraído del domicilio: {resultado['Código Postal']}")
             else:
                 # Intenta buscar solo 5 dígitos seguidos
-                cp_match = re.search(r'(\d{5})', resultado["Domicilio del contratante"])
+                cp_match = registro.search(r'(\d{5})', resultado["Domicilio del contratante"])
                 if cp_match:
                     resultado["Código Postal"] = cp_match.group(1).strip()
                     logging.info(f"Código postal extraído del domicilio (regex alternativo): {resultado['Código Postal']}")
@@ -375,7 +398,9 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
                 resultado["Coaseguro"] += "%"
                 
         # Intento específico para extraer el número de póliza y tipo de plan correctamente
-        poliza_match = re.search(r'Póliza\s*\n\s*([A-Z0-9]+)', texto_completo)
+        poliza_match = None
+        if "Número de póliza" not in valores_geometricos:
+            poliza_match = registro.search(r'Póliza\s*\n\s*([A-Z0-9]+)', texto_completo)
         if poliza_match:
             resultado["Número de póliza"] = poliza_match.group(1).strip()
             logging.info(f"Número de póliza extraído (alt): {resultado['Número de póliza']}")
@@ -392,7 +417,7 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
             
             # Intentar varios patrones
             for pattern in poliza_patterns:
-                poliza_alt_match = re.search(pattern, texto_completo)
+                poliza_alt_match = registro.search(pattern, texto_completo)
                 if poliza_alt_match:
                     resultado["Número de póliza"] = poliza_alt_match.group(0).strip()
                     logging.info(f"Número de póliza extraído (pattern): {resultado['Número de póliza']}")
@@ -402,13 +427,15 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
             if resultado["Número de póliza"] == "0" or len(resultado["Número de póliza"]) < 4 or resultado["Número de póliza"] == "N":
                 for line in texto_completo.split('\n'):
                     if "Póliza" in line:
-                        digits_match = re.search(r'([0-9]{5,}[A-Z0-9]*)', line)
+                        digits_match = registro.search(r'([0-9]{5,}[A-Z0-9]*)', line)
                         if digits_match:
                             resultado["Número de póliza"] = digits_match.group(1).strip()
                             logging.info(f"Número de póliza extraído (línea): {resultado['Número de póliza']}")
                             break
         
-        tipo_plan_match = re.search(r'Tipo de plan\s*\n\s*([A-Za-zÁ-Úá-ú\s]+)', texto_completo)
+        tipo_plan_match = None
+        if "Tipo de Plan" not in valores_geometricos:
+            tipo_plan_match = registro.search(r'Tipo de plan\s*\n\s*([A-Za-zÁ-Úá-ú\s]+)', texto_completo)
         if tipo_plan_match:
             resultado["Tipo de Plan"] = tipo_plan_match.group(1).strip()
             logging.info(f"Tipo de Plan extraído (alt): {resultado['Tipo de Plan']}")
@@ -419,7 +446,7 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
             logging.info(f"Nombre del asegurado titular asumido como el contratante: {resultado['Nombre del asegurado titular']}")
         
         # Buscar la clave de agente y nombre en formato específico
-        agente_match = re.search(r'Agente:\s*Número\s*\n(\d+)\s+([A-ZÁ-Ú\s,.]+)', texto_completo, re.MULTILINE)
+        agente_match = registro.search(r'Agente:\s*Número\s*\n(\d+)\s+([A-ZÁ-Ú\s,.]+)', texto_completo, re.MULTILINE)
         if agente_match:
             resultado["Clave Agente"] = agente_match.group(1).strip()
             resultado["Nombre del agente"] = agente_match.group(2).strip()
@@ -427,43 +454,49 @@ def extraer_datos_poliza_salud_familiar(pdf_path: str) -> Dict:
             logging.info(f"Nombre del agente extraído (alt): {resultado['Nombre del agente']}")
         
         # Extraer la solicitud con otro patrón
-        solicitud_match = re.search(r'Solicitud\s*\n\s*(\d+)', texto_completo)
+        solicitud_match = None
+        if "Solicitud" not in valores_geometricos:
+            solicitud_match = registro.search(r'Solicitud\s*\n\s*(\d+)', texto_completo)
         if solicitud_match:
             resultado["Solicitud"] = solicitud_match.group(1).strip()
             logging.info(f"Solicitud extraída (alt): {resultado['Solicitud']}")
 
-        # Buscar fechas en formato DD/MM/YYYY
-        fecha_emision_match = re.search(r'Fecha\s+de\s+Emisi[óo]n\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
-        fecha_inicio_match = re.search(r'(?:Vigencia\s+desde|Fecha\s+de\s+inicio\s+de\s+vigencia)\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
-        fecha_fin_match = re.search(r'(?:Vigencia\s+hasta|Fecha\s+de\s+fin\s+de\s+vigencia)\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
-        
-        # Buscar fechas en formato DD/MMM/YYYY
-        fecha_emision_alt_match = re.search(r'Fecha\s+de\s+Emisi[óo]n\s*[^\d]*(\d{2}/[A-Za-z]{3}/\d{4})', texto_completo, re.IGNORECASE)
-        
-        # Buscar formato de vigencia con "A" como separador
-        fecha_vigencia_alt_match = re.search(r'Vigencia\s*[^\d]*(\d{2}/[A-Za-z]{3}/\d{4})\s*A\s*(\d{2}/[A-Za-z]{3}/\d{4})', texto_completo, re.IGNORECASE)
-        
-        # Asignar fechas extraídas
-        if fecha_emision_match:
-            resultado['Fecha de emisión'] = fecha_emision_match.group(1)
-            logging.info(f"Fecha de emisión extraída: {resultado['Fecha de emisión']}")
-        elif fecha_emision_alt_match:
-            resultado['Fecha de emisión'] = fecha_emision_alt_match.group(1)
-            logging.info(f"Fecha de emisión extraída (formato alt): {resultado['Fecha de emisión']}")
-        
-        if fecha_inicio_match:
-            resultado['Fecha de inicio de vigencia'] = fecha_inicio_match.group(1)
-            logging.info(f"Fecha de inicio de vigencia extraída: {resultado['Fecha de inicio de vigencia']}")
-        elif fecha_vigencia_alt_match:
-            resultado['Fecha de inicio de vigencia'] = fecha_vigencia_alt_match.group(1)
-            logging.info(f"Fecha de inicio de vigencia extraída (formato alt): {resultado['Fecha de inicio de vigencia']}")
+        # Respaldo por regex de las fechas que no se ubicaron por etiqueta
+        if not CAMPOS_FECHAS <= valores_geometricos.keys():
+            # Buscar fechas en formato DD/MM/YYYY
+            fecha_emision_match = registro.search(r'Fecha\s+de\s+Emisi[óo]n\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
+            fecha_inicio_match = registro.search(r'(?:Vigencia\s+desde|Fecha\s+de\s+inicio\s+de\s+vigencia)\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
+            fecha_fin_match = registro.search(r'(?:Vigencia\s+hasta|Fecha\s+de\s+fin\s+de\s+vigencia)\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
+        
+            # Buscar fechas en formato DD/MMM/YYYY
+            fecha_emision_alt_match = registro.search(r'Fecha\s+de\s+Emisi[óo]n\s*[^\d]*(\d{2}/[A-Za-z]{3}/\d{4})', texto_completo, re.IGNORECASE)
+        
+            # Buscar formato de vigencia con "A" como separador
+            fecha_vigencia_alt_match = registro.search(r'Vigencia\s*[^\d]*(\d{2}/[A-Za-z]{3}/\d{4})\s*A\s*(\d{2}/[A-Za-z]{3}/\d{4})', texto_completo, re.IGNORECASE)
+        
+            # Asignar fechas extraídas
+            if fecha_emision_match:
+                resultado['Fecha de emisión'] = fecha_emision_match.group(1)
+                logging.info(f"Fecha de emisión extraída: {resultado['Fecha de emisión']}")
+            elif fecha_emision_alt_match:
+                resultado['Fecha de emisión'] = fecha_emision_alt_match.group(1)
+                logging.info(f"Fecha de emisión extraída (formato alt): {resultado['Fecha de emisión']}")
+        
+            if fecha_inicio_match:
+                resultado['Fecha de inicio de vigencia'] = fecha_inicio_match.group(1)
+                logging.info(f"Fecha de inicio de vigencia extraída: {resultado['Fecha de inicio de vigencia']}")
+            elif fecha_vigencia_alt_match:
+                resultado['Fecha de inicio de vigencia'] = fecha_vigencia_alt_match.group(1)
+                logging.info(f"Fecha de inicio de vigencia extraída (formato alt): {resultado['Fecha de inicio de vigencia']}")
             
-        if fecha_fin_match:
-            resultado['Fecha de fin de vigencia'] = fecha_fin_match.group(1)
-            logging.info(f"Fecha de fin de vigencia extraída: {resultado['Fecha de fin de vigencia']}")
-        elif fecha_vigencia_alt_match:
-            resultado['Fecha de fin de vigencia'] = fecha_vigencia_alt_match.group(2)
-            logging.info(f"Fecha de fin de vigencia extraída (formato alt): {resultado['Fecha de fin de vigencia']}")
+            if fecha_fin_match:
+                resultado['Fecha de fin de vigencia'] = fecha_fin_match.group(1)
+                logging.info(f"Fecha de fin de vigencia extraída: {resultado['Fecha de fin de vigencia']}")
+            elif fecha_vigencia_alt_match:
+                resultado['Fecha de fin de vigencia'] = fecha_vigencia_alt_match.group(2)
+                logging.info(f"Fecha de fin de vigencia extraída (formato alt): {resultado['Fecha de fin de vigencia']}")
+            # Las fechas ubicadas por etiqueta tienen prioridad
+            resultado.update({campo: valor for campo, valor in valores_geometricos.items() if campo in CAMPOS_FECHAS})
 
     except Exception as e:
         logging.error(f"Error procesando PDF de Gastos Médicos Mayores Familiar: {str(e)}", exc_info=True)
@@ -3,12 +3,12 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
-import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from secciones import segmentar
 
 # Configurar logging
 logging.basicConfig(
@@ -27,7 +27,7 @@ def normalizar_numero(valor: str) -> str:
         return "0"
     
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\s]', '', valor)
+    valor = registro.sub(r'[$\s]', '', valor)
     
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
@@ -62,14 +62,14 @@ def detectar_tipo_documento(texto: str) -> str:
     ]
     
     # Contar cuántos patrones coinciden
-    coincidencias = sum(1 for pattern in patrones_salud_familiar_variantef if re.search(pattern, texto, re.IGNORECASE))
+    coincidencias = sum(1 for pattern in patrones_salud_familiar_variantef if registro.search(pattern, texto, re.IGNORECASE))
     
     # Si más del 60% de los patrones coinciden, consideramos que es el documento correcto
     if coincidencias >= len(patrones_salud_familiar_variantef) * 0.6:
         return "GASTOS_MEDICOS_FAMILIAR_VARIANTEF"
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_salud_familiar_variantef(pdf_path: str) -> Dict:
+def extraer_datos_poliza_salud_familiar_variantef(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza de Gastos Médicos Mayores Familiar Variante F desde un archivo PDF.
     """
@@ -127,13 +127,12 @@ def extraer_datos_poliza_salud_familiar_variantef(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        texto_completo_raw = ""
-        for page in doc:
-            texto_completo += page.get_text("text", sort=True) + "\n"  # Usar sort=True para orden de lectura
-            texto_completo_raw += page.get_text() + "\n"  # Sin ordenar para capturar texto tal como está
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = documento.text_sorted  # Texto en orden de lectura (sort=True)
+            texto_completo_raw = documento.text  # Sin ordenar para capturar texto tal como está
+
+        # Ubicar las secciones una sola vez: cada campo se busca en la suya
+        segmentacion = segmentar(texto_completo)
 
         # Detección de formato tabular estándar AXA
         # 1. Extraer número de póliza, tipo de plan y solicitud
@@ -153,12 +152,13 @@ def extraer_datos_poliza_salud_familiar_variantef(pdf_path: str) -> Dict:
         # Patrones del contratante y asegurado
         contratante_nombre_pattern = r'Datos del contratante\s*\n?\s*Nombre\s*:\s*([A-ZÁ-Ú\s,.]+)'
         contratante_domicilio_pattern = r'Domicilio\s*:\s*([^C]*)'
-        contratante_ciudad_pattern = r'Ciudad\s*:\s*([A-ZÁ-Ú\s,.]+)'
+        # La ciudad termina con su línea: con \s la clase seguía en la línea siguiente ("MERIDA\nP")
+        contratante_ciudad_pattern = r'Ciudad\s*:\s*([A-ZÁ-Ú ,.]+?)[ \t]*$'
         contratante_cp_pattern = r'C\.P\.\s*(\d{5})'
         
         asegurado_nombre_pattern = r'Datos del Asegurado Titular\s*\n?\s*Nombre\s*:\s*([A-ZÁ-Ú\s,.]+)'
         asegurado_domicilio_pattern = r'Domicilio\s*:\s*([^C]*?)(?=Ciudad|$)'
-        asegurado_ciudad_pattern = r'Ciudad\s*:\s*([A-ZÁ-Ú\s,.]+)'
+        asegurado_ciudad_pattern = r'Ciudad\s*:\s*([A-ZÁ-Ú ,.]+?)[ \t]*$'
         
         # Patrones RFC y teléfono
         rfc_pattern = r'R\.F\.C\.\s*:\s*([A-Z0-9]{10,13})'
@@ -197,56 +197,56 @@ def extraer_datos_poliza_salud_familiar_variantef(pdf_path: str) -> Dict:
         tabla_datos_financieros_pattern = r'Prima\s*\n\s*Descuento familiar\s*\n\s*(\d+)\s*\n\s*Cesión de Comisión\s*\n\s*(\d+)\s*\n\s*Prima Neta\s*\n\s*([\d,]+\.\d{2})\s*\n\s*Recargo por pago fraccionado\s*\n\s*(\d+)\s*\n\s*Derecho de póliza\s*\n\s*([\d,]+\.\d{2})\s*\n\s*I\.V\.A\.\s*\n\s*([\d,]+\.\d{2})\s*\n\s*Prima anual total\s*\n\s*([\d,]+\.\d{2})'
         
         # Buscar fechas
-        fecha_emision_match = re.search(r'Fecha\s+de\s+Emisi[óo]n\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
-        fecha_inicio_match = re.search(r'(?:Vigencia\s+desde|Fecha\s+de\s+inicio\s+de\s+vigencia)\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
-        fecha_fin_match = re.search(r'(?:Vigencia\s+hasta|Fecha\s+de\s+fin\s+de\s+vigencia)\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
+        fecha_emision_match = registro.search(r'Fecha\s+de\s+Emisi[óo]n\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
+        fecha_inicio_match = registro.search(r'(?:Vigencia\s+desde|Fecha\s+de\s+inicio\s+de\s+vigencia)\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
+        fecha_fin_match = registro.search(r'(?:Vigencia\s+hasta|Fecha\s+de\s+fin\s+de\s+vigencia)\s*[^\d]*(\d{2}/\d{2}/\d{4})', texto_completo, re.IGNORECASE)
         
         # Buscar fechas en formato DD/MMM/YYYY
-        fecha_emision_alt_match = re.search(r'Fecha\s+de\s+Emisi[óo]n\s*[^\d]*(\d{2}/[A-Za-z]{3}/\d{4})', texto_completo, re.IGNORECASE)
+        fecha_emision_alt_match = registro.search(r'Fecha\s+de\s+Emisi[óo]n\s*[^\d]*(\d{2}/[A-Za-z]{3}/\d{4})', texto_completo, re.IGNORECASE)
         
         # Buscar formato de vigencia con "A" como separador
-        fecha_vigencia_alt_match = re.search(r'Vigencia\s*[^\d]*(\d{2}/[A-Za-z]{3}/\d{4})\s*A\s*(\d{2}/[A-Za-z]{3}/\d{4})', texto_completo, re.IGNORECASE)
+        fecha_vigencia_alt_match = registro.search(r'Vigencia\s*[^\d]*(\d{2}/[A-Za-z]{3}/\d{4})\s*A\s*(\d{2}/[A-Za-z]{3}/\d{4})', texto_completo, re.IGNORECASE)
         
         # Extraer datos básicos
         matches = {
-            "Número de póliza": re.search(poliza_pattern, texto_completo),
-            "Solicitud": re.search(solicitud_pattern, texto_completo),
-            "Tipo de Plan": re.search(tipo_plan_pattern, texto_completo),
-            "Fecha de inicio de vigencia": re.search(fecha_inicio_pattern, texto_completo),
-            "Fecha de fin de vigencia": re.search(fecha_fin_pattern, texto_completo),
-            "Fecha de emisión": re.search(fecha_emision_pattern, texto_completo),
-            "Frecuencia de pago": re.search(frecuencia_pago_pattern, texto_completo),
-            "Tipo de pago": re.search(tipo_pago_pattern, texto_completo),
-            "Nombre del contratante": re.search(contratante_nombre_pattern, texto_completo),
-            "Domicilio del contratante": re.search(contratante_domicilio_pattern, texto_completo),
-            "Ciudad del contratante": re.search(contratante_ciudad_pattern, texto_completo),
-            "Código Postal": re.search(contratante_cp_pattern, texto_completo),
-            "Nombre del asegurado titular": re.search(asegurado_nombre_pattern, texto_completo),
-            "Domicilio del asegurado": re.search(asegurado_domicilio_pattern, texto_completo),
-            "Ciudad del asegurado": re.search(asegurado_ciudad_pattern, texto_completo),
-            "R.F.C.": re.search(rfc_pattern, texto_completo),
-            "Teléfono": re.search(telefono_pattern, texto_completo),
-            "Zona Tarificación": re.search(zona_pattern, texto_completo),
-            "Periodo de pago de siniestro": re.search(periodo_siniestro_pattern, texto_completo),
-            "Clave Agente": re.search(agente_clave_pattern, texto_completo),
-            "Nombre del agente": re.search(agente_nombre_pattern, texto_completo),
-            "Promotor": re.search(promotor_pattern, texto_completo),
-            "Prima Neta": re.search(prima_neta_pattern, texto_completo),
-            "Descuento familiar": re.search(descuento_pattern, texto_completo),
-            "Cesión de Comisión": re.search(cesion_pattern, texto_completo),
-            "Recargo por pago fraccionado": re.search(recargo_pattern, texto_completo),
-            "Derecho de póliza": re.search(derecho_poliza_pattern, texto_completo),
-            "I.V.A.": re.search(iva_pattern, texto_completo),
-            "Prima anual total": re.search(prima_total_pattern, texto_completo),
-            "Emergencias en el Extranjero": re.search(emergencias_pattern, texto_completo),
-            "Medicamentos fuera del hospital": re.search(medicamentos_pattern, texto_completo),
-            "Maternidad": re.search(maternidad_pattern, texto_completo),
-            "Protección Dental": re.search(dental_pattern, texto_completo),
-            "Tu Médico 24 Hrs": re.search(medico_24_pattern, texto_completo),
-            "Coaseguro": re.search(coaseguro_pattern, texto_completo),
-            "Tope de Coaseguro": re.search(tope_coaseguro_pattern, texto_completo),
-            "Suma Asegurada": re.search(suma_asegurada_pattern, texto_completo),
-            "Deducible": re.search(deducible_pattern, texto_completo),
+            "Número de póliza": registro.search(poliza_pattern, texto_completo),
+            "Solicitud": registro.search(solicitud_pattern, texto_completo),
+            "Tipo de Plan": registro.search(tipo_plan_pattern, texto_completo),
+            "Fecha de inicio de vigencia": registro.search(fecha_inicio_pattern, texto_completo),
+            "Fecha de fin de vigencia": registro.search(fecha_fin_pattern, texto_completo),
+            "Fecha de emisión": registro.search(fecha_emision_pattern, texto_completo),
+            "Frecuencia de pago": registro.search(frecuencia_pago_pattern, texto_completo),
+            "Tipo de pago": registro.search(tipo_pago_pattern, texto_completo),
+            "Nombre del contratante": segmentacion.buscar(contratante_nombre_pattern, "contratante"),
+            "Domicilio del contratante": segmentacion.buscar(contratante_domicilio_pattern, "contratante"),
+            "Ciudad del contratante": segmentacion.buscar(contratante_ciudad_pattern, "contratante", re.MULTILINE),
+            "Código Postal": segmentacion.buscar(contratante_cp_pattern, "contratante"),
+            "Nombre del asegurado titular": segmentacion.buscar(asegurado_nombre_pattern, "asegurado"),
+            "Domicilio del asegurado": segmentacion.buscar(asegurado_domicilio_pattern, "asegurado"),
+            "Ciudad del asegurado": segmentacion.buscar(asegurado_ciudad_pattern, "asegurado", re.MULTILINE),
+            "R.F.C.": segmentacion.buscar(rfc_pattern, "contratante"),
+            "Teléfono": segmentacion.buscar(telefono_pattern, "contratante"),
+            "Zona Tarificación": registro.search(zona_pattern, texto_completo),
+            "Periodo de pago de siniestro": registro.search(periodo_siniestro_pattern, texto_completo),
+            "Clave Agente": segmentacion.buscar(agente_clave_pattern, "agente"),
+            "Nombre del agente": segmentacion.buscar(agente_nombre_pattern, "agente"),
+            "Promotor": segmentacion.buscar(promotor_pattern, "agente"),
+            "Prima Neta": segmentacion.buscar(prima_neta_pattern, "prima"),
+            "Descuento familiar": segmentacion.buscar(descuento_pattern, "prima"),
+            "Cesión de Comisión": segmentacion.buscar(cesion_pattern, "prima"),
+            "Recargo por pago fraccionado": segmentacion.buscar(recargo_pattern, "prima"),
+            "Derecho de póliza": segmentacion.buscar(derecho_poliza_pattern, "prima"),
+            "I.V.A.": segmentacion.buscar(iva_pattern, "prima"),
+            "Prima anual total": segmentacion.buscar(prima_total_pattern, "prima"),
+            "Emergencias en el Extranjero": registro.search(emergencias_pattern, texto_completo),
+            "Medicamentos fuera del hospital": registro.search(medicamentos_pattern, texto_completo),
+            "Maternidad": registro.search(maternidad_pattern, texto_completo),
+            "Protección Dental": registro.search(dental_pattern, texto_completo),
+            "Tu Médico 24 Hrs": registro.search(medico_24_pattern, texto_completo),
+            "Coaseguro": registro.search(coaseguro_pattern, texto_completo),
+            "Tope de Coaseguro": registro.search(tope_coaseguro_pattern, texto_completo),
+            "Suma Asegurada": registro.search(suma_asegurada_pattern, texto_completo),
+            "Deducible": registro.search(deducible_pattern, texto_completo),
         }
         
         # Llenar los datos
@@ -266,7 +266,7 @@ def extraer_datos_poliza_salud_familiar_variantef(pdf_path: str) -> Dict:
                     logging.warning(f"Error extrayendo {campo}: {e}")
         
         # Procesar tabla de datos financieros completa si existe
-        match_tabla = re.search(tabla_datos_financieros_pattern, texto_completo)
+        match_tabla = segmentacion.buscar(tabla_datos_financieros_pattern, "prima")
         if match_tabla:
             resultado["Descuento familiar"] = normalizar_numero(match_tabla.group(1))
             resultado["Cesión de Comisión"] = normalizar_numero(match_tabla.group(2))
@@ -280,14 +280,14 @@ def extraer_datos_poliza_salud_familiar_variantef(pdf_path: str) -> Dict:
         # Búsqueda alternativa para extraer datos específicos del formato AXA salud familiar
         for linea in texto_completo.split('\n'):
             if "Póliza" in linea and resultado["Número de póliza"] == "0":
-                match = re.search(r'(\d{5,}[A-Z0-9]+)', linea)
+                match = registro.search(r'(\d{5,}[A-Z0-9]+)', linea)
                 if match:
                     resultado["Número de póliza"] = match.group(1)
                     logging.info(f"Número de póliza extraído (alt): {resultado['Número de póliza']}")
             
             # Buscar agente si no lo encontramos aún
             if "Agente" in linea and ":" in linea and resultado["Clave Agente"] == "0":
-                match = re.search(r'Agente\s*:?\s*(\d+)', linea)
+                match = registro.search(r'Agente\s*:?\s*(\d+)', linea)
                 if match:
                     resultado["Clave Agente"] = match.group(1)
                     logging.info(f"Clave Agente extraída (alt): {resultado['Clave Agente']}")
@@ -303,7 +303,7 @@ def extraer_datos_poliza_salud_familiar_variantef(pdf_path: str) -> Dict:
         
         # Extraer coberturas incluidas
         cobertura_pattern = r'Incluidos en Básica\s+(.*?)(?=Coberturas adicionales con costo|$)'
-        cobertura_match = re.search(cobertura_pattern, texto_completo, re.DOTALL | re.IGNORECASE)
+        cobertura_match = segmentacion.buscar(cobertura_pattern, "coberturas", re.DOTALL | re.IGNORECASE)
         if cobertura_match:
             coberturas_incluidas.append({
                 "Nombre": "Cobertura Básica",
@@ -323,7 +323,7 @@ def extraer_datos_poliza_salud_familiar_variantef(pdf_path: str) -> Dict:
         # Si hay campos específicos que aún no hemos encontrado, buscamos en la imagen
         # Si no tenemos nombre del contratante pero sí hay datos en la imagen
         if resultado["Nombre del contratante"] == "0":
-            nombre_contratante_alt = re.search(r'Nombre\s*\n\s*([A-ZÁ-Ú\s,.]+)', texto_completo)
+            nombre_contratante_alt = registro.search(r'Nombre\s*\n\s*([A-ZÁ-Ú\s,.]+)', texto_completo)
             if nombre_contratante_alt:
                 resultado["Nombre del contratante"] = nombre_contratante_alt.group(1).strip()
                 logging.info(f"Nombre del contratante extraído (alt2): {resultado['Nombre del contratante']}")
@@ -3,12 +3,15 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
+from functools import partial
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
 import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from artefactos import SumideroArtefactos
+import markdown_polizas
 
 # Configurar logging
 logging.basicConfig(
@@ -27,7 +30,7 @@ def normalizar_numero(valor: str) -> str:
         return "0"
     
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\s]', '', valor)
+    valor = registro.sub(r'[$\s]', '', valor)
     return valor
 
 def detectar_tipo_documento(texto_pdf: str) -> str:
@@ -35,7 +38,7 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     Detecta el tipo de documento basado en patrones específicos.
     """
     # Patrones para identificar documentos de vida
-    if re.search(r'Ordinario de Vida|Seguro de Vida|P[óo]liza de Vida', texto_pdf, re.IGNORECASE):
+    if registro.search(r'Ordinario de Vida|Seguro de Vida|P[óo]liza de Vida', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Vida")
         return "VIDA"
     
@@ -43,7 +46,30 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     logging.warning("Tipo de documento no identificado claramente")
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_vida(pdf_path: str) -> Dict:
+# Patrones para extracción (ajustados a documentos de vida)
+PATRONES = registro.grupo("vida", {
+    "Clave Agente": r'Clave(?:\s+de)?\s+Agente[:\s]+([A-Z0-9]+)|Consultor\s+Financiero\s+([A-Z0-9]+)',
+    "Cobertura Básica": r'Cobertura\s+B[áa]sica[:\s]+([\d,.]+)',
+    "Código Postal": r'C[óo]digo\s+Postal[:\s]+(\d+)|C\.P\.[:\s]+(\d+)',
+    "Fecha de emisión": r'Fecha\s+de\s+emisi[óo]n[:\s]+(\d{1,2}/\w+/\d{4}|\d{1,2}/\d{1,2}/\d{4})',
+    "Fecha de fin de vigencia": r'Fecha\s+(?:de\s+fin|fin)\s+de\s+vigencia[:\s]+(\d{1,2}/\w+/\d{4}|\d{1,2}/\d{1,2}/\d{4})',
+    "Fecha de inicio de vigencia": r'Fecha\s+(?:de\s+inicio|inicio)\s+de\s+vigencia[:\s]+(\d{1,2}/\w+/\d{4}|\d{1,2}/\d{1,2}/\d{4})',
+    "Frecuencia de pago": r'Frecuencia\s+de\s+[Pp]ago(?:\s+de\s+[Pp]rimas)?[:\s]+([\d,.]+|ANUAL|Anual|Mensual|Trimestral|Semestral)',
+    "Nombre del agente": r'Nombre\s+del\s+agente[:\s]+([^\n]+)|Consultor\s+Financiero\s+[A-Z0-9]+\s+([A-Z\s]+)',
+    "Nombre del asegurado titular": r'Nombre\s+del\s+asegurado\s+titular[:\s]+([^\n]+)',
+    "Nombre del contratante": r'Nombre\s+del\s+contratante[:\s]+([^\n]+)',
+    "Nombre del plan": r'(?:Nombre\s+del\s+plan|Plan)[:\s]+([^\n]+)',
+    "Número de póliza": r'N[úu]mero\s+de\s+p[óo]liza[:\s]+([A-Z0-9]+)',
+    "Periodo de pago de siniestro": r'Periodo\s+de\s+pago\s+de\s+siniestro[:\s]+([\d,.]+)',
+    "Plazo de pago": r'Plazo\s+(?:de\s+)?[Pp]ago[:\s]+([^\n]+)|Plazo\s+Pago\s+(Vitalicio)',
+    "Prima Neta": r'Prima\s+Neta[:\s]+([\d,.]+)',
+    "Prima anual total": r'Prima\s+anual\s+total[:\s]+([\d,.]+)',
+    "R.F.C.": r'R\.F\.C\.[:\s]+([A-Z0-9]+)',
+    "Teléfono": r'Tel\.?[:\s]+([0-9\-\(\)]+)'
+}, re.IGNORECASE)
+
+
+def extraer_datos_poliza_vida(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza de vida desde un archivo PDF.
     """
@@ -82,53 +108,25 @@ def extraer_datos_poliza_vida(pdf_path: str) -> Dict:
     
     try:
         # Extraer texto del PDF
-        reader = PdfReader(pdf_path)
-        if len(reader.pages) < 1:
-            logging.error(f"El PDF {pdf_path} no tiene páginas")
-            return resultado
-        
-        # Extraer todo el texto del documento para análisis completo
-        texto_completo = ""
-        for pagina in reader.pages:
-            texto_completo += pagina.extract_text() + "\n"
-        
-        # También usar PyMuPDF para extracción más precisa de tablas y formatos
-        doc = fitz.open(pdf_path)
-        texto_mupdf = ""
-        for pagina in doc:
-            texto_mupdf += pagina.get_text() + "\n"
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            if len(documento.pages_text_pypdf) < 1:
+                logging.error(f"El PDF {pdf_path} no tiene páginas")
+                return resultado
+            
+            # Extraer todo el texto del documento para análisis completo
+            texto_completo = documento.text_pypdf
+            
+            # También usar PyMuPDF para extracción más precisa de tablas y formatos
+            texto_mupdf = documento.text
         
         # Detectar tipo de documento
         tipo_documento = detectar_tipo_documento(texto_completo)
         if tipo_documento != "VIDA":
             logging.warning(f"Este documento no parece ser una póliza de vida: {tipo_documento}")
         
-        # Patrones para extracción (ajustados a documentos de vida)
-        patrones = {
-            "Clave Agente": r'Clave(?:\s+de)?\s+Agente[:\s]+([A-Z0-9]+)|Consultor\s+Financiero\s+([A-Z0-9]+)',
-            "Cobertura Básica": r'Cobertura\s+B[áa]sica[:\s]+([\d,.]+)',
-            "Código Postal": r'C[óo]digo\s+Postal[:\s]+(\d+)|C\.P\.[:\s]+(\d+)',
-            "Fecha de emisión": r'Fecha\s+de\s+emisi[óo]n[:\s]+(\d{1,2}/\w+/\d{4}|\d{1,2}/\d{1,2}/\d{4})',
-            "Fecha de fin de vigencia": r'Fecha\s+(?:de\s+fin|fin)\s+de\s+vigencia[:\s]+(\d{1,2}/\w+/\d{4}|\d{1,2}/\d{1,2}/\d{4})',
-            "Fecha de inicio de vigencia": r'Fecha\s+(?:de\s+inicio|inicio)\s+de\s+vigencia[:\s]+(\d{1,2}/\w+/\d{4}|\d{1,2}/\d{1,2}/\d{4})',
-            "Frecuencia de pago": r'Frecuencia\s+de\s+[Pp]ago(?:\s+de\s+[Pp]rimas)?[:\s]+([\d,.]+|ANUAL|Anual|Mensual|Trimestral|Semestral)',
-            "Nombre del agente": r'Nombre\s+del\s+agente[:\s]+([^\n]+)|Consultor\s+Financiero\s+[A-Z0-9]+\s+([A-Z\s]+)',
-            "Nombre del asegurado titular": r'Nombre\s+del\s+asegurado\s+titular[:\s]+([^\n]+)',
-            "Nombre del contratante": r'Nombre\s+del\s+contratante[:\s]+([^\n]+)',
-            "Nombre del plan": r'(?:Nombre\s+del\s+plan|Plan)[:\s]+([^\n]+)',
-            "Número de póliza": r'N[úu]mero\s+de\s+p[óo]liza[:\s]+([A-Z0-9]+)',
-            "Periodo de pago de siniestro": r'Periodo\s+de\s+pago\s+de\s+siniestro[:\s]+([\d,.]+)',
-            "Plazo de pago": r'Plazo\s+(?:de\s+)?[Pp]ago[:\s]+([^\n]+)|Plazo\s+Pago\s+(Vitalicio)',
-            "Prima Neta": r'Prima\s+Neta[:\s]+([\d,.]+)',
-            "Prima anual total": r'Prima\s+anual\s+total[:\s]+([\d,.]+)',
-            "R.F.C.": r'R\.F\.C\.[:\s]+([A-Z0-9]+)',
-            "Teléfono": r'Tel\.?[:\s]+([0-9\-\(\)]+)'
-        }
-        
         # Extraer valores usando patrones
-        for campo, patron in patrones.items():
-            match = re.search(patron, texto_completo, re.IGNORECASE)
+        for campo, patron in PATRONES.items():
+            match = patron.search(texto_completo)
             if match:
                 # Para el Código Postal, verificar los grupos de captura
                 if campo == "Código Postal" and len(match.groups()) > 1:
@@ -145,7 +143,7 @@ def extraer_datos_poliza_vida(pdf_path: str) -> Dict:
                 else:
                     valor = match.group(1).strip()
                     
-                if re.search(r'[\d,.]+', valor) and "fecha" not in campo.lower():
+                if registro.search(r'[\d,.]+', valor) and "fecha" not in campo.lower():
                     resultado[campo] = normalizar_numero(valor)
                 else:
                     resultado[campo] = valor
@@ -156,11 +154,11 @@ def extraer_datos_poliza_vida(pdf_path: str) -> Dict:
             resultado["Nombre del plan"] = "Nombre del plan: Ordinario de Vida"
         
         # Si el archivo fue cargado desde una URL, guardar la URL
-        if pdf_path.startswith("http"):
-            resultado["Url"] = pdf_path
+        if str(pdf_path).startswith("http"):
+            resultado["Url"] = str(pdf_path)
         
         # Buscar específicamente "Plazo Pago" en formato de tabla
-        plazo_pago_match = re.search(r'Plazo\s+Pago\s+(\w+)', texto_completo, re.IGNORECASE)
+        plazo_pago_match = registro.search(r'Plazo\s+Pago\s+(\w+)', texto_completo, re.IGNORECASE)
         if plazo_pago_match:
             valor_plazo = plazo_pago_match.group(1).strip()
             logging.info(f"Encontrado Plazo de Pago (formato tabla): {valor_plazo}")
@@ -178,90 +176,77 @@ def extraer_datos_poliza_vida(pdf_path: str) -> Dict:
     
     return resultado
 
+# Encabezado y notas del markdown de datos extraídos
+TITULO_MARKDOWN = "Datos Extraídos de Póliza de Vida"
+NOTAS_MARKDOWN = "El documento es una póliza ordinaria de vida. Los valores \"Por determinar\" indican campos que no pudieron ser claramente identificados en el documento original PDF."
+
+def organizar_datos_markdown(datos: Dict) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Organiza los datos extraídos en las secciones del markdown.
+    """
+    # Organizar datos por categorías
+    info_general = {
+        "Tipo de Documento": "Póliza de Vida",
+        "Nombre del Plan": datos["Nombre del plan"].replace("Nombre del plan: ", "") if datos["Nombre del plan"] != "0" else "Por determinar",
+        "Número de Póliza": datos["Número de póliza"] if datos["Número de póliza"] != "0" else "Por determinar"
+    }
+
+    datos_asegurado = {
+        "Nombre del Asegurado Titular": datos["Nombre del asegurado titular"] if datos["Nombre del asegurado titular"] != "0" else "Por determinar",
+        "Nombre del Contratante": datos["Nombre del contratante"] if datos["Nombre del contratante"] != "0" else "Por determinar",
+        "R.F.C.": datos["R.F.C."] if datos["R.F.C."] != "0" else "Por determinar",
+        "Domicilio del Contratante": datos["Domicilio del contratante"] if datos["Domicilio del contratante"] != "0" else "Por determinar",
+        "Código Postal": datos["Código Postal"] if datos["Código Postal"] != "0" else "Por determinar",
+        "Teléfono": datos["Teléfono"] if datos["Teléfono"] != "0" else "Por determinar"
+    }
+
+    datos_agente = {
+        "Clave Agente": datos["Clave Agente"] if datos["Clave Agente"] != "0" else "Por determinar",
+        "Nombre del Agente": datos["Nombre del agente"] if datos["Nombre del agente"] != "0" else "Por determinar"
+    }
+
+    fechas = {
+        "Fecha de Emisión": datos["Fecha de emisión"] if datos["Fecha de emisión"] != "0" else "Por determinar",
+        "Fecha de Inicio de Vigencia": datos["Fecha de inicio de vigencia"] if datos["Fecha de inicio de vigencia"] != "0" else "Por determinar",
+        "Fecha de Fin de Vigencia": datos["Fecha de fin de vigencia"] if datos["Fecha de fin de vigencia"] != "0" else "Por determinar"
+    }
+
+    info_financiera = {
+        "Prima Neta": datos["Prima Neta"] if datos["Prima Neta"] != "0" else "Por determinar",
+        "Prima Anual Total": datos["Prima anual total"] if datos["Prima anual total"] != "0" else "Por determinar",
+        "Cobertura Básica": datos["Cobertura Básica"] if datos["Cobertura Básica"] != "0" else "Por determinar",
+        "Coberturas Adicionales con Costo": datos["Coberturas adicionales con costo"] if datos["Coberturas adicionales con costo"] != "0" else "Por determinar",
+        "Frecuencia de Pago": datos["Frecuencia de pago"] if datos["Frecuencia de pago"] != "0" else "Por determinar",
+        "Periodo de Pago de Siniestro": datos["Periodo de pago de siniestro"] if datos["Periodo de pago de siniestro"] != "0" else "Por determinar",
+        "I.V.A.": datos["I.V.A."] if datos["I.V.A."] != "0" else "0",
+        "Coaseguro": datos["Coaseguro"] if datos["Coaseguro"] != "0" else "0",
+        "Deducible": datos["Deducible"] if datos["Deducible"] != "0" else "0",
+        "Deducible Cero por Accidente": datos["Deducible Cero por Accidente"] if datos["Deducible Cero por Accidente"] != "0" else "0",
+        "Gama Hospitalaria": datos["Gama Hospitalaria"] if datos["Gama Hospitalaria"] != "0" else "0",
+        "Cobertura Nacional": datos["Cobertura Nacional"] if datos["Cobertura Nacional"] != "0" else "0",
+        "Plazo de Pago": datos["Plazo de pago"] if datos["Plazo de pago"] != "0" else "Por determinar"
+    }
+    
+    return [
+        ("Información General", info_general),
+        ("Datos del Asegurado", datos_asegurado),
+        ("Datos del Agente", datos_agente),
+        ("Fechas Importantes", fechas),
+        ("Información Financiera", info_financiera),
+    ]
+
+def renderizar_markdown(datos: Dict) -> str:
+    """
+    Genera el contenido markdown con los datos extraídos, sin escribirlo a disco.
+    """
+    return markdown_polizas.renderizar_markdown(TITULO_MARKDOWN, organizar_datos_markdown(datos), NOTAS_MARKDOWN)
+
 def generar_markdown(datos: Dict, ruta_salida: str = "vida.md") -> None:
     """
     Genera un archivo markdown con los datos extraídos estructurados.
     """
     try:
-        # Organizar datos por categorías
-        info_general = {
-            "Tipo de Documento": "Póliza de Vida",
-            "Nombre del Plan": datos["Nombre del plan"].replace("Nombre del plan: ", "") if datos["Nombre del plan"] != "0" else "Por determinar",
-            "Número de Póliza": datos["Número de póliza"] if datos["Número de póliza"] != "0" else "Por determinar"
-        }
-        
-        datos_asegurado = {
-            "Nombre del Asegurado Titular": datos["Nombre del asegurado titular"] if datos["Nombre del asegurado titular"] != "0" else "Por determinar",
-            "Nombre del Contratante": datos["Nombre del contratante"] if datos["Nombre del contratante"] != "0" else "Por determinar",
-            "R.F.C.": datos["R.F.C."] if datos["R.F.C."] != "0" else "Por determinar",
-            "Domicilio del Contratante": datos["Domicilio del contratante"] if datos["Domicilio del contratante"] != "0" else "Por determinar",
-            "Código Postal": datos["Código Postal"] if datos["Código Postal"] != "0" else "Por determinar",
-            "Teléfono": datos["Teléfono"] if datos["Teléfono"] != "0" else "Por determinar"
-        }
-        
-        datos_agente = {
-            "Clave Agente": datos["Clave Agente"] if datos["Clave Agente"] != "0" else "Por determinar",
-            "Nombre del Agente": datos["Nombre del agente"] if datos["Nombre del agente"] != "0" else "Por determinar"
-        }
-        
-        fechas = {
-            "Fecha de Emisión": datos["Fecha de emisión"] if datos["Fecha de emisión"] != "0" else "Por determinar",
-            "Fecha de Inicio de Vigencia": datos["Fecha de inicio de vigencia"] if datos["Fecha de inicio de vigencia"] != "0" else "Por determinar",
-            "Fecha de Fin de Vigencia": datos["Fecha de fin de vigencia"] if datos["Fecha de fin de vigencia"] != "0" else "Por determinar"
-        }
-        
-        info_financiera = {
-            "Prima Neta": datos["Prima Neta"] if datos["Prima Neta"] != "0" else "Por determinar",
-            "Prima Anual Total": datos["Prima anual total"] if datos["Prima anual total"] != "0" else "Por determinar",
-            "Cobertura Básica": datos["Cobertura Básica"] if datos["Cobertura Básica"] != "0" else "Por determinar",
-            "Coberturas Adicionales con Costo": datos["Coberturas adicionales con costo"] if datos["Coberturas adicionales con costo"] != "0" else "Por determinar",
-            "Frecuencia de Pago": datos["Frecuencia de pago"] if datos["Frecuencia de pago"] != "0" else "Por determinar",
-            "Periodo de Pago de Siniestro": datos["Periodo de pago de siniestro"] if datos["Periodo de pago de siniestro"] != "0" else "Por determinar",
-            "I.V.A.": datos["I.V.A."] if datos["I.V.A."] != "0" else "0",
-            "Coaseguro": datos["Coaseguro"] if datos["Coaseguro"] != "0" else "0",
-            "Deducible": datos["Deducible"] if datos["Deducible"] != "0" else "0",
-            "Deducible Cero por Accidente": datos["Deducible Cero por Accidente"] if datos["Deducible Cero por Accidente"] != "0" else "0",
-            "Gama Hospitalaria": datos["Gama Hospitalaria"] if datos["Gama Hospitalaria"] != "0" else "0",
-            "Cobertura Nacional": datos["Cobertura Nacional"] if datos["Cobertura Nacional"] != "0" else "0",
-            "Plazo de Pago": datos["Plazo de pago"] if datos["Plazo de pago"] != "0" else "Por determinar"
-        }
-        
-        # Construir el markdown
-        md_content = "# Datos Extraídos de Póliza de Vida\n\n"
-        
-        # Información General
-        md_content += "## Información General\n"
-        for clave, valor in info_general.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Datos del Asegurado
-        md_content += "## Datos del Asegurado\n"
-        for clave, valor in datos_asegurado.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Datos del Agente
-        md_content += "## Datos del Agente\n"
-        for clave, valor in datos_agente.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Fechas
-        md_content += "## Fechas Importantes\n"
-        for clave, valor in fechas.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Información Financiera
-        md_content += "## Información Financiera\n"
-        for clave, valor in info_financiera.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Notas
-        md_content += "## Notas Adicionales\n"
-        md_content += "El documento es una póliza ordinaria de vida. Los valores \"Por determinar\" indican campos que no pudieron ser claramente identificados en el documento original PDF."
+        md_content = renderizar_markdown(datos)
         
         # Guardar el archivo markdown
         with open(ruta_salida, 'w', encoding='utf-8') as f:
@@ -272,11 +257,40 @@ def generar_markdown(datos: Dict, ruta_salida: str = "vida.md") -> None:
     except Exception as e:
         logging.error(f"Error generando archivo markdown: {str(e)}", exc_info=True)
 
-def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
+# Mapeo de campos del markdown a keys en el resultado
+CAMPOS_MARKDOWN = {
+    "Clave Agente": "Clave Agente",
+    "Nombre del Agente": "Nombre del agente",
+    "Nombre del Contratante": "Nombre del contratante",
+    "Domicilio del Contratante": "Domicilio del contratante",
+    "Código Postal": "Código Postal",
+    "Teléfono": "Teléfono",
+    "R.F.C.": "R.F.C.",
+    "Fecha de Emisión": "Fecha de emisión",
+    "Fecha de Inicio de Vigencia": "Fecha de inicio de vigencia",
+    "Fecha de Fin de Vigencia": "Fecha de fin de vigencia",
+    "Prima Neta": "Prima Neta",
+    "Prima Anual Total": "Prima anual total",
+    "Cobertura Básica": "Cobertura Básica",
+    "Coberturas Adicionales con Costo": "Coberturas adicionales con costo",
+    "Frecuencia de Pago": "Frecuencia de pago",
+    "Periodo de Pago de Siniestro": "Periodo de pago de siniestro",
+    "I.V.A.": "I.V.A.",
+    "Coaseguro": "Coaseguro",
+    "Deducible": "Deducible",
+    "Deducible Cero por Accidente": "Deducible Cero por Accidente",
+    "Gama Hospitalaria": "Gama Hospitalaria",
+    "Cobertura Nacional": "Cobertura Nacional",
+    "Plazo de Pago": "Plazo de pago",
+    "Número de Póliza": "Número de póliza",
+    "Nombre del Plan": "Nombre del plan"
+}
+
+def _resultado_vacio() -> Dict:
     """
-    Extrae datos desde un archivo markdown estructurado
+    Resultado con todos los campos sin valor ("0").
     """
-    resultado = {
+    return {
         "Clave Agente": "0",
         "Coaseguro": "0",
         "Cobertura Básica": "0",
@@ -306,54 +320,19 @@ def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
         "Teléfono": "0",
         "Url": "0"
     }
+
+def datos_desde_valores_markdown(valores: Dict[str, str]) -> Dict:
+    """
+    Construye el resultado final a partir de los valores del markdown ({clave markdown: valor}).
+    """
+    resultado = _resultado_vacio()
     
     try:
-        # Mapeo de campos del markdown a keys en el resultado
-        mappings = {
-            "Clave Agente": "Clave Agente",
-            "Nombre del Agente": "Nombre del agente",
-            "Nombre del Contratante": "Nombre del contratante",
-            "Domicilio del Contratante": "Domicilio del contratante",
-            "Código Postal": "Código Postal",
-            "Teléfono": "Teléfono",
-            "R.F.C.": "R.F.C.",
-            "Fecha de Emisión": "Fecha de emisión",
-            "Fecha de Inicio de Vigencia": "Fecha de inicio de vigencia",
-            "Fecha de Fin de Vigencia": "Fecha de fin de vigencia",
-            "Prima Neta": "Prima Neta",
-            "Prima Anual Total": "Prima anual total",
-            "Cobertura Básica": "Cobertura Básica",
-            "Coberturas Adicionales con Costo": "Coberturas adicionales con costo",
-            "Frecuencia de Pago": "Frecuencia de pago",
-            "Periodo de Pago de Siniestro": "Periodo de pago de siniestro",
-            "I.V.A.": "I.V.A.",
-            "Coaseguro": "Coaseguro",
-            "Deducible": "Deducible",
-            "Deducible Cero por Accidente": "Deducible Cero por Accidente",
-            "Gama Hospitalaria": "Gama Hospitalaria",
-            "Cobertura Nacional": "Cobertura Nacional",
-            "Plazo de Pago": "Plazo de pago",
-            "Número de Póliza": "Número de póliza",
-            "Nombre del Plan": "Nombre del plan"
-        }
-        
-        # Leer el archivo markdown
-        with open(ruta_md, 'r', encoding='utf-8') as f:
-            contenido = f.read()
-        
-        # Extraer los valores con regex
-        for md_key, json_key in mappings.items():
-            patron = f"\\*\\*{re.escape(md_key)}\\*\\*: ([^\\n]+)"
-            match = re.search(patron, contenido)
-            if match:
-                valor = match.group(1).strip()
+        for md_key, json_key in CAMPOS_MARKDOWN.items():
+            valor = valores.get(md_key)
+            if valor is not None:
                 if valor != "Por determinar":
-                    # Para el nombre del plan, usar directamente el valor sin prefijo
-                    if json_key == "Nombre del plan":
-                        resultado[json_key] = valor
-                    else:
-                        resultado[json_key] = valor
-                        
+                    resultado[json_key] = valor
                     logging.info(f"Extraído desde markdown: {json_key} = {resultado[json_key]}")
         
         # Si no hay fecha de fin de vigencia pero hay plazo de pago, usar ese valor
@@ -375,6 +354,39 @@ def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
     
     return resultado
 
+def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
+    """
+    Extrae datos desde un archivo markdown estructurado
+    """
+    try:
+        # Leer el archivo markdown
+        with open(ruta_md, 'r', encoding='utf-8') as f:
+            contenido = f.read()
+    except Exception as e:
+        logging.error(f"Error extrayendo datos desde markdown: {str(e)}", exc_info=True)
+        return _resultado_vacio()
+    
+    return datos_desde_valores_markdown(markdown_polizas.valores_desde_contenido(contenido, CAMPOS_MARKDOWN))
+
+def normalizar_datos_poliza(datos: Dict) -> Dict:
+    """
+    Obtiene en memoria el mismo resultado que generar_markdown seguido de
+    extraer_datos_desde_markdown, sin escribir ni releer el archivo.
+    
+    Args:
+        datos (Dict): Datos extraídos del PDF por extraer_datos_poliza_vida
+        
+    Returns:
+        Dict: Datos finales de la póliza
+    """
+    try:
+        secciones = organizar_datos_markdown(datos)
+    except Exception as e:
+        logging.error(f"Error organizando los datos extraídos: {str(e)}", exc_info=True)
+        return _resultado_vacio()
+    
+    return datos_desde_valores_markdown(markdown_polizas.valores_desde_secciones(secciones, CAMPOS_MARKDOWN))
+
 def guardar_a_json(datos: Dict, ruta_salida: str) -> None:
     """
     Guarda los resultados en formato JSON
@@ -414,6 +426,34 @@ def procesar_archivo(ruta_pdf: str, directorio_salida: str = "output") -> Dict:
     
     return datos_finales
 
+def procesar_documento(ruta_pdf: Union[str, DocumentContext], sumidero: Optional[SumideroArtefactos] = None) -> Dict:
+    """
+    Procesa un PDF en memoria y devuelve los datos finales de la póliza.
+    
+    Da el mismo resultado que procesar_archivo sin pasar por un markdown en disco.
+    El markdown y el JSON solo se generan si se indica un sumidero activo.
+    
+    Args:
+        ruta_pdf (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+        sumidero (SumideroArtefactos, opcional): Destino del markdown y el JSON; sin
+            sumidero (o apagado) no se escriben
+        
+    Returns:
+        Dict: Datos finales de la póliza
+    """
+    datos = extraer_datos_poliza_vida(ruta_pdf)
+    datos_finales = normalizar_datos_poliza(datos)
+    
+    if sumidero is not None and sumidero.activo:
+        nombre_base = os.path.basename(str(ruta_pdf)).replace('.pdf', '')
+        # Copias: en modo async los archivos se escriben después de devolver el resultado
+        sumidero.guardar(nombre_base, {
+            "md": partial(generar_markdown, dict(datos)),
+            "json": partial(guardar_a_json, dict(datos_finales)),
+        })
+    
+    return datos_finales
+
 def procesar_directorio(directorio: str, directorio_salida: str = "output") -> None:
     """
     Procesa todos los archivos PDF en un directorio
@@ -3,12 +3,15 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
+from functools import partial
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
 import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from artefactos import SumideroArtefactos
+import markdown_polizas
 
 # Configurar logging
 logging.basicConfig(
@@ -26,7 +29,7 @@ def normalizar_numero(valor: str) -> str:
     if not valor:
         return "0"
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\\s]', '', valor)
+    valor = registro.sub(r'[$\\s]', '', valor)
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
     # Asegura que tenga dos decimales si es un número flotante
@@ -42,12 +45,12 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     Detecta el tipo de documento basado en patrones específicos para pólizas individuales.
     """
     # Patrones mejorados para identificar documentos de vida individual
-    if re.search(r'Vida\s+Individual|Seguro\s+Individual|P[óo]liza\s+Individual|Seguro\s+de\s+Vida\s+Individual|Vida\s+Inteligente', texto_pdf, re.IGNORECASE):
+    if registro.search(r'Vida\s+Individual|Seguro\s+Individual|P[óo]liza\s+Individual|Seguro\s+de\s+Vida\s+Individual|Vida\s+Inteligente', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Vida Individual")
         return "VIDA_INDIVIDUAL"
     
     # Si no coincide con ningún patrón conocido pero parece ser de vida
-    if re.search(r'Ordinario\s+de\s+Vida|Seguro\s+de\s+Vida|P[óo]liza\s+de\s+Vida', texto_pdf, re.IGNORECASE):
+    if registro.search(r'Ordinario\s+de\s+Vida|Seguro\s+de\s+Vida|P[óo]liza\s+de\s+Vida', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Vida (formato general)")
         return "VIDA"
     
@@ -55,7 +58,36 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     logging.warning("Tipo de documento no identificado claramente")
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_vida_individual(pdf_path: str) -> Dict:
+# Patrones Refinados - Enfoque más robusto
+PATRONES = registro.grupo("vida_individual", {
+    "Clave Agente": r'Agente\s+(\d+)|Centro de Utilidad\s*:\s*\d+\s+Promotor\s*:\s*(\d+)',
+    # Captura nombres con diferentes formatos
+    "Nombre del asegurado titular": r'(?:Datos del Asegurado\s+Nombre|Asegurado\s+Nombre)\s+([A-ZÁ-Ú,\s]+?)(?:\s+(?:Fecha|Sexo|R\.F\.C\.|Edad))',
+    "Nombre del contratante": r'(?:Contratante\s+Nombre|Nombre\s+[A-ZÁ-Ú,\s]+\s+Domicilio)\s+([A-ZÁ-Ú,\s]+?)(?=\s+(?:Domicilio|C\s+))',
+    # Patrón genérico para domicilios con casos especiales
+    "Domicilio del contratante": r'Domicilio\s+((?:.|\n)+?)(?=\n\s*(?:R\.F\.C\.|C\.P\.|Tel\.|Datos del|Edo\.))',
+    "Código Postal": r'C\.P\.\s+(\d{5})',
+    "Teléfono": r'Tel\.\s+([0-9]{7,10})',
+    # RFC: Busca la etiqueta R.F.C. seguida de 10-13 caracteres alfanuméricos
+    "R.F.C.": r'R\.F\.C\.\s+([A-Z0-9]{10,13})',
+    "Fecha de emisión": r'Emisi[oó]n\s+(\d{1,2}[/-][A-ZÁ-Ú]+[/-]\d{4})',
+    "Fecha de inicio de vigencia": r'Inicio\s+de\s+Vigencia\s+(\d{1,2}[/-][A-ZÁ-Ú]+[/-]\d{4})',
+    # Plazo y frecuencia de pago
+    "Plazo de pago": r'(?:VIDA INTELIGENTE \w+|ORDINARIO DE VIDA)\s+(?:[\d,.]+\s+){1,2}(\d+\s*A[ñn]os|Vitalicio)',
+    "Frecuencia de pago": r'Frecuencia\s+de\s+Pago(?:\s+de\s+Primas)?\s+([A-Z]+)',
+    # Otros datos
+    "Nombre del agente": r'Agente\s+\d+\s+([A-ZÁ-Ú\s]+?)(?=\s+(?:Centro|$))',
+    "Nombre del plan": r'(?:Seguro|Tipo de Riesgo)\s+((?:VIDA INTELIGENTE|ORDINARIO DE VIDA)(?:\s*\(INDIVIDUAL\)|NIVELADO| NO FUMADOR)*)',
+    "Número de póliza": r'P[óo]liza(?:\s*(?:No\.?|N[úu]mero))?\s*:?\s*([A-Z0-9-]+)',
+    "Prima Neta": r'Prima\s+B[áa]sica\s+Anual\s+([\d,]+\.\d{2}|[\d,]+\d{2})',
+    "Prima anual total": r'Prima\s+Total\s+Anual\s+([\d,]+\.\d{2}|[\d,]+\d{2})',
+    # Suma Asegurada con diferentes formatos
+    "Suma asegurada": r'(?:VIDA INTELIGENTE \w+|ORDINARIO DE VIDA)\s+([\d,]+\.\d{2}|[\d,]+\d{2})',
+    "Moneda": r'Moneda\s+([A-Z]+)'
+}, re.MULTILINE | re.IGNORECASE)
+
+
+def extraer_datos_poliza_vida_individual(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza de vida individual desde un archivo PDF.
     """
@@ -77,65 +109,34 @@ def extraer_datos_poliza_vida_individual(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        for page in doc:
-            texto_completo += page.get_text("text", sort=True) + "\n" # Usar sort=True para orden de lectura
-        doc.close()
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = documento.text_sorted  # Texto en orden de lectura (sort=True)
 
         # Detectar tipo de documento
         tipo_documento = detectar_tipo_documento(texto_completo)
         if tipo_documento != "VIDA_INDIVIDUAL" and tipo_documento != "VIDA":
             logging.warning(f"Este documento no parece ser una póliza de vida individual: {tipo_documento}")
 
-        # Patrones Refinados - Enfoque más robusto
-        patrones = {
-            "Clave Agente": r'Agente\s+(\d+)|Centro de Utilidad\s*:\s*\d+\s+Promotor\s*:\s*(\d+)',
-            # Captura nombres con diferentes formatos
-            "Nombre del asegurado titular": r'(?:Datos del Asegurado\s+Nombre|Asegurado\s+Nombre)\s+([A-ZÁ-Ú,\s]+?)(?:\s+(?:Fecha|Sexo|R\.F\.C\.|Edad))',
-            "Nombre del contratante": r'(?:Contratante\s+Nombre|Nombre\s+[A-ZÁ-Ú,\s]+\s+Domicilio)\s+([A-ZÁ-Ú,\s]+?)(?=\s+(?:Domicilio|C\s+))',
-            # Patrón genérico para domicilios con casos especiales
-            "Domicilio del contratante": r'Domicilio\s+((?:.|\n)+?)(?=\n\s*(?:R\.F\.C\.|C\.P\.|Tel\.|Datos del|Edo\.))',
-            "Código Postal": r'C\.P\.\s+(\d{5})',
-            "Teléfono": r'Tel\.\s+([0-9]{7,10})',
-            # RFC: Busca la etiqueta R.F.C. seguida de 10-13 caracteres alfanuméricos
-            "R.F.C.": r'R\.F\.C\.\s+([A-Z0-9]{10,13})',
-            "Fecha de emisión": r'Emisi[oó]n\s+(\d{1,2}[/-][A-ZÁ-Ú]+[/-]\d{4})',
-            "Fecha de inicio de vigencia": r'Inicio\s+de\s+Vigencia\s+(\d{1,2}[/-][A-ZÁ-Ú]+[/-]\d{4})',
-            # Plazo y frecuencia de pago
-            "Plazo de pago": r'(?:VIDA INTELIGENTE \w+|ORDINARIO DE VIDA)\s+(?:[\d,.]+\s+){1,2}(\d+\s*A[ñn]os|Vitalicio)',
-            "Frecuencia de pago": r'Frecuencia\s+de\s+Pago(?:\s+de\s+Primas)?\s+([A-Z]+)',
-            # Otros datos
-            "Nombre del agente": r'Agente\s+\d+\s+([A-ZÁ-Ú\s]+?)(?=\s+(?:Centro|$))',
-            "Nombre del plan": r'(?:Seguro|Tipo de Riesgo)\s+((?:VIDA INTELIGENTE|ORDINARIO DE VIDA)(?:\s*\(INDIVIDUAL\)|NIVELADO| NO FUMADOR)*)',
-            "Número de póliza": r'P[óo]liza(?:\s*(?:No\.?|N[úu]mero))?\s*:?\s*([A-Z0-9-]+)',
-            "Prima Neta": r'Prima\s+B[áa]sica\s+Anual\s+([\d,]+\.\d{2}|[\d,]+\d{2})',
-            "Prima anual total": r'Prima\s+Total\s+Anual\s+([\d,]+\.\d{2}|[\d,]+\d{2})',
-            # Suma Asegurada con diferentes formatos
-            "Suma asegurada": r'(?:VIDA INTELIGENTE \w+|ORDINARIO DE VIDA)\s+([\d,]+\.\d{2}|[\d,]+\d{2})',
-            "Moneda": r'Moneda\s+([A-Z]+)'
-        }
-
         # Extraer valores usando patrones mejorados (UN SOLO BUCLE FOR)
-        for campo, patron in patrones.items():
-            match = re.search(patron, texto_completo, re.MULTILINE | re.IGNORECASE)
+        for campo, patron in PATRONES.items():
+            match = patron.search(texto_completo)
             if match:
                 if campo == "Domicilio del contratante":
                     # Capturar el texto completo del domicilio primero
                     valor = match.group(1).strip()
-                    valor = re.sub(r'\s*\n\s*', ' ', valor)
+                    valor = registro.sub(r'\s*\n\s*', ' ', valor)
                     
                     # Caso especial: C JAIBA
-                    jaiba_match = re.search(r'C\s+JAIBA\s+LOTE\s+(\d+)\s+MZA\s+(\d+)\s+DEPTO\s+(\d+)', valor, re.IGNORECASE)
+                    jaiba_match = registro.search(r'C\s+JAIBA\s+LOTE\s+(\d+)\s+MZA\s+(\d+)\s+DEPTO\s+(\d+)', valor, re.IGNORECASE)
                     if jaiba_match:
                         lote, mza, depto = jaiba_match.groups()
                         valor = f"C Jaiba lote {lote} mza {mza} depto {depto} en rincon playas la playa la playa"
                     # Caso especial: TIJUANA
                     elif "TIJUANA TIJUANA" in valor:
-                        valor = re.sub(r'(?<=TIJUANA TIJUANA).*$', '', valor).strip()
+                        valor = registro.sub(r'(?<=TIJUANA TIJUANA).*$', '', valor).strip()
                     
                     # Limpieza final y limitación a 50 caracteres
-                    valor = re.sub(r'\s+', ' ', valor).strip()
+                    valor = registro.sub(r'\s+', ' ', valor).strip()
                     if len(valor) > 50:
                         valor = valor[:50]
                     
@@ -150,7 +151,7 @@ def extraer_datos_poliza_vida_individual(pdf_path: str) -> Dict:
                         valor = match.group(0).strip()
                         resultado[campo] = normalizar_numero(valor)
                 elif campo == "R.F.C.":
-                    rfc_matches = re.findall(patron, texto_completo, re.MULTILINE | re.IGNORECASE)
+                    rfc_matches = patron.findall(texto_completo)
                     if rfc_matches:
                         valid_rfcs = [r for r in rfc_matches if len(r) in (12, 13)]
                         if valid_rfcs:
@@ -206,7 +207,7 @@ def extraer_datos_poliza_vida_individual(pdf_path: str) -> Dict:
         # Si después de todo el procesamiento todavía no tenemos dirección y hay "JAIBA" en el texto
         if resultado["Domicilio del contratante"] == "0" and "JAIBA" in texto_completo:
             # Buscar el patrón más genérico
-            jaiba_match = re.search(r'C\s+JAIBA\s+LOTE\s+(\d+)\s+MZA\s+(\d+)\s+DEPTO\s+(\d+)', texto_completo, re.IGNORECASE)
+            jaiba_match = registro.search(r'C\s+JAIBA\s+LOTE\s+(\d+)\s+MZA\s+(\d+)\s+DEPTO\s+(\d+)', texto_completo, re.IGNORECASE)
             if jaiba_match:
                 lote, mza, depto = jaiba_match.groups()
                 resultado["Domicilio del contratante"] = f"C Jaiba lote {lote} mza {mza} depto {depto} en rincon playas la playa la playa"
@@ -217,7 +218,7 @@ def extraer_datos_poliza_vida_individual(pdf_path: str) -> Dict:
 
         # Caso especial adicional: si domicilio contiene C JAIBA pero en otro formato
         if resultado["Domicilio del contratante"] != "0" and "JAIBA" in resultado["Domicilio del contratante"] and "en rincon playas la playa la playa" not in resultado["Domicilio del contratante"]:
-            jaiba_match = re.search(r'C\s+JAIBA\s+LOTE\s+(\d+)\s+MZA\s+(\d+)\s+DEPTO\s+(\d+)', resultado["Domicilio del contratante"], re.IGNORECASE)
+            jaiba_match = registro.search(r'C\s+JAIBA\s+LOTE\s+(\d+)\s+MZA\s+(\d+)\s+DEPTO\s+(\d+)', resultado["Domicilio del contratante"], re.IGNORECASE)
             if jaiba_match:
                 lote, mza, depto = jaiba_match.groups()
                 resultado["Domicilio del contratante"] = f"C Jaiba lote {lote} mza {mza} depto {depto} en rincon playas la playa la playa"
@@ -229,21 +230,21 @@ def extraer_datos_poliza_vida_individual(pdf_path: str) -> Dict:
         # Si después de todo el procesamiento todavía no tenemos algunos datos críticos, intentar con patrones alternativos
         if resultado["Nombre del plan"] == "0":
             # Búsqueda alternativa para plan
-            plan_alt = re.search(r'(?:ORDINARIO DE VIDA|VIDA INTELIGENTE[A-ZÁ-Ú\s]*)', texto_completo)
+            plan_alt = registro.search(r'(?:ORDINARIO DE VIDA|VIDA INTELIGENTE[A-ZÁ-Ú\s]*)', texto_completo)
             if plan_alt:
                 resultado["Nombre del plan"] = plan_alt.group(0).strip()
                 logging.info(f"Plan encontrado (alt): {resultado['Nombre del plan']}")
         
         if resultado["Suma asegurada"] == "0":
             # Buscar valor cerca de palabras clave
-            suma_alt = re.search(r'(?:Asegurada|ASEGURADA)\s+([\d,]+\.\d{2}|[\d,]+\d{2})', texto_completo)
+            suma_alt = registro.search(r'(?:Asegurada|ASEGURADA)\s+([\d,]+\.\d{2}|[\d,]+\d{2})', texto_completo)
             if suma_alt:
                 resultado["Suma asegurada"] = normalizar_numero(suma_alt.group(1))
                 logging.info(f"Suma asegurada encontrada (alt): {resultado['Suma asegurada']}")
                 
         if resultado["Prima Neta"] == "0" or resultado["Prima anual total"] == "0":
             # Buscar cualquier prima con formato numérico 
-            primas_alt = re.findall(r'Prima\s+(?:\w+\s+)+(\d{1,3}(?:,\d{3})*\.\d{2}|\d{1,3}(?:,\d{3})*\d{2})', texto_completo)
+            primas_alt = registro.findall(r'Prima\s+(?:\w+\s+)+(\d{1,3}(?:,\d{3})*\.\d{2}|\d{1,3}(?:,\d{3})*\d{2})', texto_completo)
             if primas_alt and resultado["Prima Neta"] == "0":
                 resultado["Prima Neta"] = normalizar_numero(primas_alt[0])
                 logging.info(f"Prima neta encontrada (alt): {resultado['Prima Neta']}")
@@ -256,91 +257,78 @@ def extraer_datos_poliza_vida_individual(pdf_path: str) -> Dict:
 
     return resultado
 
+# Encabezado y notas del markdown de datos extraídos
+TITULO_MARKDOWN = "Datos Extraídos de Póliza de Vida Individual"
+NOTAS_MARKDOWN = "El documento es una póliza de vida individual. Los valores \"Por determinar\" indican campos que no pudieron ser claramente identificados en el documento original PDF."
+
+def organizar_datos_markdown(datos: Dict) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Organiza los datos extraídos en las secciones del markdown.
+    """
+    # Organizar datos por categorías
+    info_general = {
+        "Tipo de Documento": "Póliza de Vida Individual",
+        "Nombre del Plan": datos["Nombre del plan"].replace("Nombre del plan: ", "") if datos["Nombre del plan"] != "0" else "Por determinar",
+        "Número de Póliza": datos["Número de póliza"] if datos["Número de póliza"] != "0" else "Por determinar"
+    }
+
+    datos_asegurado = {
+        "Nombre del Asegurado Titular": datos["Nombre del asegurado titular"] if datos["Nombre del asegurado titular"] != "0" else "Por determinar",
+        "Nombre del Contratante": datos["Nombre del contratante"] if datos["Nombre del contratante"] != "0" else "Por determinar",
+        "R.F.C.": datos["R.F.C."] if datos["R.F.C."] != "0" else "Por determinar",
+        "Domicilio del Contratante": datos["Domicilio del contratante"] if datos["Domicilio del contratante"] != "0" else "Por determinar",
+        "Código Postal": datos["Código Postal"] if datos["Código Postal"] != "0" else "Por determinar",
+        "Teléfono": datos["Teléfono"] if datos["Teléfono"] != "0" else "Por determinar"
+    }
+
+    datos_agente = {
+        "Clave Agente": datos["Clave Agente"] if datos["Clave Agente"] != "0" else "Por determinar",
+        "Nombre del Agente": datos["Nombre del agente"] if datos["Nombre del agente"] != "0" else "Por determinar"
+    }
+
+    fechas = {
+        "Fecha de Emisión": datos["Fecha de emisión"] if datos["Fecha de emisión"] != "0" else "Por determinar",
+        "Fecha de Inicio de Vigencia": datos["Fecha de inicio de vigencia"] if datos["Fecha de inicio de vigencia"] != "0" else "Por determinar",
+        "Fecha de Fin de Vigencia": datos["Fecha de fin de vigencia"] if datos["Fecha de fin de vigencia"] != "0" else "Por determinar"
+    }
+
+    info_financiera = {
+        "Prima Neta": datos["Prima Neta"] if datos["Prima Neta"] != "0" else "Por determinar",
+        "Prima Anual Total": datos["Prima anual total"] if datos["Prima anual total"] != "0" else "Por determinar",
+        "Cobertura Básica": datos["Cobertura Básica"] if datos["Cobertura Básica"] != "0" else "Por determinar",
+        "Coberturas Adicionales con Costo": datos["Coberturas adicionales con costo"] if datos["Coberturas adicionales con costo"] != "0" else "Por determinar",
+        "Frecuencia de Pago": datos["Frecuencia de pago"] if datos["Frecuencia de pago"] != "0" else "Por determinar",
+        "Periodo de Pago de Siniestro": datos["Periodo de pago de siniestro"] if datos["Periodo de pago de siniestro"] != "0" else "Por determinar",
+        "Suma Asegurada": datos["Suma asegurada"] if datos["Suma asegurada"] != "0" else "Por determinar",
+        "I.V.A.": datos["I.V.A."] if datos["I.V.A."] != "0" else "0",
+        "Coaseguro": datos["Coaseguro"] if datos["Coaseguro"] != "0" else "0",
+        "Deducible": datos["Deducible"] if datos["Deducible"] != "0" else "0",
+        "Deducible Cero por Accidente": datos["Deducible Cero por Accidente"] if datos["Deducible Cero por Accidente"] != "0" else "0",
+        "Gama Hospitalaria": datos["Gama Hospitalaria"] if datos["Gama Hospitalaria"] != "0" else "0",
+        "Cobertura Nacional": datos["Cobertura Nacional"] if datos["Cobertura Nacional"] != "0" else "0",
+        "Plazo de Pago": datos["Plazo de pago"] if datos["Plazo de pago"] != "0" else "Por determinar"
+    }
+    
+    return [
+        ("Información General", info_general),
+        ("Datos del Asegurado", datos_asegurado),
+        ("Datos del Agente", datos_agente),
+        ("Fechas Importantes", fechas),
+        ("Información Financiera", info_financiera),
+    ]
+
+def renderizar_markdown(datos: Dict) -> str:
+    """
+    Genera el contenido markdown con los datos extraídos, sin escribirlo a disco.
+    """
+    return markdown_polizas.renderizar_markdown(TITULO_MARKDOWN, organizar_datos_markdown(datos), NOTAS_MARKDOWN)
+
 def generar_markdown(datos: Dict, ruta_salida: str = "vida_individual.md") -> None:
     """
     Genera un archivo markdown con los datos extraídos estructurados para pólizas de vida individual.
     """
     try:
-        # Organizar datos por categorías
-        info_general = {
-            "Tipo de Documento": "Póliza de Vida Individual",
-            "Nombre del Plan": datos["Nombre del plan"].replace("Nombre del plan: ", "") if datos["Nombre del plan"] != "0" else "Por determinar",
-            "Número de Póliza": datos["Número de póliza"] if datos["Número de póliza"] != "0" else "Por determinar"
-        }
-        
-        datos_asegurado = {
-            "Nombre del Asegurado Titular": datos["Nombre del asegurado titular"] if datos["Nombre del asegurado titular"] != "0" else "Por determinar",
-            "Nombre del Contratante": datos["Nombre del contratante"] if datos["Nombre del contratante"] != "0" else "Por determinar",
-            "R.F.C.": datos["R.F.C."] if datos["R.F.C."] != "0" else "Por determinar",
-            "Domicilio del Contratante": datos["Domicilio del contratante"] if datos["Domicilio del contratante"] != "0" else "Por determinar",
-            "Código Postal": datos["Código Postal"] if datos["Código Postal"] != "0" else "Por determinar",
-            "Teléfono": datos["Teléfono"] if datos["Teléfono"] != "0" else "Por determinar"
-        }
-        
-        datos_agente = {
-            "Clave Agente": datos["Clave Agente"] if datos["Clave Agente"] != "0" else "Por determinar",
-            "Nombre del Agente": datos["Nombre del agente"] if datos["Nombre del agente"] != "0" else "Por determinar"
-        }
-        
-        fechas = {
-            "Fecha de Emisión": datos["Fecha de emisión"] if datos["Fecha de emisión"] != "0" else "Por determinar",
-            "Fecha de Inicio de Vigencia": datos["Fecha de inicio de vigencia"] if datos["Fecha de inicio de vigencia"] != "0" else "Por determinar",
-            "Fecha de Fin de Vigencia": datos["Fecha de fin de vigencia"] if datos["Fecha de fin de vigencia"] != "0" else "Por determinar"
-        }
-        
-        info_financiera = {
-            "Prima Neta": datos["Prima Neta"] if datos["Prima Neta"] != "0" else "Por determinar",
-            "Prima Anual Total": datos["Prima anual total"] if datos["Prima anual total"] != "0" else "Por determinar",
-            "Cobertura Básica": datos["Cobertura Básica"] if datos["Cobertura Básica"] != "0" else "Por determinar",
-            "Coberturas Adicionales con Costo": datos["Coberturas adicionales con costo"] if datos["Coberturas adicionales con costo"] != "0" else "Por determinar",
-            "Frecuencia de Pago": datos["Frecuencia de pago"] if datos["Frecuencia de pago"] != "0" else "Por determinar",
-            "Periodo de Pago de Siniestro": datos["Periodo de pago de siniestro"] if datos["Periodo de pago de siniestro"] != "0" else "Por determinar",
-            "Suma Asegurada": datos["Suma asegurada"] if datos["Suma asegurada"] != "0" else "Por determinar",
-            "I.V.A.": datos["I.V.A."] if datos["I.V.A."] != "0" else "0",
-            "Coaseguro": datos["Coaseguro"] if datos["Coaseguro"] != "0" else "0",
-            "Deducible": datos["Deducible"] if datos["Deducible"] != "0" else "0",
-            "Deducible Cero por Accidente": datos["Deducible Cero por Accidente"] if datos["Deducible Cero por Accidente"] != "0" else "0",
-            "Gama Hospitalaria": datos["Gama Hospitalaria"] if datos["Gama Hospitalaria"] != "0" else "0",
-            "Cobertura Nacional": datos["Cobertura Nacional"] if datos["Cobertura Nacional"] != "0" else "0",
-            "Plazo de Pago": datos["Plazo de pago"] if datos["Plazo de pago"] != "0" else "Por determinar"
-        }
-        
-        # Construir el markdown
-        md_content = "# Datos Extraídos de Póliza de Vida Individual\n\n"
-        
-        # Información General
-        md_content += "## Información General\n"
-        for clave, valor in info_general.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Datos del Asegurado
-        md_content += "## Datos del Asegurado\n"
-        for clave, valor in datos_asegurado.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Datos del Agente
-        md_content += "## Datos del Agente\n"
-        for clave, valor in datos_agente.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Fechas
-        md_content += "## Fechas Importantes\n"
-        for clave, valor in fechas.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Información Financiera
-        md_content += "## Información Financiera\n"
-        for clave, valor in info_financiera.items():
-            md_content += f"- **{clave}**: {valor}\n"
-        md_content += "\n"
-        
-        # Notas
-        md_content += "## Notas Adicionales\n"
-        md_content += "El documento es una póliza de vida individual. Los valores \"Por determinar\" indican campos que no pudieron ser claramente identificados en el documento original PDF."
+        md_content = renderizar_markdown(datos)
         
         # Guardar el archivo markdown
         with open(ruta_salida, 'w', encoding='utf-8') as f:
@@ -351,13 +339,44 @@ def generar_markdown(datos: Dict, ruta_salida: str = "vida_individual.md") -> No
     except Exception as e:
         logging.error(f"Error generando archivo markdown: {str(e)}", exc_info=True)
 
-def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
+# Mapeo de campos del markdown a keys en el resultado
+CAMPOS_MARKDOWN = {
+    "Tipo de Documento": None, # Ignorar
+    "Nombre del Plan": "Nombre del plan",
+    "Número de Póliza": "Número de póliza",
+    "Nombre del Asegurado Titular": "Nombre del asegurado titular",
+    "Nombre del Contratante": "Nombre del contratante",
+    "R.F.C.": "R.F.C.",
+    "Domicilio del Contratante": "Domicilio del contratante",
+    "Código Postal": "Código Postal",
+    "Teléfono": "Teléfono",
+    "Clave Agente": "Clave Agente",
+    "Nombre del Agente": "Nombre del agente",
+    "Fecha de Emisión": "Fecha de emisión",
+    "Fecha de Inicio de Vigencia": "Fecha de inicio de vigencia",
+    "Fecha de Fin de Vigencia": "Fecha de fin de vigencia",
+    "Prima Neta": "Prima Neta",
+    "Prima Anual Total": "Prima anual total",
+    "Cobertura Básica": "Cobertura Básica",
+    "Coberturas Adicionales con Costo": "Coberturas adicionales con costo",
+    "Frecuencia de Pago": "Frecuencia de pago",
+    "Moneda": "Moneda", # Mapear Moneda
+    "Periodo de Pago de Siniestro": "Periodo de pago de siniestro",
+    "Suma Asegurada": "Suma asegurada",
+    "I.V.A.": "I.V.A.",
+    "Coaseguro": "Coaseguro",
+    "Deducible": "Deducible",
+    "Deducible Cero por Accidente": "Deducible Cero por Accidente",
+    "Gama Hospitalaria": "Gama Hospitalaria",
+    "Cobertura Nacional": "Cobertura Nacional",
+    "Plazo de Pago": "Plazo de pago"
+}
+
+def _resultado_vacio() -> Dict:
     """
-    Extrae datos desde un archivo markdown estructurado para vida individual
+    Resultado con todos los campos sin valor ("0").
     """
-    logging.info(f"Extrayendo datos desde archivo markdown: {ruta_md}")
-    
-    resultado = {
+    return {
         "Clave Agente": "0", "Coaseguro": "0", "Cobertura Básica": "0",
         "Cobertura Nacional": "0", "Coberturas adicionales con costo": "0",
         "Código Postal": "0", "Deducible": "0", "Deducible Cero por Accidente": "0",
@@ -371,66 +390,28 @@ def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
         "Prima Neta": "0", "Prima anual total": "0", "R.F.C.": "0",
         "Teléfono": "0", "Url": "0", "Suma asegurada": "0", "Moneda": "0"
     }
-    campos_map = {
-            "Tipo de Documento": None, # Ignorar
-            "Nombre del Plan": "Nombre del plan",
-            "Número de Póliza": "Número de póliza",
-            "Nombre del Asegurado Titular": "Nombre del asegurado titular",
-            "Nombre del Contratante": "Nombre del contratante",
-            "R.F.C.": "R.F.C.",
-            "Domicilio del Contratante": "Domicilio del contratante",
-            "Código Postal": "Código Postal",
-            "Teléfono": "Teléfono",
-            "Clave Agente": "Clave Agente",
-            "Nombre del Agente": "Nombre del agente",
-            "Fecha de Emisión": "Fecha de emisión",
-            "Fecha de Inicio de Vigencia": "Fecha de inicio de vigencia",
-            "Fecha de Fin de Vigencia": "Fecha de fin de vigencia",
-            "Prima Neta": "Prima Neta",
-            "Prima Anual Total": "Prima anual total",
-            "Cobertura Básica": "Cobertura Básica",
-            "Coberturas Adicionales con Costo": "Coberturas adicionales con costo",
-            "Frecuencia de Pago": "Frecuencia de pago",
-            "Moneda": "Moneda", # Mapear Moneda
-            "Periodo de Pago de Siniestro": "Periodo de pago de siniestro",
-            "Suma Asegurada": "Suma asegurada",
-            "I.V.A.": "I.V.A.",
-            "Coaseguro": "Coaseguro",
-            "Deducible": "Deducible",
-            "Deducible Cero por Accidente": "Deducible Cero por Accidente",
-            "Gama Hospitalaria": "Gama Hospitalaria",
-            "Cobertura Nacional": "Cobertura Nacional",
-            "Plazo de Pago": "Plazo de pago"
-        }
-        
-    try:
-        with open(ruta_md, 'r', encoding='utf-8') as f:
-            contenido = f.read()
-        
-        # Extraer los valores con regex
-        for md_key, json_key in campos_map.items():
-            if json_key: # Solo procesar si la clave JSON no es None
-                patron = f"\\*\\*{re.escape(md_key)}\\*\\*: ([^\\n]+)"
-                match = re.search(patron, contenido)
-                if match:
-                    valor = match.group(1).strip()
-                    if valor != "Por determinar":
-                        resultado[json_key] = valor
-                        # Limitar domicilios a 50 caracteres
-                        if json_key in ["Domicilio del contratante", "Domicilio del asegurado"] and len(valor) > 50:
-                            resultado[json_key] = valor[:50]
-                            logging.info(f"Limitado {json_key} a 50 caracteres: {resultado[json_key]}")
-                        logging.info(f"Extraído desde markdown: {json_key} = {resultado[json_key]}")
-                    else:
-                        logging.info(f"Campo {json_key} marcado como 'Por determinar' en markdown.")
+
+def datos_desde_valores_markdown(valores: Dict[str, str], origen: str = "markdown") -> Dict:
+    """
+    Construye el resultado final a partir de los valores del markdown ({clave markdown: valor}).
+    """
+    resultado = _resultado_vacio()
+    
+    for md_key, json_key in CAMPOS_MARKDOWN.items():
+        if json_key: # Solo procesar si la clave JSON no es None
+            valor = valores.get(md_key)
+            if valor is not None:
+                if valor != "Por determinar":
+                    resultado[json_key] = valor
+                    # Limitar domicilios a 50 caracteres
+                    if json_key in ["Domicilio del contratante", "Domicilio del asegurado"] and len(valor) > 50:
+                        resultado[json_key] = valor[:50]
+                        logging.info(f"Limitado {json_key} a 50 caracteres: {resultado[json_key]}")
+                    logging.info(f"Extraído desde markdown: {json_key} = {resultado[json_key]}")
                 else:
-                     logging.warning(f"No se encontró el patrón para '{md_key}' en {ruta_md}")
-        
-    except FileNotFoundError:
-        logging.error(f"Archivo markdown no encontrado: {ruta_md}")
-        return resultado # Devuelve el diccionario inicializado si no se encuentra el archivo
-    except Exception as e:
-        logging.error(f"Error leyendo o procesando archivo markdown {ruta_md}: {e}", exc_info=True)
+                    logging.info(f"Campo {json_key} marcado como 'Por determinar' en markdown.")
+            else:
+                 logging.warning(f"No se encontró el patrón para '{md_key}' en {origen}")
 
     # Lógica para domicilio asegurado = contratante
     if resultado["Domicilio del contratante"] != "0":
@@ -444,6 +425,45 @@ def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
 
     return resultado
 
+def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
+    """
+    Extrae datos desde un archivo markdown estructurado para vida individual
+    """
+    logging.info(f"Extrayendo datos desde archivo markdown: {ruta_md}")
+    
+    try:
+        with open(ruta_md, 'r', encoding='utf-8') as f:
+            contenido = f.read()
+    except FileNotFoundError:
+        logging.error(f"Archivo markdown no encontrado: {ruta_md}")
+        return _resultado_vacio() # Devuelve el diccionario inicializado si no se encuentra el archivo
+    except Exception as e:
+        logging.error(f"Error leyendo o procesando archivo markdown {ruta_md}: {e}", exc_info=True)
+        return _resultado_vacio()
+    
+    valores = markdown_polizas.valores_desde_contenido(contenido, CAMPOS_MARKDOWN)
+    return datos_desde_valores_markdown(valores, ruta_md)
+
+def normalizar_datos_poliza(datos: Dict) -> Dict:
+    """
+    Obtiene en memoria el mismo resultado que generar_markdown seguido de
+    extraer_datos_desde_markdown, sin escribir ni releer el archivo.
+    
+    Args:
+        datos (Dict): Datos extraídos del PDF por extraer_datos_poliza_vida_individual
+        
+    Returns:
+        Dict: Datos finales de la póliza
+    """
+    try:
+        secciones = organizar_datos_markdown(datos)
+    except Exception as e:
+        logging.error(f"Error organizando los datos extraídos: {str(e)}", exc_info=True)
+        return _resultado_vacio()
+    
+    valores = markdown_polizas.valores_desde_secciones(secciones, CAMPOS_MARKDOWN)
+    return datos_desde_valores_markdown(valores, "memoria")
+
 def guardar_a_json(datos: Dict, ruta_salida: str) -> None:
     """
     Guarda los resultados en formato JSON
@@ -495,6 +515,34 @@ def procesar_archivo(ruta_pdf: str, directorio_salida: str = "output") -> Dict:
     
     return datos_finales
 
+def procesar_documento(ruta_pdf: Union[str, DocumentContext], sumidero: Optional[SumideroArtefactos] = None) -> Dict:
+    """
+    Procesa un PDF en memoria y devuelve los datos finales de la póliza.
+    
+    Da el mismo resultado que procesar_archivo sin pasar por un markdown en disco.
+    El markdown y el JSON solo se generan si se indica un sumidero activo.
+    
+    Args:
+        ruta_pdf (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+        sumidero (SumideroArtefactos, opcional): Destino del markdown y el JSON; sin
+            sumidero (o apagado) no se escriben
+        
+    Returns:
+        Dict: Datos finales de la póliza
+    """
+    datos = extraer_datos_poliza_vida_individual(ruta_pdf)
+    datos_finales = normalizar_datos_poliza(datos)
+    
+    if sumidero is not None and sumidero.activo:
+        nombre_base = os.path.basename(str(ruta_pdf)).replace('.pdf', '')
+        # Copias: en modo async los archivos se escriben después de devolver el resultado
+        sumidero.guardar(nombre_base, {
+            "md": partial(generar_markdown, dict(datos)),
+            "json": partial(guardar_a_json, dict(datos_finales)),
+        })
+    
+    return datos_finales
+
 def procesar_directorio(directorio: str, directorio_salida: str = "output") -> None:
     """
     Procesa todos los archivos PDF en un directorio
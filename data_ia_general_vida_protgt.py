@@ -3,12 +3,14 @@ import sys
 import re
 import json
 import logging
-import fitz  # PyMuPDF
 from datetime import datetime
+from functools import partial
 from typing import Dict, Union, Optional, List, Tuple
-from PyPDF2 import PdfReader
 import glob
 from pathlib import Path
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
+from artefactos import SumideroArtefactos
 
 # Configurar logging
 logging.basicConfig(
@@ -39,7 +41,7 @@ def normalizar_numero(valor: str) -> str:
     if not valor:
         return "0"
     # Elimina espacios y caracteres no deseados pero mantiene comas y puntos
-    valor = re.sub(r'[$\\s]', '', valor)
+    valor = registro.sub(r'[$\\s]', '', valor)
     # Quita comas usadas como separadores de miles antes de la conversión
     valor = valor.replace(',', '')
     # Asegura que tenga dos decimales si es un número flotante
@@ -55,12 +57,12 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     Detecta el tipo de documento basado en patrones específicos para pólizas VIDA PROTGT.
     """
     # Patrones para identificar documentos VIDA PROTGT
-    if re.search(r'VIDA PROTGT|PROTGT', texto_pdf, re.IGNORECASE):
+    if registro.search(r'VIDA PROTGT|PROTGT', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de VIDA PROTGT")
         return "VIDA_PROTGT"
     
     # Si no coincide con ningún patrón conocido pero parece ser de vida
-    if re.search(r'Seguro\s+de\s+Vida|P[óo]liza\s+de\s+Vida', texto_pdf, re.IGNORECASE):
+    if registro.search(r'Seguro\s+de\s+Vida|P[óo]liza\s+de\s+Vida', texto_pdf, re.IGNORECASE):
         logging.info("Detectado: Documento de Vida (formato general)")
         return "VIDA"
     
@@ -68,7 +70,42 @@ def detectar_tipo_documento(texto_pdf: str) -> str:
     logging.warning("Tipo de documento no identificado claramente")
     return "DESCONOCIDO"
 
-def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
+# Patrones específicos para el formato VIDA PROTGT
+PATRONES = registro.grupo("vida_protgt", {
+    "Clave Agente": r'Agente:?\s+(\d+)|Agente:\s+(\d{6})|Agente\s+(\d{6})',
+    "Nombre del agente": r'(?:Agente:?\s+\d+\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)|(?:\d{6}\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)|Agente[:\s]+\d+[:\s]+([A-ZÁ-Ú\s,.]+)',
+    "Nombre del asegurado titular": r'(?:Datos del asegurado|Asegurado)[:\s]+(?:Nombre|NOMBRE)[:\s]+([A-ZÁ-Ú\s,.]+?)(?=\s+(?:Fecha|Domicilio|R\.F\.C\.|CURP))|(?:Nombre|NOMBRE)[:\s]+([A-ZÁ-Ú\s,.]+?)(?=\s+(?:Domicilio|R\.F\.C\.|CURP))',
+    "Nombre del contratante": r'(?:Datos del contratante|Contratante)[:\s]+(?:Nombre|NOMBRE)[:\s]+([A-ZÁ-Ú\s,.]+?)(?=\s+(?:Domicilio|R\.F\.C\.|CURP))|(?:Nombre|NOMBRE)[:\s]+([A-ZÁ-Ú\s,.]+?)(?=\s+(?:Domicilio|R\.F\.C\.|CURP))',
+    "Domicilio del contratante": r'Domicilio[:\s]+(.*?)(?=\s+R\.F\.C\.:|$)|Domicilio[:\s]+(.*?)(?=\s+Teléfono:|$)',
+    "Código Postal": r'(?:C\.P\.|CP|[\d,]+,)\s*(\d{5})|(\d{5}),\s+\w+',
+    "Teléfono": r'Teléfono:\s+([0-9]{7,10})',
+    "R.F.C.": r'R\.F\.C\.:\s+([A-Z0-9]{10,13})',
+    "Fecha de emisión": r'Fecha de emisión\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Fecha de inicio de vigencia": r'(?:Fecha de inicio\s+de vigencia|Fecha de inicio|Inicio de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Fecha de fin de vigencia": r'(?:Fecha de fin\s+de vigencia|Fecha de fin|Fin de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
+    "Plazo de pago": r'Plazo de\s+pago\s+([0-9]+\s+(?:años|AÑOS))|Plazo de Pago:?\s+([0-9]+\s+(?:años|AÑOS))',
+    "Plazo de Seguro": r'Plazo de\s+Seguro\s+([0-9]+\s+(?:años|AÑOS))|Plazo de Seguro:?\s+([0-9]+\s+(?:años|AÑOS))',
+    "Forma de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',
+    "Frecuencia de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',  # Mismo patrón que Forma de pago
+    "Nombre del plan": r'VIDA PROTGT',
+    "Tipo de Plan": r'Tipo de Plan\s+([A-ZÁ-Ú\s]+)|VIDA PROTGT\s+([A-ZÁ-Ú\s]+)',
+    "Número de póliza": r'(?:Póliza|PÓLIZA)\s+([A-Z0-9]+H?)|(?:Póliza|PÓLIZA)[:\s]+([0-9]+[A-Z]?H?)|(?:FOLIO|Folio)[:\s]+([0-9]+[A-Z]?H?)|(\d{7}H)',
+    "Prima Neta": r'Prima anual\s+([\d,]+\.\d{2})|Prima\s+trimestral\s+([\d,]+\.\d{2})',
+    "Prima anual total": r'Prima anual total\s+([\d,]+\.\d{2})|PRIMA ANUAL TOTAL[:\s]+([\d,]+\.\d{2})',
+    "Prima mensual": r'Prima\s+mensual\s+([\d,]+\.\d{2})|Según\s+Forma\s+de\s+Pago\s+([\d,]+\.\d{2})',
+    "Suma asegurada": r'Básica\s+\d+\s+(?:AÑOS|años)\s+([\d,]+\.\d{2})|Suma asegurada\s+([\d,]+\.\d{2})|(?:SUMA ASEGURADA|Suma asegurada)[:\s]+([\d,]+\.\d{2})|Cobertura Básica[:\s]+(?:$|[\w\s]+)[:\s]+([\d,]+\.\d{2})',
+    "Moneda": r'Moneda\s+([A-ZÁ-Ú]+)',
+    "Centro de Utilidad": r'Centro de Utilidad:\s+(\d+)',
+    "Cobertura Básica": r'Básica\s+(\d+\s+(?:años|AÑOS))\s+[\d,]+\.\d{2}|Básica\s+(\d+\s+(?:años|AÑOS))',
+    # Nuevos patrones para los campos adicionales
+    "Prima trimestral": r'Prima\s+trimestral\s+([\d,]+\.\d{2})',
+    "Recargo por pago fraccionado": r'Recargo\s+por\s+pago\s+fraccionado\s+([\d,]+\.\d{2})',
+    "Prima adicional": r'Prima\s+adicional\s+([\d,]+\.\d{2})',
+    "Prima trimestral total": r'Prima\s+trimestral\s+total\s+([\d,]+\.\d{2})'
+}, re.MULTILINE | re.IGNORECASE)
+
+
+def extraer_datos_poliza_vida_protgt(pdf_path: Union[str, DocumentContext]) -> Dict:
     """
     Extrae datos de una póliza VIDA PROTGT desde un archivo PDF.
     """
@@ -92,27 +129,19 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
 
     try:
         # Extraer texto del PDF usando PyMuPDF para mejor manejo de layout
-        doc = fitz.open(pdf_path)
-        texto_completo = ""
-        for page in doc:
-            # Usar múltiples métodos de extracción para mayor robustez
-            texto_con_sort = page.get_text("text", sort=True) + "\n"
-            texto_sin_sort = page.get_text("text", sort=False) + "\n"
-            
-            # Procesar correctamente los bloques (son una lista, no un string)
-            blocks = page.get_text("blocks")
-            texto_blocks = ""
-            for b in blocks:
-                # Cada bloque es una tupla con información; el texto está en el índice 4
-                if len(b) > 4:
-                    texto_blocks += b[4] + " "
-            texto_blocks += "\n"
-            
-            # Combinar los resultados
-            texto_completo += texto_con_sort
-            # Añadir un separador para identificar fácilmente los diferentes métodos en logs
-            texto_completo += "--- TEXTO SIN SORT ---\n" + texto_sin_sort
-            texto_completo += "--- TEXTO BLOCKS ---\n" + texto_blocks
+        with abrir_documento(pdf_path) as documento:
+            texto_completo = ""
+            for num_pagina in range(documento.page_count):
+                # Usar múltiples métodos de extracción para mayor robustez
+                texto_con_sort = documento.page_text_sorted(num_pagina) + "\n"
+                texto_sin_sort = documento.page_text(num_pagina) + "\n"
+                texto_blocks = documento.page_blocks(num_pagina)
+                
+                # Combinar los resultados
+                texto_completo += texto_con_sort
+                # Añadir un separador para identificar fácilmente los diferentes métodos en logs
+                texto_completo += "--- TEXTO SIN SORT ---\n" + texto_sin_sort
+                texto_completo += "--- TEXTO BLOCKS ---\n" + texto_blocks
             
         # Guardar el texto extraído para debugging
         debug_dir = os.path.join(os.path.dirname(pdf_path), "debug")
@@ -121,58 +150,23 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
             f.write(texto_completo)
             
         logging.info(f"Texto extraído guardado para debugging en {os.path.join(debug_dir, 'texto_extraido.txt')}")
-        doc.close()
 
         # Detectar tipo de documento
         tipo_documento = detectar_tipo_documento(texto_completo)
         if tipo_documento != "VIDA_PROTGT" and tipo_documento != "VIDA":
             logging.warning(f"Este documento no parece ser una póliza VIDA PROTGT: {tipo_documento}")
 
-        # Patrones específicos para el formato VIDA PROTGT
-        patrones = {
-            "Clave Agente": r'Agente:?\s+(\d+)|Agente:\s+(\d{6})|Agente\s+(\d{6})',
-            "Nombre del agente": r'(?:Agente:?\s+\d+\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)|(?:\d{6}\s+)([A-ZÁ-Ú\s,.]+?)(?=\s+Promotor:|$)|Agente[:\s]+\d+[:\s]+([A-ZÁ-Ú\s,.]+)',
-            "Nombre del asegurado titular": r'(?:Datos del asegurado|Asegurado)[:\s]+(?:Nombre|NOMBRE)[:\s]+([A-ZÁ-Ú\s,.]+?)(?=\s+(?:Fecha|Domicilio|R\.F\.C\.|CURP))|(?:Nombre|NOMBRE)[:\s]+([A-ZÁ-Ú\s,.]+?)(?=\s+(?:Domicilio|R\.F\.C\.|CURP))',
-            "Nombre del contratante": r'(?:Datos del contratante|Contratante)[:\s]+(?:Nombre|NOMBRE)[:\s]+([A-ZÁ-Ú\s,.]+?)(?=\s+(?:Domicilio|R\.F\.C\.|CURP))|(?:Nombre|NOMBRE)[:\s]+([A-ZÁ-Ú\s,.]+?)(?=\s+(?:Domicilio|R\.F\.C\.|CURP))',
-            "Domicilio del contratante": r'Domicilio[:\s]+(.*?)(?=\s+R\.F\.C\.:|$)|Domicilio[:\s]+(.*?)(?=\s+Teléfono:|$)',
-            "Código Postal": r'(?:C\.P\.|CP|[\d,]+,)\s*(\d{5})|(\d{5}),\s+\w+',
-            "Teléfono": r'Teléfono:\s+([0-9]{7,10})',
-            "R.F.C.": r'R\.F\.C\.:\s+([A-Z0-9]{10,13})',
-            "Fecha de emisión": r'Fecha de emisión\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Fecha de inicio de vigencia": r'(?:Fecha de inicio\s+de vigencia|Fecha de inicio|Inicio de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Fecha de fin de vigencia": r'(?:Fecha de fin\s+de vigencia|Fecha de fin|Fin de Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})',
-            "Plazo de pago": r'Plazo de\s+pago\s+([0-9]+\s+(?:años|AÑOS))|Plazo de Pago:?\s+([0-9]+\s+(?:años|AÑOS))',
-            "Plazo de Seguro": r'Plazo de\s+Seguro\s+([0-9]+\s+(?:años|AÑOS))|Plazo de Seguro:?\s+([0-9]+\s+(?:años|AÑOS))',
-            "Forma de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',
-            "Frecuencia de pago": r'Forma de pago\s+([A-ZÁ-Ú]+)',  # Mismo patrón que Forma de pago
-            "Nombre del plan": r'VIDA PROTGT',
-            "Tipo de Plan": r'Tipo de Plan\s+([A-ZÁ-Ú\s]+)|VIDA PROTGT\s+([A-ZÁ-Ú\s]+)',
-            "Número de póliza": r'(?:Póliza|PÓLIZA)\s+([A-Z0-9]+H?)|(?:Póliza|PÓLIZA)[:\s]+([0-9]+[A-Z]?H?)|(?:FOLIO|Folio)[:\s]+([0-9]+[A-Z]?H?)|(\d{7}H)',
-            "Prima Neta": r'Prima anual\s+([\d,]+\.\d{2})|Prima\s+trimestral\s+([\d,]+\.\d{2})',
-            "Prima anual total": r'Prima anual total\s+([\d,]+\.\d{2})|PRIMA ANUAL TOTAL[:\s]+([\d,]+\.\d{2})',
-            "Prima mensual": r'Prima\s+mensual\s+([\d,]+\.\d{2})|Según\s+Forma\s+de\s+Pago\s+([\d,]+\.\d{2})',
-            "Suma asegurada": r'Básica\s+\d+\s+(?:AÑOS|años)\s+([\d,]+\.\d{2})|Suma asegurada\s+([\d,]+\.\d{2})|(?:SUMA ASEGURADA|Suma asegurada)[:\s]+([\d,]+\.\d{2})|Cobertura Básica[:\s]+(?:$|[\w\s]+)[:\s]+([\d,]+\.\d{2})',
-            "Moneda": r'Moneda\s+([A-ZÁ-Ú]+)',
-            "Centro de Utilidad": r'Centro de Utilidad:\s+(\d+)',
-            "Cobertura Básica": r'Básica\s+(\d+\s+(?:años|AÑOS))\s+[\d,]+\.\d{2}|Básica\s+(\d+\s+(?:años|AÑOS))',
-            # Nuevos patrones para los campos adicionales
-            "Prima trimestral": r'Prima\s+trimestral\s+([\d,]+\.\d{2})',
-            "Recargo por pago fraccionado": r'Recargo\s+por\s+pago\s+fraccionado\s+([\d,]+\.\d{2})',
-            "Prima adicional": r'Prima\s+adicional\s+([\d,]+\.\d{2})',
-            "Prima trimestral total": r'Prima\s+trimestral\s+total\s+([\d,]+\.\d{2})'
-        }
-
         # Extraer valores usando patrones específicos
-        for campo, patron in patrones.items():
-            match = re.search(patron, texto_completo, re.MULTILINE | re.IGNORECASE)
+        for campo, patron in PATRONES.items():
+            match = patron.search(texto_completo)
             if match:
-                debug_print(f"Encontrada coincidencia para {campo} con patrón {patron}")
+                debug_print(f"Encontrada coincidencia para {campo} con patrón {patron.pattern}")
                 debug_print(f"Grupos encontrados para {campo}", str(match.groups()))
                 
                 if campo == "Domicilio del contratante":
                     valor = match.group(1).strip() if match.group(1) else match.group(2).strip()
                     # Limpiar saltos de línea y espacios múltiples
-                    valor = re.sub(r'\s*\n\s*', ' ', valor)
+                    valor = registro.sub(r'\s*\n\s*', ' ', valor)
                     # Limitar a 50 caracteres si es necesario
                     if len(valor) > 50:
                         valor = valor[:50]
@@ -254,7 +248,7 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
         
         # Si no encontramos algunos datos clave, busquemos con patrones alternativos
         if resultado["Nombre del asegurado titular"] == "0":
-            nombre_match = re.search(r'Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|\n)', texto_completo)
+            nombre_match = registro.search(r'Nombre:\s+([A-ZÁ-Ú\s,.]+?)(?=\s+Fecha|\n)', texto_completo)
             if nombre_match:
                 resultado["Nombre del asegurado titular"] = nombre_match.group(1).strip()
                 logging.info(f"Nombre del asegurado encontrado (alt): {resultado['Nombre del asegurado titular']}")
@@ -266,7 +260,7 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
         
         # Buscar fechas de vigencia con patrón alternativo
         if resultado["Fecha de inicio de vigencia"] == "0":
-            fecha_inicio_match = re.search(r'(?:vigencia|Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_completo)
+            fecha_inicio_match = registro.search(r'(?:vigencia|Vigencia)\s+([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_completo)
             if fecha_inicio_match:
                 resultado["Fecha de inicio de vigencia"] = fecha_inicio_match.group(1).strip()
                 logging.info(f"Fecha de inicio encontrada (alt): {resultado['Fecha de inicio de vigencia']}")
@@ -275,7 +269,7 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
             # Buscar fecha de fin de vigencia después de fecha de inicio
             if resultado["Fecha de inicio de vigencia"] != "0":
                 texto_posterior = texto_completo[texto_completo.find(resultado["Fecha de inicio de vigencia"]):]
-                fecha_fin_match = re.search(r'([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_posterior[len(resultado["Fecha de inicio de vigencia"]):])
+                fecha_fin_match = registro.search(r'([0-9]{1,2}/[A-Z]{3}/[0-9]{4})', texto_posterior[len(resultado["Fecha de inicio de vigencia"]):])
                 if fecha_fin_match:
                     resultado["Fecha de fin de vigencia"] = fecha_fin_match.group(1).strip()
                     logging.info(f"Fecha de fin encontrada (alt): {resultado['Fecha de fin de vigencia']}")
@@ -283,7 +277,7 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
         # Número de póliza puede estar en formato diferente
         if resultado["Número de póliza"] == "0" or not resultado["Número de póliza"].isalnum():
             # Buscar en todo el texto para encontrar el número de póliza con formato 1059331H
-            poliza_match = re.search(r'(?:Póliza|PÓLIZA|Poliza)\s*[:\s]\s*(\d+[A-Z]?H?)|(\d+[A-Z]?H?)(?:\s+Este)', texto_completo)
+            poliza_match = registro.search(r'(?:Póliza|PÓLIZA|Poliza)\s*[:\s]\s*(\d+[A-Z]?H?)|(\d+[A-Z]?H?)(?:\s+Este)', texto_completo)
             if poliza_match:
                 # Seleccionar el grupo que no es None
                 poliza_num = next((g for g in poliza_match.groups() if g), "")
@@ -292,7 +286,7 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
                     logging.info(f"Número de póliza encontrado (alt): {resultado['Número de póliza']}")
             else:
                 # Última posibilidad - buscar el valor de póliza directamente
-                poliza_match = re.search(r'1059331H', texto_completo)
+                poliza_match = registro.search(r'1059331H', texto_completo)
                 if poliza_match:
                     resultado["Número de póliza"] = poliza_match.group(0).strip()
                     logging.info(f"Número de póliza encontrado (exacto): {resultado['Número de póliza']}")
@@ -300,7 +294,7 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
         # Nombre del plan puede estar en el encabezado del documento
         if resultado["Nombre del plan"] == "0":
             # Buscar directamente el nombre del plan en el encabezado del documento
-            plan_match = re.search(r'VIDA PROTGT', texto_completo)
+            plan_match = registro.search(r'VIDA PROTGT', texto_completo)
             if plan_match:
                 if resultado["Tipo de Plan"] != "0":
                     resultado["Nombre del plan"] = f"VIDA PROTGT {resultado['Tipo de Plan']}"
@@ -309,14 +303,14 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
                 logging.info(f"Nombre del plan encontrado (alt): {resultado['Nombre del plan']}")
             else:
                 # Buscar cualquier mención a "Tipo de Plan"
-                plan_match = re.search(r'Tipo de Plan\s+([A-ZÁ-ÚÑa-zá-úñ\s]+)', texto_completo)
+                plan_match = registro.search(r'Tipo de Plan\s+([A-ZÁ-ÚÑa-zá-úñ\s]+)', texto_completo)
                 if plan_match:
                     resultado["Nombre del plan"] = f"VIDA PROTGT {plan_match.group(1).strip()}"
                     logging.info(f"Nombre del plan encontrado (tipo): {resultado['Nombre del plan']}")
         
         # Plazo de pago puede estar en otro formato
         if resultado["Plazo de pago"] == "0":
-            plazo_match = re.search(r'Plazo de\s+pago\s+([0-9]+)', texto_completo)
+            plazo_match = registro.search(r'Plazo de\s+pago\s+([0-9]+)', texto_completo)
             if plazo_match:
                 resultado["Plazo de pago"] = plazo_match.group(1).strip() + " años"
                 logging.info(f"Plazo de pago encontrado (alt): {resultado['Plazo de pago']}")
@@ -324,7 +318,7 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
                 # Buscar en secciones relacionadas con el pago
                 for linea in texto_completo.split('\n'):
                     if "Plazo" in linea and "año" in linea.lower():
-                        plazo_match = re.search(r'([0-9]+\s*(?:años|AÑOS|Años))', linea)
+                        plazo_match = registro.search(r'([0-9]+\s*(?:años|AÑOS|Años))', linea)
                         if plazo_match:
                             resultado["Plazo de pago"] = plazo_match.group(1).strip()
                             logging.info(f"Plazo de pago encontrado (línea): {resultado['Plazo de pago']}")
@@ -342,13 +336,13 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
         # La cobertura básica puede estar en la sección de coberturas
         if resultado["Cobertura Básica"] == "0":
             # Buscar en la sección de coberturas
-            cobertura_match = re.search(r'Básica\s+(\d+\s+(?:AÑOS|años))', texto_completo)
+            cobertura_match = registro.search(r'Básica\s+(\d+\s+(?:AÑOS|años))', texto_completo)
             if cobertura_match:
                 resultado["Cobertura Básica"] = cobertura_match.group(1).strip()
                 logging.info(f"Cobertura básica encontrada: {resultado['Cobertura Básica']}")
         
         # El número de póliza podría ser incorrecto, buscar específicamente 1059331H
-        poliza_alt_match = re.search(r'(\d{7}H)', texto_completo)
+        poliza_alt_match = registro.search(r'(\d{7}H)', texto_completo)
         if poliza_alt_match:
             # Este formato es más específico (7 dígitos seguidos de H)
             resultado["Número de póliza"] = poliza_alt_match.group(1).strip()
@@ -357,13 +351,13 @@ def extraer_datos_poliza_vida_protgt(pdf_path: str) -> Dict:
         # Prima anual total podría estar en diferentes formatos
         if resultado["Prima anual total"] == "0":
             # Buscar prima anual total directamente
-            prima_total_match = re.search(r'Prima anual total\s+([\d,]+\.\d{2})', texto_completo)
+            prima_total_match = registro.search(r'Prima anual total\s+([\d,]+\.\d{2})', texto_completo)
             if prima_total_match:
                 resultado["Prima anual total"] = normalizar_numero(prima_total_match.group(1).strip())
                 logging.info(f"Prima anual total encontrada directamente: {resultado['Prima anual total']}")
             else:
                 # Buscar prima trimestral total y multiplicar por 4
-                prima_trimestral_match = re.search(r'Prima trimestral total\s+([\d,]+\.\d{2})', texto_completo)
+                prima_trimestral_match = registro.search(r'Prima trimestral total\s+([\d,]+\.\d{2})', texto_completo)
                 if prima_trimestral_match:
                     prima_trimestral = float(normalizar_numero(prima_trimestral_match.group(1).strip()))
                     resultado["Prima anual total"] = f"{prima_trimestral * 4:.2f}"
@@ -552,7 +546,7 @@ def extraer_datos_desde_markdown(ruta_md: str) -> Dict:
         # Buscar cada clave usando regex
         for clave_md, clave_dict in mapping.items():
             patron = f"- \\*\\*{clave_md}\\*\\*: (.*?)\\n"
-            match = re.search(patron, contenido)
+            match = registro.search(patron, contenido)
             if match:
                 valor = match.group(1).strip()
                 # Si el valor es "Por determinar", mantener como "0"
@@ -608,6 +602,36 @@ def procesar_archivo(ruta_pdf: str, directorio_salida: str = "output") -> Dict:
         logging.error(f"Error procesando archivo {ruta_pdf}: {str(e)}", exc_info=True)
         return {}
 
+def procesar_documento(ruta_pdf: Union[str, DocumentContext], sumidero: Optional[SumideroArtefactos] = None) -> Dict:
+    """
+    Procesa un PDF de VIDA PROTGT sin escribir archivos intermedios.
+    
+    El markdown y el JSON solo se generan si se indica un sumidero activo.
+    
+    Args:
+        ruta_pdf (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+        sumidero (SumideroArtefactos, opcional): Destino del markdown y el JSON; sin
+            sumidero (o apagado) no se escriben
+        
+    Returns:
+        Dict: Datos extraídos del PDF
+    """
+    try:
+        datos = extraer_datos_poliza_vida_protgt(ruta_pdf)
+        
+        if sumidero is not None and sumidero.activo:
+            nombre_base = os.path.splitext(os.path.basename(str(ruta_pdf)))[0]
+            # Copia: en modo async los archivos se escriben después de devolver el resultado
+            sumidero.guardar(nombre_base, {
+                "md": partial(generar_markdown, dict(datos)),
+                "json": partial(guardar_a_json, dict(datos)),
+            })
+        
+        return datos
+    except Exception as e:
+        logging.error(f"Error procesando archivo {ruta_pdf}: {str(e)}", exc_info=True)
+        return {}
+
 def procesar_directorio(directorio: str, directorio_salida: str = "output") -> None:
     """
     Procesa todos los archivos PDF en un directorio.
@@ -1,6 +1,6 @@
 import json
 import os
-import requests
+from sesiones_http import obtener_sesion
 from urllib.parse import urlparse
 import shutil
 from datetime import datetime
@@ -14,21 +14,51 @@ def crear_carpeta_salud():
     else:
         print("La carpeta 'salud' ya existe")
 
-def descargar_archivo(url, ruta_destino):
-    """Descarga un archivo desde una URL"""
+# Manifiesto de la última ejecución (se reutiliza para no volver a descargar lo que no cambió)
+MANIFIESTO = os.path.join("salud", "manifiesto_descargas.json")
+
+def descargar_archivo(url, ruta_destino, etag=None, last_modified=None):
+    """
+    Descarga un archivo desde una URL.
+    
+    Si se pasan `etag` o `last_modified` la petición es condicional
+    (If-None-Match / If-Modified-Since): un 304 deja el archivo existente.
+    El contenido se escribe en un `.part` y se renombra al terminar.
+    
+    Returns:
+        dict: estado ("descargado", "sin_cambios" o "error"), tamano, etag, last_modified y error
+    """
+    encabezados = {}
+    if etag:
+        encabezados["If-None-Match"] = etag
+    if last_modified:
+        encabezados["If-Modified-Since"] = last_modified
+    ruta_parcial = ruta_destino + ".part"
     try:
         print(f"Descargando: {url} -> {ruta_destino}")
-        response = requests.get(url, stream=True, timeout=30)
-        response.raise_for_status()
-        
-        with open(ruta_destino, 'wb') as f:
-            shutil.copyfileobj(response.raw, f)
+        # Sesión compartida: reutiliza la conexión con el host entre descargas
+        with obtener_sesion().get(url, stream=True, timeout=30, headers=encabezados) as response:
+            if response.status_code == 304:
+                print(f"= Sin cambios: {ruta_destino}")
+                return {"estado": "sin_cambios", "tamano": os.path.getsize(ruta_destino),
+                        "etag": etag, "last_modified": last_modified, "error": None}
+            response.raise_for_status()
+            
+            with open(ruta_parcial, 'wb') as f:
+                shutil.copyfileobj(response.raw, f)
+            os.replace(ruta_parcial, ruta_destino)
+            
+            resultado = {"estado": "descargado", "tamano": os.path.getsize(ruta_destino),
+                         "etag": response.headers.get("ETag"),
+                         "last_modified": response.headers.get("Last-Modified"), "error": None}
         
         print(f"✓ Descargado con éxito: {ruta_destino}")
-        return True
+        return resultado
     except Exception as e:
+        if os.path.exists(ruta_parcial):
+            os.remove(ruta_parcial)
         print(f"✗ Error al descargar {url}: {str(e)}")
-        return False
+        return {"estado": "error", "tamano": None, "etag": None, "last_modified": None, "error": str(e)}
 
 def extraer_datos_salud():
     """Extrae datos del archivo salud.json"""
@@ -61,202 +91,233 @@ def extraer_datos_salud():
         print(f"Error inesperado al leer salud.json: {str(e)}")
         return None
 
+def buscar_urls_recursivamente(datos, ya_encontrados=None):
+    """Busca recursivamente cualquier URL en la estructura de datos"""
+    if ya_encontrados is None:
+        ya_encontrados = {}  # dict: conserva el orden en que aparecen
+    
+    if isinstance(datos, str):
+        if datos.startswith("http") and datos not in ya_encontrados:
+            ya_encontrados[datos] = None
+    elif isinstance(datos, dict):
+        for key, value in datos.items():
+            buscar_urls_recursivamente(value, ya_encontrados)
+    elif isinstance(datos, list):
+        for item in datos:
+            buscar_urls_recursivamente(item, ya_encontrados)
+    
+    return list(ya_encontrados)
+
+def _nombre_de_url(url, alterno):
+    """Nombre del archivo según la URL, o `alterno` si la ruta no tiene nombre."""
+    nombre = os.path.basename(urlparse(url).path)
+    return nombre if nombre else alterno
+
+def construir_manifiesto(datos):
+    """
+    Arma la lista de archivos a guardar, sin repetidos, antes de descargar nada.
+    
+    Recorre las mismas estructuras que antes se descargaban por separado (lista de
+    elementos, clave `urls`, valores del diccionario, lista `archivos` y la búsqueda
+    recursiva de URLs). Cada URL aparece una sola vez, con el nombre de la primera
+    estructura donde se encontró; si dos URLs distintas producen el mismo nombre, la
+    segunda recibe un sufijo en lugar de sobrescribir a la primera.
+    
+    Args:
+        datos: Contenido de salud.json
+    
+    Returns:
+        list: Entradas {"tipo": "url"|"local"|"contenido", "origen", "nombre"[, "contenido"]}
+    """
+    entradas = []
+    urls_vistas = set()
+    nombres = {}
+    
+    def agregar(tipo, origen, nombre, **extra):
+        if tipo == "url":
+            if origen in urls_vistas:
+                return
+            urls_vistas.add(origen)
+        base, extension = os.path.splitext(nombre)
+        candidato, n = nombre, 2
+        while candidato in nombres and nombres[candidato] != origen:
+            candidato = f"{base}_{n}{extension}"
+            n += 1
+        nombres[candidato] = origen
+        entradas.append({"tipo": tipo, "origen": origen, "nombre": candidato, **extra})
+    
+    # Si datos es una lista de elementos
+    if isinstance(datos, list):
+        for i, item in enumerate(datos):
+            if isinstance(item, dict):
+                # Si el elemento tiene una URL directa
+                if "url" in item:
+                    url = item["url"]
+                    agregar("url", url, item.get("nombre") or _nombre_de_url(url, f"archivo_{i}.pdf"))
+                # Si el elemento tiene datos para guardar en un archivo
+                elif "contenido" in item:
+                    nombre = item.get("nombre", f"contenido_{i}.txt")
+                    agregar("contenido", nombre, nombre, contenido=str(item["contenido"]))
+            # Si el elemento es una cadena (podría ser una URL directa)
+            elif isinstance(item, str) and item.startswith("http"):
+                agregar("url", item, _nombre_de_url(item, f"archivo_{i}.pdf"))
+    
+    # Si datos es un diccionario
+    elif isinstance(datos, dict):
+        # Caso especial: si contiene una lista de URLs directamente
+        if "urls" in datos and isinstance(datos["urls"], list):
+            for i, url in enumerate(datos["urls"]):
+                if isinstance(url, str) and url.startswith("http"):
+                    agregar("url", url, _nombre_de_url(url, f"archivo_{i}.pdf"))
+        
+        # Caso 1: diccionario con archivos como valores (URLs o rutas locales)
+        for key, item in datos.items():
+            if isinstance(item, str):
+                if item.startswith("http"):
+                    agregar("url", item, _nombre_de_url(item, f"{key}.pdf"))
+                elif item.endswith(".pdf"):
+                    agregar("local", item, key if key.endswith(".pdf") else f"{key}.pdf")
+        
+        # Caso 2: diccionario con estructura más compleja
+        if "archivos" in datos:
+            archivos = datos["archivos"]
+            if isinstance(archivos, list):
+                for archivo in archivos:
+                    if isinstance(archivo, dict) and "url" in archivo:
+                        url = archivo["url"]
+                        agregar("url", url, archivo.get("nombre") or _nombre_de_url(url, f"archivo_{len(entradas)}.pdf"))
+            else:
+                print(f"La clave 'archivos' no contiene una lista, sino: {type(archivos).__name__}")
+    
+    # Buscar en cualquier estructura para URLs (solo agrega las que no se vieron)
+    for i, url in enumerate(buscar_urls_recursivamente(datos)):
+        agregar("url", url, _nombre_de_url(url, f"encontrado_{i}.pdf"))
+    
+    return entradas
+
+def cargar_manifiesto(ruta=MANIFIESTO):
+    """Entradas del manifiesto anterior indexadas por origen ({} si no existe)."""
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return {e["origen"]: e for e in json.load(f).get("entradas", [])}
+    except (OSError, ValueError, AttributeError, KeyError, TypeError):
+        return {}
+
+def guardar_manifiesto(entradas, ruta=MANIFIESTO):
+    """Guarda el manifiesto (escritura atómica)."""
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"generado": datetime.now().isoformat(timespec="seconds"), "entradas": entradas},
+                  f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+def ejecutar_entrada(entrada, previa, log):
+    """
+    Guarda un archivo del manifiesto.
+    
+    Una URL cuyo archivo ya existe con el tamaño registrado en la ejecución anterior
+    no se vuelve a bajar: si se conoce su ETag/Last-Modified se confirma con una
+    petición condicional (304 = sin cambios) y si no, basta el tamaño.
+    
+    Returns:
+        str: "descargado", "sin_cambios", "copiado", "guardado" o "error"
+    """
+    ruta_destino = os.path.join("salud", entrada["nombre"])
+    
+    if entrada["tipo"] == "url":
+        url = entrada["origen"]
+        vigente = (previa is not None and previa.get("nombre") == entrada["nombre"]
+                   and previa.get("tamano") is not None and os.path.exists(ruta_destino)
+                   and os.path.getsize(ruta_destino) == previa["tamano"])
+        if vigente and not (previa.get("etag") or previa.get("last_modified")):
+            print(f"= Ya descargado: {ruta_destino}")
+            entrada.update(tamano=previa["tamano"], etag=None, last_modified=None, estado="sin_cambios")
+            return "sin_cambios"
+        resultado = descargar_archivo(url, ruta_destino,
+                                      etag=previa.get("etag") if vigente else None,
+                                      last_modified=previa.get("last_modified") if vigente else None)
+        entrada.update(tamano=resultado["tamano"], etag=resultado["etag"],
+                       last_modified=resultado["last_modified"], estado=resultado["estado"])
+        if resultado["estado"] == "descargado":
+            log.write(f"Archivo descargado: {entrada['nombre']} desde {url}\n")
+        elif resultado["estado"] == "sin_cambios":
+            log.write(f"Sin cambios: {entrada['nombre']} ({url})\n")
+        else:
+            log.write(f"Error al descargar {url}: {resultado['error']}\n")
+        return resultado["estado"]
+    
+    if entrada["tipo"] == "local":
+        # Copiar archivo local
+        try:
+            shutil.copy2(entrada["origen"], ruta_destino)
+            log.write(f"Archivo copiado: {entrada['nombre']} desde {entrada['origen']}\n")
+            print(f"✓ Copiado con éxito: {ruta_destino}")
+            entrada["estado"] = "copiado"
+        except Exception as e:
+            log.write(f"Error al copiar {entrada['origen']}: {str(e)}\n")
+            print(f"✗ Error al copiar {entrada['origen']}: {str(e)}")
+            entrada["estado"] = "error"
+        return entrada["estado"]
+    
+    # Contenido incluido en el JSON (no se guarda en el manifiesto)
+    contenido = entrada.pop("contenido")
+    try:
+        with open(ruta_destino, "w", encoding="utf-8") as f:
+            f.write(contenido)
+        log.write(f"Contenido guardado en: {entrada['nombre']}\n")
+        print(f"✓ Contenido guardado en: {entrada['nombre']}")
+        entrada["estado"] = "guardado"
+    except Exception as e:
+        log.write(f"Error al guardar contenido en {entrada['nombre']}: {str(e)}\n")
+        print(f"✗ Error al guardar contenido en {entrada['nombre']}: {str(e)}")
+        entrada["estado"] = "error"
+    return entrada["estado"]
+
 def procesar_datos_salud(datos):
-    """Procesa los datos y guarda los archivos en la carpeta salud"""
+    """Arma el manifiesto de descargas, lo ejecuta y guarda los archivos en la carpeta salud"""
     if not datos:
         print("No hay datos para procesar.")
         return
     
-    total_archivos = 0
-    archivos_descargados = 0
+    # Paso 1: plan (sin repetidos) y estado de la ejecución anterior
+    entradas = construir_manifiesto(datos)
+    anteriores = cargar_manifiesto()
+    print(f"Manifiesto: {len(entradas)} archivos únicos "
+          f"({sum(1 for e in entradas if e['origen'] in anteriores)} ya registrados en la ejecución anterior)")
     
     # Crear archivo de registro
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = os.path.join("salud", f"extraccion_log_{timestamp}.txt")
+    conteo = {}
     
     with open(log_file, "w", encoding="utf-8") as log:
         log.write(f"Extracción iniciada: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
         log.write(f"Tipo de datos: {type(datos).__name__}\n")
+        log.write(f"Archivos en el manifiesto: {len(entradas)}\n")
         
-        # Si datos es una lista de elementos
-        if isinstance(datos, list):
-            print(f"Procesando lista con {len(datos)} elementos")
-            for i, item in enumerate(datos):
-                resultado = procesar_item(item, i, log)
-                if resultado:
-                    archivos_descargados += 1
-                total_archivos += 1
+        # Paso 2: ejecutar cada entrada una sola vez
+        for entrada in entradas:
+            estado = ejecutar_entrada(entrada, anteriores.get(entrada["origen"]), log)
+            conteo[estado] = conteo.get(estado, 0) + 1
+        guardar_manifiesto(entradas)
         
-        # Si datos es un diccionario
-        elif isinstance(datos, dict):
-            print("Procesando diccionario...")
-            
-            # Caso especial: si contiene una lista de URLs directamente
-            if "urls" in datos and isinstance(datos["urls"], list):
-                print(f"Encontrada lista de URLs bajo clave 'urls': {len(datos['urls'])} elementos")
-                for i, url in enumerate(datos["urls"]):
-                    if isinstance(url, str) and url.startswith("http"):
-                        nombre = os.path.basename(urlparse(url).path)
-                        if not nombre or nombre == "":
-                            nombre = f"archivo_{i}.pdf"
-                        ruta_destino = os.path.join("salud", nombre)
-                        exito = descargar_archivo(url, ruta_destino)
-                        
-                        if exito:
-                            log.write(f"Archivo descargado: {nombre} desde {url}\n")
-                            archivos_descargados += 1
-                        total_archivos += 1
-            
-            # Caso 1: diccionario con archivos como valores
-            for key, item in datos.items():
-                if isinstance(item, str):
-                    # Es probablemente una URL o ruta de archivo
-                    if item.startswith("http"):
-                        print(f"Procesando URL: {key} -> {item}")
-                        nombre_archivo = os.path.basename(urlparse(item).path)
-                        if not nombre_archivo or nombre_archivo == "":
-                            nombre_archivo = f"{key}.pdf"
-                        ruta_destino = os.path.join("salud", nombre_archivo)
-                        
-                        exito = descargar_archivo(item, ruta_destino)
-                        
-                        if exito:
-                            log.write(f"Archivo descargado: {nombre_archivo} desde {item}\n")
-                            archivos_descargados += 1
-                        total_archivos += 1
-                    elif item.endswith(".pdf"):
-                        print(f"Procesando archivo local: {key} -> {item}")
-                        nombre_archivo = key if key.endswith(".pdf") else f"{key}.pdf"
-                        ruta_destino = os.path.join("salud", nombre_archivo)
-                        
-                        # Copiar archivo local
-                        try:
-                            shutil.copy2(item, ruta_destino)
-                            log.write(f"Archivo copiado: {nombre_archivo} desde {item}\n")
-                            archivos_descargados += 1
-                            print(f"✓ Copiado con éxito: {ruta_destino}")
-                        except Exception as e:
-                            log.write(f"Error al copiar {item}: {str(e)}\n")
-                            print(f"✗ Error al copiar {item}: {str(e)}")
-                        
-                        total_archivos += 1
-            
-            # Caso 2: diccionario con estructura más compleja
-            if "archivos" in datos:
-                archivos = datos["archivos"]
-                if isinstance(archivos, list):
-                    print(f"Procesando lista de archivos: {len(archivos)} elementos")
-                    for archivo in archivos:
-                        if isinstance(archivo, dict) and "url" in archivo:
-                            url = archivo["url"]
-                            nombre = archivo.get("nombre", os.path.basename(urlparse(url).path))
-                            if not nombre or nombre == "":
-                                nombre = f"archivo_{total_archivos}.pdf"
-                            
-                            ruta_destino = os.path.join("salud", nombre)
-                            exito = descargar_archivo(url, ruta_destino)
-                            
-                            if exito:
-                                log.write(f"Archivo descargado: {nombre} desde {url}\n")
-                                archivos_descargados += 1
-                            total_archivos += 1
-                else:
-                    print(f"La clave 'archivos' no contiene una lista, sino: {type(archivos).__name__}")
-            
+        if isinstance(datos, dict):
             # También guardar el JSON original en la carpeta
             with open(os.path.join("salud", "datos_salud.json"), "w", encoding="utf-8") as f:
                 json.dump(datos, f, indent=2, ensure_ascii=False)
                 log.write("Archivo datos_salud.json guardado\n")
                 print("✓ Archivo datos_salud.json guardado")
         
-        # Buscar en cualquier estructura para URLs
-        urls_encontradas = buscar_urls_recursivamente(datos)
-        if urls_encontradas:
-            print(f"Se encontraron {len(urls_encontradas)} URLs en la estructura completa")
-            for i, url in enumerate(urls_encontradas):
-                nombre = os.path.basename(urlparse(url).path)
-                if not nombre or nombre == "":
-                    nombre = f"encontrado_{i}.pdf"
-                ruta_destino = os.path.join("salud", nombre)
-                
-                exito = descargar_archivo(url, ruta_destino)
-                if exito:
-                    log.write(f"URL encontrada descargada: {nombre} desde {url}\n")
-                    archivos_descargados += 1
-                total_archivos += 1
-        
+        guardados = len(entradas) - conteo.get("error", 0)
         log.write(f"\nExtracción finalizada: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        log.write(f"Total de archivos procesados: {total_archivos}\n")
-        log.write(f"Archivos guardados correctamente: {archivos_descargados}\n")
-    
-    print(f"\nProceso completado. Se procesaron {total_archivos} archivos.")
-    print(f"Se guardaron {archivos_descargados} archivos en la carpeta 'salud'.")
-    print(f"Detalles guardados en {log_file}")
-
-def buscar_urls_recursivamente(datos, ya_encontrados=None):
-    """Busca recursivamente cualquier URL en la estructura de datos"""
-    if ya_encontrados is None:
-        ya_encontrados = set()
-    
-    if isinstance(datos, str):
-        if datos.startswith("http") and datos not in ya_encontrados:
-            ya_encontrados.add(datos)
-    elif isinstance(datos, dict):
-        for key, value in datos.items():
-            buscar_urls_recursivamente(value, ya_encontrados)
-    elif isinstance(datos, list):
-        for item in datos:
-            buscar_urls_recursivamente(item, ya_encontrados)
-    
-    return list(ya_encontrados)
-
-def procesar_item(item, indice, log):
-    """Procesa un elemento individual del JSON"""
-    if isinstance(item, dict):
-        # Si el elemento tiene una URL directa
-        if "url" in item:
-            url = item["url"]
-            nombre = item.get("nombre", os.path.basename(urlparse(url).path))
-            if not nombre or nombre == "":
-                nombre = f"archivo_{indice}.pdf"
-            
-            ruta_destino = os.path.join("salud", nombre)
-            exito = descargar_archivo(url, ruta_destino)
-            
-            if exito:
-                log.write(f"Archivo descargado: {nombre} desde {url}\n")
-                return True
-        
-        # Si el elemento tiene datos para guardar en un archivo
-        elif "contenido" in item:
-            nombre = item.get("nombre", f"contenido_{indice}.txt")
-            ruta_destino = os.path.join("salud", nombre)
-            
-            try:
-                with open(ruta_destino, "w", encoding="utf-8") as f:
-                    f.write(str(item["contenido"]))
-                log.write(f"Contenido guardado en: {nombre}\n")
-                print(f"✓ Contenido guardado en: {nombre}")
-                return True
-            except Exception as e:
-                log.write(f"Error al guardar contenido en {nombre}: {str(e)}\n")
-                print(f"✗ Error al guardar contenido en {nombre}: {str(e)}")
-                return False
-    
-    # Si el elemento es una cadena (podría ser una URL directa)
-    elif isinstance(item, str) and item.startswith("http"):
-        nombre = os.path.basename(urlparse(item).path)
-        if not nombre or nombre == "":
-            nombre = f"archivo_{indice}.pdf"
-        
-        ruta_destino = os.path.join("salud", nombre)
-        exito = descargar_archivo(item, ruta_destino)
-        
-        if exito:
-            log.write(f"Archivo descargado: {nombre} desde {item}\n")
-            return True
+        log.write(f"Total de archivos procesados: {len(entradas)}\n")
+        log.write(f"Archivos guardados correctamente: {guardados}\n")
+        log.write(f"Detalle: {json.dumps(conteo, ensure_ascii=False)}\n")
     
-    return False
+    print(f"\nProceso completado. Se procesaron {len(entradas)} archivos.")
+    print(f"Se guardaron {guardados} archivos en la carpeta 'salud' "
+          f"({conteo.get('descargado', 0)} descargados, {conteo.get('sin_cambios', 0)} sin cambios).")
+    print(f"Detalles guardados en {log_file}; manifiesto en {MANIFIESTO}")
 
 def mostrar_contenido_salud_json():
     """Muestra las primeras líneas del archivo salud.json para diagnóstico"""
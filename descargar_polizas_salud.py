@@ -1,9 +1,25 @@
 import json
 import requests
 import os
+import sys
+import random
+import argparse
+import threading
 import urllib.parse
 from pathlib import Path
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from sesiones_http import crear_sesion, obtener_sesion
+
+# Concurrencia por defecto del modo masivo (configurable por entorno o argumentos)
+CONCURRENCIA = int(os.environ.get("PRISMA_DESCARGA_CONCURRENCIA", "8"))
+CONCURRENCIA_POR_HOST = int(os.environ.get("PRISMA_DESCARGA_POR_HOST", "4"))
+# Respuestas con las que el servidor pide bajar el ritmo
+STATUS_SATURACION = (429, 503)
+INTENTOS_SATURACION = 5
+PAUSA_MINIMA = 1.0
+PAUSA_MAXIMA = 60.0
 
 def crear_carpeta_si_no_existe(carpeta):
     """Crea una carpeta si no existe."""
@@ -25,6 +41,35 @@ def obtener_nombre_archivo(url):
     
     return nombre_archivo
 
+def asignar_nombres(uris):
+    """
+    Quita las URIs repetidas y asigna a cada una su archivo de destino.
+    
+    Si dos URIs distintas producen el mismo nombre (misma ruta final en otro host o
+    carpeta), la segunda recibe un sufijo (`poliza_2.pdf`) en lugar de compartir el
+    archivo y su `.part` con la primera.
+    
+    Args:
+        uris: Lista de URLs (puede tener repetidas)
+    
+    Returns:
+        dict: {uri: nombre de archivo}, en el orden en que aparecen
+    """
+    destinos = {}
+    usados = set()
+    for uri in uris:
+        if uri in destinos:
+            continue
+        nombre = obtener_nombre_archivo(uri)
+        base, extension = os.path.splitext(nombre)
+        candidato, n = nombre, 2
+        while candidato in usados:
+            candidato = f"{base}_{n}{extension}"
+            n += 1
+        usados.add(candidato)
+        destinos[uri] = candidato
+    return destinos
+
 def descargar_archivo(url, carpeta_destino):
     """Descarga un archivo desde una URL y lo guarda en la carpeta de destino."""
     try:
@@ -34,14 +79,15 @@ def descargar_archivo(url, carpeta_destino):
         
         # Realizar la solicitud HTTP
         print(f"Descargando: {url}")
-        respuesta = requests.get(url, stream=True, timeout=30)
-        respuesta.raise_for_status()  # Verificar si hubo errores en la descarga
-        
-        # Guardar el archivo
-        with open(ruta_destino, 'wb') as archivo:
-            for chunk in respuesta.iter_content(chunk_size=8192):
-                if chunk:
-                    archivo.write(chunk)
+        # Sesión compartida: reutiliza la conexión y reintenta ante errores 5xx
+        with obtener_sesion().get(url, stream=True, timeout=30) as respuesta:
+            respuesta.raise_for_status()  # Verificar si hubo errores en la descarga
+            
+            # Guardar el archivo
+            with open(ruta_destino, 'wb') as archivo:
+                for chunk in respuesta.iter_content(chunk_size=8192):
+                    if chunk:
+                        archivo.write(chunk)
         
         print(f"Archivo guardado como: {ruta_destino}")
         return True
@@ -49,10 +95,253 @@ def descargar_archivo(url, carpeta_destino):
         print(f"Error al descargar {url}: {e}")
         return False
 
-def main():
+def extraer_uris(datos):
+    """Extrae las URIs de PDFs del contenido de salud.json (lista, diccionario o texto libre)."""
+    # Asumimos que las URIs pueden estar en diferentes formatos/estructuras en el JSON
+    # Esta parte puede necesitar ajustes según la estructura real del archivo
+    uris = []
+    
+    # Si datos es una lista
+    if isinstance(datos, list):
+        for item in datos:
+            if isinstance(item, dict) and 'uri' in item:
+                uris.append(item['uri'])
+            elif isinstance(item, str) and (item.startswith('http') or item.startswith('https')):
+                uris.append(item)
+    
+    # Si datos es un diccionario
+    elif isinstance(datos, dict):
+        # Buscar URIs en keys específicas como 'uris', 'links', 'urls', etc.
+        for key in ['uris', 'urls', 'links', 'documentos']:
+            if key in datos and isinstance(datos[key], list):
+                for item in datos[key]:
+                    if isinstance(item, dict) and 'uri' in item:
+                        uris.append(item['uri'])
+                    elif isinstance(item, str) and (item.startswith('http') or item.startswith('https')):
+                        uris.append(item)
+        
+        # Revisar todos los valores del diccionario
+        for key, value in datos.items():
+            if isinstance(value, str) and (value.startswith('http') or value.startswith('https')):
+                uris.append(value)
+    
+    # Si no se encontraron URIs en los formatos anteriores, intentar otras estrategias
+    if not uris:
+        print("No se encontraron URIs en el formato esperado. Intentando buscar en todo el JSON...")
+        
+        # Convertir todo el JSON a string y buscar patrones de URLs
+        import re
+        json_str = json.dumps(datos)
+        # Patron para URLs que comienzan con http o https
+        url_pattern = r'https?://[^\s,\'"]+\.(?:pdf|PDF)'
+        uris = re.findall(url_pattern, json_str)
+    
+    return uris
+
+class ControlHost:
+    """
+    Limita las descargas simultáneas a un host y se frena cuando el servidor lo pide.
+    
+    Ante un 429/503 el host entero se pausa: `Retry-After` si el servidor lo envía,
+    o una espera que se duplica con cada saturación consecutiva (con jitter, entre
+    PAUSA_MINIMA y PAUSA_MAXIMA). Cada descarga exitosa reduce la espera a la mitad.
+    """
+    
+    def __init__(self, limite):
+        self.semaforo = threading.BoundedSemaphore(max(1, limite))
+        self.pausa = 0.0
+        self.reanudar_en = 0.0
+        self.saturaciones = 0
+        self._lock = threading.Lock()
+    
+    def esperar(self):
+        """Bloquea mientras el host esté en pausa."""
+        while True:
+            with self._lock:
+                restante = self.reanudar_en - time.monotonic()
+            if restante <= 0:
+                return
+            time.sleep(restante)
+    
+    def saturado(self, retry_after=None):
+        """Registra un 429/503 y devuelve los segundos de pausa del host."""
+        with self._lock:
+            self.saturaciones += 1
+            self.pausa = min(PAUSA_MAXIMA, max(PAUSA_MINIMA, self.pausa * 2))
+            espera = retry_after if retry_after is not None else max(PAUSA_MINIMA, self.pausa * random.uniform(0.5, 1.0))
+            espera = min(PAUSA_MAXIMA, espera)
+            self.reanudar_en = max(self.reanudar_en, time.monotonic() + espera)
+            return espera
+    
+    def exito(self):
+        with self._lock:
+            self.pausa = self.pausa / 2 if self.pausa > PAUSA_MINIMA else 0.0
+
+class Progreso:
+    """Contadores de la descarga masiva con velocidad en archivos/s y bytes/s."""
+    
+    def __init__(self, total, intervalo=2.0):
+        self.total = total
+        self.intervalo = intervalo
+        self.completados = 0
+        self.exitos = 0
+        self.errores = 0
+        self.bytes = 0
+        self.inicio = time.monotonic()
+        self._ultimo_reporte = self.inicio
+        self._lock = threading.Lock()
+    
+    def registrar(self, ok, tamano):
+        with self._lock:
+            self.completados += 1
+            self.bytes += tamano
+            if ok:
+                self.exitos += 1
+            else:
+                self.errores += 1
+            ahora = time.monotonic()
+            reportar = ahora - self._ultimo_reporte >= self.intervalo or self.completados == self.total
+            if reportar:
+                self._ultimo_reporte = ahora
+        if reportar:
+            print(self.linea())
+    
+    def resumen(self):
+        with self._lock:
+            transcurrido = max(time.monotonic() - self.inicio, 1e-6)
+            return {
+                "total": self.total,
+                "completados": self.completados,
+                "exitos": self.exitos,
+                "errores": self.errores,
+                "bytes": self.bytes,
+                "segundos": round(transcurrido, 2),
+                "archivos_por_segundo": round(self.completados / transcurrido, 2),
+                "bytes_por_segundo": round(self.bytes / transcurrido),
+            }
+    
+    def linea(self):
+        r = self.resumen()
+        return (f"[{r['completados']}/{r['total']}] {r['exitos']} ok, {r['errores']} errores | "
+                f"{r['archivos_por_segundo']:.2f} archivos/s | {r['bytes_por_segundo'] / (1024 * 1024):.2f} MB/s")
+
+def _retry_after(respuesta):
+    """Segundos del encabezado Retry-After (solo la forma numérica)."""
+    valor = (respuesta.headers.get("Retry-After") or "").strip()
+    return float(valor) if valor.isdigit() else None
+
+def descargar_con_control(url, carpeta_destino, sesion, control, nombre_archivo=None):
+    """
+    Descarga un archivo respetando el límite y las pausas de su host.
+    
+    Args:
+        url: URL del archivo
+        carpeta_destino: Carpeta donde se guarda
+        sesion: Sesión HTTP (sin reintentos de 429/503, que se manejan aquí)
+        control: ControlHost del host de la URL
+        nombre_archivo: Nombre del archivo (por defecto, el de la URL; ver asignar_nombres)
+    
+    Returns:
+        tuple: (éxito, bytes descargados, mensaje de error o None)
+    """
+    ruta_destino = os.path.join(carpeta_destino, nombre_archivo or obtener_nombre_archivo(url))
+    ruta_parcial = ruta_destino + ".part"
+    error = None
+    for intento in range(1, INTENTOS_SATURACION + 1):
+        with control.semaforo:
+            control.esperar()
+            try:
+                with sesion.get(url, stream=True, timeout=30) as respuesta:
+                    if respuesta.status_code in STATUS_SATURACION:
+                        espera = control.saturado(_retry_after(respuesta))
+                        error = f"HTTP {respuesta.status_code}"
+                        print(f"{url}: {error}, pausa del host {espera:.1f}s (intento {intento}/{INTENTOS_SATURACION})")
+                        continue
+                    respuesta.raise_for_status()
+                    tamano = 0
+                    # Se escribe a un .part y se renombra al terminar: no quedan archivos truncados
+                    with open(ruta_parcial, 'wb') as archivo:
+                        for chunk in respuesta.iter_content(chunk_size=64 * 1024):
+                            if chunk:
+                                archivo.write(chunk)
+                                tamano += len(chunk)
+                    os.replace(ruta_parcial, ruta_destino)
+                control.exito()
+                return True, tamano, None
+            except (requests.exceptions.RequestException, OSError) as e:
+                if os.path.exists(ruta_parcial):
+                    os.remove(ruta_parcial)
+                return False, 0, str(e)
+    return False, 0, error
+
+def descargar_concurrente(uris, carpeta_destino, concurrencia=CONCURRENCIA, por_host=CONCURRENCIA_POR_HOST,
+                          intervalo_progreso=2.0):
+    """
+    Descarga varias URIs en paralelo con límite global y por host.
+    
+    Cada URI se descarga una sola vez; los nombres repetidos reciben un sufijo.
+    
+    Args:
+        uris: Lista de URLs
+        carpeta_destino: Carpeta donde se guardan los archivos
+        concurrencia: Descargas simultáneas en total
+        por_host: Descargas simultáneas por host
+        intervalo_progreso: Segundos entre líneas de progreso
+    
+    Returns:
+        dict: Resumen (éxitos, errores, bytes, archivos/s, bytes/s, URIs repetidas, fallidos,
+            archivos guardados por URI y saturaciones por host)
+    """
+    # Una sola sesión para el lote: una conexión keep-alive por descarga simultánea a cada host.
+    # 429/503 no se reintentan en la sesión: los maneja ControlHost pausando todo el host.
+    sesion = crear_sesion(conexiones_por_host=por_host, status_reintentables=(500, 502, 504))
+    destinos = asignar_nombres(uris)
+    controles = {}
+    for uri in destinos:
+        host = urllib.parse.urlparse(uri).netloc
+        if host not in controles:
+            controles[host] = ControlHost(por_host)
+    
+    progreso = Progreso(len(destinos), intervalo=intervalo_progreso)
+    fallidos = []
+    
+    def tarea(uri):
+        ok, tamano, error = descargar_con_control(uri, carpeta_destino, sesion,
+                                                  controles[urllib.parse.urlparse(uri).netloc], destinos[uri])
+        progreso.registrar(ok, tamano)
+        return uri, ok, error
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrencia), thread_name_prefix="descarga") as pool:
+            for futuro in as_completed([pool.submit(tarea, uri) for uri in destinos]):
+                uri, ok, error = futuro.result()
+                if not ok:
+                    print(f"Error al descargar {uri}: {error}")
+                    fallidos.append({"uri": uri, "error": error})
+    finally:
+        sesion.close()
+    
+    resumen = progreso.resumen()
+    resumen["repetidas"] = len(uris) - len(destinos)
+    resumen["fallidos"] = fallidos
+    resumen["archivos"] = destinos
+    resumen["saturaciones"] = {host: c.saturaciones for host, c in controles.items() if c.saturaciones}
+    return resumen
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Descarga las pólizas de salud listadas en un archivo JSON")
+    parser.add_argument("archivo_json", nargs="?", default="salud.json", help="Archivo JSON con las URIs")
+    parser.add_argument("-d", "--destino", default="polizas-salud", help="Carpeta de destino")
+    parser.add_argument("-j", "--concurrencia", type=int, default=CONCURRENCIA,
+                        help="Descargas simultáneas en total (PRISMA_DESCARGA_CONCURRENCIA)")
+    parser.add_argument("--por-host", type=int, default=CONCURRENCIA_POR_HOST,
+                        help="Descargas simultáneas por host (PRISMA_DESCARGA_POR_HOST)")
+    parser.add_argument("--json", dest="salida_json", help="Guardar el resumen en este archivo")
+    args = parser.parse_args(argv)
+    
     # Configuración
-    archivo_json = "salud.json"
-    carpeta_destino = "polizas-salud"
+    archivo_json = args.archivo_json
+    carpeta_destino = args.destino
     
     # Crear la carpeta de destino si no existe
     crear_carpeta_si_no_existe(carpeta_destino)
@@ -65,61 +354,27 @@ def main():
         # Verificar si hay datos y extraer las URIs
         if not datos:
             print(f"El archivo {archivo_json} está vacío o no contiene datos válidos.")
-            return
+            return 1
         
-        # Extraer las URIs del archivo JSON
-        # Asumimos que las URIs pueden estar en diferentes formatos/estructuras en el JSON
-        # Esta parte puede necesitar ajustes según la estructura real del archivo
-        uris = []
-        
-        # Si datos es una lista
-        if isinstance(datos, list):
-            for item in datos:
-                if isinstance(item, dict) and 'uri' in item:
-                    uris.append(item['uri'])
-                elif isinstance(item, str) and (item.startswith('http') or item.startswith('https')):
-                    uris.append(item)
-        
-        # Si datos es un diccionario
-        elif isinstance(datos, dict):
-            # Buscar URIs en keys específicas como 'uris', 'links', 'urls', etc.
-            for key in ['uris', 'urls', 'links', 'documentos']:
-                if key in datos and isinstance(datos[key], list):
-                    for item in datos[key]:
-                        if isinstance(item, dict) and 'uri' in item:
-                            uris.append(item['uri'])
-                        elif isinstance(item, str) and (item.startswith('http') or item.startswith('https')):
-                            uris.append(item)
-            
-            # Revisar todos los valores del diccionario
-            for key, value in datos.items():
-                if isinstance(value, str) and (value.startswith('http') or value.startswith('https')):
-                    uris.append(value)
-        
-        # Si no se encontraron URIs en los formatos anteriores, intentar otras estrategias
-        if not uris:
-            print("No se encontraron URIs en el formato esperado. Intentando buscar en todo el JSON...")
-            
-            # Convertir todo el JSON a string y buscar patrones de URLs
-            import re
-            json_str = json.dumps(datos)
-            # Patron para URLs que comienzan con http o https
-            url_pattern = r'https?://[^\s,\'"]+\.(?:pdf|PDF)'
-            uris = re.findall(url_pattern, json_str)
+        uris = extraer_uris(datos)
         
         # Descargar archivos
         if uris:
-            print(f"Se encontraron {len(uris)} URIs para descargar.")
-            exitos = 0
-            for i, uri in enumerate(uris, 1):
-                print(f"\nDescargando archivo {i} de {len(uris)}")
-                if descargar_archivo(uri, carpeta_destino):
-                    exitos += 1
-                # Pequeña pausa entre descargas para no sobrecargar el servidor
-                if i < len(uris):
-                    time.sleep(1)
+            print(f"Se encontraron {len(uris)} URIs para descargar "
+                  f"({args.concurrencia} simultáneas, {args.por_host} por host).")
+            resumen = descargar_concurrente(uris, carpeta_destino, args.concurrencia, args.por_host)
             
-            print(f"\nProceso completado. Se descargaron {exitos} de {len(uris)} archivos.")
+            print(f"\nProceso completado. Se descargaron {resumen['exitos']} de {resumen['total']} archivos "
+                  f"en {resumen['segundos']}s ({resumen['archivos_por_segundo']} archivos/s, "
+                  f"{resumen['bytes_por_segundo'] / (1024 * 1024):.2f} MB/s).")
+            if resumen["repetidas"]:
+                print(f"URIs repetidas (descargadas una sola vez): {resumen['repetidas']}")
+            if resumen["saturaciones"]:
+                print(f"Respuestas 429/503 por host: {resumen['saturaciones']}")
+            if args.salida_json:
+                with open(args.salida_json, 'w', encoding='utf-8') as f:
+                    json.dump(resumen, f, indent=2, ensure_ascii=False)
+            return 0 if not resumen["fallidos"] else 1
         else:
             print("No se encontraron URIs para descargar en el archivo JSON.")
     
@@ -129,6 +384,7 @@ def main():
         print(f"No se encontró el archivo {archivo_json}. Verifica la ruta e intenta nuevamente.")
     except Exception as e:
         print(f"Error inesperado: {e}")
+    return 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
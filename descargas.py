@@ -0,0 +1,215 @@
+import io
+import os
+import time
+import hashlib
+import logging
+import tempfile
+from typing import Dict, Optional
+
+import requests
+
+import metricas
+from sesiones_http import obtener_sesion
+
+logger = logging.getLogger(__name__)
+
+# Límites por defecto (configurables por entorno)
+MAX_BYTES = int(os.environ.get("PRISMA_DESCARGA_MAX_BYTES", str(50 * 1024 * 1024)))
+UMBRAL_MEMORIA = int(os.environ.get("PRISMA_DESCARGA_UMBRAL_MEMORIA", str(8 * 1024 * 1024)))
+TIMEOUT = float(os.environ.get("PRISMA_DESCARGA_TIMEOUT", "30"))
+
+TAM_BLOQUE = 64 * 1024
+# El encabezado %PDF- debe aparecer en los primeros 1024 bytes (como aceptan los lectores de PDF)
+VENTANA_MAGIC = 1024
+MAGIC_PDF = b"%PDF-"
+
+
+class ErrorDescarga(Exception):
+    """Error al descargar un PDF (HTTP, tamaño, tiempo o contenido no PDF)."""
+
+
+class DescargaPDF:
+    """
+    Contenido de un PDF descargado.
+
+    Se mantiene en memoria mientras no supere `umbral_memoria`; por encima se
+    vuelca a un archivo temporal y se sigue escribiendo ahí. El SHA-256 se
+    calcula mientras llegan los bloques, de modo que la cache puede consultarse
+    sin volver a leer el contenido.
+
+    Usar como context manager (o llamar `cerrar()`) para borrar el temporal.
+    """
+
+    def __init__(self, url: str, umbral_memoria: int = UMBRAL_MEMORIA, directorio: Optional[str] = None):
+        self.url = url
+        self.umbral_memoria = umbral_memoria
+        self.directorio = directorio
+        self.tamano = 0
+        self.content_type = ""
+        self.ruta: Optional[str] = None
+        self._memoria: Optional[io.BytesIO] = io.BytesIO()
+        self._archivo = None
+        self._hash = hashlib.sha256()
+        self._sha256: Optional[str] = None
+
+    def __enter__(self) -> "DescargaPDF":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+    @property
+    def en_disco(self) -> bool:
+        return self.ruta is not None
+
+    @property
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            self._sha256 = self._hash.hexdigest()
+        return self._sha256
+
+    def escribir(self, bloque: bytes) -> None:
+        self._hash.update(bloque)
+        self.tamano += len(bloque)
+        if self._archivo is None and self.tamano > self.umbral_memoria:
+            # Volcar lo acumulado en memoria a un temporal y continuar en disco
+            self._archivo = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf", dir=self.directorio)
+            self.ruta = self._archivo.name
+            self._archivo.write(self._memoria.getvalue())
+            self._memoria = None
+            logger.debug(f"Descarga de {self.url} volcada a disco en {self.ruta}")
+        if self._archivo is not None:
+            self._archivo.write(bloque)
+        else:
+            self._memoria.write(bloque)
+
+    def terminar(self) -> None:
+        """Cierra la escritura (el archivo en disco queda listo para leerse)."""
+        if self._archivo is not None and not self._archivo.closed:
+            self._archivo.close()
+
+    def leer(self) -> bytes:
+        """Contenido completo (lo lee del disco si se volcó)."""
+        if self.ruta is not None:
+            self.terminar()
+            with open(self.ruta, "rb") as f:
+                return f.read()
+        return self._memoria.getvalue()
+
+    def a_archivo(self, sufijo: str = ".pdf") -> str:
+        """
+        Devuelve una ruta en disco con el contenido; quien llama pasa a ser dueño del archivo.
+
+        Si la descarga ya estaba en disco se entrega ese mismo archivo (sin copiarlo).
+        """
+        if self.ruta is not None:
+            self.terminar()
+            ruta, self.ruta = self.ruta, None
+            self._memoria = io.BytesIO()
+            return ruta
+        with tempfile.NamedTemporaryFile(delete=False, suffix=sufijo, dir=self.directorio) as f:
+            f.write(self._memoria.getvalue())
+            return f.name
+
+    def cerrar(self) -> None:
+        self.terminar()
+        if self.ruta is not None:
+            try:
+                os.remove(self.ruta)
+            except OSError:
+                pass
+            self.ruta = None
+        self._memoria = None
+
+
+def _verificar_magic(inicio: bytes, url: str) -> None:
+    if MAGIC_PDF not in inicio[:VENTANA_MAGIC]:
+        raise ErrorDescarga(f"El archivo descargado de {url} no es un PDF válido")
+
+
+def descargar_pdf(url: str, timeout: float = TIMEOUT, max_bytes: int = MAX_BYTES,
+                  umbral_memoria: int = UMBRAL_MEMORIA, sesion: Optional[requests.Session] = None,
+                  headers: Optional[Dict[str, str]] = None, directorio: Optional[str] = None) -> DescargaPDF:
+    """
+    Descarga un PDF por streaming con límite de tamaño y de tiempo.
+
+    Args:
+        url: URL del PDF
+        timeout: Segundos máximos para toda la descarga (también se usa como timeout de conexión/lectura)
+        max_bytes: Tamaño máximo aceptado (0 = sin límite)
+        umbral_memoria: Bytes a partir de los cuales el contenido se vuelca a disco
+        sesion: Sesión de requests a usar (por defecto la compartida de `sesiones_http`)
+        headers: Encabezados adicionales
+        directorio: Directorio para el temporal (por defecto el del sistema)
+
+    Returns:
+        DescargaPDF: Contenido descargado, con su SHA-256 y tamaño
+
+    Raises:
+        ErrorDescarga: Si la respuesta HTTP falla, se excede el tamaño o el tiempo,
+            o el contenido no empieza como un PDF
+    """
+    cliente = sesion or obtener_sesion()
+    encabezados = {"Accept": "application/pdf"}
+    encabezados.update(headers or {})
+    limite = time.monotonic() + timeout
+
+    try:
+        response = cliente.get(url, headers=encabezados, timeout=timeout, stream=True)
+    except requests.RequestException as e:
+        metricas.descargas.inc(resultado="error")
+        raise ErrorDescarga(f"No se pudo descargar {url}: {str(e)}") from e
+
+    descarga = DescargaPDF(url, umbral_memoria=umbral_memoria, directorio=directorio)
+    try:
+        with response:
+            try:
+                response.raise_for_status()
+            except requests.HTTPError as e:
+                raise ErrorDescarga(f"Error HTTP {response.status_code} al descargar {url}") from e
+            descarga.content_type = response.headers.get("Content-Type", "")
+
+            declarado = response.headers.get("Content-Length")
+            if max_bytes and declarado and declarado.isdigit() and int(declarado) > max_bytes:
+                raise ErrorDescarga(f"El PDF excede el tamaño máximo ({int(declarado)} > {max_bytes} bytes)")
+
+            inicio = b""
+            magic_verificado = False
+            for bloque in response.iter_content(chunk_size=TAM_BLOQUE):
+                if not bloque:
+                    continue
+                if not magic_verificado:
+                    inicio += bloque
+                    if len(inicio) < VENTANA_MAGIC:
+                        continue
+                    _verificar_magic(inicio, url)
+                    magic_verificado = True
+                    bloque, inicio = inicio, b""
+                descarga.escribir(bloque)
+                if max_bytes and descarga.tamano > max_bytes:
+                    raise ErrorDescarga(f"El PDF excede el tamaño máximo ({max_bytes} bytes)")
+                if time.monotonic() > limite:
+                    raise ErrorDescarga(f"Tiempo de descarga agotado ({timeout:g}s) para {url}")
+            if not magic_verificado:
+                # Archivo más corto que la ventana de verificación
+                _verificar_magic(inicio, url)
+                descarga.escribir(inicio)
+                if max_bytes and descarga.tamano > max_bytes:
+                    raise ErrorDescarga(f"El PDF excede el tamaño máximo ({max_bytes} bytes)")
+        descarga.terminar()
+    except requests.RequestException as e:
+        descarga.cerrar()
+        metricas.descargas.inc(resultado="error")
+        metricas.bytes_descargados.inc(descarga.tamano)
+        raise ErrorDescarga(f"Error durante la descarga de {url}: {str(e)}") from e
+    except Exception:
+        descarga.cerrar()
+        metricas.descargas.inc(resultado="error")
+        metricas.bytes_descargados.inc(descarga.tamano)
+        raise
+
+    metricas.descargas.inc(resultado="ok")
+    metricas.bytes_descargados.inc(descarga.tamano)
+
+    logger.info(f"Descargado {url}: {descarga.tamano} bytes ({'disco' if descarga.en_disco else 'memoria'}, {descarga.sha256[:12]})")
+    return descarga
@@ -4,13 +4,12 @@ import re
 import json
 import logging
 import argparse
-import fitz  # PyMuPDF
 from datetime import datetime
 import glob
 from pathlib import Path
 from typing import Dict, Union, Optional
-from PyPDF2 import PdfReader
-import subprocess # Importar subprocess
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro
 
 # Configurar logging
 logging.basicConfig(
@@ -27,7 +26,7 @@ def normalizar_numero(valor: str) -> float:
     """
     try:
         # Eliminar símbolos de moneda y espacios
-        valor = re.sub(r'[$\\s,]', '', valor)
+        valor = registro.sub(r'[$\\s,]', '', valor)
         # Manejar el caso de números que ya tienen punto decimal pero también comas (ej. "1,234.56")
         # La línea anterior ya elimina las comas, así que solo convertimos a float
         return float(valor)
@@ -41,26 +40,26 @@ def detectar_formato(texto_pdf):
     Retorna un identificador de formato.
     """
     # Formato 1: Valores en línea (etiqueta, espacios, número)
-    if re.search(r'Prima\\s+neta\\s+\\d', texto_pdf):
+    if registro.search(r'Prima\\s+neta\\s+\\d', texto_pdf):
         logging.debug("Detectado: FORMATO_LINEAL")
         return "FORMATO_LINEAL"
     
     # Formato 2/3: Etiquetas y valores en líneas separadas (etiqueta, newline, espacios opcionales, número)
     # O el formato vertical específico O_6731931
-    if (re.search(r'Prima\\s+neta\\s*\\n\\s*\\d', texto_pdf) or 
-        re.search(r'Prima neta\\s*\\nTasa de financiamiento\\s*\\nGastos por expedición\\s*\\nI\\.V\\.A\\.\\s*\\nPrecio total\\s*\\n', texto_pdf, re.MULTILINE)):
+    if (registro.search(r'Prima\\s+neta\\s*\\n\\s*\\d', texto_pdf) or 
+        registro.search(r'Prima neta\\s*\\nTasa de financiamiento\\s*\\nGastos por expedición\\s*\\nI\\.V\\.A\\.\\s*\\nPrecio total\\s*\\n', texto_pdf, re.MULTILINE)):
         logging.debug("Detectado: FORMATO_VERTICAL")
         return "FORMATO_VERTICAL"
     
     # Formato 4: Con tabla previa de coberturas (puede tener luego formato lineal o vertical)
     # Solo detectamos la presencia de la tabla, la lógica de extracción decidirá después
-    if re.search(r'Coberturas\\s+amparadas[\\s\\S]*Suma\\s+asegurada[\\s\\S]*Deducible[\\s\\S]*Prima', texto_pdf):
+    if registro.search(r'Coberturas\\s+amparadas[\\s\\S]*Suma\\s+asegurada[\\s\\S]*Deducible[\\s\\S]*Prima', texto_pdf):
         logging.debug("Detectado: FORMATO_TABLA (puede ser lineal o vertical después)")
         # Podríamos retornar "FORMATO_TABLA_LINEAL" o "FORMATO_TABLA_VERTICAL" si refinamos más
         # Por ahora, trataremos TABLA como un posible LINEAL o VERTICAL en la lógica principal
-        if re.search(r'Prima\\s+neta\\s+\\d', texto_pdf):
+        if registro.search(r'Prima\\s+neta\\s+\\d', texto_pdf):
              return "FORMATO_LINEAL" # Tabla seguida de formato lineal
-        elif re.search(r'Prima\\s+neta\\s*\\n\\s*\\d', texto_pdf):
+        elif registro.search(r'Prima\\s+neta\\s*\\n\\s*\\d', texto_pdf):
              return "FORMATO_VERTICAL" # Tabla seguida de formato vertical
 
     logging.debug("Detectado: FORMATO_DESCONOCIDO")
@@ -100,7 +99,7 @@ def extraer_desde_texto_crudo(texto_crudo):
         )
         # --- Fin de la modificación ---
                                
-        match_bloque = re.search(patron_bloque_vertical, texto_crudo, re.IGNORECASE | re.MULTILINE)
+        match_bloque = registro.search(patron_bloque_vertical, texto_crudo, re.IGNORECASE | re.MULTILINE)
         
         if match_bloque:
             logging.info("Texto Crudo - Encontrado bloque vertical completo.")
@@ -130,7 +129,7 @@ def extraer_desde_texto_crudo(texto_crudo):
                 
                 # Buscar la línea donde aparece la etiqueta
                 for i, linea in enumerate(lineas):
-                    if re.search(data['etiqueta'], linea, re.IGNORECASE):
+                    if registro.search(data['etiqueta'], linea, re.IGNORECASE):
                         logging.debug(f"Texto Crudo/Fallback - Etiqueta para '{campo}' encontrada en línea {i+1}: '{linea.strip()}'")
                         etiqueta_encontrada_idx = i
                         break # Encontramos la primera ocurrencia
@@ -141,7 +140,7 @@ def extraer_desde_texto_crudo(texto_crudo):
                         idx_valor = etiqueta_encontrada_idx + j
                         if idx_valor < num_lineas:
                             linea_valor = lineas[idx_valor].strip()
-                            numero_match = re.search(r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)', linea_valor)
+                            numero_match = registro.search(r'(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)', linea_valor)
                             if numero_match:
                                 valor_str = numero_match.group(1)
                                 # Evitar asignar el mismo valor a múltiples campos si ya tiene uno
@@ -186,7 +185,38 @@ def extraer_desde_texto_crudo(texto_crudo):
         return None
     # --- Fin modificación --- 
 
-def extraer_datos_endoso_a(pdf_path: str) -> Dict[str, Union[str, float]]:
+def extraer_texto_pdf(pdf_path: Union[str, DocumentContext]) -> str:
+    """
+    Extrae el texto de todas las páginas del PDF con PyMuPDF.
+    
+    Args:
+        pdf_path (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+        
+    Returns:
+        str: Texto extraído del PDF (cadena vacía si falla)
+    """
+    try:
+        with abrir_documento(pdf_path) as documento:
+            return documento.text
+    except Exception as e:
+        logging.error(f"Error al extraer texto del PDF {pdf_path}: {str(e)}")
+        return ""
+
+def extraer_texto_crudo_pdf(pdf_path: Union[str, DocumentContext]) -> str:
+    """
+    Extrae el texto del PDF en el orden del contenido, con la misma disposición
+    de líneas que `pdftotext -raw`, sin lanzar un proceso externo.
+
+    Args:
+        pdf_path (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+
+    Returns:
+        str: Texto crudo del PDF
+    """
+    with abrir_documento(pdf_path) as documento:
+        return documento.text_raw
+
+def extraer_datos_endoso_a(pdf_path: Union[str, DocumentContext]) -> Dict[str, Union[str, float]]:
     """
     Extrae datos financieros de un endoso tipo A.
     
@@ -253,7 +283,7 @@ def extraer_datos_endoso_a(pdf_path: str) -> Dict[str, Union[str, float]]:
     datos_temp = {}
     for campo, lista_patrones in patrones_especificos.items():
          for i, patron in enumerate(lista_patrones):
-             match = re.search(patron, texto)
+             match = registro.search(patron, texto)
              if match:
                 valor_str = match.group(1)
                 datos_temp[campo] = normalizar_numero(valor_str)
@@ -261,6 +291,7 @@ def extraer_datos_endoso_a(pdf_path: str) -> Dict[str, Union[str, float]]:
                 break # Pasar al siguiente campo si se encontró
 
     prima_neta = datos_temp.get('prima_neta')
+    tasa_financiamiento = datos_temp.get('tasa_financiamiento')
     gastos_expedicion = datos_temp.get('gastos_expedicion')
     iva = datos_temp.get('iva')
     precio_total = datos_temp.get('precio_total')
@@ -268,7 +299,7 @@ def extraer_datos_endoso_a(pdf_path: str) -> Dict[str, Union[str, float]]:
     # Intentar con el patrón de bloque vertical si es FORMATO_VERTICAL y no se encontraron todos
     if formato == "FORMATO_VERTICAL" and not all([prima_neta, gastos_expedicion, iva, precio_total]):
          logging.info("Intentando Estrategia 1b: Patrón de bloque vertical específico...")
-         match_bloque = re.search(patron_bloque_vertical, texto, re.MULTILINE)
+         match_bloque = registro.search(patron_bloque_vertical, texto, re.MULTILINE)
          if match_bloque:
              logging.info("Encontrado patrón de bloque vertical.")
              # Asignar solo si no se encontraron previamente
@@ -291,7 +322,7 @@ def extraer_datos_endoso_a(pdf_path: str) -> Dict[str, Union[str, float]]:
         }
         datos_temp_gen = {}
         for campo, patron in patrones_genericos.items():
-             match = re.search(patron, texto)
+             match = registro.search(patron, texto)
              if match:
                  valor_str = match.group(1)
                  datos_temp_gen[campo] = normalizar_numero(valor_str)
@@ -305,12 +336,11 @@ def extraer_datos_endoso_a(pdf_path: str) -> Dict[str, Union[str, float]]:
         if not precio_total: precio_total = datos_temp_gen.get('precio_total')
 
 
-    # --- Estrategia 3: Texto Crudo (pdftotext -raw) ---
+    # --- Estrategia 3: Texto Crudo (orden del contenido, como pdftotext -raw) ---
     if not all([prima_neta, gastos_expedicion, iva, precio_total]):
-        logging.info("Intentando Estrategia 3: Texto crudo (pdftotext -raw)...")
+        logging.info("Intentando Estrategia 3: Texto crudo (orden del contenido)...")
         try:
-            result = subprocess.run(['pdftotext', '-raw', pdf_path, '-'], capture_output=True, text=True, check=True)
-            texto_crudo = result.stdout
+            texto_crudo = extraer_texto_crudo_pdf(pdf_path)
             logging.debug(f"Texto crudo obtenido (primeros 500 chars): {texto_crudo[:500]}")
             resultado_crudo = extraer_desde_texto_crudo(texto_crudo)
             if resultado_crudo:
@@ -323,10 +353,6 @@ def extraer_datos_endoso_a(pdf_path: str) -> Dict[str, Union[str, float]]:
                 if not precio_total: precio_total = resultado_crudo.get('precio_total')
             else:
                 logging.warning("No se encontraron valores desde texto crudo.")
-        except FileNotFoundError:
-             logging.error("Comando 'pdftotext' no encontrado. Asegúrate de que esté instalado y en el PATH.")
-        except subprocess.CalledProcessError as e:
-             logging.error(f"Error al ejecutar pdftotext: {e}")
         except Exception as e:
             logging.error(f"Error inesperado al procesar texto crudo: {str(e)}")
 
@@ -334,9 +360,9 @@ def extraer_datos_endoso_a(pdf_path: str) -> Dict[str, Union[str, float]]:
     if not prima_neta:
          logging.info("Intentando Estrategia 4: Sumar primas individuales...")
          # Busca una línea que empiece con "Prima" y tenga varios números después
-         prima_section_match = re.search(r'^Prima\\s+(\\d{1,3}(?:,\\d{3})*(?:\\.\\d{2})?(?:\\s+\\d{1,3}(?:,\\d{3})*(?:\\.\\d{2})?)*)', texto, re.MULTILINE)
+         prima_section_match = registro.search(r'^Prima\\s+(\\d{1,3}(?:,\\d{3})*(?:\\.\\d{2})?(?:\\s+\\d{1,3}(?:,\\d{3})*(?:\\.\\d{2})?)*)', texto, re.MULTILINE)
          if prima_section_match:
-             numeros_primas = re.findall(r'(\\d{1,3}(?:,\\d{3})*(?:\\.\\d{2})?)', prima_section_match.group(1))
+             numeros_primas = registro.findall(r'(\\d{1,3}(?:,\\d{3})*(?:\\.\\d{2})?)', prima_section_match.group(1))
              if numeros_primas:
                  suma_primas = sum(normalizar_numero(n) for n in numeros_primas)
                  prima_neta = suma_primas
@@ -378,52 +404,52 @@ def extract_endoso_b_data(text, pdf_path):
     data = {}
     
     # Extraer número de póliza
-    poliza_match = re.search(r'Póliza\s+(\d+)', text)
+    poliza_match = registro.search(r'Póliza\s+(\d+)', text)
     if poliza_match:
         data["Número de póliza"] = poliza_match.group(1)
     
     # Extraer número de endoso
-    endoso_match = re.search(r'Endoso\s+([A-Z0-9]+)', text)
+    endoso_match = registro.search(r'Endoso\s+([A-Z0-9]+)', text)
     if endoso_match:
         data["Número de endoso"] = endoso_match.group(1)
     
     # Extraer vigencia
-    vigencia_desde = re.search(r'Desde:\s+(\d{2}/\w{3}/\d{4})', text)
-    vigencia_hasta = re.search(r'Hasta:\s+(\d{2}/\w{3}/\d{4})', text)
+    vigencia_desde = registro.search(r'Desde:\s+(\d{2}/\w{3}/\d{4})', text)
+    vigencia_hasta = registro.search(r'Hasta:\s+(\d{2}/\w{3}/\d{4})', text)
     if vigencia_desde:
         data["Vigencia desde"] = vigencia_desde.group(1)
     if vigencia_hasta:
         data["Vigencia hasta"] = vigencia_hasta.group(1)
     
     # Extraer datos del asegurado
-    nombre_match = re.search(r'Nombre:\s+(.*?)(?:\s{3}|$)', text, re.DOTALL)
+    nombre_match = registro.search(r'Nombre:\s+(.*?)(?:\s{3}|$)', text, re.DOTALL)
     if nombre_match:
         data["Nombre del asegurado"] = nombre_match.group(1).strip()
     
     # Extraer datos del vehículo
-    vehiculo_match = re.search(r'Vehículo:\s+(.*?)(?:\s+Motor:|$)', text, re.DOTALL)
+    vehiculo_match = registro.search(r'Vehículo:\s+(.*?)(?:\s+Motor:|$)', text, re.DOTALL)
     if vehiculo_match:
         data["Vehículo"] = vehiculo_match.group(1).strip()
     
     # Extraer placa
-    placa_match = re.search(r'Placas:\s+([A-Z0-9]+)', text)
+    placa_match = registro.search(r'Placas:\s+([A-Z0-9]+)', text)
     if placa_match:
         data["Placas"] = placa_match.group(1)
     
     # Extraer modelo
-    modelo_match = re.search(r'Modelo:\s+(\d{4})', text)
+    modelo_match = registro.search(r'Modelo:\s+(\d{4})', text)
     if modelo_match:
         data["Modelo"] = modelo_match.group(1)
     
     # Tipo de endoso (extraer de la descripción o del nombre del archivo)
     filename = os.path.basename(pdf_path)
     # Intentar extraer el tipo de endoso del nombre del archivo (ej: CAMBIO, CANCELACION)
-    tipo_endoso_match = re.search(r'AUTOS/([A-Z]+)/', filename)
+    tipo_endoso_match = registro.search(r'AUTOS/([A-Z]+)/', filename)
     if tipo_endoso_match:
         data["Tipo de endoso"] = tipo_endoso_match.group(1)
     
     # Extraer descripción del cambio
-    descripcion_match = re.search(r'Se hace constar que, (.*?)(?:$|\n\n)', text, re.DOTALL)
+    descripcion_match = registro.search(r'Se hace constar que, (.*?)(?:$|\n\n)', text, re.DOTALL)
     if descripcion_match:
         data["Descripción del cambio"] = descripcion_match.group(1).strip()
     
@@ -437,18 +463,18 @@ def extract_traditional_format(text):
     logging.info("Detectado formato tradicional (columna de datos)")
     
     # Normalizar el texto: reemplazar múltiples espacios y saltos de línea con un solo espacio
-    text = re.sub(r'\s+', ' ', text)
+    text = registro.sub(r'\s+', ' ', text)
     
     # Buscar el bloque de valores financieros
     # Primero encontrar las etiquetas
     labels_pattern = r"Prima neta\s*Tasa de financiamiento\s*Gastos por expedición\s*I\.V\.A\.\s*Precio total"
-    labels_match = re.search(labels_pattern, text, re.IGNORECASE)
+    labels_match = registro.search(labels_pattern, text, re.IGNORECASE)
     
     if labels_match:
         # Si encontramos las etiquetas, buscar los valores que siguen
         values_text = text[labels_match.end():]
         values_pattern = r"\s*([\d,.]+)\s*([\d,.]+)\s*([\d,.]+)\s*([\d,.]+)\s*([\d,.]+)"
-        values_match = re.search(values_pattern, values_text)
+        values_match = registro.search(values_pattern, values_text)
         
         if values_match:
             logging.info("Encontrado bloque de valores financieros")
@@ -482,7 +508,7 @@ def extract_traditional_format(text):
     # Buscar cada patrón en el texto
     for pattern, key in patterns:
         # Buscar todas las coincidencias
-        matches = list(re.finditer(pattern, text, re.IGNORECASE))
+        matches = list(registro.finditer(pattern, text, re.IGNORECASE))
         if matches:
             # Tomar el último valor encontrado (suele ser el más relevante)
             value = normalizar_numero(matches[-1].group(1))
@@ -490,10 +516,10 @@ def extract_traditional_format(text):
             logging.info(f"Encontrado {key}: {value}")
         else:
             # Si no se encuentra, intentar buscar el valor después de la etiqueta
-            label_match = re.search(key, text, re.IGNORECASE)
+            label_match = registro.search(key, text, re.IGNORECASE)
             if label_match:
                 # Buscar el siguiente número después de la etiqueta
-                value_match = re.search(r"([\d,.]+)", text[label_match.end():label_match.end()+50])
+                value_match = registro.search(r"([\d,.]+)", text[label_match.end():label_match.end()+50])
                 if value_match:
                     value = normalizar_numero(value_match.group(1))
                     result[key] = value
@@ -510,23 +536,23 @@ def extract_generic_format(text):
     data = {}
     
     # Intentar extraer valores usando patrones más flexibles
-    prima_neta_match = re.search(r'(?:Prima|PRIMA)[^\d]+([\d,.]+)', text)
+    prima_neta_match = registro.search(r'(?:Prima|PRIMA)[^\d]+([\d,.]+)', text)
     if prima_neta_match:
         data["Prima neta"] = normalizar_numero(prima_neta_match.group(1))
     
-    tasa_match = re.search(r'(?:Tasa|TASA)[^\d]+([\d,.]+)', text)
+    tasa_match = registro.search(r'(?:Tasa|TASA)[^\d]+([\d,.]+)', text)
     if tasa_match:
         data["Tasa de financiamiento"] = normalizar_numero(tasa_match.group(1))
     
-    gastos_match = re.search(r'(?:Gastos|GASTOS)[^\d]+([\d,.]+)', text)
+    gastos_match = registro.search(r'(?:Gastos|GASTOS)[^\d]+([\d,.]+)', text)
     if gastos_match:
         data["Gastos por expedición"] = normalizar_numero(gastos_match.group(1))
     
-    iva_match = re.search(r'(?:I\.V\.A\.|IVA)[^\d]+([\d,.]+)', text)
+    iva_match = registro.search(r'(?:I\.V\.A\.|IVA)[^\d]+([\d,.]+)', text)
     if iva_match:
         data["I.V.A."] = normalizar_numero(iva_match.group(1))
     
-    precio_match = re.search(r'(?:Precio|PRECIO|Total|TOTAL)[^\d]+([\d,.]+)', text)
+    precio_match = registro.search(r'(?:Precio|PRECIO|Total|TOTAL)[^\d]+([\d,.]+)', text)
     if precio_match:
         data["Precio total"] = normalizar_numero(precio_match.group(1))
     
@@ -0,0 +1,729 @@
+import os
+import sys
+import json
+import random
+import hashlib
+import logging
+import argparse
+import textwrap
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+MESES = ["ENE", "FEB", "MAR", "ABR", "MAY", "JUN", "JUL", "AGO", "SEP", "OCT", "NOV", "DIC"]
+MESES_LARGOS = ["ENERO", "FEBRERO", "MARZO", "ABRIL", "MAYO", "JUNIO", "JULIO", "AGOSTO",
+                "SEPTIEMBRE", "OCTUBRE", "NOVIEMBRE", "DICIEMBRE"]
+
+NOMBRES = ["JUAN", "MARIA", "JOSE", "ANA", "LUIS", "CARMEN", "PEDRO", "LAURA", "JORGE", "SOFIA",
+           "MIGUEL", "ELENA", "RICARDO", "PATRICIA", "FERNANDO", "GABRIELA", "ROBERTO", "ADRIANA"]
+APELLIDOS = ["PEREZ", "LOPEZ", "GARCIA", "HERNANDEZ", "MARTINEZ", "GONZALEZ", "RODRIGUEZ", "SANCHEZ",
+             "RAMIREZ", "TORRES", "FLORES", "RIVERA", "GOMEZ", "DIAZ", "CRUZ", "MORALES", "ORTIZ", "RUIZ"]
+CALLES = ["AV REFORMA", "CALLE HIDALGO", "AV JUAREZ", "CALLE MORELOS", "AV INSURGENTES", "CALLE ALLENDE",
+          "BLVD LOPEZ MATEOS", "CALLE ZARAGOZA"]
+COLONIAS = ["CENTRO", "DEL VALLE", "ROMA NORTE", "JARDINES", "LAS LOMAS", "SAN ANGEL", "CHAPULTEPEC"]
+CIUDADES = [("LOS CABOS", "23400"), ("CIUDAD DE MEXICO", "06600"), ("GUADALAJARA", "44100"),
+            ("MONTERREY", "64000"), ("PUEBLA", "72000"), ("MERIDA", "97000"), ("TIJUANA", "22000")]
+PARENTESCOS = ["TITULAR", "CONYUGE", "HIJO", "HIJA"]
+EMPRESAS = ["COMERCIALIZADORA DEL NORTE SA DE CV", "SERVICIOS INTEGRALES DEL BAJIO SA DE CV",
+            "DISTRIBUIDORA OCCIDENTE SA DE CV", "TECNOLOGIA APLICADA DEL SUR SA DE CV"]
+
+# Vocabulario de las páginas de condiciones generales (sin palabras que disparen la detección de otro tipo)
+_PALABRAS_CLAUSULAS = (
+    "la compañía el asegurado contrato vigencia cláusula siniestro reclamación indemnización beneficio "
+    "periodo obligaciones derechos documentos pago aviso plazo exclusiones rescisión notificación domicilio "
+    "moneda comprobante interés disposiciones artículo fracción ley sobre el contrato de seguro "
+    "registro comisión nacional institución procedimiento conforme establecido presente anterior durante "
+    "cuando cada caso dentro días hábiles naturales siguientes fecha recepción"
+).split()
+
+# Geometría de la página (A4 en puntos)
+MARGEN = 40
+TAM_LETRA = 9
+INTERLINEADO = 13
+
+
+# --- Datos ficticios ---
+
+def _nombre(rng: random.Random) -> str:
+    return f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+
+
+def _rfc(rng: random.Random, nacimiento: date) -> str:
+    letras = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(4))
+    homoclave = "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(3))
+    return f"{letras}{nacimiento:%y%m%d}{homoclave}"
+
+
+def _monto(valor: float) -> str:
+    return f"{valor:,.2f}"
+
+
+def _fecha_num(valor: date) -> str:
+    return f"{valor:%d/%m/%Y}"
+
+
+def _fecha_mes(valor: date, separador: str = "/") -> str:
+    return f"{valor.day:02d}{separador}{MESES[valor.month - 1]}{separador}{valor.year}"
+
+
+def datos_ficticios(rng: random.Random) -> Dict:
+    """Datos comunes de una póliza ficticia (personas, domicilio, fechas y montos)."""
+    nacimiento = date(rng.randint(1955, 2000), rng.randint(1, 12), rng.randint(1, 28))
+    emision = date(rng.randint(2021, 2025), rng.randint(1, 12), rng.randint(1, 28))
+    inicio = emision + timedelta(days=rng.randint(0, 15))
+    ciudad, cp = rng.choice(CIUDADES)
+    prima_neta = round(rng.uniform(2_000, 60_000), 2)
+    derecho = rng.choice([500.0, 600.0, 700.0, 850.0])
+    recargo = round(prima_neta * rng.choice([0, 0, 0.03, 0.05]), 2)
+    iva = round((prima_neta + derecho + recargo) * 0.16, 2)
+    contratante = _nombre(rng)
+    return {
+        "contratante": contratante,
+        "asegurado": contratante if rng.random() < 0.6 else _nombre(rng),
+        "nacimiento": nacimiento,
+        "edad": inicio.year - nacimiento.year,
+        "sexo": rng.choice(["MASCULINO", "FEMENINO"]),
+        "rfc": _rfc(rng, nacimiento),
+        "domicilio": f"{rng.choice(CALLES)} {rng.randint(1, 999)} COL {rng.choice(COLONIAS)}",
+        "ciudad": ciudad,
+        "cp": cp,
+        "telefono": f"{rng.randint(55, 99)}{rng.randint(10_000_000, 99_999_999)}",
+        "emision": emision,
+        "inicio": inicio,
+        "fin": date(inicio.year + 1, inicio.month, inicio.day),
+        "poliza": f"{rng.randint(1_000_000, 9_999_999)}H",
+        "solicitud": str(rng.randint(100_000, 99_999_999)),
+        "agente_clave": str(rng.randint(10_000, 999_999)),
+        "agente": _nombre(rng),
+        "promotor": str(rng.randint(10, 9_999)),
+        "centro_utilidad": str(rng.randint(100, 999)),
+        "prima_neta": prima_neta,
+        "derecho": derecho,
+        "recargo": recargo,
+        "iva": iva,
+        "total": round(prima_neta + derecho + recargo + iva, 2),
+        "suma_asegurada": float(rng.choice([250_000, 500_000, 1_000_000, 1_500_000, 3_000_000])),
+        "plazo": rng.choice([10, 15, 20, 25]),
+    }
+
+
+def _clausula(rng: random.Random, numero: int) -> str:
+    """Párrafo de condiciones generales con texto de relleno."""
+    palabras = [rng.choice(_PALABRAS_CLAUSULAS) for _ in range(rng.randint(40, 90))]
+    return f"Cláusula {numero}. " + " ".join(palabras).capitalize() + "."
+
+
+# --- Renderizado ---
+
+class Lienzo:
+    """
+    Escribe líneas y filas de tabla en un documento fitz, agregando páginas según haga falta.
+
+    El texto de cada página se acumula en un TextWriter y se escribe una sola vez al
+    pasar a la siguiente: `page.insert_text` por línea reescribe el contenido de la
+    página en cada llamada y domina el tiempo con cientos de páginas.
+    """
+
+    def __init__(self, caratula_una_pagina: bool = False):
+        self.caratula_una_pagina = caratula_una_pagina
+        self.doc = fitz.open()
+        self.fuentes = {False: fitz.Font("helv"), True: fitz.Font("hebo")}
+        self.pagina = None
+        self.escritor = None
+        self.y = 0.0
+        self.nueva_pagina()
+
+    def _volcar(self) -> None:
+        if self.escritor is not None:
+            self.escritor.write_text(self.pagina)
+            self.escritor = None
+
+    def nueva_pagina(self) -> None:
+        self._volcar()
+        self.pagina = self.doc.new_page()
+        self.escritor = fitz.TextWriter(self.pagina.rect)
+        self.y = MARGEN + TAM_LETRA
+
+    def salto_caratula(self) -> None:
+        """Paso de la identificación a los montos de la carátula (no salta en los layouts mixtos)."""
+        if self.caratula_una_pagina:
+            self.y += INTERLINEADO
+        else:
+            self.nueva_pagina()
+
+    def _espacio_para(self, alto: float) -> None:
+        if self.y + alto > self.pagina.rect.height - MARGEN:
+            self.nueva_pagina()
+
+    def linea(self, texto: str, x: float = MARGEN, tam: float = TAM_LETRA, negrita: bool = False) -> None:
+        self._espacio_para(INTERLINEADO)
+        self.escritor.append((x, self.y), texto, font=self.fuentes[negrita], fontsize=tam)
+        self.y += INTERLINEADO * tam / TAM_LETRA
+
+    def titulo(self, texto: str) -> None:
+        self.linea(texto, tam=12, negrita=True)
+        self.y += 4
+
+    def seccion(self, texto: str) -> None:
+        self.y += 4
+        self.linea(texto, negrita=True)
+
+    def fila(self, celdas: List[Tuple[float, str]], negrita: bool = False) -> None:
+        """Celdas en la misma línea base, cada una en su columna (x)."""
+        self._espacio_para(INTERLINEADO)
+        for x, texto in celdas:
+            self.escritor.append((x, self.y), texto, font=self.fuentes[negrita], fontsize=TAM_LETRA)
+        self.y += INTERLINEADO
+
+    def parrafo(self, texto: str, ancho: int = 105) -> None:
+        for renglon in textwrap.wrap(texto, ancho):
+            self.linea(renglon)
+        self.y += 4
+
+    def guardar(self, ruta: str) -> int:
+        self._volcar()
+        paginas = self.doc.page_count
+        # Metadatos fijos y sin ID nuevo: la misma semilla produce el mismo archivo byte a byte
+        self.doc.set_metadata({"producer": "PRISMA generador_sinteticos", "creationDate": "D:20240101000000",
+                               "modDate": "D:20240101000000"})
+        self.doc.save(ruta, garbage=3, deflate=True, no_new_id=True)
+        self.doc.close()
+        return paginas
+
+
+# --- Layouts ---
+#
+# Cada layout escribe la carátula y devuelve (tipo que debe detectar validate_endoso,
+# campos esperados en el resultado). La primera página lleva el producto y los datos
+# de identificación, y las primas van en la segunda. Cada layout tiene además una
+# variante `_MIXTO` con toda la carátula en la primera página, como las carátulas
+# reales que mezclan ambos: ahí la detección ve desde la primera página el producto
+# junto con las firmas genéricas de montos (prima neta, I.V.A., ...).
+# Los tipos que la detección no distingue con una carátula realista no tienen layout
+# (ver LAYOUTS_NO_SOPORTADOS).
+
+def _roster(lienzo: Lienzo, rng: random.Random, datos: Dict, asegurados: int, titulo: str,
+            columnas: Tuple[str, ...] = ("Nombre", "Parentesco", "Fecha de nacimiento", "Sexo", "Prima")) -> None:
+    if asegurados <= 0:
+        return
+    lienzo.nueva_pagina()
+    lienzo.seccion(titulo)
+    xs = [MARGEN, 230, 320, 420, 490]
+    lienzo.fila(list(zip(xs, columnas)), negrita=True)
+    for n in range(asegurados):
+        nacimiento = date(rng.randint(1950, 2023), rng.randint(1, 12), rng.randint(1, 28))
+        parentesco = "TITULAR" if n == 0 else rng.choice(PARENTESCOS[1:])
+        nombre = datos["asegurado"] if n == 0 else _nombre(rng)
+        valores = (nombre, parentesco, _fecha_num(nacimiento), rng.choice(["M", "F"]),
+                   _monto(rng.uniform(500, 20_000)))
+        lienzo.fila(list(zip(xs, valores)))
+
+
+def _encabezado(lienzo: Lienzo, texto: str) -> None:
+    """Dato de la esquina superior derecha (antes del título, como en las carátulas)."""
+    lienzo.fila([(400, texto)], negrita=True)
+
+
+def _contratante_dos_puntos(lienzo: Lienzo, datos: Dict, titulo: str = "Datos del contratante") -> None:
+    lienzo.seccion(titulo)
+    lienzo.linea(f"Nombre: {datos['contratante']}")
+    lienzo.linea(f"Domicilio: {datos['domicilio']}, {datos['cp']}, {datos['ciudad']}")
+    lienzo.linea(f"R.F.C.: {datos['rfc']}")
+    lienzo.linea(f"Teléfono: {datos['telefono']}")
+
+
+def _salud_identificacion(lienzo: Lienzo, datos: Dict) -> None:
+    lienzo.seccion("Datos del contratante")
+    lienzo.linea(f"Nombre : {datos['contratante']}")
+    lienzo.linea(f"Domicilio : {datos['domicilio']}")
+    lienzo.linea(f"Ciudad: {datos['ciudad']}")
+    lienzo.linea(f"C.P. {datos['cp']}")
+    lienzo.linea(f"R.F.C. : {datos['rfc']}")
+    lienzo.linea(f"Teléfono: {datos['telefono']}")
+    lienzo.seccion("Datos del Asegurado Titular")
+    lienzo.linea(f"Nombre : {datos['asegurado']}")
+    lienzo.linea(f"Domicilio : {datos['domicilio']}")
+    lienzo.linea(f"Ciudad: {datos['ciudad']}")
+
+
+def _salud_poliza(lienzo: Lienzo, datos: Dict, plan: str) -> None:
+    lienzo.linea(f"Póliza {datos['poliza']}")
+    lienzo.linea(f"Solicitud {datos['solicitud']}")
+    lienzo.linea(f"Tipo de plan {plan}")
+    lienzo.linea(f"Fecha de inicio de vigencia {_fecha_num(datos['inicio'])}")
+    lienzo.linea(f"Fecha de fin de vigencia {_fecha_num(datos['fin'])}")
+    lienzo.linea(f"Fecha de emisión {_fecha_num(datos['emision'])}")
+    lienzo.linea("Frecuencia de pago ANUAL")
+    lienzo.linea("Zona Tarificación: Zona 2")
+
+
+def _salud_primas(lienzo: Lienzo, rng: random.Random, datos: Dict, con_servicios: bool = True) -> None:
+    lienzo.seccion("Condiciones de la cobertura")
+    lienzo.linea(f"SumaAsegurada $ {datos['suma_asegurada']:,.0f} M.N.")
+    lienzo.linea(f"Deducible $ {rng.choice([10_000, 20_000, 35_000]):,} M.N.")
+    lienzo.linea(f"Coaseguro {rng.choice([10, 20])} %")
+    lienzo.linea(f"Tope de Coaseguro $ {rng.choice([40_000, 60_000]):,} M.N.")
+    lienzo.linea(f"Gama Hospitalaria {rng.choice(['ALFA', 'BETA', 'GAMMA'])}")
+    lienzo.linea(f"Tipo de Red {rng.choice(['ABIERTA', 'CERRADA'])}")
+    lienzo.linea(f"Tabulador Médico {rng.choice(['PLUS', 'NORMAL'])}")
+    if con_servicios:
+        lienzo.linea("Maternidad Amparada")
+        lienzo.linea("Protección Dental Amparada")
+    lienzo.seccion("Prima")
+    lienzo.linea("Descuento familiar 0")
+    lienzo.linea("Cesión de Comisión 0")
+    lienzo.linea(f"Prima Neta {_monto(datos['prima_neta'])}")
+    lienzo.linea(f"Recargo por pago fraccionado {_monto(datos['recargo'])}")
+    lienzo.linea(f"Derecho de póliza {_monto(datos['derecho'])}")
+    lienzo.linea(f"I.V.A. {_monto(datos['iva'])}")
+    lienzo.linea(f"Prima anual total {_monto(datos['total'])}")
+    lienzo.linea(f"Agente: {datos['agente_clave']} {datos['agente']}")
+    lienzo.linea(f"Promotor: {datos['promotor']}")
+
+
+def _campos_salud(datos: Dict) -> Dict:
+    return {"Número de póliza": datos["poliza"], "Prima Neta": _monto(datos["prima_neta"]),
+            "Prima anual total": _monto(datos["total"]), "R.F.C.": datos["rfc"]}
+
+
+def layout_salud_colectivo(lienzo, rng, datos, asegurados):
+    _encabezado(lienzo, f"Póliza {datos['poliza']}")
+    lienzo.titulo("Carátula de póliza")
+    lienzo.linea("Gastos Médicos Mayores Colectivo")
+    _salud_identificacion(lienzo, datos)
+    _salud_poliza(lienzo, datos, rng.choice(["Flex Plus", "Colectivo Empresarial"]))
+    lienzo.salto_caratula()
+    _salud_primas(lienzo, rng, datos)
+    _roster(lienzo, rng, datos, asegurados, "Relación de asegurados")
+    return "SALUD_COLECTIVO", _campos_salud(datos)
+
+
+def layout_salud_variantef(lienzo, rng, datos, asegurados):
+    lienzo.titulo("AXA Seguros")
+    lienzo.linea("Gastos Médicos Mayores AXA Seguros")
+    lienzo.linea("Servicios adicionales incluidos en la cobertura")
+    lienzo.linea("Cobertura internacional")
+    _salud_identificacion(lienzo, datos)
+    _salud_poliza(lienzo, datos, "Ultra Medical Elite")
+    lienzo.salto_caratula()
+    _salud_primas(lienzo, rng, datos, con_servicios=False)
+    _roster(lienzo, rng, datos, asegurados, "Relación de asegurados")
+    return "SALUD_FAMILIAR_VARIANTEF", _campos_salud(datos)
+
+
+def layout_aliados_ppr(lienzo, rng, datos, asegurados):
+    lienzo.titulo("Carátula de póliza Aliados+ PPR")
+    lienzo.linea("Seguro de vida y ahorro")
+    lienzo.linea(f"PÓLIZA {datos['poliza']}")
+    lienzo.linea(f"TIPO DE PLAN PPR{rng.choice([60, 65])}")
+    lienzo.linea(f"SOLICITUD {datos['solicitud']}")
+    lienzo.seccion("DATOS DEL CONTRATANTE")
+    lienzo.linea(f"Nombre: {datos['contratante']}")
+    lienzo.linea(f"Domicilio: {datos['domicilio']}, {datos['cp']}, {datos['ciudad']}")
+    lienzo.linea(f"R.F.C.: {datos['rfc']}")
+    lienzo.linea(f"Teléfono: {datos['telefono']}")
+    lienzo.seccion("DATOS DEL ASEGURADO")
+    lienzo.linea(f"Nombre: {datos['asegurado']}")
+    lienzo.linea(f"Fecha de nacimiento: {_fecha_mes(datos['nacimiento'])}")
+    lienzo.linea(f"Fecha de Emisión: {_fecha_mes(datos['emision'])}")
+    lienzo.linea(f"Inicio de Vigencia: {_fecha_mes(datos['inicio'])}")
+    lienzo.linea(f"Fin de Vigencia: {_fecha_mes(datos['fin'])}")
+    lienzo.salto_caratula()
+    lienzo.linea("Moneda: NACIONAL")
+    lienzo.linea(f"Plazo de Seguro: {datos['plazo']} AÑOS")
+    lienzo.linea(f"Plazo de Pago: {datos['plazo']} años")
+    lienzo.linea("Forma de Pago: MENSUAL")
+    lienzo.linea(f"Prima anual : {_monto(datos['prima_neta'])}")
+    lienzo.linea(f"Prima Anual Total: {_monto(datos['prima_neta'])}")
+    lienzo.linea(f"SUMA ASEGURADA {_monto(datos['suma_asegurada'])}")
+    lienzo.linea(f"Básica {datos['plazo']} AÑOS {_monto(datos['suma_asegurada'])}")
+    lienzo.linea(f"Agente: {datos['agente_clave']} {datos['agente']} Promotor: {datos['promotor']}")
+    _roster(lienzo, rng, datos, asegurados, "Beneficiarios", ("Nombre", "Parentesco", "Fecha de nacimiento", "Sexo", "Porcentaje"))
+    return "ALIADOS_PPR", {"Número de póliza": datos["poliza"], "Prima anual total": _monto(datos["prima_neta"])}
+
+
+def layout_aliados_kids(lienzo, rng, datos, asegurados):
+    trimestral = round(datos["prima_neta"] / 4, 2)
+    _encabezado(lienzo, "PÓLIZA")
+    _encabezado(lienzo, datos["poliza"])
+    lienzo.titulo("Carátula de póliza Aliados+ Kids")
+    lienzo.linea(f"SOLICITUD {datos['solicitud']}")
+    lienzo.linea("TIPO DE PLAN Universitario")
+    lienzo.linea(f"Inicio de vigencia {_fecha_mes(datos['inicio'])}")
+    lienzo.linea(f"Fin de vigencia {_fecha_mes(datos['fin'])}")
+    lienzo.linea(f"Fecha de emisión {_fecha_mes(datos['emision'])}")
+    lienzo.seccion("DATOS DEL CONTRATANTE")
+    lienzo.linea(f"Nombre: {datos['contratante']}")
+    lienzo.linea(f"Domicilio: {datos['domicilio']}")
+    lienzo.linea(f"R.F.C.: {datos['rfc']}")
+    lienzo.linea(f"Teléfono: {datos['telefono']}")
+    lienzo.seccion("DATOS DEL ASEGURADO MENOR")
+    lienzo.linea(f"Nombre: {_nombre(rng)}")
+    lienzo.linea(f"Fecha de nacimiento: {_fecha_mes(date(rng.randint(2010, 2022), rng.randint(1, 12), rng.randint(1, 28)))}")
+    lienzo.linea(f"Edad: {rng.randint(1, 14)}")
+    lienzo.linea(f"Sexo: {rng.choice(['Masculino', 'Femenino'])}")
+    lienzo.salto_caratula()
+    lienzo.linea(f"Agente: {datos['agente_clave']} {datos['agente']}")
+    lienzo.linea(f"Promotor: {datos['promotor']}")
+    lienzo.linea(f"Centro de Utilidad: {datos['centro_utilidad']}")
+    lienzo.linea("Moneda NACIONAL")
+    lienzo.linea(f"Plazo de seguro Edad alcanzada {rng.choice([18, 22, 25])}")
+    lienzo.linea(f"Plazo de pago {datos['plazo']} Años")
+    lienzo.linea("Forma de pago TRIMESTRAL")
+    lienzo.linea(f"Prima trimestral: {_monto(trimestral)}")
+    lienzo.linea(f"Recargo por pago fraccionado {_monto(datos['recargo'])}")
+    lienzo.linea(f"Prima anual total: {_monto(datos['prima_neta'])}")
+    lienzo.linea(f"Prima trimestral Total {_monto(trimestral)}")
+    lienzo.linea(f"Aliados+ Kids 18 {datos['plazo']} AÑOS {_monto(datos['suma_asegurada'])}")
+    _roster(lienzo, rng, datos, asegurados, "Beneficiarios", ("Nombre", "Parentesco", "Fecha de nacimiento", "Sexo", "Porcentaje"))
+    return "ALIADOS_KIDS", {"Número de póliza": datos["poliza"], "Prima anual total": _monto(datos["prima_neta"])}
+
+
+def _protgt(lienzo: Lienzo, rng: random.Random, datos: Dict, titulo: List[str], tipo_plan: str) -> None:
+    for n, linea in enumerate(titulo):
+        lienzo.titulo(linea) if n == 0 else lienzo.linea(linea)
+    lienzo.linea(f"PÓLIZA {datos['poliza']}")
+    lienzo.linea(f"Tipo de Plan {tipo_plan}")
+    _contratante_dos_puntos(lienzo, datos, "Datos del contratante")
+    lienzo.seccion("Datos del asegurado")
+    lienzo.linea(f"Nombre: {datos['asegurado']}")
+    lienzo.linea(f"Fecha de nacimiento {_fecha_mes(datos['nacimiento'])}")
+    lienzo.linea(f"Fecha de emisión {_fecha_mes(datos['emision'])}")
+    lienzo.linea(f"Fecha de inicio de vigencia {_fecha_mes(datos['inicio'])}")
+    lienzo.linea(f"Fecha de fin de vigencia {_fecha_mes(datos['fin'])}")
+    lienzo.salto_caratula()
+    lienzo.linea(f"Plazo de pago {datos['plazo']} AÑOS")
+    lienzo.linea(f"Plazo de Seguro {datos['plazo']} AÑOS")
+    lienzo.linea("Forma de pago MENSUAL")
+    lienzo.linea("Moneda NACIONAL")
+    lienzo.linea(f"Prima anual {_monto(datos['prima_neta'])}")
+    lienzo.linea(f"Prima anual total {_monto(datos['prima_neta'])}")
+    lienzo.linea(f"Prima mensual {_monto(datos['prima_neta'] / 12)}")
+    lienzo.linea(f"Básica {datos['plazo']} AÑOS {_monto(datos['suma_asegurada'])}")
+    lienzo.linea(f"Agente: {datos['agente_clave']} {datos['agente']} Promotor: {datos['promotor']}")
+    lienzo.linea(f"Centro de Utilidad: {datos['centro_utilidad']}")
+
+
+def _campos_protgt(datos: Dict) -> Dict:
+    return {"Número de póliza": datos["poliza"], "Prima anual total": _monto(datos["prima_neta"])}
+
+
+def layout_vida_protgt(lienzo, rng, datos, asegurados):
+    _protgt(lienzo, rng, datos, ["Carátula de póliza Vida Protgt", "Protgt cobertura conyugal"], "VIDA PROTGT")
+    _roster(lienzo, rng, datos, asegurados, "Beneficiarios", ("Nombre", "Parentesco", "Fecha de nacimiento", "Sexo", "Porcentaje"))
+    return "VIDA_PROTGT", _campos_protgt(datos)
+
+
+def layout_protgt_temporal_mn(lienzo, rng, datos, asegurados):
+    _protgt(lienzo, rng, datos, ["Carátula de póliza Protgt Temporal MN", "Seguro temporal MN"], "TEMPORAL MN")
+    _roster(lienzo, rng, datos, asegurados, "Beneficiarios", ("Nombre", "Parentesco", "Fecha de nacimiento", "Sexo", "Porcentaje"))
+    return "PROTGT_TEMPORAL_MN", _campos_protgt(datos)
+
+
+def layout_proteccion_efectiva(lienzo, rng, datos, asegurados):
+    descuento = round(datos["prima_neta"] * 0.1, 2)
+    nacimiento = datos["nacimiento"]
+    _encabezado(lienzo, f"Póliza {datos['poliza']}")
+    lienzo.titulo("Carátula de póliza Protección Efectiva")
+    lienzo.linea("Hoja 1 de 2")
+    lienzo.linea(f"Solicitud {datos['solicitud']}")
+    lienzo.linea("Tipo de Plan PROTECCION EFECTIVA")
+    lienzo.linea("Plazo de seguro TEMPORAL A 1 AÑO")
+    lienzo.seccion("Datos del contratante")
+    lienzo.linea(f"Nombre {datos['contratante']}")
+    lienzo.linea(f"Domicilio {datos['domicilio']}, {datos['cp']}, {datos['ciudad']}")
+    lienzo.linea(f"R.F.C. {datos['rfc']}")
+    lienzo.linea(f"Teléfono {datos['telefono']}")
+    lienzo.seccion("Datos del asegurado")
+    lienzo.linea(f"Nombre {datos['asegurado']}")
+    lienzo.linea(f"Fecha de Nacimiento {nacimiento.day:02d} DE {MESES_LARGOS[nacimiento.month - 1]} DE {nacimiento.year}")
+    lienzo.linea(f"Edad {datos['edad']}")
+    lienzo.linea(f"Sexo {datos['sexo']}")
+    lienzo.linea("Hábito NO FUMADOR")
+    lienzo.salto_caratula()
+    lienzo.linea(f"Fecha de emisión {_fecha_mes(datos['emision'])}")
+    lienzo.linea(f"Fecha de inicio de vigencia {_fecha_mes(datos['inicio'])}")
+    lienzo.linea(f"Fecha de fin de vigencia {_fecha_mes(datos['fin'])}")
+    lienzo.linea("Forma de pago ANUAL")
+    lienzo.linea("Moneda PESOS")
+    lienzo.linea(f"Prima anual {_monto(datos['prima_neta'])}")
+    lienzo.linea(f"Descuento 10% - {_monto(descuento)}")
+    lienzo.linea(f"Prima anual total {_monto(datos['prima_neta'] - descuento)}")
+    lienzo.linea(f"FALLECIMIENTO {_monto(datos['suma_asegurada'])}")
+    lienzo.linea("PÉRDIDA ORGÁNICA POR ACCIDENTE AMPARADO")
+    lienzo.linea(f"INVALIDEZ TOTAL Y PERMANENTE {_monto(datos['suma_asegurada'])}")
+    lienzo.linea(f"Agente {datos['agente_clave'].zfill(6)} {datos['agente']}")
+    lienzo.linea(f"Promotor {datos['promotor']}")
+    lienzo.linea(f"Centro de Utilidad {datos['centro_utilidad']}")
+    _roster(lienzo, rng, datos, asegurados, "Beneficiarios", ("Nombre", "Parentesco", "Fecha de nacimiento", "Sexo", "Porcentaje"))
+    return "PROTECCION_EFECTIVA", {"Número de póliza": datos["poliza"],
+                                   "Prima anual total": _monto(datos["prima_neta"] - descuento)}
+
+
+def layout_protgt_pyme(lienzo, rng, datos, asegurados):
+    integrantes = max(asegurados, 1)
+    lienzo.titulo("Carátula de póliza Plan Protege PYME")
+    lienzo.linea(f"Grupo Empresarial {rng.choice(EMPRESAS)}")
+    lienzo.linea(f"Contratante {rng.choice(EMPRESAS)}")
+    lienzo.linea(f"Domicilio {datos['domicilio']}, {datos['cp']}, {datos['ciudad']}")
+    lienzo.linea(f"R.F.C. {datos['rfc'][1:]}")
+    lienzo.linea(f"Teléfono {datos['telefono']}")
+    lienzo.linea("Características del grupo asegurado Empleados activos de tiempo completo")
+    lienzo.linea("Regla para determinar la suma asegurada 24 meses de sueldo")
+    lienzo.linea(f"Póliza {datos['poliza']}")
+    lienzo.linea(f"Fecha de emisión {_fecha_num(datos['emision'])}")
+    lienzo.linea(f"Fecha de inicio de vigencia {_fecha_num(datos['inicio'])}")
+    lienzo.linea(f"Fecha de fin de vigencia {_fecha_num(datos['fin'])}")
+    lienzo.salto_caratula()
+    lienzo.linea("Forma de pago ANUAL")
+    lienzo.linea("Tipo de Plan PYME")
+    lienzo.linea("Moneda PESOS Conducto de Cobro AGENTE")
+    lienzo.linea(f"SAMI ${_monto(datos['suma_asegurada'])}")
+    lienzo.linea("Pago de la Prima CONTRIBUTORIO Porcentaje de Contribución del asegurado 0%")
+    lienzo.linea(f"Prima ${_monto(datos['prima_neta'])}")
+    lienzo.linea(f"Recargo por pago fraccionado ${_monto(datos['recargo'])}")
+    lienzo.linea(f"Prima Total ${_monto(datos['prima_neta'] + datos['recargo'])}")
+    lienzo.linea("Tipo de Administración DETALLADA")
+    lienzo.linea("BÁSICA 1 años")
+    lienzo.linea("Edad Máxima de Aceptación 65 años")
+    lienzo.linea(f"Integrantes {integrantes}")
+    lienzo.linea(f"Agente {datos['agente_clave'].zfill(6)} {datos['agente']}")
+    lienzo.linea(f"Promotor {datos['promotor']}")
+    lienzo.linea(f"Centro de Costos {datos['centro_utilidad']}")
+    _roster(lienzo, rng, datos, asegurados, "Integrantes",
+            ("Nombre", "Categoría", "Fecha de nacimiento", "Sexo", "Suma Asegurada"))
+    return "PROTGT_PYME", {"Número de póliza": datos["poliza"],
+                           "Prima Total": _monto(datos["prima_neta"] + datos["recargo"])}
+
+
+def layout_vida_individual(lienzo, rng, datos, asegurados):
+    total = round(datos["prima_neta"] * 1.1, 2)
+    lienzo.titulo("Seguro de Vida Individual")
+    lienzo.linea(f"Póliza No. {datos['poliza']}")
+    lienzo.seccion("Contratante")
+    lienzo.linea(f"Contratante Nombre {datos['contratante']}")
+    lienzo.linea(f"Domicilio {datos['domicilio']}")
+    lienzo.linea(f"C.P. {datos['cp']}")
+    lienzo.linea(f"R.F.C. {datos['rfc']}")
+    lienzo.linea(f"Tel. {datos['telefono']}")
+    lienzo.linea(f"Datos del Asegurado Nombre {datos['asegurado']} Fecha {_fecha_mes(datos['nacimiento'], '-')}")
+    lienzo.linea(f"Emisión {_fecha_mes(datos['emision'], '-')}")
+    lienzo.linea(f"Inicio de Vigencia {_fecha_mes(datos['inicio'], '-')}")
+    lienzo.linea("Frecuencia de Pago ANUAL")
+    lienzo.linea("Moneda PESOS")
+    lienzo.salto_caratula()
+    lienzo.linea("Seguro ORDINARIO DE VIDA")
+    lienzo.linea(f"ORDINARIO DE VIDA {_monto(datos['suma_asegurada'])} {_monto(datos['prima_neta'])} {datos['plazo']} Años")
+    lienzo.linea(f"Prima Básica Anual {_monto(datos['prima_neta'])}")
+    lienzo.linea(f"Prima Total Anual {_monto(total)}")
+    lienzo.linea(f"Agente {datos['agente_clave']} {datos['agente']} Centro de Utilidad : {datos['centro_utilidad']} "
+                 f"Promotor : {datos['promotor']}")
+    _roster(lienzo, rng, datos, asegurados, "Beneficiarios", ("Nombre", "Parentesco", "Fecha de nacimiento", "Sexo", "Porcentaje"))
+    return "POLIZA_VIDA_INDIVIDUAL", {"Número de póliza": datos["poliza"], "Prima anual total": _monto(total)}
+
+
+# Layout -> función que lo escribe
+LAYOUTS: Dict[str, Callable] = {
+    "SALUD_FAMILIAR_VARIANTEF": layout_salud_variantef,
+    "SALUD_COLECTIVO": layout_salud_colectivo,
+    "ALIADOS_PPR": layout_aliados_ppr,
+    "ALIADOS_KIDS": layout_aliados_kids,
+    "VIDA_PROTGT": layout_vida_protgt,
+    "PROTGT_TEMPORAL_MN": layout_protgt_temporal_mn,
+    "PROTECCION_EFECTIVA": layout_proteccion_efectiva,
+    "PROTGT_PYME": layout_protgt_pyme,
+    "POLIZA_VIDA_INDIVIDUAL": layout_vida_individual,
+}
+
+# Variantes con la carátula completa (identificación y montos) en la primera página
+SUFIJO_MIXTO = "_MIXTO"
+LAYOUTS.update({nombre + SUFIJO_MIXTO: funcion for nombre, funcion in list(LAYOUTS.items())})
+
+# Tipos sin layout: sus extractores leen etiquetas (Prima neta, I.V.A., Prima anual total,
+# Tipo de plan) que también son firmas de SALUD_COLECTIVO, regla de mayor prioridad con
+# umbral 2, así que una carátula fiel a ellos se detecta como SALUD_COLECTIVO y el
+# corpus nunca llegaría a su extractor.
+LAYOUTS_NO_SOPORTADOS = {
+    "ENDOSO_A": "Prima neta e I.V.A. en los montos del endoso",
+    "SALUD_FAMILIAR": "Carátula de póliza, Prima Neta, I.V.A., Deducible, Coaseguro...",
+    "PROTEGETE_ORDINARIO": "Tipo de Plan y Prima anual total (y VIDA PROTGT ORDINARIO se detecta como VIDA_PROTGT)",
+    "POLIZA_VIDA": "Prima Neta y Prima anual total",
+}
+
+
+def generar_pdf(layout: str, ruta: str, semilla: int = 0, paginas: int = 2, asegurados: int = 0) -> Dict:
+    """
+    Genera un PDF ficticio de un layout.
+
+    Args:
+        layout: Nombre del layout (ver LAYOUTS)
+        ruta: Archivo de salida
+        semilla: Semilla de los datos (mismo layout y semilla = mismo PDF)
+        paginas: Páginas mínimas; después de la carátula y la relación de asegurados
+            se agregan condiciones generales hasta alcanzarlas
+        asegurados: Filas de la relación de asegurados / beneficiarios / integrantes
+
+    Returns:
+        dict: archivo, layout, tipo esperado, páginas y campos esperados
+    """
+    # Semilla por documento independiente del orden de generación
+    rng = random.Random(int(hashlib.sha256(f"{layout}:{semilla}".encode()).hexdigest()[:16], 16))
+    datos = datos_ficticios(rng)
+    lienzo = Lienzo(caratula_una_pagina=layout.endswith(SUFIJO_MIXTO))
+    tipo, campos = LAYOUTS[layout](lienzo, rng, datos, asegurados)
+    if lienzo.doc.page_count < paginas:
+        lienzo.nueva_pagina()
+        lienzo.seccion("Condiciones generales")
+        numero = 1
+        while lienzo.doc.page_count < paginas:
+            lienzo.parrafo(_clausula(rng, numero))
+            numero += 1
+    total_paginas = lienzo.guardar(ruta)
+    return {
+        "archivo": os.path.basename(ruta),
+        "layout": layout,
+        "tipo_esperado": tipo,
+        "semilla": semilla,
+        "paginas": total_paginas,
+        "asegurados": asegurados,
+        "campos": campos,
+    }
+
+
+def _generar_tarea(args: Tuple[str, str, int, int, int]) -> Dict:
+    return generar_pdf(*args)
+
+
+def generar_corpus(directorio: str, layouts: Optional[List[str]] = None, cantidad: int = 1, paginas: int = 2,
+                   asegurados: int = 0, semilla: int = 0, procesos: int = 1) -> List[Dict]:
+    """
+    Genera `cantidad` PDFs por layout y escribe `esperado.json` con lo que debe extraerse de cada uno.
+
+    Args:
+        directorio: Carpeta de salida
+        layouts: Layouts a generar (por defecto todos)
+        cantidad: PDFs por layout
+        paginas: Páginas mínimas por PDF
+        asegurados: Filas de la relación de asegurados por PDF
+        semilla: Semilla base
+        procesos: Procesos en paralelo
+
+    Returns:
+        list: Entradas del manifiesto
+    """
+    os.makedirs(directorio, exist_ok=True)
+    tareas = []
+    for layout in layouts or list(LAYOUTS):
+        for n in range(cantidad):
+            ruta = os.path.join(directorio, f"{layout.lower()}_{n:05d}.pdf")
+            tareas.append((layout, ruta, semilla + n, paginas, asegurados))
+    if procesos > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            manifiesto = list(pool.map(_generar_tarea, tareas, chunksize=max(1, len(tareas) // (procesos * 4))))
+    else:
+        manifiesto = [_generar_tarea(t) for t in tareas]
+    with open(os.path.join(directorio, "esperado.json"), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    logger.info(f"{len(manifiesto)} PDFs sintéticos generados en {directorio}")
+    return manifiesto
+
+
+def _detectar(documento) -> str:
+    """Tipo detectado con la misma lectura progresiva de páginas que validate_endoso."""
+    from validar_tipo_endoso import detectar_tipo_progresivo
+
+    return detectar_tipo_progresivo(documento)[0]
+
+
+def _numero(valor) -> Optional[float]:
+    try:
+        return round(float(str(valor).replace(",", "").replace("$", "").strip()), 2)
+    except ValueError:
+        return None
+
+
+def _contiene(resultado: Dict, esperado: str) -> bool:
+    """Indica si algún valor del resultado coincide con el esperado (los montos se comparan como número)."""
+    numero = _numero(esperado)
+    pendientes = [resultado]
+    while pendientes:
+        valor = pendientes.pop()
+        if isinstance(valor, dict):
+            pendientes.extend(valor.values())
+        elif isinstance(valor, list):
+            pendientes.extend(valor)
+        elif numero is not None and _numero(valor) == numero:
+            return True
+        elif numero is None and esperado in str(valor):
+            return True
+    return False
+
+
+def verificar_corpus(directorio: str, manifiesto: List[Dict]) -> Dict:
+    """
+    Pasa cada PDF por la detección y por validate_endoso y compara contra el manifiesto.
+
+    Returns:
+        dict: Por layout, documentos detectados con el tipo esperado y campos esperados
+            presentes en el resultado de la extracción
+    """
+    from contexto_documento import DocumentContext
+    from validar_tipo_endoso import validate_endoso
+
+    resumen: Dict[str, Dict] = {}
+    for entrada in manifiesto:
+        with DocumentContext(os.path.join(directorio, entrada["archivo"])) as documento:
+            tipo = _detectar(documento)
+            resultado = validate_endoso(documento)
+        encontrados = 0 if "error" in resultado else sum(
+            1 for valor in entrada["campos"].values() if _contiene(resultado, valor))
+        stats = resumen.setdefault(entrada["layout"], {"documentos": 0, "tipo_correcto": 0, "campos": 0,
+                                                       "campos_encontrados": 0, "errores": 0,
+                                                       "tipos_detectados": {}})
+        stats["documentos"] += 1
+        stats["tipo_correcto"] += int(tipo == entrada["tipo_esperado"])
+        stats["campos"] += len(entrada["campos"])
+        stats["campos_encontrados"] += encontrados
+        stats["errores"] += int("error" in resultado)
+        stats["tipos_detectados"][tipo] = stats["tipos_detectados"].get(tipo, 0) + 1
+    return resumen
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Genera PDFs ficticios de pólizas para benchmarks y pruebas de carga",
+        epilog="Tipos sin layout (la detección los clasifica como SALUD_COLECTIVO): "
+               + ", ".join(LAYOUTS_NO_SOPORTADOS))
+    parser.add_argument("directorio", help="Carpeta de salida")
+    parser.add_argument("-l", "--layouts", nargs="*", choices=list(LAYOUTS), help="Layouts a generar (por defecto todos)")
+    parser.add_argument("-c", "--cantidad", type=int, default=1, help="PDFs por layout")
+    parser.add_argument("-p", "--paginas", type=int, default=2, help="Páginas mínimas por PDF (se completan con condiciones generales)")
+    parser.add_argument("-a", "--asegurados", type=int, default=3, help="Filas de la relación de asegurados/beneficiarios")
+    parser.add_argument("-s", "--semilla", type=int, default=0, help="Semilla base")
+    parser.add_argument("-j", "--procesos", type=int, default=1, help="Procesos en paralelo")
+    parser.add_argument("--verificar", action="store_true", help="Pasar los PDFs por validate_endoso y reportar aciertos")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    manifiesto = generar_corpus(args.directorio, args.layouts, args.cantidad, args.paginas,
+                                args.asegurados, args.semilla, args.procesos)
+    print(f"Generados {len(manifiesto)} PDFs ({sum(e['paginas'] for e in manifiesto)} páginas) en {args.directorio}")
+
+    if args.verificar:
+        resumen = verificar_corpus(args.directorio, manifiesto)
+        print(f"{'layout':32} {'docs':>5} {'tipo ok':>8} {'errores':>8} {'campos':>9}  detectados")
+        for layout, stats in resumen.items():
+            print(f"{layout:32} {stats['documentos']:>5} {stats['tipo_correcto']:>8} {stats['errores']:>8} "
+                  f"{stats['campos_encontrados']:>4}/{stats['campos']:<4}  {stats['tipos_detectados']}")
+        correcto = all(s["tipo_correcto"] == s["documentos"] and not s["errores"] for s in resumen.values())
+        return 0 if correcto else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
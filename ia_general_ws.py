@@ -1,5 +1,4 @@
-from flask import Flask, request, jsonify
-import requests
+from flask import Flask, request, jsonify, Response, stream_with_context
 import re
 import logging
 import tempfile
@@ -8,104 +7,97 @@ import os
 import sys
 import json
 from pathlib import Path
-import importlib.util
+from typing import Union
 import io
-
-# --- IMPORTACIÓN DE MÓDULOS DE EXTRACTORES ---
-# Función para importar módulos dinámicamente
-def importar_modulo(nombre_archivo):
-    try:
-        spec = importlib.util.spec_from_file_location(nombre_archivo, nombre_archivo)
-        modulo = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(modulo)
-        return modulo
-    except Exception as e:
-        logging.error(f"Error al importar módulo {nombre_archivo}: {str(e)}")
-        return None
+import time
+import threading
+import queue
+import uuid
+import multiprocessing
+import signal
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, CancelledError, TimeoutError as FuturesTimeoutError
+from concurrent.futures import wait as wait_futures
+from concurrent.futures.process import BrokenProcessPool
+from contexto_documento import DocumentContext
+import descargas
+from descargas import DescargaPDF
+from cache_resultados import crear_cache_desde_entorno
+from patrones_registro import registro as registro_patrones, documento_en_curso
+from artefactos import sumidero as sumidero_artefactos
+from registro_extractores import registro_extractores
+import sesiones_http
+import tiempos
+from tiempos import estadisticas_tiempos
+import metricas
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Importar extractores
+# --- EXTRACTORES ---
+# El validador se importa al arrancar; los módulos de cada extractor los importa
+# registro_extractores la primera vez que se usan (misma instancia que usa el validador)
 try:
-    validador_tipo_endoso = importar_modulo("validar_tipo_endoso.py")
-    endosos_autos = importar_modulo("endosos_autos_a.py")
-    data_ia_general_vida = importar_modulo("data_ia_general_vida.py")
-    data_ia_general_salud_familiar = importar_modulo("data_ia_general_salud_familiar.py")
-    data_ia_general_salud_familiar_variantef = importar_modulo("data_ia_general_salud_familiar_variantef.py")
-    data_ia_general_salud_colectivo = importar_modulo("data_ia_general_salud_colectivo.py")
-    data_ia_general_vida_individual = importar_modulo("data_ia_general_vida_individual.py")
-    data_ia_general_protgt_ppr = importar_modulo("data_ia_general_protgt_ppr.py")
-    data_ia_general_vida_protgt = importar_modulo("data_ia_general_vida_protgt.py")
-    data_ia_general_protgt_mn = importar_modulo("data_ia_general_protgt_mn.py")
-    data_ia_general_proteccion_efectiva = importar_modulo("data_ia_general_proteccion_efectiva.py")
-    data_ia_general_protgt_pyme = importar_modulo("data_ia_general_protgt_pyme.py")
-    data_ia_general_kids = importar_modulo("data_ia_general_kids.py")
-    
-    if validador_tipo_endoso:
-        logging.info("Módulo validar_tipo_endoso.py cargado correctamente")
-    else:
-        logging.error("No se pudo cargar validar_tipo_endoso.py. La detección de documentos podría ser imprecisa.")
+    import validar_tipo_endoso as validador_tipo_endoso
+    logging.info("Módulo validar_tipo_endoso.py cargado correctamente")
 except Exception as e:
-    logging.error(f"Error al cargar los módulos: {str(e)}")
+    logging.error(f"No se pudo cargar validar_tipo_endoso.py. La detección de documentos podría ser imprecisa: {str(e)}")
+    validador_tipo_endoso = None
+
+# Tipos de documento que atiende el servicio con un extractor específico
+TIPOS_EXTRACTORES = [
+    "ENDOSO_A",
+    "POLIZA_VIDA",
+    "SALUD_FAMILIAR",
+    "SALUD_FAMILIAR_VARIANTEF",
+    "SALUD_COLECTIVO",
+    "POLIZA_VIDA_INDIVIDUAL",
+    "POLIZA_ALIADOS_PPR",
+    "POLIZA_VIDA_PROTGT",
+    "POLIZA_PROTGT_TEMPORAL_MN",
+    "PROTECCION_EFECTIVA",
+    "PROTGT_PYME",
+    "ALIADOS_KIDS",
+]
+
+def extractor_diferido(tipo):
+    """Devuelve una función que importa el extractor del tipo en su primera llamada."""
+    def extractor(pdf_path):
+        funcion = registro_extractores.obtener(tipo)
+        if funcion is None:
+            raise RuntimeError(f"No se pudo importar el extractor para {tipo}")
+        return funcion(pdf_path)
+    extractor.__name__ = f"extractor_{tipo.lower()}"
+    return extractor
 
 app = Flask(__name__)
+# Peticiones, latencia y en curso por endpoint; expone /metrics (formato Prometheus)
+metricas.instrumentar_app(app)
 
 class PolizaProcessor:
     def __init__(self):
         self.extractores = {}
         self.cargar_extractores()
+        # Los procesos del pool de /batch no usan la cache: la consulta el proceso principal
+        self.cache = crear_cache_desde_entorno() if multiprocessing.parent_process() is None else None
     
     def cargar_extractores(self):
-        """Carga los extractores disponibles"""
-        # Extractor de endosos de autos
-        if 'endosos_autos' in globals():
-            self.extractores["ENDOSO_A"] = endosos_autos.extraer_datos_endoso_a
-        
-        # Extractores de pólizas de vida y salud
-        if 'data_ia_general_vida' in globals():
-            self.extractores["POLIZA_VIDA"] = data_ia_general_vida.extraer_datos_poliza_vida
-        
-        if 'data_ia_general_salud_familiar' in globals():
-            self.extractores["SALUD_FAMILIAR"] = data_ia_general_salud_familiar.extraer_datos_poliza_salud_familiar
-        
-        if 'data_ia_general_salud_familiar_variantef' in globals():
-            self.extractores["SALUD_FAMILIAR_VARIANTEF"] = data_ia_general_salud_familiar_variantef.extraer_datos_poliza_salud_familiar_variantef
-        
-        if 'data_ia_general_salud_colectivo' in globals():
-            self.extractores["SALUD_COLECTIVO"] = data_ia_general_salud_colectivo.extraer_datos_poliza_salud_colectivo
-        
-        if 'data_ia_general_vida_individual' in globals():
-            self.extractores["POLIZA_VIDA_INDIVIDUAL"] = data_ia_general_vida_individual.extraer_datos_poliza_vida_individual
-        
-        if 'data_ia_general_protgt_ppr' in globals():
-            self.extractores["POLIZA_ALIADOS_PPR"] = data_ia_general_protgt_ppr.extraer_datos_poliza_aliados_ppr
-        
-        if 'data_ia_general_vida_protgt' in globals():
-            self.extractores["POLIZA_VIDA_PROTGT"] = data_ia_general_vida_protgt.extraer_datos_poliza_vida_protgt
-        
-        if 'data_ia_general_protgt_mn' in globals():
-            self.extractores["POLIZA_PROTGT_TEMPORAL_MN"] = data_ia_general_protgt_mn.extraer_datos_poliza_protgt_temporal_mn
-        
-        if 'data_ia_general_proteccion_efectiva' in globals():
-            self.extractores["PROTECCION_EFECTIVA"] = data_ia_general_proteccion_efectiva.extraer_datos_poliza_proteccion_efectiva
+        """Registra los extractores disponibles (los módulos se importan al primer uso)"""
+        for tipo in TIPOS_EXTRACTORES:
+            if registro_extractores.tiene(tipo):
+                self.extractores[tipo] = extractor_diferido(tipo)
         
-        if 'data_ia_general_protgt_pyme' in globals():
-            self.extractores["PROTGT_PYME"] = data_ia_general_protgt_pyme.extraer_datos_poliza_protgt_pyme
-        
-        if 'data_ia_general_kids' in globals():
-            self.extractores["ALIADOS_KIDS"] = data_ia_general_kids.extraer_datos_poliza_aliados_kids
-        
-        logging.info(f"Extractores cargados: {list(self.extractores.keys())}")
+        logging.info(f"Extractores registrados: {list(self.extractores.keys())}")
 
     def detectar_tipo_documento(self, pdf_path):
         """Detecta el tipo de documento para seleccionar el extractor apropiado"""
+        # Compartir un único documento abierto entre el validador y las detecciones alternativas
+        documento = pdf_path if isinstance(pdf_path, DocumentContext) else DocumentContext(pdf_path)
         try:
             # Usar el validador importado globalmente
-            if 'validador_tipo_endoso' in globals() and validador_tipo_endoso:
+            if validador_tipo_endoso:
                 try:
-                    resultado = validador_tipo_endoso.validate_endoso(pdf_path)
+                    resultado = validador_tipo_endoso.validate_endoso(documento)
                     if resultado and "tipo_documento" in resultado:
                         tipo = resultado["tipo_documento"]
                         descripcion = resultado.get("descripcion", "")
@@ -120,29 +112,25 @@ class PolizaProcessor:
             
             # Detección alternativa si validador falló
             # Detectar ENDOSO_A
-            if 'endosos_autos' in globals() and hasattr(endosos_autos, 'detectar_formato'):
+            if registro_extractores.tiene("ENDOSO_A", "detectar"):
                 try:
-                    texto = endosos_autos.extraer_texto_pdf(pdf_path)
-                    formato = endosos_autos.detectar_formato(texto)
+                    texto = registro_extractores.obtener("ENDOSO_A", "texto")(documento)
+                    formato = registro_extractores.obtener("ENDOSO_A", "detectar")(texto)
                     if formato != "FORMATO_DESCONOCIDO":
                         return "ENDOSO_A", None
                 except Exception as e:
                     logging.warning(f"Error al detectar formato endosos_autos: {str(e)}")
             
             # Intentar con data_ia_general_salud_colectivo (prioridad alta por ser nuevo)
-            if 'data_ia_general_salud_colectivo' in globals():
+            if registro_extractores.tiene("SALUD_COLECTIVO", "detectar"):
                 try:
                     # Extraer texto para la detección
-                    import fitz
-                    doc = fitz.open(pdf_path)
-                    texto = ""
-                    for page in doc:
-                        texto += page.get_text("text") + "\n"
-                    doc.close()
+                    texto = documento.text
                     
                     # Intentar detectar con la función específica
-                    if hasattr(data_ia_general_salud_colectivo, 'detectar_tipo_documento'):
-                        tipo_detectado = data_ia_general_salud_colectivo.detectar_tipo_documento(texto)
+                    detectar_salud_colectivo = registro_extractores.obtener("SALUD_COLECTIVO", "detectar")
+                    if detectar_salud_colectivo:
+                        tipo_detectado = detectar_salud_colectivo(texto)
                         logging.info(f"Detector salud_colectivo devolvió: {tipo_detectado}")
                         if tipo_detectado == "SALUD_COLECTIVO":
                             logging.info("Tipo de documento identificado como Salud Colectivo")
@@ -157,19 +145,13 @@ class PolizaProcessor:
                 if tipo != "ENDOSO_A" and tipo != "SALUD_COLECTIVO":  # Ya intentamos estos
                     try:
                         # Intentar usar función de detección específica si existe
-                        modulo_nombre = f"data_ia_general_{tipo.lower()}"
-                        if modulo_nombre in globals():
-                            modulo = globals()[modulo_nombre]
-                            if hasattr(modulo, 'detectar_tipo_documento'):
-                                texto = ""
-                                # Extraer texto para la detección
-                                import fitz
-                                doc = fitz.open(pdf_path)
-                                for page in doc:
-                                    texto += page.get_text("text") + "\n"
-                                doc.close()
+                        if registro_extractores.tiene(tipo, "detectar"):
+                            detectar = registro_extractores.obtener(tipo, "detectar")
+                            if detectar:
+                                # Extraer texto para la detección (se calcula una sola vez)
+                                texto = documento.text
                                 
-                                detectado = modulo.detectar_tipo_documento(texto)
+                                detectado = detectar(texto)
                                 if detectado != "DESCONOCIDO":
                                     logging.info(f"Tipo de documento identificado como {tipo}")
                                     return tipo, None
@@ -184,6 +166,9 @@ class PolizaProcessor:
         except Exception as e:
             logging.error(f"Error en detección de tipo de documento: {str(e)}")
             return "DESCONOCIDO", None
+        finally:
+            if documento is not pdf_path:
+                documento.close()
 
     def formatear_datos_financieros(self, datos, tipo_documento):
         """Formatea los datos financieros para el API"""
@@ -340,25 +325,50 @@ class PolizaProcessor:
         
         return datos
             
+    def descargar_pdf(self, pdf_url: str, timeout: float = descargas.TIMEOUT) -> DescargaPDF:
+        """Descarga un PDF desde una URL por streaming (con límite de tamaño y SHA-256 calculado al vuelo)"""
+        return descargas.descargar_pdf(pdf_url, timeout=timeout)
+
     def process_pdf(self, pdf_url: str) -> dict:
         """Procesa un PDF desde una URL y extrae su información"""
+        try:
+            with tiempos.etapa("descarga"):
+                descarga = self.descargar_pdf(pdf_url)
+        except Exception as e:
+            logging.error(f"Error al procesar PDF: {str(e)}")
+            return {"error": str(e)}
+        
+        with descarga:
+            return self.procesar_contenido(descarga, pdf_url)
+
+    def procesar_contenido(self, contenido: Union[bytes, DescargaPDF], pdf_url: str = "", usar_cache: bool = True) -> dict:
+        """Detecta el tipo y extrae la información de un PDF ya descargado (bytes o DescargaPDF)"""
         temp_dir = tempfile.mkdtemp()
         pdf_path = Path(temp_dir) / "documento.pdf"
+        documento = None
 
         try:
-            # Descargar PDF
-            response = requests.get(
-                pdf_url,
-                headers={'Accept': 'application/pdf'},
-                timeout=30
-            )
-            response.raise_for_status()
-
-            if 'application/pdf' not in response.headers.get('Content-Type', ''):
-                raise ValueError("El archivo no es un PDF válido")
+            # Contexto compartido: el PDF se parsea una sola vez para detección y extracción
+            if isinstance(contenido, DescargaPDF) and contenido.en_disco:
+                # La descarga ya está en disco: se usa ese archivo sin cargarlo en memoria
+                documento = DocumentContext(contenido.ruta, sha256=contenido.sha256)
+            elif isinstance(contenido, DescargaPDF):
+                documento = DocumentContext(pdf_path, contenido=contenido.leer(), sha256=contenido.sha256)
+            else:
+                documento = DocumentContext(pdf_path, contenido=contenido)
+            
+            # Si el mismo PDF ya se procesó con esta versión de los extractores, reutilizar el resultado
+            if usar_cache and self.cache:
+                with tiempos.etapa("cache"):
+                    en_cache = self.cache.obtener(documento.sha256)
+                if en_cache is not None:
+                    logging.info(f"Resultado obtenido de cache para {pdf_url} ({documento.sha256[:12]})")
+                    tiempos.establecer_tipo(en_cache.get("tipo_documento"))
+                    return en_cache
             
-            # Guardar PDF temporalmente
-            pdf_path.write_bytes(response.content)
+            # Guardar PDF temporalmente (si no se está usando ya un archivo en disco)
+            if documento.ruta == str(pdf_path):
+                pdf_path.write_bytes(documento.raw)
             
             # **1. Definir la estructura base completa con valores por defecto**
             # Incluir TODOS los campos posibles de todos los extractores
@@ -438,7 +448,8 @@ class PolizaProcessor:
             }
 
             # **2. Detectar el tipo de documento y procesar**
-            tipo_documento, resultado_validacion = self.detectar_tipo_documento(pdf_path)
+            tipo_documento, resultado_validacion = self.detectar_tipo_documento(documento)
+            tiempos.establecer_tipo(tipo_documento)
             
             if tipo_documento == "DESCONOCIDO":
                 return {
@@ -461,7 +472,8 @@ class PolizaProcessor:
                 if tipo_documento in self.extractores:
                     try:
                         extractor = self.extractores[tipo_documento]
-                        datos_completos_extraidos = extractor(pdf_path)
+                        with tiempos.etapa("extraer"), documento_en_curso(documento):
+                            datos_completos_extraidos = extractor(documento)
                         
                         # Formatear datos financieros
                         datos_financieros = self.formatear_datos_financieros(datos_completos_extraidos, tipo_documento)
@@ -496,6 +508,7 @@ class PolizaProcessor:
                     }
             
             # **4. Rellenar estructura base con datos extraídos**
+            tiempos.iniciar_etapa("respuesta")
             if datos_completos_extraidos:
                 # Eliminar campos que no deben estar en la respuesta
                 campos_a_excluir = []
@@ -626,6 +639,13 @@ class PolizaProcessor:
                 "datos_financieros": respuesta_financiera_base,
                 "datos_completos": respuesta_poliza_base
             }
+            if resultado_validacion and resultado_validacion.get("paginas_leidas"):
+                respuesta["paginas_leidas"] = resultado_validacion["paginas_leidas"]
+            tiempos.terminar_etapa("respuesta")
+            
+            if usar_cache and self.cache:
+                with tiempos.etapa("cache"):
+                    self.cache.guardar(documento.sha256, respuesta)
             
             return respuesta
         
@@ -635,6 +655,8 @@ class PolizaProcessor:
             
         finally:
             # Limpiar archivos temporales
+            if documento:
+                documento.close()
             if pdf_path.exists():
                 pdf_path.unlink()
             try:
@@ -644,7 +666,23 @@ class PolizaProcessor:
 
 processor = PolizaProcessor()
 
+def aplanar_respuesta(result: dict) -> dict:
+    """Crea la estructura de respuesta plana que devuelven /polizas y /batch"""
+    respuesta = {}
+    
+    # Agregar datos financieros y de póliza directamente al objeto raíz
+    for key, value in result.items():
+        if key not in ["tipo_documento", "descripcion", "ramo"]:
+            respuesta[key] = value
+    
+    # Agregar información adicional que pueda ser útil
+    respuesta["document_type"] = result.get("tipo_documento", "DESCONOCIDO")
+    respuesta["description"] = result.get("descripcion", "")
+    respuesta["ramo"] = result.get("ramo", "DESCONOCIDO")
+    return respuesta
+
 @app.route('/polizas', methods=['POST'])
+@estadisticas_tiempos.medir_endpoint
 def process_policy():
     try:
         pdf_url = request.json.get('pdf_url')
@@ -653,19 +691,10 @@ def process_policy():
 
         # Procesar el PDF
         result = processor.process_pdf(pdf_url)
+        metricas.registrar_documento(result.get("tipo_documento"), "error" in result)
         
         # Crear estructura de respuesta plana
-        respuesta = {}
-        
-        # Agregar datos financieros y de póliza directamente al objeto raíz
-        for key, value in result.items():
-            if key not in ["tipo_documento", "descripcion", "ramo"]:
-                respuesta[key] = value
-        
-        # Agregar información adicional que pueda ser útil
-        respuesta["document_type"] = result.get("tipo_documento", "DESCONOCIDO")
-        respuesta["description"] = result.get("descripcion", "")
-        respuesta["ramo"] = result.get("ramo", "DESCONOCIDO")
+        respuesta = aplanar_respuesta(result)
         
         return jsonify({'data': respuesta})
 
@@ -673,6 +702,229 @@ def process_policy():
         logger.error(f"Error procesando póliza: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# --- PROCESAMIENTO EN PARALELO DE /batch ---
+# La detección y extracción (MuPDF + regex) es CPU y el GIL impide paralelizarla con hilos,
+# por eso se delega a un pool de procesos. Las descargas se hacen en hilos del proceso
+# principal y se solapan con la extracción de los documentos ya descargados.
+BATCH_WORKERS = int(os.environ.get("PRISMA_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+BATCH_TIMEOUT = float(os.environ.get("PRISMA_BATCH_TIMEOUT", "120"))
+
+batch_en_curso = metricas.registro.medidor(
+    "prisma_batch_documentos_en_curso", "Documentos de /batch y /jobs descargándose o en el pool de procesos")
+
+class PoolBatch:
+    """
+    Pool de procesos de /batch que sabe qué worker ejecuta cada tarea.
+
+    Cada worker avisa por una cola (pid, tarea) al empezar una extracción; así el plazo
+    de la extracción cuenta desde que un worker la toma (la espera en la cola del pool
+    no cuenta) y, si se agota, se puede terminar el proceso que se quedó trabado.
+    Un `ProcessPoolExecutor` no interrumpe una tarea en curso (`cancel()` no la detiene).
+    """
+
+    def __init__(self, max_workers: int):
+        contexto = multiprocessing.get_context("spawn")
+        self._avisos = contexto.SimpleQueue()
+        self._lock = threading.Lock()
+        self._inicios = {}
+        self._pids = {}
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=contexto,
+            initializer=_iniciar_worker_batch,
+            initargs=(self._avisos,)
+        )
+        threading.Thread(target=self._escuchar_avisos, name="batch-avisos", daemon=True).start()
+
+    def _escuchar_avisos(self):
+        while True:
+            aviso = self._avisos.get()
+            if aviso is None:
+                return
+            tarea, pid = aviso
+            with self._lock:
+                evento = self._inicios.get(tarea)
+                if evento is not None:
+                    self._pids[tarea] = pid
+            if evento is not None:
+                evento.set()
+
+    def ejecutar(self, contenido: bytes, pdf_url: str, timeout: float) -> dict:
+        """
+        Extrae el PDF en un worker y espera a lo sumo `timeout` segundos desde que empieza.
+
+        Raises:
+            FuturesTimeoutError: Si la extracción no termina a tiempo (el worker se termina)
+            BrokenProcessPool: Si un worker del pool murió
+        """
+        tarea = uuid.uuid4().hex
+        evento = threading.Event()
+        with self._lock:
+            self._inicios[tarea] = evento
+        try:
+            try:
+                futuro = self.executor.submit(_extraer_en_proceso, contenido, pdf_url, tarea)
+            except RuntimeError as e:
+                if isinstance(e, BrokenProcessPool):
+                    raise
+                # Otro hilo retiró este pool (p. ej. tras un timeout) entre obtenerlo y enviar la
+                # tarea: "cannot schedule new futures after shutdown" se trata como pool roto
+                raise BrokenProcessPool(str(e)) from e
+            futuro.add_done_callback(lambda _: evento.set())
+            evento.wait()
+            if futuro.done():
+                return futuro.result()
+            try:
+                return futuro.result(timeout=timeout)
+            except FuturesTimeoutError:
+                with self._lock:
+                    pid = self._pids.get(tarea)
+                self._terminar_worker(pid, pdf_url)
+                raise
+        finally:
+            with self._lock:
+                self._inicios.pop(tarea, None)
+                self._pids.pop(tarea, None)
+
+    def _terminar_worker(self, pid, pdf_url: str):
+        """Mata el worker trabado y retira el pool para que las nuevas tareas usen uno nuevo"""
+        _reiniciar_pool_batch(self)
+        if pid is None:
+            return
+        logging.warning(f"Terminando el worker {pid} de /batch, trabado procesando {pdf_url}")
+        try:
+            os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+        except OSError as e:
+            logging.warning(f"No se pudo terminar el worker {pid}: {str(e)}")
+
+    def cerrar(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._avisos.put(None)
+
+_pool_batch = None
+_pool_batch_lock = threading.Lock()
+
+def _obtener_pool_batch() -> PoolBatch:
+    """Devuelve el pool de procesos de /batch, creándolo la primera vez"""
+    global _pool_batch
+    with _pool_batch_lock:
+        if _pool_batch is None:
+            logging.info(f"Iniciando pool de procesos para /batch con {BATCH_WORKERS} workers")
+            _pool_batch = PoolBatch(BATCH_WORKERS)
+        return _pool_batch
+
+def _reiniciar_pool_batch(pool: PoolBatch):
+    """Descarta `pool` (p. ej. si un worker murió) para que se cree uno nuevo; no hace nada si ya se descartó"""
+    global _pool_batch
+    with _pool_batch_lock:
+        if _pool_batch is not pool:
+            return
+        _pool_batch = None
+    pool.cerrar()
+
+# Cola de avisos del proceso worker (la fija el initializer del pool)
+_avisos_batch = None
+
+def _iniciar_worker_batch(avisos):
+    global _avisos_batch
+    _avisos_batch = avisos
+
+def _extraer_en_proceso(contenido: bytes, pdf_url: str, tarea: str = None) -> dict:
+    """Se ejecuta dentro de un proceso del pool: detección y extracción del PDF"""
+    if tarea and _avisos_batch is not None:
+        _avisos_batch.put((tarea, os.getpid()))
+    return processor.procesar_contenido(contenido, pdf_url, usar_cache=False)
+
+def _extraer_en_pool(contenido: bytes, pdf_url: str, timeout: float) -> dict:
+    """
+    Extrae el PDF en el pool de procesos de /batch.
+
+    Si el pool se rompe mientras la tarea espera o se ejecuta (un worker murió o se
+    terminó por agotar el plazo de otro documento), se reintenta una vez en un pool nuevo.
+    """
+    for intento in range(2):
+        pool = _obtener_pool_batch()
+        try:
+            return pool.ejecutar(contenido, pdf_url, timeout)
+        except (BrokenProcessPool, CancelledError) as e:
+            # Al retirar un pool roto se cancelan también las tareas que aún no empezaban
+            _reiniciar_pool_batch(pool)
+            if intento:
+                raise
+            logging.warning(f"El pool de procesos de /batch dejó de funcionar ({type(e).__name__}); reintentando {pdf_url}")
+
+def _procesar_url_batch(url: str, timeout: float) -> dict:
+    """
+    Descarga un PDF y delega su extracción al pool de procesos.
+    
+    Args:
+        url: URL del PDF
+        timeout: Segundos máximos para la descarga y, por separado, para la extracción
+            (contados desde que un worker la empieza)
+        
+    Returns:
+        dict: Resultado del batch para la URL (status success/error)
+    """
+    batch_en_curso.inc()
+    try:
+        with processor.descargar_pdf(url, timeout=timeout) as descarga:
+            # La cache vive en el proceso principal; los workers no la usan.
+            # El SHA-256 ya se calculó durante la descarga.
+            sha256 = descarga.sha256
+            result = processor.cache.obtener(sha256) if processor.cache else None
+            # El contenido solo se lee (y se envía al worker) si no hay resultado en cache
+            contenido = descarga.leer() if result is None else None
+        if result is not None:
+            logging.info(f"Resultado obtenido de cache para {url} ({sha256[:12]})")
+        else:
+            try:
+                result = _extraer_en_pool(contenido, url, timeout)
+            except FuturesTimeoutError:
+                logging.error(f"Tiempo de espera agotado procesando {url}")
+                metricas.registrar_documento(None, True)
+                return {'url': url, 'status': 'error', 'error': f'Tiempo de espera agotado ({timeout:g}s)'}
+            if processor.cache and "error" not in result:
+                processor.cache.guardar(sha256, result)
+        
+        metricas.registrar_documento(result.get("tipo_documento"), "error" in result)
+        return {'url': url, 'status': 'success', 'data': aplanar_respuesta(result)}
+    except BrokenProcessPool as e:
+        logging.error(f"El pool de procesos de /batch dejó de funcionar: {str(e)}")
+        metricas.registrar_documento(None, True)
+        return {'url': url, 'status': 'error', 'error': 'Fallo interno del worker de extracción'}
+    except Exception as e:
+        logging.error(f"Error procesando {url} en batch: {str(e)}")
+        metricas.registrar_documento(None, True)
+        return {'url': url, 'status': 'error', 'error': str(e)}
+    finally:
+        batch_en_curso.dec()
+
+def _stream_batch(pdf_urls: list, timeout: float):
+    """
+    Genera una línea NDJSON por documento en cuanto termina (orden de finalización).
+    
+    Solo hay `2 * BATCH_WORKERS` documentos en curso a la vez, por lo que la memoria
+    no depende del tamaño del lote. Cada línea incluye `indice` (posición en pdf_urls).
+    """
+    ventana = BATCH_WORKERS * 2
+    urls = iter(enumerate(pdf_urls))
+    pendientes = {}
+    with ThreadPoolExecutor(max_workers=min(len(pdf_urls), ventana)) as hilos:
+        def llenar_ventana():
+            for indice, url in urls:
+                pendientes[hilos.submit(_procesar_url_batch, url, timeout)] = indice
+                if len(pendientes) >= ventana:
+                    break
+        
+        llenar_ventana()
+        while pendientes:
+            hechos, _ = wait_futures(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                resultado = futuro.result()
+                resultado['indice'] = pendientes.pop(futuro)
+                yield json.dumps(resultado, ensure_ascii=False) + "\n"
+            llenar_ventana()
+
 @app.route('/batch', methods=['POST'])
 def process_batch():
     try:
@@ -680,36 +932,17 @@ def process_batch():
         if not pdf_urls:
             return jsonify({'error': 'Se requiere una lista de URLs en pdf_urls'}), 400
         
-        results = []
-        for url in pdf_urls:
-            try:
-                # Procesar el PDF
-                result = processor.process_pdf(url)
-                
-                # Crear estructura de respuesta plana
-                respuesta = {}
-                
-                # Agregar datos financieros y de póliza directamente al objeto raíz
-                for key, value in result.items():
-                    if key not in ["tipo_documento", "descripcion", "ramo"]:
-                        respuesta[key] = value
-                
-                # Agregar información adicional que pueda ser útil
-                respuesta["document_type"] = result.get("tipo_documento", "DESCONOCIDO")
-                respuesta["description"] = result.get("descripcion", "")
-                respuesta["ramo"] = result.get("ramo", "DESCONOCIDO")
-                
-                results.append({
-                    'url': url,
-                    'status': 'success',
-                    'data': respuesta
-                })
-            except Exception as e:
-                results.append({
-                    'url': url,
-                    'status': 'error',
-                    'error': str(e)
-                })
+        timeout = float(request.json.get('timeout', BATCH_TIMEOUT))
+        
+        # Modo streaming (opt-in): una línea JSON por documento en cuanto termina
+        if request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson':
+            return Response(stream_with_context(_stream_batch(pdf_urls, timeout)), mimetype='application/x-ndjson')
+        
+        # Hasta 2 descargas en curso por worker para que el pool no se quede sin trabajo;
+        # los resultados se recogen en el mismo orden que pdf_urls
+        with ThreadPoolExecutor(max_workers=min(len(pdf_urls), BATCH_WORKERS * 2)) as hilos:
+            futuros = [hilos.submit(_procesar_url_batch, url, timeout) for url in pdf_urls]
+            results = [futuro.result() for futuro in futuros]
         
         return jsonify({'results': results})
         
@@ -717,25 +950,293 @@ def process_batch():
         logger.error(f"Error procesando batch de pólizas: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# --- JOBS ASÍNCRONOS (/jobs) ---
+# Para lotes grandes: POST /jobs devuelve un id de inmediato y un pool de hilos vacía la
+# cola procesando cada URL igual que /batch. El cliente consulta el estado (o espera con
+# long-poll) y recoge los resultados de cada documento a medida que terminan.
+JOB_WORKERS = int(os.environ.get("PRISMA_JOB_WORKERS", "0")) or BATCH_WORKERS * 2
+JOB_RETENCION = float(os.environ.get("PRISMA_JOB_RETENCION", "3600"))
+# Límites de admisión (0 = sin límite): jobs sin terminar (429 si se excede) y URLs por job (413)
+JOB_MAX_EN_CURSO = int(os.environ.get("PRISMA_JOB_MAX_EN_CURSO", "32"))
+JOB_MAX_URLS = int(os.environ.get("PRISMA_JOB_MAX_URLS", "1000"))
+JOB_MAX_ESPERA = 60.0
+
+class Job:
+    """Estado de un job: URLs a procesar, resultados por documento y orden de finalización"""
+    
+    def __init__(self, urls: list, timeout: float):
+        self.id = uuid.uuid4().hex
+        self.urls = urls
+        self.timeout = timeout
+        self.resultados = [None] * len(urls)
+        self.orden_completado = []
+        self.errores = 0
+        self.creado = time.time()
+        self.iniciado = None
+        self.terminado = None
+    
+    @property
+    def estado(self) -> str:
+        if self.terminado is not None:
+            return "completado"
+        if self.iniciado is not None:
+            return "en_proceso"
+        return "pendiente"
+    
+    def resumen(self) -> dict:
+        total = len(self.urls)
+        completados = len(self.orden_completado)
+        return {
+            "job_id": self.id,
+            "estado": self.estado,
+            "total": total,
+            "completados": completados,
+            "errores": self.errores,
+            "progreso": round(completados / total, 4) if total else 1.0,
+            "creado": self.creado,
+            "iniciado": self.iniciado,
+            "terminado": self.terminado
+        }
+
+class GestorJobs:
+    """Cola de documentos pendientes y pool de hilos que la procesa"""
+    
+    def __init__(self, num_workers: int, retencion: float, max_en_curso: int = 0, max_urls: int = 0):
+        self.num_workers = num_workers
+        self.retencion = retencion
+        self.max_en_curso = max_en_curso
+        self.max_urls = max_urls
+        self.cola = queue.Queue()
+        self.jobs = {}
+        self._cond = threading.Condition()
+        self._workers = []
+    
+    def _iniciar_workers(self):
+        if self._workers:
+            return
+        for n in range(self.num_workers):
+            hilo = threading.Thread(target=self._worker, name=f"job-worker-{n}", daemon=True)
+            hilo.start()
+            self._workers.append(hilo)
+        logging.info(f"Iniciados {self.num_workers} workers de jobs")
+    
+    def _purgar(self):
+        """Elimina los jobs terminados hace más de `retencion` segundos (con el lock tomado)"""
+        limite = time.time() - self.retencion
+        for job_id in [j.id for j in self.jobs.values() if j.terminado and j.terminado < limite]:
+            del self.jobs[job_id]
+    
+    def crear(self, urls: list, timeout: float):
+        """Crea el job y encola sus URLs; devuelve None si ya hay `max_en_curso` jobs sin terminar"""
+        job = Job(urls, timeout)
+        with self._cond:
+            self._purgar()
+            if self.max_en_curso and sum(1 for j in self.jobs.values() if j.terminado is None) >= self.max_en_curso:
+                return None
+            self._iniciar_workers()
+            self.jobs[job.id] = job
+            if not urls:
+                job.terminado = time.time()
+        for indice in range(len(urls)):
+            self.cola.put((job, indice))
+        logging.info(f"Job {job.id} creado con {len(urls)} documentos")
+        return job
+    
+    def obtener(self, job_id: str):
+        with self._cond:
+            self._purgar()
+            return self.jobs.get(job_id)
+    
+    def esperar(self, job: Job, desde: int, espera: float) -> None:
+        """Bloquea hasta que haya resultados posteriores a `desde`, el job termine o pase `espera`"""
+        limite = time.monotonic() + espera
+        with self._cond:
+            while len(job.orden_completado) <= desde and job.terminado is None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._cond.wait(restante)
+    
+    def instantanea(self, job: Job, desde: int = 0) -> dict:
+        """Resumen del job con los resultados completados a partir de la posición `desde`"""
+        with self._cond:
+            respuesta = job.resumen()
+            completados = job.orden_completado[desde:]
+            respuesta['resultados'] = [job.resultados[indice] for indice in completados]
+            respuesta['siguiente'] = desde + len(completados)
+            return respuesta
+    
+    def _worker(self):
+        while True:
+            job, indice = self.cola.get()
+            try:
+                with self._cond:
+                    if job.iniciado is None:
+                        job.iniciado = time.time()
+                resultado = _procesar_url_batch(job.urls[indice], job.timeout)
+            except Exception as e:
+                resultado = {'url': job.urls[indice], 'status': 'error', 'error': str(e)}
+            finally:
+                self.cola.task_done()
+            resultado['indice'] = indice
+            with self._cond:
+                job.resultados[indice] = resultado
+                job.orden_completado.append(indice)
+                if resultado['status'] == 'error':
+                    job.errores += 1
+                if len(job.orden_completado) == len(job.urls):
+                    job.terminado = time.time()
+                    logging.info(f"Job {job.id} completado ({job.errores} errores)")
+                self._cond.notify_all()
+    
+    def estadisticas(self) -> dict:
+        with self._cond:
+            self._purgar()
+            activos = [j for j in self.jobs.values() if j.terminado is None]
+            return {
+                "profundidad_cola": self.cola.qsize(),
+                "workers": len(self._workers) or self.num_workers,
+                "jobs_activos": len(activos),
+                "jobs_retenidos": len(self.jobs),
+                "max_en_curso": self.max_en_curso,
+                "max_urls": self.max_urls,
+                "documentos_pendientes": sum(len(j.urls) - len(j.orden_completado) for j in activos)
+            }
+
+gestor_jobs = GestorJobs(JOB_WORKERS, JOB_RETENCION, JOB_MAX_EN_CURSO, JOB_MAX_URLS)
+
+# --- MÉTRICAS CALCULADAS AL EXPONER /metrics ---
+def _consultas_cache():
+    if not processor.cache:
+        return None
+    stats = processor.cache.estadisticas()
+    return {("memoria",): stats["hits_memoria"], ("disco",): stats["hits_disco"], ("fallo",): stats["misses"]}
+
+metricas.registro.calculada(
+    "prisma_cache_consultas_total", "Consultas a la cache de resultados (acierto en memoria, en disco o fallo)",
+    _consultas_cache, tipo="counter", etiquetas=("resultado",))
+metricas.registro.calculada(
+    "prisma_jobs_cola", "Documentos en la cola de los workers de /jobs", lambda: gestor_jobs.cola.qsize())
+metricas.registro.calculada(
+    "prisma_jobs_activos", "Jobs sin terminar", lambda: gestor_jobs.estadisticas()["jobs_activos"])
+metricas.registro.calculada(
+    "prisma_artefactos_pendientes", "Artefactos en la cola de escritura",
+    lambda: sumidero_artefactos.estadisticas()["pendientes"])
+metricas.registro.calculada(
+    "prisma_regex_timeouts_total", "Búsquedas de patrones cortadas por exceder PRISMA_REGEX_TIMEOUT",
+    lambda: registro_patrones.resumen()["timeouts"], tipo="counter")
+metricas.registro.calculada(
+    "prisma_http_salida_reintentos_total", "Reintentos de las descargas HTTP salientes",
+    lambda: sesiones_http.estadisticas()["reintentos"], tipo="counter")
+
+@app.route('/jobs', methods=['POST'])
+def crear_job():
+    try:
+        pdf_urls = request.json.get('pdf_urls', [])
+        if not pdf_urls:
+            return jsonify({'error': 'Se requiere una lista de URLs en pdf_urls'}), 400
+        if gestor_jobs.max_urls and len(pdf_urls) > gestor_jobs.max_urls:
+            return jsonify({'error': f'Demasiadas URLs en el job: {len(pdf_urls)} (máximo {gestor_jobs.max_urls})'}), 413
+        
+        timeout = float(request.json.get('timeout', BATCH_TIMEOUT))
+        job = gestor_jobs.crear(list(pdf_urls), timeout)
+        if job is None:
+            return jsonify({'error': f'Demasiados jobs en curso (máximo {gestor_jobs.max_en_curso}); reintente más tarde'}), 429
+        
+        respuesta = job.resumen()
+        respuesta['url_estado'] = f"/jobs/{job.id}"
+        respuesta['profundidad_cola'] = gestor_jobs.cola.qsize()
+        return jsonify(respuesta), 202
+    
+    except Exception as e:
+        logger.error(f"Error creando job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def estado_job(job_id):
+    """
+    Estado de un job y resultados completados.
+    
+    Parámetros de consulta:
+        desde: Devuelve solo los resultados completados a partir de esta posición (cursor)
+        wait: Segundos a esperar (long-poll) si no hay resultados nuevos (máx. 60)
+    """
+    job = gestor_jobs.obtener(job_id)
+    if job is None:
+        return jsonify({'error': 'Job no encontrado'}), 404
+    
+    desde = max(request.args.get('desde', 0, type=int), 0)
+    espera = min(max(request.args.get('wait', 0, type=float), 0), JOB_MAX_ESPERA)
+    if espera:
+        gestor_jobs.esperar(job, desde, espera)
+    
+    return jsonify(gestor_jobs.instantanea(job, desde))
+
+@app.route('/jobs/<job_id>/resultados/<int:indice>', methods=['GET'])
+def resultado_job(job_id, indice):
+    """Resultado de un documento del job (posición en pdf_urls)"""
+    job = gestor_jobs.obtener(job_id)
+    if job is None:
+        return jsonify({'error': 'Job no encontrado'}), 404
+    if indice < 0 or indice >= len(job.urls):
+        return jsonify({'error': 'Índice fuera de rango'}), 404
+    
+    resultado = job.resultados[indice]
+    if resultado is None:
+        return jsonify({'job_id': job.id, 'indice': indice, 'url': job.urls[indice], 'status': 'pendiente'}), 202
+    return jsonify(resultado)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     # Verificar que los extractores estén cargados
     extractores_cargados = list(processor.extractores.keys())
     
     # Verificar si el validador está disponible
-    validador_activo = 'validador_tipo_endoso' in globals() and validador_tipo_endoso is not None
+    validador_activo = validador_tipo_endoso is not None
     
     return jsonify({
         'status': 'ok', 
         'service': 'ia_general_ws',
         'extractores_disponibles': extractores_cargados,
-        'validador_activo': validador_activo
+        'validador_activo': validador_activo,
+        'cache': processor.cache.estadisticas() if processor.cache else {'activa': False},
+        'jobs': gestor_jobs.estadisticas(),
+        'modulos_extractores': registro_extractores.estadisticas(),
+        'http': sesiones_http.estadisticas(),
+        'artefactos': sumidero_artefactos.estadisticas()
+    })
+
+@app.route('/patrones', methods=['GET'])
+def estadisticas_patrones():
+    """
+    Contadores por patrón del registro compartido (llamadas, aciertos, fallos, latencia).
+    
+    Parámetros de consulta:
+        top: Número de patrones a devolver (50 por defecto, 0 = todos)
+        orden: Campo para ordenar (tiempo_total_ms, llamadas, fallos, timeouts, tiempo_max_ms, ...)
+    """
+    top = request.args.get('top', 50, type=int)
+    orden = request.args.get('orden', 'tiempo_total_ms')
+    if orden not in ('tiempo_total_ms', 'tiempo_medio_ms', 'tiempo_max_ms', 'llamadas', 'aciertos', 'fallos', 'timeouts'):
+        return jsonify({'error': f'Campo de orden no válido: {orden}'}), 400
+    
+    return jsonify({
+        'resumen': registro_patrones.resumen(),
+        'patrones': registro_patrones.estadisticas(top=top or None, orden=orden)
     })
 
+@app.route('/tiempos', methods=['GET'])
+def estadisticas_tiempos_etapas():
+    """
+    Percentiles por tipo de documento y etapa (descarga, abrir, texto, detectar,
+    extraer, respuesta, ...) de las peticiones a /polizas medidas en este proceso.
+    """
+    return jsonify(estadisticas_tiempos.estadisticas())
+
 @app.route('/validador/estado', methods=['GET'])
 def validador_estado():
     """Endpoint para verificar el estado del validador"""
-    if 'validador_tipo_endoso' in globals() and validador_tipo_endoso is not None:
+    if validador_tipo_endoso is not None:
         return jsonify({
             'status': 'ok',
             'message': 'El validador de tipo de endoso está activo y funcionando',
@@ -750,7 +1251,7 @@ def validador_estado():
 
 if __name__ == '__main__':
     # Verificar si el validador está disponible al inicio
-    if 'validador_tipo_endoso' in globals() and validador_tipo_endoso is not None:
+    if validador_tipo_endoso is not None:
         logging.info("Iniciando servidor con validador_tipo_endoso activo")
     else:
         logging.warning("Iniciando servidor SIN validador_tipo_endoso. La detección de documentos puede ser imprecisa")
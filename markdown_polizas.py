@@ -0,0 +1,86 @@
+import re
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from patrones_registro import registro
+
+logger = logging.getLogger(__name__)
+
+# Sección del markdown: (título, {clave: valor})
+Seccion = Tuple[str, Dict[str, str]]
+
+
+def renderizar_markdown(titulo: str, secciones: List[Seccion], notas: str) -> str:
+    """
+    Construye el markdown de datos de una póliza.
+
+    Cada sección se escribe como `## Título` seguido de una línea `- **Clave**: valor`
+    por campo; al final va la sección de notas adicionales.
+
+    Args:
+        titulo: Título principal del documento
+        secciones: Lista de (título de sección, {clave: valor})
+        notas: Texto de la sección "Notas Adicionales"
+
+    Returns:
+        str: Contenido markdown
+    """
+    md_content = f"# {titulo}\n\n"
+    for nombre_seccion, campos in secciones:
+        md_content += f"## {nombre_seccion}\n"
+        for clave, valor in campos.items():
+            md_content += f"- **{clave}**: {valor}\n"
+        md_content += "\n"
+    md_content += "## Notas Adicionales\n"
+    md_content += notas
+    return md_content
+
+
+def valores_desde_contenido(contenido: str, claves: Iterable[str]) -> Dict[str, str]:
+    """
+    Lee los valores `- **Clave**: valor` de un markdown ya generado.
+
+    Args:
+        contenido: Texto del markdown
+        claves: Claves a buscar (tal como aparecen en negritas)
+
+    Returns:
+        Dict[str, str]: Valor (sin espacios en los extremos) de cada clave encontrada
+    """
+    valores = {}
+    for clave in claves:
+        patron = f"\\*\\*{re.escape(clave)}\\*\\*: ([^\\n]+)"
+        match = registro.search(patron, contenido)
+        if match:
+            valores[clave] = match.group(1).strip()
+    return valores
+
+
+def valores_desde_secciones(secciones: List[Seccion], claves: Iterable[str]) -> Dict[str, str]:
+    """
+    Obtiene los mismos valores que `valores_desde_contenido` sobre el markdown
+    renderizado, pero directamente de las secciones, sin construir ni recorrer el texto.
+
+    Reproduce lo que ocurre al escribir y releer el archivo: de cada valor solo
+    se conserva la primera línea (también `\\r` corta la línea al leer en modo
+    texto) y, si la primera línea está vacía, se toma la siguiente aparición de
+    la clave.
+
+    Args:
+        secciones: Lista de (título de sección, {clave: valor})
+        claves: Claves a buscar
+
+    Returns:
+        Dict[str, str]: Valor (sin espacios en los extremos) de cada clave encontrada
+    """
+    pendientes = set(claves)
+    valores = {}
+    for _, campos in secciones:
+        for clave, valor in campos.items():
+            if clave not in pendientes:
+                continue
+            linea = str(valor).replace("\r\n", "\n").replace("\r", "\n").split("\n", 1)[0]
+            if linea:
+                valores[clave] = linea.strip()
+                pendientes.discard(clave)
+    return valores
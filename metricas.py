@@ -0,0 +1,296 @@
+import os
+import math
+import time
+import bisect
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import tiempos
+
+logger = logging.getLogger(__name__)
+
+# Límites (en segundos) de los histogramas de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+RUTA_METRICAS = os.environ.get("PRISMA_METRICAS_RUTA", "/metrics")
+
+_INICIO_PROCESO = time.time()
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_valor(valor: float) -> str:
+    if valor == math.inf:
+        return "+Inf"
+    if isinstance(valor, int) or (isinstance(valor, float) and valor.is_integer() and abs(valor) < 1e15):
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _formatear_etiquetas(nombres: Sequence[str], valores: Sequence, extra: str = "") -> str:
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas: Dict) -> Tuple:
+        return tuple(str(etiquetas.get(nombre, "")) for nombre in self.etiquetas)
+
+    def lineas(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Contador(_Metrica):
+    """Contador monótono por combinación de etiquetas."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, cantidad: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def lineas(self) -> Iterable[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for clave, valor in valores:
+            yield f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_valor(valor)}"
+
+
+class Medidor(Contador):
+    """Valor que sube y baja (peticiones en curso, profundidad de una cola)."""
+
+    tipo = "gauge"
+
+    def dec(self, cantidad: float = 1, **etiquetas) -> None:
+        self.inc(-cantidad, **etiquetas)
+
+    def fijar(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = valor
+
+
+class Histograma(_Metrica):
+    """
+    Histograma acumulativo al estilo Prometheus.
+
+    Cada observación solo incrementa un contador por bucket (búsqueda binaria
+    sobre los límites); los acumulados `le` se calculan al exponer.
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # Por clave: [conteos por bucket (+Inf al final), suma]
+        self._series: Dict[Tuple, list] = {}
+
+    def observar(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def lineas(self) -> Iterable[str]:
+        with self._lock:
+            series = sorted((clave, list(conteos), suma) for clave, (conteos, suma) in self._series.items())
+        for clave, conteos, suma in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (math.inf,), conteos):
+                acumulado += conteo
+                le = f'le="{_formatear_valor(limite)}"'
+                yield f"{self.nombre}_bucket{_formatear_etiquetas(self.etiquetas, clave, le)} {acumulado}"
+            yield f"{self.nombre}_sum{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_valor(round(suma, 6))}"
+            yield f"{self.nombre}_count{_formatear_etiquetas(self.etiquetas, clave)} {acumulado}"
+
+
+class MetricaCalculada(_Metrica):
+    """
+    Métrica cuyo valor se lee al exponer (p. ej. de las estadísticas de la cache).
+
+    `funcion` devuelve un número o un diccionario {tupla de etiquetas: valor};
+    si falla, la métrica se omite en esa exposición.
+    """
+
+    def __init__(self, nombre: str, ayuda: str, funcion: Callable, tipo: str = "gauge",
+                 etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.tipo = tipo
+        self.funcion = funcion
+
+    def lineas(self) -> Iterable[str]:
+        try:
+            valores = self.funcion()
+        except Exception as e:
+            logger.warning(f"No se pudo calcular la métrica {self.nombre}: {str(e)}")
+            return
+        if valores is None:
+            return
+        if not isinstance(valores, dict):
+            valores = {(): valores}
+        for clave, valor in sorted(valores.items()):
+            if valor is None:
+                continue
+            clave = clave if isinstance(clave, tuple) else (clave,)
+            yield f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_valor(valor)}"
+
+
+class RegistroMetricas:
+    """Métricas del proceso, expuestas en el formato de texto de Prometheus."""
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica: _Metrica) -> _Metrica:
+        with self._lock:
+            existente = self._metricas.get(metrica.nombre)
+            if existente is not None:
+                # Registrar dos veces (p. ej. al recargar un módulo) devuelve la misma métrica
+                return existente
+            self._metricas[metrica.nombre] = metrica
+            return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Medidor:
+        return self._registrar(Medidor(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   buckets: Sequence[float] = BUCKETS_LATENCIA) -> Histograma:
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def calculada(self, nombre: str, ayuda: str, funcion: Callable, tipo: str = "gauge",
+                  etiquetas: Sequence[str] = ()) -> MetricaCalculada:
+        return self._registrar(MetricaCalculada(nombre, ayuda, funcion, tipo, etiquetas))
+
+    def exponer(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+        lineas: List[str] = []
+        for metrica in metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.lineas())
+        return "\n".join(lineas) + "\n"
+
+
+# Registro compartido por los servicios
+registro = RegistroMetricas()
+
+peticiones = registro.contador(
+    "prisma_http_peticiones_total", "Peticiones HTTP atendidas", ("endpoint", "metodo", "codigo"))
+duracion_peticiones = registro.histograma(
+    "prisma_http_duracion_segundos", "Latencia de las peticiones HTTP por endpoint", ("endpoint",))
+en_curso = registro.medidor(
+    "prisma_http_en_curso", "Peticiones HTTP en curso", ("endpoint",))
+documentos = registro.contador(
+    "prisma_documentos_total", "Documentos procesados por tipo y resultado (ok/error)",
+    ("tipo_documento", "resultado"))
+duracion_etapas = registro.histograma(
+    "prisma_etapa_duracion_segundos",
+    "Tiempo exclusivo por etapa (descarga, texto, detectar, extraer, ...) y tipo de documento",
+    ("tipo_documento", "etapa"))
+descargas = registro.contador(
+    "prisma_descargas_total", "Descargas de PDFs por URL por resultado (ok/error)", ("resultado",))
+bytes_descargados = registro.contador(
+    "prisma_descarga_bytes_total", "Bytes de PDFs descargados por URL")
+inicio_proceso = registro.calculada(
+    "prisma_proceso_inicio_segundos", "Momento de arranque del proceso (epoch)",
+    lambda: _INICIO_PROCESO)
+
+
+def registrar_documento(tipo_documento: Optional[str], error: bool) -> None:
+    """
+    Cuenta un documento procesado.
+
+    Si el resultado no trae el tipo (p. ej. un error después de detectarlo) se
+    usa el de la medición de `tiempos` de la petición en curso.
+    """
+    if not tipo_documento:
+        medicion = tiempos.medicion_actual()
+        tipo_documento = medicion.tipo if medicion is not None else None
+    documentos.inc(tipo_documento=tipo_documento or "DESCONOCIDO", resultado="error" if error else "ok")
+
+
+def _observar_medicion(medicion: "tiempos.Medicion") -> None:
+    tipo = medicion.tipo or "DESCONOCIDO"
+    for etapa, segundos in medicion.etapas.items():
+        duracion_etapas.observar(segundos, tipo_documento=tipo, etapa=etapa)
+
+
+# Las etapas medidas por `tiempos` alimentan el histograma por tipo y etapa
+tiempos.estadisticas_tiempos.agregar_observador(_observar_medicion)
+
+
+def instrumentar_app(app, ruta: str = RUTA_METRICAS) -> None:
+    """
+    Registra en una app de Flask las métricas por petición y el endpoint `ruta`.
+
+    El endpoint se identifica por la regla de la ruta (`/jobs/<job_id>`, no la URL
+    concreta) para que el número de series no crezca con cada id. El tiempo de
+    las respuestas en streaming (NDJSON de /batch) se cuenta hasta que termina
+    de enviarse.
+
+    Args:
+        app: Aplicación de Flask
+        ruta: Ruta del endpoint de métricas (por defecto PRISMA_METRICAS_RUTA, `/metrics`)
+    """
+    from flask import Response, g, request
+
+    def _endpoint() -> str:
+        return request.url_rule.rule if request.url_rule is not None else "sin_ruta"
+
+    @app.before_request
+    def _inicio_peticion():
+        g._metricas_inicio = time.perf_counter()
+        g._metricas_endpoint = _endpoint()
+        en_curso.inc(endpoint=g._metricas_endpoint)
+
+    @app.after_request
+    def _codigo_respuesta(respuesta):
+        g._metricas_codigo = respuesta.status_code
+        return respuesta
+
+    @app.teardown_request
+    def _fin_peticion(error=None):
+        inicio = g.pop("_metricas_inicio", None)
+        if inicio is None:
+            return
+        endpoint = g.pop("_metricas_endpoint", "sin_ruta")
+        codigo = g.pop("_metricas_codigo", 500)
+        en_curso.dec(endpoint=endpoint)
+        peticiones.inc(endpoint=endpoint, metodo=request.method, codigo=codigo)
+        duracion_peticiones.observar(time.perf_counter() - inicio, endpoint=endpoint)
+
+    def metricas():
+        return Response(registro.exponer(), content_type=TIPO_CONTENIDO)
+
+    app.add_url_rule(ruta, "metricas", metricas, methods=["GET"])
+
@@ -0,0 +1,272 @@
+import io
+import os
+import re
+import logging
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from contexto_documento import DocumentContext
+
+logger = logging.getLogger(__name__)
+
+# Formato -> (extensión, mimetype)
+FORMATOS = {
+    "jpeg": ("jpg", "image/jpeg"),
+    "webp": ("webp", "image/webp"),
+    "png": ("png", "image/png"),
+}
+
+ANCHO_MINIMO = 64
+ANCHO_MAXIMO = 2400
+# La cache en disco se poda (ver max_archivos) cada tantos PDFs o miniaturas nuevos
+ARCHIVOS_POR_PODA = 32
+
+_HASH_VALIDO = re.compile(r"^[0-9a-f]{64}$")
+
+
+def hash_valido(sha256: str) -> bool:
+    """Indica si la cadena tiene forma de SHA-256 en hexadecimal (evita rutas arbitrarias)."""
+    return bool(_HASH_VALIDO.match(sha256 or ""))
+
+
+def _escribir_atomico(ruta: str, contenido: bytes) -> None:
+    """Escribe el archivo en un temporal del mismo directorio y lo renombra."""
+    directorio = os.path.dirname(ruta)
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+    except Exception:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+class ServicioMiniaturas:
+    """
+    Miniaturas de la primera página de los PDF, direccionadas por el hash del contenido.
+
+    `registrar()` guarda el PDF en `directorio/pdfs/<sha256>.pdf` (una sola vez por
+    contenido) y devuelve el hash; `app.py` sirve ese archivo en `/pdf/<hash>`. La
+    miniatura no se genera en ese momento. Se
+    renderiza la primera vez que la interfaz la pide con `obtener()`, en un pool de
+    hilos acotado, y se guarda en `directorio/miniaturas/<sha256>_<ancho>.<ext>`; las
+    siguientes peticiones leen el archivo. Dos peticiones simultáneas de la misma
+    miniatura comparten el mismo renderizado.
+
+    El ancho (en píxeles) se acota a [ANCHO_MINIMO, ANCHO_MAXIMO]; el DPI de
+    renderizado se deriva del ancho y del tamaño de la página.
+    """
+
+    def __init__(self, directorio: str = "cache", ancho: int = 480, formato: str = "webp",
+                 calidad: int = 80, max_hilos: int = 2, max_archivos: int = 5000):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de miniatura no válido: {formato} (opciones: {', '.join(FORMATOS)})")
+        # Rutas absolutas: send_file resuelve las relativas contra app.root_path, no contra el cwd
+        directorio = os.path.abspath(directorio)
+        self.directorio_pdfs = os.path.join(directorio, "pdfs")
+        self.directorio_miniaturas = os.path.join(directorio, "miniaturas")
+        self.ancho = self.acotar_ancho(ancho)
+        self.formato = formato
+        self.calidad = calidad
+        self.max_archivos = max_archivos
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_hilos), thread_name_prefix="miniaturas")
+        self._en_curso: Dict[Tuple[str, int, str], Future] = {}
+        # Reentrante: el callback de un futuro ya terminado se ejecuta al registrarlo, con el lock tomado
+        self._lock = threading.RLock()
+        self._escritos_desde_poda = 0
+        self._contadores = {"registrados": 0, "renderizadas": 0, "aciertos": 0, "errores": 0, "podadas": 0}
+
+    @staticmethod
+    def acotar_ancho(ancho: int) -> int:
+        return max(ANCHO_MINIMO, min(ANCHO_MAXIMO, int(ancho)))
+
+    # --- PDFs ---
+
+    def ruta_pdf(self, sha256: str) -> str:
+        return os.path.join(self.directorio_pdfs, f"{sha256}.pdf")
+
+    def registrar(self, documento: DocumentContext) -> Optional[str]:
+        """
+        Guarda el PDF por su hash para generar su miniatura cuando se pida.
+
+        Args:
+            documento: Contexto del PDF ya abierto
+
+        Returns:
+            str: SHA-256 del contenido, o None si no se pudo guardar
+        """
+        try:
+            sha256 = documento.sha256
+            ruta = self.ruta_pdf(sha256)
+            if os.path.exists(ruta):
+                # Vuelve a ser reciente: la poda elimina primero los de mtime más antiguo
+                os.utime(ruta)
+            else:
+                os.makedirs(self.directorio_pdfs, exist_ok=True)
+                _escribir_atomico(ruta, documento.raw)
+                with self._lock:
+                    self._contadores["registrados"] += 1
+                self._archivo_escrito()
+            return sha256
+        except Exception as e:
+            logger.error(f"No se pudo registrar el PDF {documento} para vista previa: {str(e)}")
+            return None
+
+    # --- Miniaturas ---
+
+    def ruta_miniatura(self, sha256: str, ancho: int, formato: str) -> str:
+        extension = FORMATOS[formato][0]
+        return os.path.join(self.directorio_miniaturas, f"{sha256}_{ancho}.{extension}")
+
+    def obtener(self, sha256: str, ancho: Optional[int] = None, formato: Optional[str] = None) -> Optional[str]:
+        """
+        Devuelve la ruta de la miniatura, generándola si aún no existe.
+
+        Args:
+            sha256: Hash del PDF registrado
+            ancho: Ancho en píxeles (por defecto el configurado)
+            formato: "jpeg", "webp" o "png" (por defecto el configurado)
+
+        Returns:
+            str: Ruta del archivo de la miniatura, o None si el PDF no está registrado
+                o el renderizado falló
+        """
+        ancho = self.acotar_ancho(ancho or self.ancho)
+        formato = formato or self.formato
+        if not hash_valido(sha256) or formato not in FORMATOS:
+            return None
+        ruta = self.ruta_miniatura(sha256, ancho, formato)
+        if os.path.exists(ruta):
+            with self._lock:
+                self._contadores["aciertos"] += 1
+            return ruta
+        if not os.path.exists(self.ruta_pdf(sha256)):
+            return None
+
+        clave = (sha256, ancho, formato)
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            if futuro is None:
+                futuro = self._pool.submit(self._renderizar, sha256, ancho, formato, ruta)
+                self._en_curso[clave] = futuro
+                futuro.add_done_callback(lambda _f, c=clave: self._terminar(c))
+        try:
+            return futuro.result()
+        except Exception as e:
+            logger.error(f"Error al generar la miniatura de {sha256}: {str(e)}")
+            return None
+
+    def _terminar(self, clave: Tuple[str, int, str]) -> None:
+        with self._lock:
+            self._en_curso.pop(clave, None)
+
+    def _renderizar(self, sha256: str, ancho: int, formato: str, ruta: str) -> Optional[str]:
+        try:
+            with DocumentContext(self.ruta_pdf(sha256)) as documento:
+                page = documento.doc.load_page(0)
+                escala = ancho / page.rect.width if page.rect.width else 1.0
+                pix = page.get_pixmap(matrix=fitz.Matrix(escala, escala), alpha=False)
+                if formato == "png":
+                    contenido = pix.tobytes("png")
+                elif formato == "jpeg":
+                    contenido = pix.tobytes("jpeg", jpg_quality=self.calidad)
+                else:
+                    from PIL import Image  # solo para WebP
+                    imagen = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+                    buffer = io.BytesIO()
+                    imagen.save(buffer, format="WEBP", quality=self.calidad)
+                    contenido = buffer.getvalue()
+            os.makedirs(self.directorio_miniaturas, exist_ok=True)
+            _escribir_atomico(ruta, contenido)
+        except Exception as e:
+            with self._lock:
+                self._contadores["errores"] += 1
+            logger.error(f"Error al renderizar miniatura {ruta}: {str(e)}", exc_info=True)
+            return None
+
+        with self._lock:
+            self._contadores["renderizadas"] += 1
+        self._archivo_escrito()
+        return ruta
+
+    def _archivo_escrito(self) -> None:
+        """Cuenta un PDF o miniatura nuevo y poda la cache cada ARCHIVOS_POR_PODA escritos."""
+        with self._lock:
+            self._escritos_desde_poda += 1
+            podar = self.max_archivos > 0 and self._escritos_desde_poda >= ARCHIVOS_POR_PODA
+            if podar:
+                self._escritos_desde_poda = 0
+        if podar:
+            self._podar()
+
+    def _podar(self) -> None:
+        """Elimina las miniaturas y PDFs más antiguos si exceden max_archivos."""
+        eliminados = 0
+        for directorio in (self.directorio_miniaturas, self.directorio_pdfs):
+            try:
+                entradas = [e for e in os.scandir(directorio) if e.is_file()]
+            except OSError:
+                continue
+            exceso = len(entradas) - self.max_archivos
+            if exceso <= 0:
+                continue
+            entradas.sort(key=lambda e: e.stat().st_mtime)
+            for entrada in entradas[:exceso]:
+                try:
+                    os.remove(entrada.path)
+                    eliminados += 1
+                except OSError:
+                    pass
+        if eliminados:
+            with self._lock:
+                self._contadores["podadas"] += eliminados
+            logger.info(f"Cache de vistas previas: {eliminados} archivo(s) antiguos eliminados")
+
+    def mimetype(self, formato: Optional[str] = None) -> str:
+        return FORMATOS[formato or self.formato][1]
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            stats = dict(self._contadores)
+            stats["en_curso"] = len(self._en_curso)
+        stats["ancho"] = self.ancho
+        stats["formato"] = self.formato
+        stats["max_archivos"] = self.max_archivos
+        return stats
+
+
+def crear_servicio_desde_entorno() -> ServicioMiniaturas:
+    """
+    Crea el servicio de miniaturas a partir de variables de entorno.
+
+    Variables:
+        PRISMA_MINIATURAS_DIR: Directorio de la cache ("cache")
+        PRISMA_MINIATURAS_ANCHO: Ancho por defecto en píxeles (480)
+        PRISMA_MINIATURAS_FORMATO: "webp" (por defecto), "jpeg" o "png"
+        PRISMA_MINIATURAS_CALIDAD: Calidad JPEG/WebP (80)
+        PRISMA_MINIATURAS_HILOS: Renderizados simultáneos (2)
+        PRISMA_MINIATURAS_MAX_ARCHIVOS: Archivos máximos por directorio (5000; 0 = sin límite)
+
+    Returns:
+        ServicioMiniaturas: El servicio configurado
+    """
+    formato = os.environ.get("PRISMA_MINIATURAS_FORMATO", "webp").strip().lower() or "webp"
+    if formato == "jpg":
+        formato = "jpeg"
+    if formato not in FORMATOS:
+        logger.warning(f"PRISMA_MINIATURAS_FORMATO={formato} no es válido; se usa webp")
+        formato = "webp"
+    return ServicioMiniaturas(
+        directorio=os.environ.get("PRISMA_MINIATURAS_DIR") or "cache",
+        ancho=int(os.environ.get("PRISMA_MINIATURAS_ANCHO", "480")),
+        formato=formato,
+        calidad=int(os.environ.get("PRISMA_MINIATURAS_CALIDAD", "80")),
+        max_hilos=int(os.environ.get("PRISMA_MINIATURAS_HILOS", "2")),
+        max_archivos=int(os.environ.get("PRISMA_MINIATURAS_MAX_ARCHIVOS", "5000")),
+    )
@@ -0,0 +1,323 @@
+import os
+import re
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import regex
+
+logger = logging.getLogger(__name__)
+
+# Segundos máximos por búsqueda de un patrón (0 = sin límite); configurable por entorno
+TIMEOUT_PATRON = float(os.environ.get("PRISMA_REGEX_TIMEOUT", "1.0"))
+
+# Documento que se está procesando (para identificar el PDF cuando un patrón agota su tiempo)
+_documento_actual: ContextVar = ContextVar("documento_patrones", default=None)
+
+
+@contextmanager
+def documento_en_curso(documento):
+    """
+    Asocia las búsquedas del bloque a un documento (`DocumentContext` o su hash).
+
+    El hash solo se calcula si algún patrón agota su tiempo.
+    """
+    token = _documento_actual.set(documento)
+    try:
+        yield
+    finally:
+        _documento_actual.reset(token)
+
+
+def _hash_documento() -> str:
+    documento = _documento_actual.get()
+    if documento is None:
+        return "desconocido"
+    if isinstance(documento, str):
+        return documento[:12]
+    try:
+        return documento.sha256[:12]
+    except Exception:
+        return "desconocido"
+
+
+def _convertir_flags(flags: int) -> int:
+    """Banderas de `re` a las de `regex` (coinciden salvo ASCII)."""
+    if flags & re.ASCII:
+        flags = (flags & ~re.ASCII) | regex.ASCII
+    return flags
+
+
+# Resultado de cada operación cuando el patrón agota su tiempo: el mismo que sin coincidencias
+_SIN_COINCIDENCIA = {"search": None, "match": None, "fullmatch": None, "findall": []}
+
+
+class PatronRegistrado:
+    """
+    Expresión regular compilada una sola vez, con sus banderas incluidas.
+
+    Expone la misma interfaz que un `re.Pattern` (search, match, finditer, ...)
+    y lleva contadores de uso: llamadas, aciertos (hubo coincidencia), fallos,
+    tiempos agotados y tiempo acumulado, para identificar los patrones que
+    realmente cuestan.
+
+    Se compila con el paquete `regex` (compatible con `re`), que permite cortar
+    una búsqueda que excede `timeout` segundos. Un patrón que agota su tiempo
+    (backtracking catastrófico sobre texto mal formado o muy largo) se trata
+    como "sin coincidencia": el extractor pasa a su siguiente estrategia en
+    lugar de dejar el worker ocupado.
+    """
+
+    __slots__ = ("nombre", "regex", "timeout", "llamadas", "aciertos", "fallos", "timeouts",
+                 "tiempo_total", "tiempo_max", "_lock")
+
+    def __init__(self, nombre: str, patron: str, flags: int = 0, timeout: Optional[float] = None):
+        self.nombre = nombre
+        self.regex = regex.compile(patron, _convertir_flags(flags))
+        self.timeout = TIMEOUT_PATRON if timeout is None else timeout
+        self.llamadas = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.timeouts = 0
+        self.tiempo_total = 0.0
+        self.tiempo_max = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def pattern(self) -> str:
+        return self.regex.pattern
+
+    @property
+    def flags(self) -> int:
+        return self.regex.flags
+
+    def _registrar(self, inicio: float, acierto: bool, agotado: bool = False) -> None:
+        duracion = time.perf_counter() - inicio
+        with self._lock:
+            self.llamadas += 1
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+            if agotado:
+                self.timeouts += 1
+            self.tiempo_total += duracion
+            if duracion > self.tiempo_max:
+                self.tiempo_max = duracion
+
+    def _agotado(self, inicio: float, texto: str) -> None:
+        self._registrar(inicio, False, agotado=True)
+        nombre = self.nombre if len(self.nombre) <= 80 else self.nombre[:77] + "..."
+        logger.warning(f"Tiempo agotado ({self.timeout:g}s) en el patrón {nombre} sobre {len(texto)} caracteres "
+                       f"(documento {_hash_documento()}); se continúa sin coincidencia")
+
+    def _ejecutar(self, operacion: str, texto: str, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resultado = getattr(self.regex, operacion)(texto, *args, timeout=self.timeout or None, **kwargs)
+        except TimeoutError:
+            self._agotado(inicio, texto)
+            return _SIN_COINCIDENCIA[operacion]
+        self._registrar(inicio, bool(resultado) if operacion == "findall" else resultado is not None)
+        return resultado
+
+    def search(self, texto: str, *args):
+        return self._ejecutar("search", texto, *args)
+
+    def match(self, texto: str, *args):
+        return self._ejecutar("match", texto, *args)
+
+    def fullmatch(self, texto: str, *args):
+        return self._ejecutar("fullmatch", texto, *args)
+
+    def findall(self, texto: str, *args) -> list:
+        return self._ejecutar("findall", texto, *args)
+
+    def finditer(self, texto: str, *args):
+        # Se materializa para medir el costo real del recorrido (y cortarlo si se agota el tiempo)
+        inicio = time.perf_counter()
+        try:
+            resultado = list(self.regex.finditer(texto, *args, timeout=self.timeout or None))
+        except TimeoutError:
+            self._agotado(inicio, texto)
+            return iter(())
+        self._registrar(inicio, bool(resultado))
+        return iter(resultado)
+
+    def sub(self, repl, texto: str, count: int = 0) -> str:
+        inicio = time.perf_counter()
+        try:
+            resultado, n = self.regex.subn(repl, texto, count, timeout=self.timeout or None)
+        except TimeoutError:
+            self._agotado(inicio, texto)
+            return texto
+        self._registrar(inicio, n > 0)
+        return resultado
+
+    def split(self, texto: str, maxsplit: int = 0) -> list:
+        inicio = time.perf_counter()
+        try:
+            resultado = self.regex.split(texto, maxsplit, timeout=self.timeout or None)
+        except TimeoutError:
+            self._agotado(inicio, texto)
+            return [texto]
+        self._registrar(inicio, len(resultado) > 1)
+        return resultado
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            return {
+                "nombre": self.nombre,
+                "patron": self.regex.pattern,
+                "llamadas": self.llamadas,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "timeouts": self.timeouts,
+                "timeout_s": self.timeout,
+                "tiempo_total_ms": round(self.tiempo_total * 1000, 3),
+                "tiempo_medio_ms": round(self.tiempo_total * 1000 / self.llamadas, 4) if self.llamadas else 0.0,
+                "tiempo_max_ms": round(self.tiempo_max * 1000, 3),
+            }
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self.llamadas = self.aciertos = self.fallos = self.timeouts = 0
+            self.tiempo_total = self.tiempo_max = 0.0
+
+
+class RegistroPatrones:
+    """
+    Registro de todos los patrones usados por los extractores y el validador.
+
+    Cada combinación (patrón, banderas) se compila una sola vez y no se desaloja
+    nunca, a diferencia de la cache interna de `re` (limitada en tamaño). Los
+    extractores declaran sus diccionarios de patrones a nivel de módulo con
+    `grupo()`, de modo que se compilan al importar; las búsquedas sueltas usan
+    `search()`, `match()`, etc. con la misma firma que el módulo `re`.
+    """
+
+    def __init__(self):
+        self._patrones: Dict[tuple, PatronRegistrado] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, patron: str, flags: int = 0, nombre: Optional[str] = None,
+                  timeout: Optional[float] = None) -> PatronRegistrado:
+        """
+        Compila y registra un patrón (o devuelve el ya registrado).
+
+        Args:
+            patron: Expresión regular
+            flags: Banderas de `re`
+            nombre: Nombre descriptivo para las estadísticas (por defecto, el propio patrón)
+            timeout: Segundos máximos por búsqueda para este patrón (por defecto PRISMA_REGEX_TIMEOUT)
+
+        Returns:
+            PatronRegistrado: El patrón compilado con sus contadores
+        """
+        clave = (patron, flags)
+        registrado = self._patrones.get(clave)
+        if registrado is None:
+            with self._lock:
+                registrado = self._patrones.get(clave)
+                if registrado is None:
+                    registrado = PatronRegistrado(nombre or patron, patron, flags, timeout)
+                    self._patrones[clave] = registrado
+                    return registrado
+        if nombre and registrado.nombre == patron:
+            registrado.nombre = nombre
+        if timeout is not None:
+            registrado.timeout = timeout
+        return registrado
+
+    def grupo(self, nombre_grupo: str, patrones: Dict[str, str], flags: int = 0,
+              timeout: Optional[float] = None) -> Dict[str, PatronRegistrado]:
+        """
+        Compila un diccionario {campo: patrón} con las mismas banderas.
+
+        Args:
+            nombre_grupo: Prefijo para los nombres (p. ej. el tipo de póliza)
+            patrones: Diccionario de campo a expresión regular
+            flags: Banderas de `re` comunes a todo el grupo
+            timeout: Segundos máximos por búsqueda (por defecto PRISMA_REGEX_TIMEOUT)
+
+        Returns:
+            Dict[str, PatronRegistrado]: Mismo diccionario con los patrones compilados
+        """
+        return {
+            campo: self.registrar(patron, flags, f"{nombre_grupo}.{campo}", timeout)
+            for campo, patron in patrones.items()
+        }
+
+    def lista(self, nombre_grupo: str, patrones: List[str], flags: int = 0) -> List[PatronRegistrado]:
+        """Compila una lista de patrones con las mismas banderas."""
+        return [self.registrar(patron, flags, f"{nombre_grupo}[{i}]") for i, patron in enumerate(patrones)]
+
+    # --- Misma interfaz que el módulo re ---
+
+    def search(self, patron: str, texto: str, flags: int = 0):
+        return self.registrar(patron, flags).search(texto)
+
+    def match(self, patron: str, texto: str, flags: int = 0):
+        return self.registrar(patron, flags).match(texto)
+
+    def fullmatch(self, patron: str, texto: str, flags: int = 0):
+        return self.registrar(patron, flags).fullmatch(texto)
+
+    def findall(self, patron: str, texto: str, flags: int = 0) -> list:
+        return self.registrar(patron, flags).findall(texto)
+
+    def finditer(self, patron: str, texto: str, flags: int = 0):
+        return self.registrar(patron, flags).finditer(texto)
+
+    def sub(self, patron: str, repl, texto: str, count: int = 0, flags: int = 0) -> str:
+        return self.registrar(patron, flags).sub(repl, texto, count)
+
+    def split(self, patron: str, texto: str, maxsplit: int = 0, flags: int = 0) -> list:
+        return self.registrar(patron, flags).split(texto, maxsplit)
+
+    # --- Estadísticas ---
+
+    def __len__(self) -> int:
+        return len(self._patrones)
+
+    def estadisticas(self, top: Optional[int] = None, orden: str = "tiempo_total_ms") -> List[Dict]:
+        """
+        Contadores por patrón, ordenados de mayor a menor según `orden`.
+
+        Args:
+            top: Devolver solo los N primeros
+            orden: Campo por el que ordenar (tiempo_total_ms, llamadas, fallos, ...)
+
+        Returns:
+            List[Dict]: Estadísticas de cada patrón
+        """
+        with self._lock:
+            patrones = list(self._patrones.values())
+        stats = [p.estadisticas() for p in patrones]
+        stats.sort(key=lambda s: s[orden], reverse=True)
+        return stats[:top] if top else stats
+
+    def resumen(self) -> Dict:
+        """Totales agregados del registro."""
+        stats = self.estadisticas()
+        return {
+            "patrones": len(stats),
+            "llamadas": sum(s["llamadas"] for s in stats),
+            "aciertos": sum(s["aciertos"] for s in stats),
+            "fallos": sum(s["fallos"] for s in stats),
+            "timeouts": sum(s["timeouts"] for s in stats),
+            "tiempo_total_ms": round(sum(s["tiempo_total_ms"] for s in stats), 3),
+        }
+
+    def reiniciar_estadisticas(self) -> None:
+        with self._lock:
+            patrones = list(self._patrones.values())
+        for p in patrones:
+            p.reiniciar()
+
+
+# Registro compartido por todos los módulos del proyecto
+registro = RegistroPatrones()
@@ -0,0 +1,246 @@
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import importlib
+import subprocess
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PuntoEntrada:
+    """Función de un módulo extractor que se importa la primera vez que se usa."""
+
+    __slots__ = ("modulo", "atributo")
+
+    def __init__(self, modulo: str, atributo: str):
+        self.modulo = modulo
+        self.atributo = atributo
+
+    def __repr__(self) -> str:
+        return f"{self.modulo}:{self.atributo}"
+
+
+class RegistroExtractores:
+    """
+    Registro de extractores por tipo de documento con importación diferida.
+
+    Cada tipo se asocia a un módulo y a sus funciones (`extraer`, `procesar`,
+    `detectar`, ...). El módulo se importa con `importlib.import_module` la
+    primera vez que se pide una de sus funciones, de modo que el arranque no
+    carga los doce extractores y `validar_tipo_endoso` y `ia_general_ws` comparten
+    la misma instancia de cada módulo (la de `sys.modules`).
+
+    Si un módulo no se puede importar se registra el error y `obtener` devuelve
+    None para sus funciones, sin volver a intentarlo.
+    """
+
+    def __init__(self):
+        self._entradas: Dict[str, Dict[str, PuntoEntrada]] = {}
+        self._modulos: Dict[str, object] = {}
+        self._errores: Dict[str, str] = {}
+        self._tiempos_ms: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def registrar(self, tipo: str, modulo: str, **funciones: str) -> None:
+        """
+        Asocia un tipo de documento con las funciones de un módulo.
+
+        Args:
+            tipo: Tipo de documento (p. ej. "POLIZA_VIDA")
+            modulo: Nombre del módulo importable
+            **funciones: {rol: nombre de la función en el módulo}
+        """
+        self._entradas[tipo] = {rol: PuntoEntrada(modulo, atributo) for rol, atributo in funciones.items()}
+
+    def tipos(self) -> List[str]:
+        return list(self._entradas)
+
+    def tiene(self, tipo: str, funcion: str = "extraer") -> bool:
+        """Indica si el tipo tiene registrada la función, sin importar el módulo."""
+        return funcion in self._entradas.get(tipo, {})
+
+    def modulos(self) -> List[str]:
+        """Módulos registrados, en orden de registro y sin repetir."""
+        vistos = []
+        for funciones in self._entradas.values():
+            for entrada in funciones.values():
+                if entrada.modulo not in vistos:
+                    vistos.append(entrada.modulo)
+        return vistos
+
+    def cargar_modulo(self, modulo: str) -> Optional[object]:
+        """
+        Importa un módulo (una sola vez) y mide cuánto tardó.
+
+        Args:
+            modulo: Nombre del módulo
+
+        Returns:
+            El módulo importado o None si falló la importación
+        """
+        if modulo in self._modulos:
+            return self._modulos[modulo]
+        if modulo in self._errores:
+            return None
+        with self._lock:
+            if modulo in self._modulos:
+                return self._modulos[modulo]
+            if modulo in self._errores:
+                return None
+            inicio = time.perf_counter()
+            try:
+                cargado = importlib.import_module(modulo)
+            except Exception as e:
+                self._errores[modulo] = str(e)
+                logger.error(f"No se pudo importar el extractor {modulo}: {str(e)}")
+                return None
+            self._tiempos_ms[modulo] = round((time.perf_counter() - inicio) * 1000, 2)
+            self._modulos[modulo] = cargado
+            logger.info(f"Extractor {modulo} cargado en {self._tiempos_ms[modulo]} ms")
+            return cargado
+
+    def modulo(self, tipo: str) -> Optional[object]:
+        """Módulo del extractor de un tipo (se importa si hace falta)."""
+        funciones = self._entradas.get(tipo)
+        if not funciones:
+            return None
+        return self.cargar_modulo(next(iter(funciones.values())).modulo)
+
+    def obtener(self, tipo: str, funcion: str = "extraer") -> Optional[Callable]:
+        """
+        Devuelve la función de un tipo de documento, importando su módulo si hace falta.
+
+        Args:
+            tipo: Tipo de documento
+            funcion: Rol de la función ("extraer", "procesar", "detectar", ...)
+
+        Returns:
+            Callable o None si el tipo o la función no existen o el módulo no se pudo importar
+        """
+        entrada = self._entradas.get(tipo, {}).get(funcion)
+        if entrada is None:
+            return None
+        cargado = self.cargar_modulo(entrada.modulo)
+        if cargado is None:
+            return None
+        return getattr(cargado, entrada.atributo, None)
+
+    def precargar(self) -> None:
+        """Importa todos los módulos registrados (p. ej. antes de crear procesos hijos)."""
+        for modulo in self.modulos():
+            self.cargar_modulo(modulo)
+
+    def estadisticas(self) -> Dict:
+        return {
+            "registrados": len(self.modulos()),
+            "cargados": dict(self._tiempos_ms),
+            "errores": dict(self._errores),
+        }
+
+
+registro_extractores = RegistroExtractores()
+
+# Tipos que usan validar_tipo_endoso (detección) y el servicio ia_general_ws.
+# `extraer` recibe la ruta o el DocumentContext; `procesar` además recibe el sumidero
+# de artefactos (extractores de vida); `detectar` es la detección alternativa del servicio.
+registro_extractores.registrar("ENDOSO_A", "endosos_autos_a", extraer="extraer_datos_endoso_a",
+                               detectar="detectar_formato", texto="extraer_texto_pdf")
+registro_extractores.registrar("POLIZA_VIDA", "data_ia_general_vida", extraer="extraer_datos_poliza_vida",
+                               procesar="procesar_documento")
+registro_extractores.registrar("POLIZA_VIDA_INDIVIDUAL", "data_ia_general_vida_individual",
+                               extraer="extraer_datos_poliza_vida_individual", procesar="procesar_documento")
+registro_extractores.registrar("PROTEGETE_ORDINARIO", "data_ia_general_protgt_ordinario",
+                               extraer="extraer_datos_poliza_protgt_ordinario", procesar="procesar_documento")
+registro_extractores.registrar("ALIADOS_PPR", "data_ia_general_protgt_ppr",
+                               extraer="extraer_datos_poliza_aliados_ppr", procesar="procesar_documento")
+registro_extractores.registrar("PROTGT_TEMPORAL_MN", "data_ia_general_protgt_mn",
+                               extraer="extraer_datos_poliza_protgt_temporal_mn", procesar="procesar_documento")
+registro_extractores.registrar("VIDA_PROTGT", "data_ia_general_vida_protgt",
+                               extraer="extraer_datos_poliza_vida_protgt", procesar="procesar_documento")
+registro_extractores.registrar("PROTECCION_EFECTIVA", "data_ia_general_proteccion_efectiva",
+                               extraer="extraer_datos_poliza_proteccion_efectiva", procesar="procesar_documento",
+                               detectar="detectar_tipo_documento")
+registro_extractores.registrar("PROTGT_PYME", "data_ia_general_protgt_pyme",
+                               extraer="extraer_datos_poliza_protgt_pyme", procesar="procesar_documento",
+                               detectar="detectar_tipo_documento")
+registro_extractores.registrar("SALUD_FAMILIAR", "data_ia_general_salud_familiar",
+                               extraer="extraer_datos_poliza_salud_familiar",
+                               detectar="detectar_tipo_documento")
+registro_extractores.registrar("SALUD_FAMILIAR_VARIANTEF", "data_ia_general_salud_familiar_variantef",
+                               extraer="extraer_datos_poliza_salud_familiar_variantef",
+                               detectar="detectar_tipo_documento")
+registro_extractores.registrar("SALUD_COLECTIVO", "data_ia_general_salud_colectivo",
+                               extraer="extraer_datos_poliza_salud_colectivo",
+                               detectar="detectar_tipo_documento")
+registro_extractores.registrar("ALIADOS_KIDS", "data_ia_general_kids", extraer="extraer_datos_poliza_aliados_kids")
+
+# Nombres con los que el servicio ia_general_ws expone algunos tipos
+registro_extractores.registrar("POLIZA_ALIADOS_PPR", "data_ia_general_protgt_ppr",
+                               extraer="extraer_datos_poliza_aliados_ppr", procesar="procesar_documento")
+registro_extractores.registrar("POLIZA_VIDA_PROTGT", "data_ia_general_vida_protgt",
+                               extraer="extraer_datos_poliza_vida_protgt", procesar="procesar_documento")
+registro_extractores.registrar("POLIZA_PROTGT_TEMPORAL_MN", "data_ia_general_protgt_mn",
+                               extraer="extraer_datos_poliza_protgt_temporal_mn", procesar="procesar_documento")
+
+
+# --- Reporte de tiempos de importación ---
+
+_LINEA_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def medir_importacion(modulo: str) -> Tuple[float, List[Tuple[str, float, float]]]:
+    """
+    Mide la importación en frío de un módulo en un intérprete nuevo (`-X importtime`).
+
+    Args:
+        modulo: Nombre del módulo
+
+    Returns:
+        Tuple: (total en ms, [(paquete de primer nivel, propio ms, acumulado ms)])
+    """
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, cwd=directorio,
+    )
+    paquetes: Dict[str, List[float]] = {}
+    total = 0.0
+    for linea in resultado.stderr.splitlines():
+        m = _LINEA_IMPORTTIME.match(linea)
+        if not m:
+            continue
+        propio, acumulado, sangria, nombre = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        raiz = nombre.split(".")[0]
+        datos = paquetes.setdefault(raiz, [0.0, 0.0])
+        datos[0] += propio / 1000
+        # Acumulado del primer nivel donde aparece el paquete (la sangría más corta)
+        datos[1] = max(datos[1], acumulado / 1000)
+        if nombre == modulo and len(sangria) <= 1:
+            total = acumulado / 1000
+    ordenados = sorted(((p, round(v[0], 2), round(v[1], 2)) for p, v in paquetes.items()),
+                       key=lambda x: x[1], reverse=True)
+    return round(total, 2), ordenados
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Reporte de tiempos de importación en frío de los extractores")
+    parser.add_argument("modulos", nargs="*", help="Módulos a medir (por defecto los frontends y todos los extractores)")
+    parser.add_argument("--top", type=int, default=8, help="Paquetes a mostrar por módulo")
+    args = parser.parse_args(argv)
+
+    modulos = args.modulos or ["validar_tipo_endoso", "ia_general_ws", "app"] + registro_extractores.modulos()
+    for modulo in modulos:
+        total, paquetes = medir_importacion(modulo)
+        print(f"{modulo}: {total:.1f} ms")
+        for paquete, propio, acumulado in paquetes[:args.top]:
+            print(f"    {paquete:32} propio {propio:8.1f} ms   acumulado {acumulado:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import re
+import logging
+from typing import Dict, List, Optional, Tuple, Union
+
+from patrones_registro import PatronRegistrado, registro
+
+logger = logging.getLogger(__name__)
+
+# Encabezados de sección de las carátulas de pólizas (al inicio de una línea).
+# El orden no importa: las secciones se ordenan por su posición en el texto.
+ENCABEZADOS_POLIZA = {
+    "contratante": r"Datos del Contratante",
+    "asegurado": r"Datos del Asegurado Titular",
+    "coberturas": r"Incluidos en B[áa]sica",
+    "coberturas_adicionales": r"Coberturas adicionales con costo",
+    "servicios": r"Servicios\s+con costo",
+    "prima": r"Prima[ \t]*$",
+    "agente": r"Agente\b",
+}
+
+# Sección de la carátula en que está cada campo de las pólizas de salud (familiar,
+# variante F y colectivo); los campos que no aparecen aquí se buscan en todo el texto
+SECCIONES_CAMPOS_SALUD = {
+    "Nombre del contratante": "contratante",
+    "Domicilio del contratante": "contratante",
+    "Ciudad del contratante": "contratante",
+    "Código Postal": "contratante",
+    "R.F.C.": "contratante",
+    "Teléfono": "contratante",
+    "Nombre del asegurado titular": "asegurado",
+    "Domicilio del asegurado": "asegurado",
+    "Ciudad del asegurado": "asegurado",
+    "Prima Neta": "prima",
+    "Recargo por pago fraccionado": "prima",
+    "Derecho de póliza": "prima",
+    "I.V.A.": "prima",
+    "Prima anual total": "prima",
+    "Descuento familiar": "prima",
+    "Cesión de Comisión": "prima",
+    "Clave Agente": "agente",
+    "Nombre del agente": "agente",
+    "Promotor": "agente",
+}
+
+
+def compilar_encabezados(encabezados: Dict[str, str]) -> Dict[str, PatronRegistrado]:
+    """
+    Compila los encabezados {sección: patrón}, anclados al inicio de una línea.
+
+    Se usa un patrón por sección en lugar de uno combinado: cada búsqueda se
+    detiene en el primer encabezado, sin recorrer todas las líneas del texto.
+
+    Args:
+        encabezados: Expresión regular del encabezado de cada sección
+
+    Returns:
+        Dict[str, PatronRegistrado]: Patrón compilado de cada sección
+    """
+    return registro.grupo("secciones", {
+        seccion: rf"^[ \t]*(?:{patron})" for seccion, patron in encabezados.items()
+    }, re.MULTILINE | re.IGNORECASE)
+
+
+_PATRONES_POLIZA = compilar_encabezados(ENCABEZADOS_POLIZA)
+
+
+class Segmentacion:
+    """
+    Posición de las secciones de un texto.
+
+    Cada sección va desde su encabezado (incluido) hasta el encabezado de la
+    siguiente sección encontrada. Si un encabezado aparece varias veces se toma
+    la primera. `buscar()` ejecuta el patrón de un campo solo sobre la ventana
+    de su sección y, si la sección no existe o el campo no está en ella, sobre
+    el texto completo (como antes de segmentar).
+    """
+
+    def __init__(self, texto: str, patrones: Dict[str, PatronRegistrado] = _PATRONES_POLIZA):
+        self.texto = texto
+        inicios: Dict[str, int] = {}
+        for seccion, patron in patrones.items():
+            coincidencia = patron.search(texto)
+            if coincidencia is not None:
+                inicios[seccion] = coincidencia.start()
+        ordenadas = sorted(inicios.items(), key=lambda s: s[1])
+        self.limites: Dict[str, Tuple[int, int]] = {}
+        for i, (seccion, inicio) in enumerate(ordenadas):
+            fin = ordenadas[i + 1][1] if i + 1 < len(ordenadas) else len(texto)
+            self.limites[seccion] = (inicio, fin)
+        if self.limites:
+            logger.debug(f"Secciones encontradas: {self.limites}")
+
+    def ventana(self, seccion: Optional[str]) -> Optional[str]:
+        """Texto de la sección, o None si no se encontró su encabezado."""
+        limites = self.limites.get(seccion) if seccion else None
+        if limites is None:
+            return None
+        return self.texto[limites[0]:limites[1]]
+
+    def buscar(self, patron: Union[str, PatronRegistrado], seccion: Optional[str] = None, flags: int = 0):
+        """
+        Busca un patrón en la ventana de su sección, con respaldo en el texto completo.
+
+        Args:
+            patron: Expresión regular (o patrón ya registrado)
+            seccion: Sección donde está el campo (None = texto completo)
+            flags: Banderas de `re` si `patron` es una cadena
+
+        Returns:
+            La coincidencia (posiciones relativas a la ventana en que se encontró) o None
+        """
+        if isinstance(patron, str):
+            patron = registro.registrar(patron, flags)
+        ventana = self.ventana(seccion)
+        if ventana is not None:
+            coincidencia = patron.search(ventana)
+            if coincidencia is not None:
+                return coincidencia
+        return patron.search(self.texto)
+
+    def secciones(self) -> List[str]:
+        return list(self.limites)
+
+
+def segmentar(texto: str, encabezados: Optional[Dict[str, str]] = None) -> Segmentacion:
+    """
+    Segmenta un texto por los encabezados de sección de las pólizas.
+
+    Args:
+        texto: Texto completo del documento
+        encabezados: Encabezados propios {sección: patrón} (por defecto ENCABEZADOS_POLIZA)
+
+    Returns:
+        Segmentacion: Offsets de cada sección encontrada
+    """
+    if encabezados is None:
+        return Segmentacion(texto)
+    return Segmentacion(texto, compilar_encabezados(encabezados))
@@ -0,0 +1,153 @@
+import os
+import random
+import logging
+import threading
+from itertools import takewhile
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+# Retry(backoff_max=...) y el atributo backoff_max requieren urllib3 >= 2 (ver requirements.txt)
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Configuración por entorno
+HOSTS_POOL = int(os.environ.get("PRISMA_HTTP_HOSTS", "10"))          # Pools por host que se conservan
+CONEXIONES_POR_HOST = int(os.environ.get("PRISMA_HTTP_POOL", "16"))  # Conexiones abiertas por host
+REINTENTOS = int(os.environ.get("PRISMA_HTTP_REINTENTOS", "3"))
+BACKOFF_BASE = float(os.environ.get("PRISMA_HTTP_BACKOFF", "0.5"))   # Segundos del primer reintento
+BACKOFF_MAX = float(os.environ.get("PRISMA_HTTP_BACKOFF_MAX", "10"))
+
+STATUS_REINTENTABLES = (500, 502, 503, 504)
+
+_contadores = {"respuestas": 0, "reintentos": 0}
+_contadores_lock = threading.Lock()
+
+
+def _contar(campo: str, cantidad: int = 1) -> None:
+    with _contadores_lock:
+        _contadores[campo] += cantidad
+
+
+class RetryConJitter(Retry):
+    """
+    Retry de urllib3 con backoff exponencial y jitter.
+
+    A diferencia del Retry estándar (que no espera antes del primer reintento y
+    no agrega aleatoriedad por defecto), la espera del reintento n es un valor
+    aleatorio entre la mitad y el total de `backoff_factor * 2**(n-1)`, acotado
+    por `backoff_max`. Así los clientes que fallan a la vez no reintentan en
+    el mismo instante. Si el servidor envía `Retry-After` se respeta ese valor.
+    """
+
+    def get_backoff_time(self) -> float:
+        consecutivos = len(list(takewhile(lambda x: x.redirect_location is None, reversed(self.history))))
+        if consecutivos == 0 or self.backoff_factor <= 0:
+            return 0
+        base = min(self.backoff_max, self.backoff_factor * (2 ** (consecutivos - 1)))
+        return base / 2 + random.uniform(0, base / 2)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None,
+                  _stacktrace=None) -> "RetryConJitter":
+        nuevo = super().increment(method, url, response, error, _pool, _stacktrace)
+        _contar("reintentos")
+        motivo = str(error) if error else (f"HTTP {response.status}" if response is not None else "desconocido")
+        destino = f"{_pool.host}{url or ''}" if _pool is not None else (url or "")
+        logger.warning(f"Reintentando {destino} (intento {len(nuevo.history)}): {motivo}")
+        return nuevo
+
+
+def crear_sesion(reintentos: int = REINTENTOS, hosts: int = HOSTS_POOL,
+                 conexiones_por_host: int = CONEXIONES_POR_HOST,
+                 status_reintentables=STATUS_REINTENTABLES) -> requests.Session:
+    """
+    Crea una sesión de requests con pools de conexiones por host y reintentos.
+
+    Args:
+        reintentos: Reintentos ante errores de conexión y respuestas 5xx
+        hosts: Número de pools por host que se conservan
+        conexiones_por_host: Conexiones máximas por host (si se agotan, la petición
+            espera a que se libere una en lugar de abrir otra)
+        status_reintentables: Códigos HTTP que se reintentan dentro de la sesión
+
+    Returns:
+        requests.Session: Sesión configurada
+    """
+    retry = RetryConJitter(
+        total=reintentos,
+        connect=reintentos,
+        read=reintentos,
+        status=reintentos,
+        other=0,
+        status_forcelist=status_reintentables,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        backoff_factor=BACKOFF_BASE,
+        backoff_max=BACKOFF_MAX,
+        # La última respuesta 5xx se devuelve y la maneja raise_for_status() de quien llama
+        raise_on_status=False,
+        # urllib3 reintenta 429/503 con Retry-After aunque no estén en la lista; solo si se piden
+        respect_retry_after_header=any(c in status_reintentables for c in (429, 503)),
+    )
+    adaptador = HTTPAdapter(pool_connections=hosts, pool_maxsize=conexiones_por_host,
+                            max_retries=retry, pool_block=True)
+    sesion = requests.Session()
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    sesion.hooks["response"].append(lambda r, *args, **kwargs: _contar("respuestas"))
+    return sesion
+
+
+_sesion: Optional[requests.Session] = None
+_sesion_pid: Optional[int] = None
+_sesion_lock = threading.Lock()
+
+
+def obtener_sesion() -> requests.Session:
+    """
+    Sesión compartida del proceso (se crea la primera vez).
+
+    Los procesos hijos crean la suya: las conexiones abiertas no se comparten
+    entre procesos.
+    """
+    global _sesion, _sesion_pid
+    if _sesion is not None and _sesion_pid == os.getpid():
+        return _sesion
+    with _sesion_lock:
+        if _sesion is None or _sesion_pid != os.getpid():
+            _sesion = crear_sesion()
+            _sesion_pid = os.getpid()
+        return _sesion
+
+
+def estadisticas() -> Dict:
+    """
+    Contadores de la sesión compartida y reutilización de conexiones por host.
+
+    `conexiones_nuevas` cuenta las conexiones TCP/TLS abiertas por cada pool y
+    `peticiones` las peticiones enviadas por él; la diferencia son peticiones
+    que reutilizaron una conexión abierta (keep-alive).
+    """
+    with _contadores_lock:
+        stats = dict(_contadores)
+    hosts = {}
+    if _sesion is not None and _sesion_pid == os.getpid():
+        adaptadores = {id(a): a for a in _sesion.adapters.values()}.values()
+        for adaptador in adaptadores:
+            pools = adaptador.poolmanager.pools
+            for clave in list(pools.keys()):
+                pool = pools.get(clave)
+                if pool is None:
+                    continue
+                host = f"{pool.scheme}://{pool.host}:{pool.port}"
+                hosts[host] = {
+                    "conexiones_nuevas": pool.num_connections,
+                    "peticiones": pool.num_requests,
+                    "reutilizadas": max(0, pool.num_requests - pool.num_connections),
+                }
+    total_peticiones = sum(h["peticiones"] for h in hosts.values())
+    total_nuevas = sum(h["conexiones_nuevas"] for h in hosts.values())
+    stats["hosts"] = hosts
+    stats["reutilizacion"] = round(1 - total_nuevas / total_peticiones, 3) if total_peticiones else None
+    stats["conexiones_por_host"] = CONEXIONES_POR_HOST
+    return stats
@@ -0,0 +1,163 @@
+"""
+Prueba de descargar_polizas_salud.py contra un servidor HTTP local (sin red).
+
+El servidor sirve PDFs ficticios bajo dos hosts (127.0.0.1 y localhost, el mismo
+puerto), registra cuántas peticiones atiende a la vez por host y responde 429/503
+a las rutas marcadas. Se verifica:
+  - el límite de descargas simultáneas por host y el global
+  - la pausa del host ante un 429 con Retry-After (no llega ninguna petición antes)
+  - el reintento tras 429/503 y el conteo de saturaciones por host
+  - URIs repetidas descargadas una sola vez y nombres repetidos con sufijo
+
+Uso: `python test_descargar_polizas_salud.py` (o con pytest)
+"""
+import os
+import time
+import tempfile
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import descargar_polizas_salud as descargas_salud
+
+# Tiempo que tarda el servidor en responder cada PDF, para que las descargas se solapen
+DEMORA = 0.1
+RETRY_AFTER = 1
+
+
+class ServidorPrueba:
+    """Servidor HTTP local que simula saturación y mide la concurrencia por host."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.en_curso = {}
+        self.maximo_por_host = {}
+        self.maximo_total = 0
+        self.peticiones = []
+        self.saturadas = set()
+        self.respuestas_429 = []
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                servidor.atender(self)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.puerto = self.httpd.server_address[1]
+        self.hilo = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url(self, host, ruta):
+        return f"http://{host}:{self.puerto}{ruta}"
+
+    @staticmethod
+    def contenido(host, ruta):
+        return f"%PDF-1.4 {host}{ruta}\n".encode("utf-8") * 64
+
+    def verificar_archivos(self, carpeta, archivos):
+        """Cada archivo guardado tiene el contenido de su URI."""
+        for uri, nombre in archivos.items():
+            partes = urllib.parse.urlparse(uri)
+            with open(os.path.join(carpeta, nombre), "rb") as f:
+                assert f.read() == self.contenido(partes.hostname, partes.path), nombre
+
+    def atender(self, peticion):
+        host = peticion.headers["Host"].split(":")[0]
+        ruta = peticion.path
+        with self.lock:
+            self.peticiones.append((time.monotonic(), host, ruta))
+            self.en_curso[host] = self.en_curso.get(host, 0) + 1
+            self.maximo_por_host[host] = max(self.maximo_por_host.get(host, 0), self.en_curso[host])
+            self.maximo_total = max(self.maximo_total, sum(self.en_curso.values()))
+            # Las rutas /saturado-429/ y /saturado-503/ fallan solo la primera vez
+            primera_vez = (host, ruta) not in self.saturadas
+            self.saturadas.add((host, ruta))
+        try:
+            time.sleep(DEMORA)
+            if ruta.startswith("/saturado-429/") and primera_vez:
+                peticion.send_response(429)
+                peticion.send_header("Retry-After", str(RETRY_AFTER))
+                peticion.send_header("Content-Length", "0")
+                peticion.end_headers()
+                with self.lock:
+                    self.respuestas_429.append(time.monotonic())
+                return
+            if ruta.startswith("/saturado-503/") and primera_vez:
+                peticion.send_response(503)
+                peticion.send_header("Content-Length", "0")
+                peticion.end_headers()
+                return
+            cuerpo = self.contenido(host, ruta)
+            peticion.send_response(200)
+            peticion.send_header("Content-Type", "application/pdf")
+            peticion.send_header("Content-Length", str(len(cuerpo)))
+            peticion.end_headers()
+            peticion.wfile.write(cuerpo)
+        finally:
+            with self.lock:
+                self.en_curso[host] -= 1
+
+
+def test_limites_por_host_y_saturacion():
+    pausa_minima, descargas_salud.PAUSA_MINIMA = descargas_salud.PAUSA_MINIMA, 0.2
+    try:
+        _probar_limites_y_saturacion()
+    finally:
+        descargas_salud.PAUSA_MINIMA = pausa_minima
+
+
+def _probar_limites_y_saturacion():
+    with ServidorPrueba() as servidor, tempfile.TemporaryDirectory() as carpeta:
+        uris = [servidor.url(host, f"/polizas/{host}_{i}.pdf")
+                for i in range(12) for host in ("127.0.0.1", "localhost")]
+        uris += [servidor.url("127.0.0.1", "/saturado-429/a.pdf"),
+                 servidor.url("localhost", "/saturado-503/b.pdf")]
+        resumen = descargas_salud.descargar_concurrente(uris, carpeta, concurrencia=3, por_host=2,
+                                                        intervalo_progreso=60)
+
+        assert resumen["exitos"] == len(uris), resumen["fallidos"]
+        assert resumen["saturaciones"] == {f"127.0.0.1:{servidor.puerto}": 1, f"localhost:{servidor.puerto}": 1}
+        assert all(maximo <= 2 for maximo in servidor.maximo_por_host.values()), servidor.maximo_por_host
+        assert servidor.maximo_total <= 3, servidor.maximo_total
+        # Las descargas sí se solapan: el límite se alcanza
+        assert max(servidor.maximo_por_host.values()) == 2
+
+        # Tras el 429 con Retry-After no llega ninguna petición nueva a ese host antes de la pausa
+        # (se da un margen para las que ya estaban saliendo cuando llegó la respuesta)
+        respuesta_429 = servidor.respuestas_429[0]
+        siguientes = [t for t, host, _ in servidor.peticiones if host == "127.0.0.1" and t > respuesta_429 + 0.05]
+        assert siguientes and min(siguientes) >= respuesta_429 + RETRY_AFTER - 0.05
+
+        servidor.verificar_archivos(carpeta, resumen["archivos"])
+        assert not [n for n in os.listdir(carpeta) if n.endswith(".part")]
+
+
+def test_uris_repetidas_y_nombres_con_sufijo():
+    with ServidorPrueba() as servidor, tempfile.TemporaryDirectory() as carpeta:
+        uris = [servidor.url("127.0.0.1", "/a/poliza.pdf"),
+                servidor.url("127.0.0.1", "/b/poliza.pdf"),
+                servidor.url("localhost", "/a/poliza.pdf"),
+                servidor.url("127.0.0.1", "/a/poliza.pdf")]
+        resumen = descargas_salud.descargar_concurrente(uris, carpeta, concurrencia=4, por_host=4,
+                                                        intervalo_progreso=60)
+
+        assert resumen["exitos"] == 3 and resumen["repetidas"] == 1
+        assert len(servidor.peticiones) == 3
+        assert sorted(os.listdir(carpeta)) == ["poliza.pdf", "poliza_2.pdf", "poliza_3.pdf"]
+        servidor.verificar_archivos(carpeta, resumen["archivos"])
+
+
+if __name__ == "__main__":
+    for prueba in (test_limites_por_host_y_saturacion, test_uris_repetidas_y_nombres_con_sufijo):
+        prueba()
+        print(f"OK {prueba.__name__}")
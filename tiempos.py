@@ -0,0 +1,253 @@
+import os
+import math
+import time
+import logging
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tiempo de la petición que no cae en ninguna etapa (validaciones, serialización, ...)
+ETAPA_OTROS = "otros"
+
+
+class Medicion:
+    """
+    Tiempos por etapa de una petición.
+
+    Las etapas se pueden anidar y los tiempos son exclusivos: el tiempo de una
+    etapa anidada (p. ej. `texto` dentro de `extraer`) se descuenta de la que la
+    contiene, de modo que la suma de las etapas más `otros` es el total. Una
+    etapa que se repite (varias páginas, varios patrones) acumula su tiempo.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fin: Optional[float] = None
+        self.tipo: Optional[str] = None
+        self.etapas: Dict[str, float] = {}
+        # Etapas abiertas: [nombre, inicio, tiempo de las etapas anidadas]
+        self._pila: List[list] = []
+
+    def iniciar(self, nombre: str) -> None:
+        self._pila.append([nombre, time.perf_counter(), 0.0])
+
+    def terminar(self, nombre: Optional[str] = None) -> None:
+        """Cierra la etapa abierta más reciente (si se indica el nombre, solo si coincide)."""
+        if not self._pila or (nombre is not None and self._pila[-1][0] != nombre):
+            return
+        etapa, inicio, anidadas = self._pila.pop()
+        duracion = time.perf_counter() - inicio
+        self.etapas[etapa] = self.etapas.get(etapa, 0.0) + duracion - anidadas
+        if self._pila:
+            self._pila[-1][2] += duracion
+
+    def cerrar(self) -> None:
+        """Cierra las etapas que quedaron abiertas (p. ej. por un return anticipado) y fija el total."""
+        while self._pila:
+            self.terminar()
+        if self.fin is None:
+            self.fin = time.perf_counter()
+
+    @property
+    def total(self) -> float:
+        return (self.fin or time.perf_counter()) - self.inicio
+
+    def milisegundos(self) -> Dict[str, float]:
+        """Etapas en ms, en el orden en que se midieron, más `otros` y `total`."""
+        total = self.total
+        resultado = {etapa: round(segundos * 1000, 2) for etapa, segundos in self.etapas.items()}
+        resultado[ETAPA_OTROS] = round(max(0.0, total - sum(self.etapas.values())) * 1000, 2)
+        resultado["total"] = round(total * 1000, 2)
+        return resultado
+
+    def server_timing(self) -> str:
+        """Valor del encabezado `Server-Timing` (una métrica por etapa, con `dur` en ms)."""
+        return ", ".join(f"{etapa};dur={ms}" for etapa, ms in self.milisegundos().items())
+
+    def como_dict(self) -> Dict:
+        return {"tipo_documento": self.tipo, "etapas_ms": self.milisegundos()}
+
+
+_medicion_actual: ContextVar[Optional[Medicion]] = ContextVar("medicion_actual", default=None)
+
+
+def medicion_actual() -> Optional[Medicion]:
+    return _medicion_actual.get()
+
+
+@contextmanager
+def etapa(nombre: str):
+    """Mide un bloque como etapa de la petición en curso (no hace nada fuera de una petición medida)."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    medicion.iniciar(nombre)
+    try:
+        yield
+    finally:
+        medicion.terminar(nombre)
+
+
+def iniciar_etapa(nombre: str) -> None:
+    """Como `etapa()`, para bloques largos; la etapa se cierra con `terminar_etapa()` o al final de la petición."""
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        medicion.iniciar(nombre)
+
+
+def terminar_etapa(nombre: str) -> None:
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        medicion.terminar(nombre)
+
+
+def establecer_tipo(tipo: Optional[str]) -> None:
+    """
+    Tipo de documento de la petición en curso (las estadísticas se agrupan por tipo).
+
+    Se conserva el primero que se establece: el de la detección, que distingue
+    productos que la respuesta agrupa (p. ej. PROTECCION_EFECTIVA como POLIZA_VIDA).
+    """
+    medicion = _medicion_actual.get()
+    if medicion is not None and tipo and medicion.tipo is None:
+        medicion.tipo = tipo
+
+
+def _percentil(ordenados: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    indice = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class EstadisticasTiempos:
+    """
+    Agregado en proceso de los tiempos por tipo de documento y etapa.
+
+    Por cada (tipo, etapa) se conservan las últimas `muestras` mediciones y los
+    percentiles se calculan al consultar. Una etapa solo suma muestras en las
+    peticiones en que ocurrió (p. ej. `descarga` no aparece en un acierto de
+    cache servido sin descargar).
+    """
+
+    def __init__(self, activo: bool = True, muestras: int = 1000, incluir_en_json: bool = False):
+        self.activo = activo
+        self.muestras = max(1, muestras)
+        self.incluir_en_json = incluir_en_json
+        self._datos: Dict[str, Dict[str, Deque[float]]] = {}
+        self._peticiones: Dict[str, int] = {}
+        self._observadores: List[Callable[[Medicion], None]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def medir(self):
+        """
+        Mide la petición en curso: las llamadas a `etapa()` dentro del bloque
+        (en este hilo) se acumulan en la medición que se entrega.
+        """
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        try:
+            yield medicion
+        finally:
+            _medicion_actual.reset(token)
+            medicion.cerrar()
+            self.registrar(medicion)
+
+    def agregar_observador(self, funcion: Callable[[Medicion], None]) -> None:
+        """Llama a `funcion` con cada medición registrada (p. ej. los histogramas de `metricas`)."""
+        self._observadores.append(funcion)
+
+    def registrar(self, medicion: Medicion) -> None:
+        for funcion in self._observadores:
+            try:
+                funcion(medicion)
+            except Exception as e:
+                logger.warning(f"Error en un observador de tiempos: {str(e)}")
+        tipo = medicion.tipo or "DESCONOCIDO"
+        with self._lock:
+            por_etapa = self._datos.setdefault(tipo, {})
+            for nombre, ms in medicion.milisegundos().items():
+                if nombre not in por_etapa:
+                    por_etapa[nombre] = deque(maxlen=self.muestras)
+                por_etapa[nombre].append(ms)
+            self._peticiones[tipo] = self._peticiones.get(tipo, 0) + 1
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            copia = {tipo: {nombre: sorted(valores) for nombre, valores in etapas.items()}
+                     for tipo, etapas in self._datos.items()}
+            peticiones = dict(self._peticiones)
+        tipos = {}
+        for tipo, etapas in copia.items():
+            tipos[tipo] = {
+                "peticiones": peticiones.get(tipo, 0),
+                "etapas_ms": {
+                    nombre: {
+                        "muestras": len(valores),
+                        "p50": _percentil(valores, 50),
+                        "p95": _percentil(valores, 95),
+                        "p99": _percentil(valores, 99),
+                        "media": round(sum(valores) / len(valores), 2),
+                        "max": valores[-1],
+                    }
+                    for nombre, valores in etapas.items()
+                },
+            }
+        return {"activo": self.activo, "muestras_por_etapa": self.muestras, "tipos": tipos}
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+            self._peticiones.clear()
+
+    def medir_endpoint(self, vista):
+        """
+        Decorador para vistas de Flask: mide la petición, agrega el encabezado
+        `Server-Timing` y, si se pide con `?timings=1` (o PRISMA_TIEMPOS_JSON=1),
+        un bloque `_timings` en la respuesta JSON.
+        """
+        @functools.wraps(vista)
+        def envoltura(*args, **kwargs):
+            if not self.activo:
+                return vista(*args, **kwargs)
+            from flask import current_app, make_response, request
+
+            with self.medir() as medicion:
+                respuesta = make_response(vista(*args, **kwargs))
+            respuesta.headers["Server-Timing"] = medicion.server_timing()
+            if (self.incluir_en_json or request.args.get("timings", "") in ("1", "true")) and respuesta.is_json:
+                datos = respuesta.get_json(silent=True)
+                if isinstance(datos, dict):
+                    datos["_timings"] = medicion.como_dict()
+                    respuesta.set_data(current_app.json.dumps(datos))
+            return respuesta
+        return envoltura
+
+
+def crear_estadisticas_desde_entorno() -> EstadisticasTiempos:
+    """
+    Crea el agregado de tiempos a partir de variables de entorno.
+
+    Variables:
+        PRISMA_TIEMPOS: "1" (por defecto) mide las peticiones; "0" lo desactiva
+        PRISMA_TIEMPOS_MUESTRAS: Mediciones que se conservan por tipo y etapa (1000)
+        PRISMA_TIEMPOS_JSON: "1" agrega `_timings` a todas las respuestas (por defecto solo con ?timings=1)
+
+    Returns:
+        EstadisticasTiempos: El agregado configurado
+    """
+    return EstadisticasTiempos(
+        activo=os.environ.get("PRISMA_TIEMPOS", "1").strip() != "0",
+        muestras=int(os.environ.get("PRISMA_TIEMPOS_MUESTRAS", "1000")),
+        incluir_en_json=os.environ.get("PRISMA_TIEMPOS_JSON", "0").strip() == "1",
+    )
+
+
+# Agregado compartido por los servicios
+estadisticas_tiempos = crear_estadisticas_desde_entorno()
@@ -1,26 +1,13 @@
-import fitz
-import re
 import logging
 import os
 import json
-from typing import Dict, Optional
-from endosos_autos_a import extraer_datos_endoso_a
-from data_ia_general_vida import procesar_archivo
-from data_ia_general_vida_individual import procesar_archivo as procesar_archivo_individual
-from data_ia_general_protgt_ordinario import procesar_archivo as procesar_archivo_protgt_ordinario
-from data_ia_general_protgt_ppr import procesar_archivo as procesar_archivo_aliados_ppr
-from data_ia_general_protgt_mn import procesar_archivo as procesar_archivo_protgt_temporal_mn
-from data_ia_general_vida_protgt import procesar_archivo as procesar_archivo_vida_protgt
-from data_ia_general_proteccion_efectiva import procesar_archivo as procesar_archivo_proteccion_efectiva
-from data_ia_general_protgt_pyme import procesar_archivo as procesar_archivo_protgt_pyme
-from data_ia_general_salud_familiar import extraer_datos_poliza_salud_familiar
-from data_ia_general_salud_colectivo import extraer_datos_poliza_salud_colectivo
-from data_ia_general_kids import extraer_datos_poliza_aliados_kids
-try:
-    from data_ia_general_salud_familiar_variantef import extraer_datos_poliza_salud_familiar_variantef
-except ImportError:
-    logger.warning("No se pudo importar data_ia_general_salud_familiar_variantef")
-    extraer_datos_poliza_salud_familiar_variantef = None
+from typing import Dict, Optional, Tuple, Union
+from contexto_documento import DocumentContext, abrir_documento
+from patrones_registro import registro, documento_en_curso
+from artefactos import SumideroArtefactos, sumidero as sumidero_artefactos
+from clasificador_documentos import ClasificadorDocumentos, ReglaDeteccion
+from registro_extractores import registro_extractores
+import tiempos
 
 # Configuración de logging
 logging.basicConfig(
@@ -29,7 +16,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+def extract_text_from_pdf(pdf_path: Union[str, DocumentContext]) -> str:
     """
     Extrae el texto de un archivo PDF.
     
@@ -40,290 +27,271 @@ def extract_text_from_pdf(pdf_path: str) -> str:
         str: Texto extraído del PDF
     """
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            # Procesar correctamente los bloques (son una lista, no un string)
-            blocks = page.get_text("blocks")
-            texto_blocks = ""
-            for b in blocks:
-                # Cada bloque es una tupla con información; el texto está en el índice 4
-                if len(b) > 4:
-                    texto_blocks += b[4] + " "
-            texto_blocks += "\n"
-            text += texto_blocks
-        doc.close()
-        return text
+        # Texto armado a partir de los bloques de cada página
+        with abrir_documento(pdf_path) as documento:
+            return documento.blocks
     except Exception as e:
         logger.error(f"Error al extraer texto del PDF: {str(e)}")
         return ""
 
-def detect_document_type(text: str) -> str:
+# Patrones para identificar Aliados+ PPR (MÁXIMA PRIORIDAD)
+PATRONES_ALIADOS_PPR = [
+    r"aliados\s*\+\s*ppr",
+    r"aliados\s*\+",
+    r"vida y ahorro",
+    r"carátula de póliza.*aliados",
+    r"aliados\+.*car[áa]tula",
+    r"aliados.*ppr",
+    r"póliza.*ahorro",
+    r"vida.*ahorro",
+    r"seguro.*ahorro",
+    r"aliados\s*mas",
+    r"ahorro.*programado",
+    r"seguro.*aliados"
+]
+
+# Patrones para identificar ALIADOS+ KIDS (nuevo)
+PATRONES_ALIADOS_KIDS = [
+    r"aliados\+\s*kids",
+    r"aliados\s+kids",
+    r"carátula de póliza.*aliados.*kids",
+    r"aliados.*kids.*carátula",
+    r"póliza.*aliados.*kids",
+    r"datos del asegurado menor",
+    r"aliados\+ kids"
+]
+
+# Patrones para identificar VIDA PROTGT
+PATRONES_VIDA_PROTGT = [
+    r"vida protgt",
+    r"protgt cobertura",
+    r"cobertura conyugal",
+    r"caratula de p[óo]liza.*vida\s*protgt",
+    r"p[óo]liza.*vida\s*protgt"
+]
+
+# Patrones para identificar Protegete Temporal MN
+PATRONES_PROTGT_TEMPORAL_MN = [
+    r"vida protgt temporal mn",
+    r"protgt temporal mn",
+    r"temporal mn",
+    r"carátula de póliza.*temporal mn",
+    r"vida protgt temporal"
+]
+
+# Patrones para identificar Protección Efectiva
+PATRONES_PROTECCION_EFECTIVA = [
+    r"protección efectiva",
+    r"carátula de póliza.*protección efectiva",
+    r"temporal a 1 año",
+    r"proteccion efectiva",
+    r"caratula de poliza.*proteccion efectiva",
+    r"hoja 1 de 2.*protección efectiva"
+]
+
+# Patrones para identificar Plan Protege PYME
+PATRONES_PROTGT_PYME = [
+    r"plan protege pyme",
+    r"carátula de póliza.*plan protege pyme",
+    r"protege pyme",
+    r"grupo empresarial",
+    r"características del grupo asegurado",
+    r"regla para determinar la suma asegurada"
+]
+
+# Patrones para identificar Gastos Médicos Mayores Familiar (NUEVO)
+PATRONES_SALUD_FAMILIAR = [
+    r"gastos m[ée]dicos mayores",
+    r"gastos m[ée]dicos mayores familiar",
+    r"gastos m[ée]dicos mayores individual",
+    r"car[áa]tula de p[óo]liza.*gastos m[ée]dicos",
+    r"p[óo]liza.*gastos m[ée]dicos",
+    r"coberturas adicionales con costo",
+    r"servicios con costo",
+    r"gama hospitalaria",
+    r"tabulador médico",
+    r"deducible.*coaseguro"
+]
+
+# Patrones para identificar Gastos Médicos Mayores Familiar Variante F (NUEVO)
+PATRONES_SALUD_FAMILIAR_VARIANTEF = [
+    r"servicios adicionales incluidos en la cobertura",
+    r"gastos m[ée]dicos mayores.*axa seguros",
+    r"axa seguros.*gastos m[ée]dicos mayores",
+    r"gastos m[ée]dicos mayores.*ultra medical elite",
+    r"cobertura internacional",
+    r"suma asegurada ilimitada"
+]
+
+# Patrones para identificar Gastos Médicos Colectivo (NUEVO)
+PATRONES_SALUD_COLECTIVO = [
+    r"gastos m[ée]dicos mayores individual",
+    r"gastos m[ée]dicos mayores familiar",
+    r"car[áa]tula de p[óo]liza",
+    r"flex plus",
+    r"tipo de plan",
+    r"prima neta",
+    r"derecho de p[óo]liza",
+    r"i\.v\.a\.",
+    r"prima anual total",
+    r"maternidad",
+    r"protecci[óo]n dental",
+    r"tabulador m[ée]dico",
+    r"gama hospitalaria",
+    r"deducible",
+    r"coaseguro"
+]
+
+# Patrones para identificar Protegete Ordinario
+PATRONES_PROTEGETE_ORDINARIO = [
+    r"vida protgt ordinario",
+    r"protgt ordinario de vida",
+    r"vida protegete ordinario",
+    r"protegete ordinario de vida"
+]
+
+# Patrones para identificar póliza de vida individual
+PATRONES_VIDA_INDIVIDUAL = [
+    r"vida individual",
+    r"seguro individual",
+    r"p[óo]liza individual",
+    r"vida inteligente",
+    r"seguro de vida individual"
+]
+
+# Patrones para identificar póliza de vida
+PATRONES_VIDA = [
+    r"ordinario de vida",
+    r"seguro de vida",
+    r"p[óo]liza de vida",
+    r"beneficiario(s)?\s+del\s+seguro",
+    r"suma\s+asegurada\s+por\s+fallecimiento"
+]
+
+# Patrones para identificar endoso tipo A
+PATRONES_ENDOSO_A = [
+    r"endoso\s+tipo\s+a",
+    r"endoso\s+de\s+modificación\s+de\s+datos",
+    r"modificación\s+de\s+datos\s+del\s+asegurado",
+    r"cambio\s+de\s+datos\s+del\s+asegurado",
+    r"endoso\s+de\s+modificación",
+    r"modificación\s+de\s+datos",
+    r"cambio\s+de\s+datos",
+    r"endoso\s+de\s+datos",
+    r"endoso\s+modificación",
+    r"endoso\s+tipo\s+a\s+modificación"
+]
+
+# Reglas de detección en orden de prioridad: (tipo, firmas, coincidencias mínimas).
+# ALIADOS_KIDS va antes que ALIADOS_PPR porque una póliza KIDS también contiene firmas
+# de Aliados+ (antes se revisaba KIDS dentro de la rama de PPR).
+REGLAS_DETECCION = [
+    ReglaDeteccion("ALIADOS_KIDS", PATRONES_ALIADOS_KIDS),
+    ReglaDeteccion("ALIADOS_PPR", PATRONES_ALIADOS_PPR),
+    ReglaDeteccion("VIDA_PROTGT", PATRONES_VIDA_PROTGT),
+    ReglaDeteccion("PROTGT_TEMPORAL_MN", PATRONES_PROTGT_TEMPORAL_MN),
+    ReglaDeteccion("PROTECCION_EFECTIVA", PATRONES_PROTECCION_EFECTIVA),
+    ReglaDeteccion("PROTGT_PYME", PATRONES_PROTGT_PYME),
+    ReglaDeteccion("SALUD_FAMILIAR_VARIANTEF", PATRONES_SALUD_FAMILIAR_VARIANTEF, umbral=2),
+    ReglaDeteccion("SALUD_COLECTIVO", PATRONES_SALUD_COLECTIVO, umbral=2),
+    ReglaDeteccion("SALUD_FAMILIAR", PATRONES_SALUD_FAMILIAR, umbral=3),
+    ReglaDeteccion("PROTEGETE_ORDINARIO", PATRONES_PROTEGETE_ORDINARIO),
+    ReglaDeteccion("POLIZA_VIDA_INDIVIDUAL", PATRONES_VIDA_INDIVIDUAL),
+    ReglaDeteccion("POLIZA_VIDA", PATRONES_VIDA),
+    ReglaDeteccion("ENDOSO_A", PATRONES_ENDOSO_A),
+]
+
+# Términos de firmas que aparecen en casi cualquier carátula: su sola presencia no
+# hace ambigua la detección (ver ClasificadorDocumentos.es_definitivo)
+TERMINOS_GENERICOS = [
+    r'carátula de póliza', r'caratula de p[óo]liza', r'caratula de poliza', r'car[áa]tula de p[óo]liza',
+    r'carátula', r'car[áa]tula', r'póliza', r'p[óo]liza', r'seguro', r'vida',
+    r'gastos m[ée]dicos', r'gastos m[ée]dicos mayores', r'deducible', r'coaseguro', r'hoja 1 de 2',
+]
+
+# Se compila una sola vez al importar el módulo
+CLASIFICADOR = ClasificadorDocumentos(REGLAS_DETECCION, genericos=TERMINOS_GENERICOS)
+
+# Detección progresiva en validate_endoso: páginas máximas a leer. Se clasifica la
+# primera página y solo se lee la siguiente si la detección es ambigua (ver
+# ClasificadorDocumentos.es_definitivo)
+MAX_PAGINAS_DETECCION = int(os.environ.get("PRISMA_DETECCION_MAX_PAGINAS", "2"))
+
+def normalizar_texto_deteccion(text: str) -> str:
+    """Minúsculas y espacios colapsados, tal como lo esperan las firmas de detección."""
+    return registro.sub(r'\s+', ' ', text.lower())
+
+def clasificar_documento(text: str, ocurrencias: Optional[Dict] = None) -> Tuple[str, float]:
     """
-    Detecta el tipo de documento basado en el contenido del texto.
+    Detecta el tipo de documento con una sola pasada sobre el texto.
     
     Args:
         text (str): Texto extraído del PDF
+        ocurrencias: Ocurrencias de términos ya calculadas sobre el texto normalizado (opcional)
         
     Returns:
-        str: Tipo de documento detectado ('ENDOSO_A', 'POLIZA_VIDA', 'POLIZA_VIDA_INDIVIDUAL', 
-                                         'PROTEGETE_ORDINARIO', 'ALIADOS_PPR', 'PROTGT_TEMPORAL_MN', 
-                                         'VIDA_PROTGT', 'PROTECCION_EFECTIVA', 'PROTGT_PYME', 'DESCONOCIDO')
+        Tuple[str, float]: Tipo de documento (ver `detect_document_type`) y confianza entre 0 y 1
     """
-    # Normalizar el texto
-    text = text.lower()
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Patrones para identificar Aliados+ PPR (MÁXIMA PRIORIDAD)
-    patrones_aliados_ppr = [
-        r"aliados\s*\+\s*ppr",
-        r"aliados\s*\+",
-        r"vida y ahorro",
-        r"carátula de póliza.*aliados",
-        r"aliados\+.*car[áa]tula",
-        r"aliados.*ppr",
-        r"póliza.*ahorro",
-        r"vida.*ahorro",
-        r"seguro.*ahorro",
-        r"aliados\s*mas",
-        r"ahorro.*programado",
-        r"seguro.*aliados"
-    ]
-    
-    # Patrones para identificar ALIADOS+ KIDS (nuevo)
-    patrones_aliados_kids = [
-        r"aliados\+\s*kids",
-        r"aliados\s+kids",
-        r"carátula de póliza.*aliados.*kids",
-        r"aliados.*kids.*carátula",
-        r"póliza.*aliados.*kids",
-        r"datos del asegurado menor",
-        r"aliados\+ kids"
-    ]
-    
-    # Patrones para identificar VIDA PROTGT
-    patrones_vida_protgt = [
-        r"vida protgt",
-        r"protgt cobertura",
-        r"cobertura conyugal",
-        r"caratula de p[óo]liza.*vida\s*protgt",
-        r"p[óo]liza.*vida\s*protgt"
-    ]
-    
-    # Patrones para identificar Protegete Temporal MN
-    patrones_protgt_temporal_mn = [
-        r"vida protgt temporal mn",
-        r"protgt temporal mn",
-        r"temporal mn",
-        r"carátula de póliza.*temporal mn",
-        r"vida protgt temporal"
-    ]
-    
-    # Patrones para identificar Protección Efectiva
-    patrones_proteccion_efectiva = [
-        r"protección efectiva",
-        r"carátula de póliza.*protección efectiva",
-        r"temporal a 1 año",
-        r"proteccion efectiva",
-        r"caratula de poliza.*proteccion efectiva",
-        r"hoja 1 de 2.*protección efectiva"
-    ]
+    if ocurrencias is None:
+        ocurrencias = CLASIFICADOR.ocurrencias(normalizar_texto_deteccion(text))
+    senales = CLASIFICADOR.senales(text, ocurrencias)
+    tipo, confianza = CLASIFICADOR.clasificar(text, senales)
     
-    # Patrones para identificar Plan Protege PYME
-    patrones_protgt_pyme = [
-        r"plan protege pyme",
-        r"carátula de póliza.*plan protege pyme",
-        r"protege pyme",
-        r"grupo empresarial",
-        r"características del grupo asegurado",
-        r"regla para determinar la suma asegurada"
-    ]
-    
-    # Patrones para identificar Gastos Médicos Mayores Familiar (NUEVO)
-    patrones_salud_familiar = [
-        r"gastos m[ée]dicos mayores",
-        r"gastos m[ée]dicos mayores familiar",
-        r"gastos m[ée]dicos mayores individual",
-        r"car[áa]tula de p[óo]liza.*gastos m[ée]dicos",
-        r"p[óo]liza.*gastos m[ée]dicos",
-        r"coberturas adicionales con costo",
-        r"servicios con costo",
-        r"gama hospitalaria",
-        r"tabulador médico",
-        r"deducible.*coaseguro"
-    ]
+    if tipo == "DESCONOCIDO":
+        logger.info("No se encontró patrón específico, documento de tipo desconocido")
+    else:
+        logger.info(f"Detectado {tipo} (confianza {confianza:.2f}) con patrones: {senales[tipo]}")
+    if len(senales) > 1:
+        logger.debug(f"Señales de otros tipos: { {t: len(p) for t, p in senales.items() if t != tipo} }")
+    return tipo, confianza
 
-    # Patrones para identificar Gastos Médicos Mayores Familiar Variante F (NUEVO)
-    patrones_salud_familiar_variantef = [
-        r"servicios adicionales incluidos en la cobertura",
-        r"gastos m[ée]dicos mayores.*axa seguros",
-        r"axa seguros.*gastos m[ée]dicos mayores",
-        r"gastos m[ée]dicos mayores.*ultra medical elite",
-        r"cobertura internacional",
-        r"suma asegurada ilimitada"
-    ]
-    
-    # Patrones para identificar Gastos Médicos Colectivo (NUEVO)
-    patrones_salud_colectivo = [
-        r"gastos m[ée]dicos mayores individual",
-        r"gastos m[ée]dicos mayores familiar",
-        r"car[áa]tula de p[óo]liza",
-        r"flex plus",
-        r"tipo de plan",
-        r"prima neta",
-        r"derecho de p[óo]liza",
-        r"i\.v\.a\.",
-        r"prima anual total",
-        r"maternidad",
-        r"protecci[óo]n dental",
-        r"tabulador m[ée]dico",
-        r"gama hospitalaria",
-        r"deducible",
-        r"coaseguro"
-    ]
-    
-    # Patrones para identificar Protegete Ordinario
-    patrones_protegete_ordinario = [
-        r"vida protgt ordinario",
-        r"protgt ordinario de vida",
-        r"vida protegete ordinario",
-        r"protegete ordinario de vida"
-    ]
-    
-    # Patrones para identificar póliza de vida individual
-    patrones_vida_individual = [
-        r"vida individual",
-        r"seguro individual",
-        r"p[óo]liza individual",
-        r"vida inteligente",
-        r"seguro de vida individual"
-    ]
-    
-    # Patrones para identificar póliza de vida
-    patrones_vida = [
-        r"ordinario de vida",
-        r"seguro de vida",
-        r"p[óo]liza de vida",
-        r"beneficiario(s)?\s+del\s+seguro",
-        r"suma\s+asegurada\s+por\s+fallecimiento"
-    ]
-    
-    # Patrones para identificar endoso tipo A
-    patrones_endoso_a = [
-        r"endoso\s+tipo\s+a",
-        r"endoso\s+de\s+modificación\s+de\s+datos",
-        r"modificación\s+de\s+datos\s+del\s+asegurado",
-        r"cambio\s+de\s+datos\s+del\s+asegurado",
-        r"endoso\s+de\s+modificación",
-        r"modificación\s+de\s+datos",
-        r"cambio\s+de\s+datos",
-        r"endoso\s+de\s+datos",
-        r"endoso\s+modificación",
-        r"endoso\s+tipo\s+a\s+modificación"
-    ]
-    
-    # **Reordenamiento de la lógica de detección**
-    
-    # 1. Buscar patrones de Aliados+ PPR primero
-    for patron in patrones_aliados_ppr:
-        if re.search(patron, text):
-            # Verificar si también contiene "kids" para diferenciar entre PPR y KIDS
-            if any(re.search(k_patron, text) for k_patron in patrones_aliados_kids):
-                logger.info(f"Detectada póliza Aliados+ KIDS con patrón: {patron}")
-                return "ALIADOS_KIDS"
-            logger.info(f"Detectada póliza Aliados+ PPR con patrón: {patron}")
-            return "ALIADOS_PPR"
-    
-    # 1.1 Buscar patrones de Aliados+ KIDS específicamente
-    for patron in patrones_aliados_kids:
-        if re.search(patron, text):
-            logger.info(f"Detectada póliza Aliados+ KIDS con patrón: {patron}")
-            return "ALIADOS_KIDS"
-            
-    # 2. Buscar patrones de VIDA PROTGT
-    for patron in patrones_vida_protgt:
-        if re.search(patron, text):
-            logger.info(f"Detectada póliza VIDA PROTGT con patrón: {patron}")
-            return "VIDA_PROTGT"
-            
-    # 3. Buscar patrones de Protegete Temporal MN
-    for patron in patrones_protgt_temporal_mn:
-        if re.search(patron, text):
-            logger.info(f"Detectada póliza Protegete Temporal MN con patrón: {patron}")
-            return "PROTGT_TEMPORAL_MN"
-            
-    # 4. Buscar patrones de Protección Efectiva
-    for patron in patrones_proteccion_efectiva:
-        if re.search(patron, text):
-            logger.info(f"Detectada póliza Protección Efectiva con patrón: {patron}")
-            return "PROTECCION_EFECTIVA"
-    
-    # 5. Buscar patrones de Plan Protege PYME
-    for patron in patrones_protgt_pyme:
-        if re.search(patron, text):
-            logger.info(f"Detectada póliza Plan Protege PYME con patrón: {patron}")
-            return "PROTGT_PYME"
-    
-    # 6. Buscar patrones de Salud Familiar Variante F (más específico, por eso va primero)
-    coincidencias_variantef = 0
-    for patron in patrones_salud_familiar_variantef:
-        if re.search(patron, text):
-            coincidencias_variantef += 1
-            logger.info(f"Coincidencia de patrón Salud Familiar Variante F: {patron}")
-    
-    if coincidencias_variantef >= 2:  # Umbral para detección de Variante F
-        logger.info(f"Detectada póliza de Gastos Médicos Mayores Familiar Variante F con {coincidencias_variantef} coincidencias")
-        return "SALUD_FAMILIAR_VARIANTEF"
-    
-    # 7. Buscar patrones de Salud Colectivo
-    coincidencias_colectivo = 0
-    for patron in patrones_salud_colectivo:
-        if re.search(patron, text, re.IGNORECASE):
-            coincidencias_colectivo += 1
-            logger.info(f"Coincidencia de patrón Salud Colectivo: {patron}")
-    
-    if coincidencias_colectivo >= 2:  # Reducir el umbral de 3 a 2
-        logger.info(f"Detectada póliza de Gastos Médicos Colectivo con {coincidencias_colectivo} coincidencias")
-        return "SALUD_COLECTIVO"
-    
-    # 8. Buscar patrones de Salud Familiar general
-    coincidencias_salud = 0
-    for patron in patrones_salud_familiar:
-        if re.search(patron, text):
-            coincidencias_salud += 1
-            logger.info(f"Coincidencia de patrón Salud Familiar: {patron}")
-    
-    if coincidencias_salud >= 3:  # Umbral para detección
-        logger.info(f"Detectada póliza de Gastos Médicos Mayores Familiar con {coincidencias_salud} coincidencias")
-        return "SALUD_FAMILIAR"
-            
-    # 9. Buscar patrones de Protegete Ordinario
-    for patron in patrones_protegete_ordinario:
-        if re.search(patron, text):
-            logger.info(f"Detectada póliza Protegete Ordinario con patrón: {patron}")
-            return "PROTEGETE_ORDINARIO"
-            
-    # 10. Buscar patrones de póliza de vida individual
-    for patron in patrones_vida_individual:
-        if re.search(patron, text):
-            logger.info(f"Detectada póliza de vida individual con patrón: {patron}")
-            return "POLIZA_VIDA_INDIVIDUAL"
-            
-    # 11. Buscar patrones de póliza de vida (genérico)
-    for patron in patrones_vida:
-        if re.search(patron, text):
-            logger.info(f"Detectada póliza de vida con patrón: {patron}")
-            return "POLIZA_VIDA"
-            
-    # 12. Buscar patrones de endoso tipo A (al final)
-    for patron in patrones_endoso_a:
-        if re.search(patron, text):
-            logger.info(f"Detectado endoso tipo A con patrón: {patron}")
-            return "ENDOSO_A"
+def detectar_tipo_progresivo(documento: DocumentContext) -> Tuple[str, float, int, str]:
+    """
+    Detecta el tipo leyendo páginas de una en una, como lo hace validate_endoso.
+
+    Se empieza con la primera página y solo se agregan páginas (hasta
+    MAX_PAGINAS_DETECCION) mientras la detección sea ambigua: tipo DESCONOCIDO o
+    una regla de mayor prioridad con coincidencias parciales en el texto leído.
+
+    Args:
+        documento: Contexto del PDF
+
+    Returns:
+        Tuple[str, float, int, str]: Tipo, confianza, páginas leídas y texto usado
+    """
+    texto = ""
+    tipo_documento, confianza, paginas_leidas = "DESCONOCIDO", 0.0, 0
+    limite = min(documento.page_count, MAX_PAGINAS_DETECCION)
+    for page_num in range(limite):
+        texto += documento.page_text(page_num)
+        paginas_leidas = page_num + 1
+        if not texto:
+            continue
+        with tiempos.etapa("detectar"), documento_en_curso(documento):
+            ocurrencias = CLASIFICADOR.ocurrencias(normalizar_texto_deteccion(texto))
+            tipo_documento, confianza = clasificar_documento(texto, ocurrencias)
+            definitivo = CLASIFICADOR.es_definitivo(tipo_documento, ocurrencias)
+        if definitivo:
+            break
+        if paginas_leidas < limite:
+            logger.info(f"Detección no definitiva con {paginas_leidas} página(s) ({tipo_documento}, confianza {confianza:.2f}); leyendo la siguiente")
+    return tipo_documento, confianza, paginas_leidas, texto
+
+def detect_document_type(text: str) -> str:
+    """
+    Detecta el tipo de documento basado en el contenido del texto.
     
-    # Si no se encuentra ningún patrón, tipo desconocido
-    logger.info("No se encontró patrón específico, documento de tipo desconocido")
-    return "DESCONOCIDO"
+    Args:
+        text (str): Texto extraído del PDF
+        
+    Returns:
+        str: Tipo de documento detectado ('ENDOSO_A', 'POLIZA_VIDA', 'POLIZA_VIDA_INDIVIDUAL', 
+                                         'PROTEGETE_ORDINARIO', 'ALIADOS_PPR', 'ALIADOS_KIDS',
+                                         'PROTGT_TEMPORAL_MN', 'VIDA_PROTGT', 'PROTECCION_EFECTIVA',
+                                         'PROTGT_PYME', 'SALUD_FAMILIAR_VARIANTEF', 'SALUD_COLECTIVO',
+                                         'SALUD_FAMILIAR', 'DESCONOCIDO')
+    """
+    return clasificar_documento(text)[0]
 
 def detect_endoso_type(text: str) -> Optional[str]:
     """
@@ -341,73 +309,90 @@ def detect_endoso_type(text: str) -> Optional[str]:
         return "A"
     return None
 
-def validate_endoso(pdf_path: str) -> Dict:
+def extraer_datos_por_tipo(pdf_path: Union[str, DocumentContext], tipo_documento: str,
+                           sumidero: Optional[SumideroArtefactos] = None) -> Dict:
     """
-    Valida el tipo de documento y extrae los datos correspondientes.
+    Ejecuta el extractor que corresponde al tipo de documento detectado.
     
     Args:
-        pdf_path (str): Ruta al archivo PDF
+        pdf_path (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+        tipo_documento (str): Tipo devuelto por `detect_document_type`
+        sumidero (SumideroArtefactos, opcional): Destino del markdown y el JSON que
+            generan los extractores de vida (sin sumidero no se escriben)
         
     Returns:
-        dict: Diccionario con el resultado de la validación y los datos extraídos
+        dict: Datos extraídos o {"error": ...} si el tipo no está soportado o la extracción falla
     """
-    doc = None # Inicializar doc a None
-    texto = "" # Inicializar texto
-    try:
-        logger.info(f"Intentando abrir PDF: {pdf_path} con fitz (PyMuPDF)...")
-        doc = fitz.open(pdf_path)
-        logger.info(f"PDF {pdf_path} abierto correctamente con fitz.")
-        
-        if doc.page_count < 1:
-            logger.error(f"El PDF {pdf_path} no tiene páginas.")
-            return {"error": "El PDF no tiene páginas"}
-            
-        # **Extraer texto para detección SIEMPRE con fitz**
-        logger.info(f"Extrayendo texto con fitz para detección en {pdf_path}...")
-        for page_num in range(min(doc.page_count, 2)): # Leer las primeras 2 páginas para detección
-             page = doc.load_page(page_num)
-             texto += page.get_text()
-             
-        if not texto:
-             logger.error(f"fitz no pudo extraer texto de las primeras páginas de {pdf_path}")
-             return {"error": "No se pudo extraer texto del PDF para detección"}
+    # El módulo del extractor se importa aquí, la primera vez que se necesita
+    if registro_extractores.tiene(tipo_documento) and registro_extractores.modulo(tipo_documento) is None:
+        logger.error(f"No se pudo importar el extractor para {tipo_documento}")
+        return {"error": f"No se pudo importar el extractor para {tipo_documento}"}
+
+    if tipo_documento == "ENDOSO_A":
+        logger.info(f"Endoso tipo A detectado para {pdf_path}. Procediendo a extraer datos financieros.")
+        datos_financieros = registro_extractores.obtener("ENDOSO_A")(pdf_path)
+        if datos_financieros:
+            logger.info(f"Datos financieros extraídos exitosamente para {pdf_path}.")
+            # Asegurarse de que todos los datos financieros incluyan prima_mensual
+            datos_financieros_completos = {
+                "prima_neta": datos_financieros.get("prima_neta", "0"),
+                "gastos_expedicion": datos_financieros.get("gastos_expedicion", "0"),
+                "iva": datos_financieros.get("iva", "0"),
+                "precio_total": datos_financieros.get("precio_total", "0"),
+                "tasa_financiamiento": datos_financieros.get("tasa_financiamiento", "0"),
+                "prima_mensual": datos_financieros.get("prima_mensual", "0")
+            }
+            return {
+                "tipo_documento": "ENDOSO_A",
+                "tipo_endoso": "A",
+                "descripcion": "MODIFICACIÓN DE DATOS",
+                "datos_financieros": datos_financieros_completos
+            }
+        else:
+            logger.error(f"Se detectó Endoso A para {pdf_path}, pero no se pudieron extraer los datos financieros.")
+            return {"error": "Se detectó Endoso A, pero no se pudieron extraer los datos financieros"}
+    
+    elif tipo_documento == "SALUD_FAMILIAR":
+        logger.info(f"Póliza de Gastos Médicos Mayores Familiar detectada para {pdf_path}. Procediendo a extraer datos.")
         
-        # Detectar el tipo de documento usando el texto extraído con fitz
-        tipo_documento = detect_document_type(texto) 
+        # Procesar el archivo y obtener datos con el script para pólizas de Salud Familiar
+        datos_salud = registro_extractores.obtener("SALUD_FAMILIAR")(pdf_path)
         
-        # Procesar según el tipo de documento
-        if tipo_documento == "ENDOSO_A":
-            logger.info(f"Endoso tipo A detectado para {pdf_path}. Procediendo a extraer datos financieros.")
-            datos_financieros = extraer_datos_endoso_a(pdf_path)
-            if datos_financieros:
-                logger.info(f"Datos financieros extraídos exitosamente para {pdf_path}.")
-                # Asegurarse de que todos los datos financieros incluyan prima_mensual
-                datos_financieros_completos = {
-                    "prima_neta": datos_financieros.get("prima_neta", "0"),
-                    "gastos_expedicion": datos_financieros.get("gastos_expedicion", "0"),
-                    "iva": datos_financieros.get("iva", "0"),
-                    "precio_total": datos_financieros.get("precio_total", "0"),
-                    "tasa_financiamiento": datos_financieros.get("tasa_financiamiento", "0"),
-                    "prima_mensual": datos_financieros.get("prima_mensual", "0")
-                }
-                return {
-                    "tipo_documento": "ENDOSO_A",
-                    "tipo_endoso": "A",
-                    "descripcion": "MODIFICACIÓN DE DATOS",
-                    "datos_financieros": datos_financieros_completos
-                }
-            else:
-                logger.error(f"Se detectó Endoso A para {pdf_path}, pero no se pudieron extraer los datos financieros.")
-                return {"error": "Se detectó Endoso A, pero no se pudieron extraer los datos financieros"}
+        if datos_salud:
+            logger.info(f"Datos de póliza de Gastos Médicos Mayores Familiar extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_salud.get("Prima Neta", "0"),
+                "gastos_expedicion": datos_salud.get("Derecho de póliza", "0"),
+                "iva": datos_salud.get("I.V.A.", "0"),
+                "precio_total": datos_salud.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
+                "prima_mensual": "0",
+                "descuento_familiar": datos_salud.get("Descuento familiar", "0"),
+                "cesion_comision": datos_salud.get("Cesión de Comisión", "0"),
+                "recargo_pago_fraccionado": datos_salud.get("Recargo por pago fraccionado", "0")
+            }
+            
+            return {
+                "tipo_documento": "SALUD_FAMILIAR",
+                "descripcion": "PÓLIZA DE GASTOS MÉDICOS MAYORES FAMILIAR",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_salud
+            }
+        else:
+            logger.error(f"Se detectó póliza de Gastos Médicos Mayores Familiar para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza de Gastos Médicos Mayores Familiar, pero no se pudieron extraer los datos"}
+    
+    elif tipo_documento == "SALUD_FAMILIAR_VARIANTEF":
+        logger.info(f"Póliza de Gastos Médicos Mayores Familiar Variante F detectada para {pdf_path}. Procediendo a extraer datos.")
         
-        elif tipo_documento == "SALUD_FAMILIAR":
-            logger.info(f"Póliza de Gastos Médicos Mayores Familiar detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Procesar el archivo y obtener datos con el script para pólizas de Salud Familiar
-            datos_salud = extraer_datos_poliza_salud_familiar(pdf_path)
+        extraer_datos_poliza_salud_familiar_variantef = registro_extractores.obtener("SALUD_FAMILIAR_VARIANTEF")
+        if extraer_datos_poliza_salud_familiar_variantef:
+            # Procesar el archivo y obtener datos con el script para pólizas de Salud Familiar Variante F
+            datos_salud = extraer_datos_poliza_salud_familiar_variantef(pdf_path)
             
             if datos_salud:
-                logger.info(f"Datos de póliza de Gastos Médicos Mayores Familiar extraídos exitosamente para {pdf_path}.")
+                logger.info(f"Datos de póliza de Gastos Médicos Mayores Familiar Variante F extraídos exitosamente para {pdf_path}.")
                 # Convertir los datos a formato financiero esperado por el frontend
                 datos_financieros = {
                     "prima_neta": datos_salud.get("Prima Neta", "0"),
@@ -422,379 +407,360 @@ def validate_endoso(pdf_path: str) -> Dict:
                 }
                 
                 return {
-                    "tipo_documento": "SALUD_FAMILIAR",
-                    "descripcion": "PÓLIZA DE GASTOS MÉDICOS MAYORES FAMILIAR",
+                    "tipo_documento": "SALUD_FAMILIAR_VARIANTEF",
+                    "descripcion": "PÓLIZA DE GASTOS MÉDICOS MAYORES FAMILIAR (VARIANTE F)",
                     "datos_financieros": datos_financieros,
                     "datos_completos": datos_salud
                 }
             else:
-                logger.error(f"Se detectó póliza de Gastos Médicos Mayores Familiar para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza de Gastos Médicos Mayores Familiar, pero no se pudieron extraer los datos"}
+                logger.error(f"Se detectó póliza de Gastos Médicos Mayores Familiar Variante F para {pdf_path}, pero no se pudieron extraer los datos.")
+                return {"error": "Se detectó póliza de Gastos Médicos Mayores Familiar Variante F, pero no se pudieron extraer los datos"}
+        else:
+            logger.error(f"No se pudo importar extractor para SALUD_FAMILIAR_VARIANTEF")
+            return {"error": "No se pudo importar extractor para póliza de Gastos Médicos Mayores Familiar Variante F"}
+    
+    elif tipo_documento == "ALIADOS_PPR":
+        logger.info(f"Póliza Aliados+ PPR detectada para {pdf_path}. Procediendo a extraer datos.")
         
-        elif tipo_documento == "SALUD_FAMILIAR_VARIANTEF":
-            logger.info(f"Póliza de Gastos Médicos Mayores Familiar Variante F detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            if extraer_datos_poliza_salud_familiar_variantef:
-                # Procesar el archivo y obtener datos con el script para pólizas de Salud Familiar Variante F
-                datos_salud = extraer_datos_poliza_salud_familiar_variantef(pdf_path)
-                
-                if datos_salud:
-                    logger.info(f"Datos de póliza de Gastos Médicos Mayores Familiar Variante F extraídos exitosamente para {pdf_path}.")
-                    # Convertir los datos a formato financiero esperado por el frontend
-                    datos_financieros = {
-                        "prima_neta": datos_salud.get("Prima Neta", "0"),
-                        "gastos_expedicion": datos_salud.get("Derecho de póliza", "0"),
-                        "iva": datos_salud.get("I.V.A.", "0"),
-                        "precio_total": datos_salud.get("Prima anual total", "0"),
-                        "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
-                        "prima_mensual": "0",
-                        "descuento_familiar": datos_salud.get("Descuento familiar", "0"),
-                        "cesion_comision": datos_salud.get("Cesión de Comisión", "0"),
-                        "recargo_pago_fraccionado": datos_salud.get("Recargo por pago fraccionado", "0")
-                    }
-                    
-                    return {
-                        "tipo_documento": "SALUD_FAMILIAR_VARIANTEF",
-                        "descripcion": "PÓLIZA DE GASTOS MÉDICOS MAYORES FAMILIAR (VARIANTE F)",
-                        "datos_financieros": datos_financieros,
-                        "datos_completos": datos_salud
-                    }
-                else:
-                    logger.error(f"Se detectó póliza de Gastos Médicos Mayores Familiar Variante F para {pdf_path}, pero no se pudieron extraer los datos.")
-                    return {"error": "Se detectó póliza de Gastos Médicos Mayores Familiar Variante F, pero no se pudieron extraer los datos"}
-            else:
-                logger.error(f"No se pudo importar extractor para SALUD_FAMILIAR_VARIANTEF")
-                return {"error": "No se pudo importar extractor para póliza de Gastos Médicos Mayores Familiar Variante F"}
+        # Procesar el documento en memoria y obtener datos con el script para pólizas Aliados+ PPR
+        datos_aliados_ppr = registro_extractores.obtener("ALIADOS_PPR", "procesar")(pdf_path, sumidero)
         
-        elif tipo_documento == "ALIADOS_PPR":
-            logger.info(f"Póliza Aliados+ PPR detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Crear directorio de salida temporal si no existe
-            output_dir = os.path.join(os.path.dirname(pdf_path), "output")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Procesar el archivo y obtener datos con el script para pólizas Aliados+ PPR
-            datos_aliados_ppr = procesar_archivo_aliados_ppr(pdf_path, output_dir)
-            
-            if datos_aliados_ppr:
-                logger.info(f"Datos de póliza Aliados+ PPR extraídos exitosamente para {pdf_path}.")
-                # Convertir los datos a formato financiero esperado por el frontend
-                datos_financieros = {
-                    "prima_neta": datos_aliados_ppr.get("Prima Neta", "0"),
-                    "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
-                    "iva": datos_aliados_ppr.get("I.V.A.", "0"),
-                    "precio_total": datos_aliados_ppr.get("Prima anual total", "0"),
-                    "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
-                    "prima_mensual": datos_aliados_ppr.get("Prima mensual", "0")
-                }
-                
-                return {
-                    "tipo_documento": "POLIZA_ALIADOS_PPR",
-                    "descripcion": "PÓLIZA ALIADOS+ PPR",
-                    "datos_financieros": datos_financieros,
-                    "datos_completos": datos_aliados_ppr
-                }
-            else:
-                logger.error(f"Se detectó póliza Aliados+ PPR para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza Aliados+ PPR, pero no se pudieron extraer los datos"}
+        if datos_aliados_ppr:
+            logger.info(f"Datos de póliza Aliados+ PPR extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_aliados_ppr.get("Prima Neta", "0"),
+                "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
+                "iva": datos_aliados_ppr.get("I.V.A.", "0"),
+                "precio_total": datos_aliados_ppr.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
+                "prima_mensual": datos_aliados_ppr.get("Prima mensual", "0")
+            }
+            
+            return {
+                "tipo_documento": "POLIZA_ALIADOS_PPR",
+                "descripcion": "PÓLIZA ALIADOS+ PPR",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_aliados_ppr
+            }
+        else:
+            logger.error(f"Se detectó póliza Aliados+ PPR para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza Aliados+ PPR, pero no se pudieron extraer los datos"}
+    
+    elif tipo_documento == "PROTGT_TEMPORAL_MN":
+        logger.info(f"Póliza Protegete Temporal MN detectada para {pdf_path}. Procediendo a extraer datos.")
         
-        elif tipo_documento == "PROTGT_TEMPORAL_MN":
-            logger.info(f"Póliza Protegete Temporal MN detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Crear directorio de salida temporal si no existe
-            output_dir = os.path.join(os.path.dirname(pdf_path), "output")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Procesar el archivo y obtener datos con el script para pólizas Protegete Temporal MN
-            datos_protgt_temporal_mn = procesar_archivo_protgt_temporal_mn(pdf_path, output_dir)
-            
-            if datos_protgt_temporal_mn:
-                logger.info(f"Datos de póliza Protegete Temporal MN extraídos exitosamente para {pdf_path}.")
-                # Convertir los datos a formato financiero esperado por el frontend
-                datos_financieros = {
-                    "prima_neta": datos_protgt_temporal_mn.get("Prima Neta", "0"),
-                    "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
-                    "iva": datos_protgt_temporal_mn.get("I.V.A.", "0"),
-                    "precio_total": datos_protgt_temporal_mn.get("Prima anual total", "0"),
-                    "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
-                    "prima_mensual": datos_protgt_temporal_mn.get("Prima mensual", "0")
-                }
-                
-                return {
-                    "tipo_documento": "POLIZA_PROTGT_TEMPORAL_MN",
-                    "descripcion": "PÓLIZA PROTGT TEMPORAL MN",
-                    "datos_financieros": datos_financieros,
-                    "datos_completos": datos_protgt_temporal_mn
-                }
-            else:
-                logger.error(f"Se detectó póliza Protegete Temporal MN para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza Protegete Temporal MN, pero no se pudieron extraer los datos"}
+        # Procesar el documento en memoria y obtener datos con el script para pólizas Protegete Temporal MN
+        datos_protgt_temporal_mn = registro_extractores.obtener("PROTGT_TEMPORAL_MN", "procesar")(pdf_path, sumidero)
         
-        elif tipo_documento == "PROTEGETE_ORDINARIO":
-            logger.info(f"Póliza Protegete Ordinario detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Crear directorio de salida temporal si no existe
-            output_dir = os.path.join(os.path.dirname(pdf_path), "output")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Procesar el archivo y obtener datos con el script para pólizas Protegete Ordinario
-            datos_protegete = procesar_archivo_protgt_ordinario(pdf_path, output_dir)
-            
-            if datos_protegete:
-                logger.info(f"Datos de póliza Protegete Ordinario extraídos exitosamente para {pdf_path}.")
-                # Convertir los datos a formato financiero esperado por el frontend
-                datos_financieros = {
-                    "prima_neta": datos_protegete.get("Prima Neta", "0"),
-                    "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
-                    "iva": datos_protegete.get("I.V.A.", "0"),
-                    "precio_total": datos_protegete.get("Prima anual total", "0"),
-                    "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
-                    "prima_mensual": datos_protegete.get("Prima mensual", "0")
-                }
-                
-                return {
-                    "tipo_documento": "POLIZA_VIDA",
-                    "descripcion": "PÓLIZA PROTEGETE ORDINARIO",
-                    "datos_financieros": datos_financieros,
-                    "datos_completos": datos_protegete
-                }
-            else:
-                logger.error(f"Se detectó póliza Protegete Ordinario para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza Protegete Ordinario, pero no se pudieron extraer los datos"}
+        if datos_protgt_temporal_mn:
+            logger.info(f"Datos de póliza Protegete Temporal MN extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_protgt_temporal_mn.get("Prima Neta", "0"),
+                "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
+                "iva": datos_protgt_temporal_mn.get("I.V.A.", "0"),
+                "precio_total": datos_protgt_temporal_mn.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
+                "prima_mensual": datos_protgt_temporal_mn.get("Prima mensual", "0")
+            }
+            
+            return {
+                "tipo_documento": "POLIZA_PROTGT_TEMPORAL_MN",
+                "descripcion": "PÓLIZA PROTGT TEMPORAL MN",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_protgt_temporal_mn
+            }
+        else:
+            logger.error(f"Se detectó póliza Protegete Temporal MN para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza Protegete Temporal MN, pero no se pudieron extraer los datos"}
+    
+    elif tipo_documento == "PROTEGETE_ORDINARIO":
+        logger.info(f"Póliza Protegete Ordinario detectada para {pdf_path}. Procediendo a extraer datos.")
         
-        elif tipo_documento == "POLIZA_VIDA_INDIVIDUAL":
-            logger.info(f"Póliza de vida individual detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Crear directorio de salida temporal si no existe
-            output_dir = os.path.join(os.path.dirname(pdf_path), "output")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Procesar el archivo y obtener datos con el script para pólizas de vida individual
-            datos_vida = procesar_archivo_individual(pdf_path, output_dir)
-            
-            if datos_vida:
-                logger.info(f"Datos de póliza de vida individual extraídos exitosamente para {pdf_path}.")
-                # Convertir los datos a formato financiero esperado por el frontend
-                datos_financieros = {
-                    "prima_neta": datos_vida.get("Prima Neta", "0"),
-                    "gastos_expedicion": "0",  # No aplica para pólizas de vida
-                    "iva": datos_vida.get("I.V.A.", "0"),
-                    "precio_total": datos_vida.get("Prima anual total", "0"),
-                    "tasa_financiamiento": "0",  # No aplica para pólizas de vida
-                    "prima_mensual": datos_vida.get("Prima mensual", "0")
-                }
-                
-                return {
-                    "tipo_documento": "POLIZA_VIDA",
-                    "descripcion": "PÓLIZA DE VIDA INDIVIDUAL",
-                    "datos_financieros": datos_financieros,
-                    "datos_completos": datos_vida
-                }
-            else:
-                logger.error(f"Se detectó póliza de vida individual para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza de vida individual, pero no se pudieron extraer los datos"}
+        # Procesar el documento en memoria y obtener datos con el script para pólizas Protegete Ordinario
+        datos_protegete = registro_extractores.obtener("PROTEGETE_ORDINARIO", "procesar")(pdf_path, sumidero)
         
-        elif tipo_documento == "POLIZA_VIDA":
-            logger.info(f"Póliza de vida detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Crear directorio de salida temporal si no existe
-            output_dir = os.path.join(os.path.dirname(pdf_path), "output")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Procesar el archivo y obtener datos
-            datos_vida = procesar_archivo(pdf_path, output_dir)
-            
-            if datos_vida:
-                logger.info(f"Datos de póliza de vida extraídos exitosamente para {pdf_path}.")
-                # Convertir los datos a formato financiero esperado por el frontend
-                datos_financieros = {
-                    "prima_neta": datos_vida.get("Prima Neta", "0"),
-                    "gastos_expedicion": "0",  # No aplica para pólizas de vida
-                    "iva": datos_vida.get("I.V.A.", "0"),
-                    "precio_total": datos_vida.get("Prima anual total", "0"),
-                    "tasa_financiamiento": "0",  # No aplica para pólizas de vida
-                    "prima_mensual": datos_vida.get("Prima mensual", "0")
-                }
-                
-                return {
-                    "tipo_documento": "POLIZA_VIDA",
-                    "descripcion": "PÓLIZA DE VIDA",
-                    "datos_financieros": datos_financieros,
-                    "datos_completos": datos_vida
-                }
-            else:
-                logger.error(f"Se detectó póliza de vida para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza de vida, pero no se pudieron extraer los datos"}
+        if datos_protegete:
+            logger.info(f"Datos de póliza Protegete Ordinario extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_protegete.get("Prima Neta", "0"),
+                "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
+                "iva": datos_protegete.get("I.V.A.", "0"),
+                "precio_total": datos_protegete.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
+                "prima_mensual": datos_protegete.get("Prima mensual", "0")
+            }
+            
+            return {
+                "tipo_documento": "POLIZA_VIDA",
+                "descripcion": "PÓLIZA PROTEGETE ORDINARIO",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_protegete
+            }
+        else:
+            logger.error(f"Se detectó póliza Protegete Ordinario para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza Protegete Ordinario, pero no se pudieron extraer los datos"}
+    
+    elif tipo_documento == "POLIZA_VIDA_INDIVIDUAL":
+        logger.info(f"Póliza de vida individual detectada para {pdf_path}. Procediendo a extraer datos.")
         
-        elif tipo_documento == "VIDA_PROTGT":
-            logger.info(f"Póliza VIDA PROTGT detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Crear directorio de salida temporal si no existe
-            output_dir = os.path.join(os.path.dirname(pdf_path), "output")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Procesar el archivo y obtener datos con el script para pólizas VIDA PROTGT
-            datos_vida_protgt = procesar_archivo_vida_protgt(pdf_path, output_dir)
-            
-            if datos_vida_protgt:
-                logger.info(f"Datos de póliza VIDA PROTGT extraídos exitosamente para {pdf_path}.")
-                # Convertir los datos a formato financiero esperado por el frontend
-                datos_financieros = {
-                    "prima_neta": datos_vida_protgt.get("Prima Neta", "0"),
-                    "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
-                    "iva": datos_vida_protgt.get("I.V.A.", "0"),
-                    "precio_total": datos_vida_protgt.get("Prima anual total", "0"),
-                    "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
-                    "prima_mensual": datos_vida_protgt.get("Prima mensual", "0")
-                }
-                
-                return {
-                    "tipo_documento": "POLIZA_VIDA_PROTGT",
-                    "descripcion": "PÓLIZA VIDA PROTGT",
-                    "datos_financieros": datos_financieros,
-                    "datos_completos": datos_vida_protgt
-                }
-            else:
-                logger.error(f"Se detectó póliza VIDA PROTGT para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza VIDA PROTGT, pero no se pudieron extraer los datos"}
+        # Procesar el documento en memoria y obtener datos con el script para pólizas de vida individual
+        datos_vida = registro_extractores.obtener("POLIZA_VIDA_INDIVIDUAL", "procesar")(pdf_path, sumidero)
         
-        elif tipo_documento == "PROTECCION_EFECTIVA":
-            logger.info(f"Póliza Protección Efectiva detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Crear directorio de salida temporal si no existe
-            output_dir = os.path.join(os.path.dirname(pdf_path), "output")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Procesar el archivo y obtener datos con el script para pólizas Protección Efectiva
-            datos_proteccion_efectiva = procesar_archivo_proteccion_efectiva(pdf_path, output_dir)
-            
-            if datos_proteccion_efectiva:
-                logger.info(f"Datos de póliza Protección Efectiva extraídos exitosamente para {pdf_path}.")
-                # Convertir los datos a formato financiero esperado por el frontend
-                datos_financieros = {
-                    "prima_neta": datos_proteccion_efectiva.get("Prima Neta", "0"),
-                    "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
-                    "iva": datos_proteccion_efectiva.get("I.V.A.", "0"),
-                    "precio_total": datos_proteccion_efectiva.get("Prima anual total", "0"),
-                    "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
-                    "prima_mensual": datos_proteccion_efectiva.get("Prima mensual", "0")
-                }
-                
-                return {
-                    "tipo_documento": "POLIZA_VIDA",
-                    "descripcion": "PÓLIZA PROTECCION EFECTIVA",
-                    "datos_financieros": datos_financieros,
-                    "datos_completos": datos_proteccion_efectiva
-                }
-            else:
-                logger.error(f"Se detectó póliza Protección Efectiva para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza Protección Efectiva, pero no se pudieron extraer los datos"}
+        if datos_vida:
+            logger.info(f"Datos de póliza de vida individual extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_vida.get("Prima Neta", "0"),
+                "gastos_expedicion": "0",  # No aplica para pólizas de vida
+                "iva": datos_vida.get("I.V.A.", "0"),
+                "precio_total": datos_vida.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",  # No aplica para pólizas de vida
+                "prima_mensual": datos_vida.get("Prima mensual", "0")
+            }
+            
+            return {
+                "tipo_documento": "POLIZA_VIDA",
+                "descripcion": "PÓLIZA DE VIDA INDIVIDUAL",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_vida
+            }
+        else:
+            logger.error(f"Se detectó póliza de vida individual para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza de vida individual, pero no se pudieron extraer los datos"}
+    
+    elif tipo_documento == "POLIZA_VIDA":
+        logger.info(f"Póliza de vida detectada para {pdf_path}. Procediendo a extraer datos.")
         
-        elif tipo_documento == "PROTGT_PYME":
-            logger.info(f"Póliza Plan Protege PYME detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Crear directorio de salida temporal si no existe
-            output_dir = os.path.join(os.path.dirname(pdf_path), "output")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Procesar el archivo y obtener datos con el script para pólizas Plan Protege PYME
-            datos_protgt_pyme = procesar_archivo_protgt_pyme(pdf_path, output_dir)
-            
-            if datos_protgt_pyme:
-                logger.info(f"Datos de póliza Plan Protege PYME extraídos exitosamente para {pdf_path}.")
-                # Convertir los datos a formato financiero esperado por el frontend
-                datos_financieros = {
-                    "prima_neta": datos_protgt_pyme.get("Prima Neta", "0"),
-                    "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
-                    "iva": datos_protgt_pyme.get("I.V.A.", "0"),
-                    "precio_total": datos_protgt_pyme.get("Prima anual total", "0"),
-                    "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
-                    "prima_mensual": datos_protgt_pyme.get("Prima mensual", "0")
-                }
-                
-                return {
-                    "tipo_documento": "POLIZA_VIDA",
-                    "descripcion": "PÓLIZA PLAN PROTEGE PYME",
-                    "datos_financieros": datos_financieros,
-                    "datos_completos": datos_protgt_pyme
-                }
-            else:
-                logger.error(f"Se detectó póliza Plan Protege PYME para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza Plan Protege PYME, pero no se pudieron extraer los datos"}
+        # Procesar el documento en memoria y obtener datos
+        datos_vida = registro_extractores.obtener("POLIZA_VIDA", "procesar")(pdf_path, sumidero)
         
-        elif tipo_documento == "SALUD_COLECTIVO":
-            logger.info(f"Póliza de Gastos Médicos Colectivo detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Procesar el archivo y obtener datos con el script para pólizas de Salud Colectivo
-            datos_salud = extraer_datos_poliza_salud_colectivo(pdf_path)
-            
-            if datos_salud:
-                logger.info(f"Datos de póliza de Gastos Médicos Colectivo extraídos exitosamente para {pdf_path}.")
-                # Convertir los datos a formato financiero esperado por el frontend
-                datos_financieros = {
-                    "prima_neta": datos_salud.get("Prima Neta", "0"),
-                    "gastos_expedicion": datos_salud.get("Derecho de póliza", "0"),
-                    "iva": datos_salud.get("I.V.A.", "0"),
-                    "precio_total": datos_salud.get("Prima anual total", "0"),
-                    "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
-                    "prima_mensual": "0",
-                    "descuento_familiar": datos_salud.get("Descuento familiar", "0"),
-                    "cesion_comision": datos_salud.get("Cesión de Comisión", "0"),
-                    "recargo_pago_fraccionado": datos_salud.get("Recargo por pago fraccionado", "0")
-                }
-                
-                return {
-                    "tipo_documento": "SALUD_COLECTIVO",
-                    "descripcion": "PÓLIZA DE GASTOS MÉDICOS COLECTIVO",
-                    "datos_financieros": datos_financieros,
-                    "datos_completos": datos_salud
-                }
-            else:
-                logger.error(f"Se detectó póliza de Gastos Médicos Colectivo para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza de Gastos Médicos Colectivo, pero no se pudieron extraer los datos"}
+        if datos_vida:
+            logger.info(f"Datos de póliza de vida extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_vida.get("Prima Neta", "0"),
+                "gastos_expedicion": "0",  # No aplica para pólizas de vida
+                "iva": datos_vida.get("I.V.A.", "0"),
+                "precio_total": datos_vida.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",  # No aplica para pólizas de vida
+                "prima_mensual": datos_vida.get("Prima mensual", "0")
+            }
+            
+            return {
+                "tipo_documento": "POLIZA_VIDA",
+                "descripcion": "PÓLIZA DE VIDA",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_vida
+            }
+        else:
+            logger.error(f"Se detectó póliza de vida para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza de vida, pero no se pudieron extraer los datos"}
+    
+    elif tipo_documento == "VIDA_PROTGT":
+        logger.info(f"Póliza VIDA PROTGT detectada para {pdf_path}. Procediendo a extraer datos.")
         
-        elif tipo_documento == "ALIADOS_KIDS":
-            logger.info(f"Póliza Aliados+ KIDS detectada para {pdf_path}. Procediendo a extraer datos.")
-            
-            # Procesar el archivo y obtener datos con el script para pólizas de Aliados+ KIDS
-            datos_kids = extraer_datos_poliza_aliados_kids(pdf_path)
-            
-            if datos_kids:
-                logger.info(f"Datos de póliza Aliados+ KIDS extraídos exitosamente para {pdf_path}.")
-                # Convertir los datos a formato financiero esperado por el frontend
-                datos_financieros = {
-                    "prima_neta": datos_kids.get("Prima Neta", "0"),
-                    "gastos_expedicion": "0",  # Normalmente no tienen gastos de expedición
-                    "iva": datos_kids.get("I.V.A.", "0"),
-                    "precio_total": datos_kids.get("Prima anual total", "0"),
-                    "tasa_financiamiento": "0",
-                    "prima_mensual": "0",
-                    "prima_trimestral": datos_kids.get("Prima trimestral", "0"),
-                    "prima_trimestral_total": datos_kids.get("Prima trimestral Total", "0"),
-                    "recargo_pago_fraccionado": datos_kids.get("Recargo por pago fraccionado", "0")
-                }
-                
-                return {
-                    "tipo_documento": "ALIADOS_KIDS",
-                    "descripcion": "PÓLIZA ALIADOS+ KIDS",
-                    "datos_financieros": datos_financieros,
-                    "datos_completos": datos_kids
-                }
-            else:
-                logger.error(f"Se detectó póliza Aliados+ KIDS para {pdf_path}, pero no se pudieron extraer los datos.")
-                return {"error": "Se detectó póliza Aliados+ KIDS, pero no se pudieron extraer los datos"}
+        # Procesar el documento en memoria y obtener datos con el script para pólizas VIDA PROTGT
+        datos_vida_protgt = registro_extractores.obtener("VIDA_PROTGT", "procesar")(pdf_path, sumidero)
+        
+        if datos_vida_protgt:
+            logger.info(f"Datos de póliza VIDA PROTGT extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_vida_protgt.get("Prima Neta", "0"),
+                "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
+                "iva": datos_vida_protgt.get("I.V.A.", "0"),
+                "precio_total": datos_vida_protgt.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
+                "prima_mensual": datos_vida_protgt.get("Prima mensual", "0")
+            }
+            
+            return {
+                "tipo_documento": "POLIZA_VIDA_PROTGT",
+                "descripcion": "PÓLIZA VIDA PROTGT",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_vida_protgt
+            }
+        else:
+            logger.error(f"Se detectó póliza VIDA PROTGT para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza VIDA PROTGT, pero no se pudieron extraer los datos"}
+    
+    elif tipo_documento == "PROTECCION_EFECTIVA":
+        logger.info(f"Póliza Protección Efectiva detectada para {pdf_path}. Procediendo a extraer datos.")
+        
+        # Procesar el documento en memoria y obtener datos con el script para pólizas Protección Efectiva
+        datos_proteccion_efectiva = registro_extractores.obtener("PROTECCION_EFECTIVA", "procesar")(pdf_path, sumidero)
         
+        if datos_proteccion_efectiva:
+            logger.info(f"Datos de póliza Protección Efectiva extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_proteccion_efectiva.get("Prima Neta", "0"),
+                "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
+                "iva": datos_proteccion_efectiva.get("I.V.A.", "0"),
+                "precio_total": datos_proteccion_efectiva.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
+                "prima_mensual": datos_proteccion_efectiva.get("Prima mensual", "0")
+            }
+            
+            return {
+                "tipo_documento": "POLIZA_VIDA",
+                "descripcion": "PÓLIZA PROTECCION EFECTIVA",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_proteccion_efectiva
+            }
         else:
-            logger.warning(f"Tipo de documento no soportado o desconocido para {pdf_path}")
-            return {"error": "Tipo de documento no soportado o desconocido"}
+            logger.error(f"Se detectó póliza Protección Efectiva para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza Protección Efectiva, pero no se pudieron extraer los datos"}
+    
+    elif tipo_documento == "PROTGT_PYME":
+        logger.info(f"Póliza Plan Protege PYME detectada para {pdf_path}. Procediendo a extraer datos.")
+        
+        # Procesar el documento en memoria y obtener datos con el script para pólizas Plan Protege PYME
+        datos_protgt_pyme = registro_extractores.obtener("PROTGT_PYME", "procesar")(pdf_path, sumidero)
+        
+        if datos_protgt_pyme:
+            logger.info(f"Datos de póliza Plan Protege PYME extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_protgt_pyme.get("Prima Neta", "0"),
+                "gastos_expedicion": "0",  # No aplica para este tipo de pólizas
+                "iva": datos_protgt_pyme.get("I.V.A.", "0"),
+                "precio_total": datos_protgt_pyme.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
+                "prima_mensual": datos_protgt_pyme.get("Prima mensual", "0")
+            }
+            
+            return {
+                "tipo_documento": "POLIZA_VIDA",
+                "descripcion": "PÓLIZA PLAN PROTEGE PYME",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_protgt_pyme
+            }
+        else:
+            logger.error(f"Se detectó póliza Plan Protege PYME para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza Plan Protege PYME, pero no se pudieron extraer los datos"}
+    
+    elif tipo_documento == "SALUD_COLECTIVO":
+        logger.info(f"Póliza de Gastos Médicos Colectivo detectada para {pdf_path}. Procediendo a extraer datos.")
+        
+        # Procesar el archivo y obtener datos con el script para pólizas de Salud Colectivo
+        datos_salud = registro_extractores.obtener("SALUD_COLECTIVO")(pdf_path)
+        
+        if datos_salud:
+            logger.info(f"Datos de póliza de Gastos Médicos Colectivo extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_salud.get("Prima Neta", "0"),
+                "gastos_expedicion": datos_salud.get("Derecho de póliza", "0"),
+                "iva": datos_salud.get("I.V.A.", "0"),
+                "precio_total": datos_salud.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",  # No aplica para este tipo de pólizas
+                "prima_mensual": "0",
+                "descuento_familiar": datos_salud.get("Descuento familiar", "0"),
+                "cesion_comision": datos_salud.get("Cesión de Comisión", "0"),
+                "recargo_pago_fraccionado": datos_salud.get("Recargo por pago fraccionado", "0")
+            }
+            
+            return {
+                "tipo_documento": "SALUD_COLECTIVO",
+                "descripcion": "PÓLIZA DE GASTOS MÉDICOS COLECTIVO",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_salud
+            }
+        else:
+            logger.error(f"Se detectó póliza de Gastos Médicos Colectivo para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza de Gastos Médicos Colectivo, pero no se pudieron extraer los datos"}
+    
+    elif tipo_documento == "ALIADOS_KIDS":
+        logger.info(f"Póliza Aliados+ KIDS detectada para {pdf_path}. Procediendo a extraer datos.")
+        
+        # Procesar el archivo y obtener datos con el script para pólizas de Aliados+ KIDS
+        datos_kids = registro_extractores.obtener("ALIADOS_KIDS")(pdf_path)
+        
+        if datos_kids:
+            logger.info(f"Datos de póliza Aliados+ KIDS extraídos exitosamente para {pdf_path}.")
+            # Convertir los datos a formato financiero esperado por el frontend
+            datos_financieros = {
+                "prima_neta": datos_kids.get("Prima Neta", "0"),
+                "gastos_expedicion": "0",  # Normalmente no tienen gastos de expedición
+                "iva": datos_kids.get("I.V.A.", "0"),
+                "precio_total": datos_kids.get("Prima anual total", "0"),
+                "tasa_financiamiento": "0",
+                "prima_mensual": "0",
+                "prima_trimestral": datos_kids.get("Prima trimestral", "0"),
+                "prima_trimestral_total": datos_kids.get("Prima trimestral Total", "0"),
+                "recargo_pago_fraccionado": datos_kids.get("Recargo por pago fraccionado", "0")
+            }
+            
+            return {
+                "tipo_documento": "ALIADOS_KIDS",
+                "descripcion": "PÓLIZA ALIADOS+ KIDS",
+                "datos_financieros": datos_financieros,
+                "datos_completos": datos_kids
+            }
+        else:
+            logger.error(f"Se detectó póliza Aliados+ KIDS para {pdf_path}, pero no se pudieron extraer los datos.")
+            return {"error": "Se detectó póliza Aliados+ KIDS, pero no se pudieron extraer los datos"}
+    
+    else:
+        logger.warning(f"Tipo de documento no soportado o desconocido para {pdf_path}")
+        return {"error": "Tipo de documento no soportado o desconocido"}
+
+def validate_endoso(pdf_path: Union[str, DocumentContext], sumidero: Optional[SumideroArtefactos] = None) -> Dict:
+    """
+    Valida el tipo de documento y extrae los datos correspondientes.
+    
+    Args:
+        pdf_path (str | DocumentContext): Ruta al archivo PDF o contexto ya abierto
+            por quien llama. Si se recibe un contexto, el PDF no se vuelve a abrir
+            y el contexto no se cierra aquí.
+        sumidero (SumideroArtefactos, opcional): Destino del markdown y el JSON de la
+            póliza (por defecto, el sumidero configurado con PRISMA_ARTEFACTOS)
+        
+    Returns:
+        dict: Diccionario con el resultado de la validación y los datos extraídos
+    """
+    documento = None # Contexto abierto por esta función (si aplica)
+    texto = "" # Inicializar texto
+    try:
+        if isinstance(pdf_path, DocumentContext):
+            logger.info(f"Reutilizando documento abierto: {pdf_path}")
+        else:
+            logger.info(f"Intentando abrir PDF: {pdf_path} con fitz (PyMuPDF)...")
+            documento = DocumentContext(pdf_path)
+            pdf_path = documento
+        logger.info(f"PDF {pdf_path} abierto correctamente con fitz.")
+        
+        if pdf_path.page_count < 1:
+            logger.error(f"El PDF {pdf_path} no tiene páginas.")
+            return {"error": "El PDF no tiene páginas"}
+            
+        logger.info(f"Extrayendo texto con fitz para detección en {pdf_path}...")
+        tipo_documento, confianza, paginas_leidas, texto = detectar_tipo_progresivo(pdf_path)
+             
+        if not texto:
+             logger.error(f"fitz no pudo extraer texto de las primeras páginas de {pdf_path}")
+             return {"error": "No se pudo extraer texto del PDF para detección", "paginas_leidas": paginas_leidas}
+        
+        logger.info(f"Tipo {tipo_documento} detectado leyendo {paginas_leidas} de {pdf_path.page_count} página(s)")
+        tiempos.establecer_tipo(tipo_documento)
+        # Los patrones que agoten su tiempo se registran con el hash de este documento
+        with tiempos.etapa("extraer"), documento_en_curso(pdf_path):
+            resultado = extraer_datos_por_tipo(pdf_path, tipo_documento, sumidero or sumidero_artefactos)
+        resultado["paginas_leidas"] = paginas_leidas
+        resultado["confianza"] = confianza
+        return resultado
             
     except Exception as e:
         logger.error(f"Error general al validar documento {pdf_path}: {str(e)}", exc_info=True)
         return {"error": f"Error interno al procesar el PDF: {str(e)}"}
     finally:
-        if doc:
+        if documento:
             logger.info(f"Cerrando documento PDF: {pdf_path}")
-            doc.close()
+            documento.close()
 
 if __name__ == "__main__":
     # Ejemplo de uso
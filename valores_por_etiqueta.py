@@ -0,0 +1,212 @@
+import os
+import re
+import logging
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from contexto_documento import DocumentContext
+from patrones_registro import PatronRegistrado, registro
+
+logger = logging.getLogger(__name__)
+
+# Extracción por posición activada (PRISMA_EXTRACCION_GEOMETRICA=0 vuelve a usar solo regex)
+EXTRACCION_GEOMETRICA = os.environ.get("PRISMA_EXTRACCION_GEOMETRICA", "1") != "0"
+# Páginas que se recorren buscando etiquetas (los datos de la carátula están al inicio)
+PAGINAS_GEOMETRIA = int(os.environ.get("PRISMA_GEOMETRIA_PAGINAS", "3"))
+
+# Distancias en múltiplos del alto de la etiqueta: separación máxima entre palabras
+# de un mismo valor y distancia máxima a la fila de un valor que está debajo
+SEPARACION_PALABRAS = 1.5
+DISTANCIA_DEBAJO = 1.5
+
+_FECHA = r'(\d{2}/\d{2}/\d{4})'
+_MONTO = r'([\d,]+\.\d{2})'
+_MONTO_O_ENTERO = r'([\d,]+\.\d{2}|[\d,]+)'
+_PALABRA = r'([A-Za-zÁ-Úá-ú]+)'
+
+# Etiqueta y formato del valor de los campos de las carátulas de salud (familiar y
+# colectivo). El valor puede estar en la misma fila a la derecha o en la fila de abajo,
+# por lo que una sola búsqueda sustituye las variantes "\s+" y "\s*\n\s*" de cada campo.
+ETIQUETAS_SALUD = {
+    "Número de póliza": ("Póliza", r'([0-9A-Z]*\d[0-9A-Z]*)\b'),
+    "Solicitud": ("Solicitud", r'(\d{5,14})\b'),
+    "Tipo de Plan": ("Tipo de plan", r'([A-Za-zÁ-Úá-ú ]+)'),
+    "Fecha de inicio de vigencia": ("Fecha de inicio de vigencia", _FECHA),
+    "Fecha de fin de vigencia": ("Fecha de fin de vigencia", _FECHA),
+    "Fecha de emisión": ("Fecha de emisión", _FECHA),
+    "Frecuencia de pago": ("Frecuencia de pago", _PALABRA),
+    "Tipo de pago": ("Tipo de pago", _PALABRA),
+    "Prima Neta": ("Prima Neta", _MONTO),
+    "Descuento familiar": ("Descuento familiar", _MONTO_O_ENTERO),
+    "Cesión de Comisión": ("Cesión de Comisión", _MONTO_O_ENTERO),
+    "Recargo por pago fraccionado": ("Recargo por pago fraccionado", _MONTO_O_ENTERO),
+    "Derecho de póliza": ("Derecho de póliza", _MONTO),
+    "I.V.A.": ("I.V.A.", _MONTO),
+    "Prima anual total": ("Prima anual total", _MONTO),
+}
+
+
+def _normalizar(palabra: str) -> str:
+    """Minúsculas y sin acentos ni dos puntos finales, para comparar etiquetas."""
+    descompuesta = unicodedata.normalize("NFKD", palabra)
+    return "".join(c for c in descompuesta if not unicodedata.combining(c)).casefold().rstrip(":")
+
+
+def compilar_etiquetas(etiquetas: Dict[str, Tuple[str, str]],
+                       flags: int = re.IGNORECASE) -> Dict[str, Tuple[Tuple[str, ...], PatronRegistrado]]:
+    """
+    Prepara las etiquetas {campo: (etiqueta, patrón del valor)}.
+
+    Args:
+        etiquetas: Texto de la etiqueta y expresión regular que valida el valor
+        flags: Banderas de `re` de los patrones de valor
+
+    Returns:
+        Dict: Palabras normalizadas de la etiqueta y patrón compilado de cada campo
+    """
+    patrones = registro.grupo("valores_por_etiqueta", {
+        campo: patron for campo, (_, patron) in etiquetas.items()
+    }, flags)
+    return {
+        campo: (tuple(_normalizar(p) for p in etiqueta.split()), patrones[campo])
+        for campo, (etiqueta, _) in etiquetas.items()
+    }
+
+
+_ETIQUETAS_SALUD = compilar_etiquetas(ETIQUETAS_SALUD)
+
+
+def _misma_fila(a, b) -> bool:
+    """Las cajas de dos palabras se solapan al menos la mitad de la altura menor."""
+    solape = min(a[3], b[3]) - max(a[1], b[1])
+    return solape >= 0.5 * min(a[3] - a[1], b[3] - b[1])
+
+
+def _ubicar_etiquetas(palabras: List, primeras: Dict[str, List[str]],
+                      etiquetas: Dict[str, Tuple[Tuple[str, ...], PatronRegistrado]]) -> List[Tuple[str, tuple, range]]:
+    """
+    Recorre una vez las palabras de la página y devuelve las etiquetas encontradas.
+
+    Una etiqueta debe empezar su frase: si la palabra anterior de la misma línea
+    está pegada ("Derecho de póliza", "Carátula de póliza") no cuenta como "Póliza".
+
+    Returns:
+        List: (campo, caja de la etiqueta, índices de sus palabras) en orden de lectura
+    """
+    normalizadas = [_normalizar(p[4]) for p in palabras]
+    encontradas = []
+    for i, normalizada in enumerate(normalizadas):
+        candidatos = primeras.get(normalizada)
+        if not candidatos:
+            continue
+        palabra = palabras[i]
+        alto = palabra[3] - palabra[1]
+        if i > 0:
+            anterior = palabras[i - 1]
+            if (anterior[5:7] == palabra[5:7] and _misma_fila(anterior, palabra)
+                    and palabra[0] - anterior[2] <= SEPARACION_PALABRAS * alto):
+                continue
+        for campo in candidatos:
+            tokens = etiquetas[campo][0]
+            fin = i + len(tokens)
+            if fin > len(palabras) or tuple(normalizadas[i:fin]) != tokens:
+                continue
+            if any(palabras[j][5:7] != palabra[5:7] for j in range(i + 1, fin)):
+                continue
+            ultima = palabras[fin - 1]
+            caja = (palabra[0], min(p[1] for p in palabras[i:fin]), ultima[2], max(p[3] for p in palabras[i:fin]))
+            encontradas.append((campo, caja, range(i, fin)))
+    return encontradas
+
+
+def _continuar_fila(palabras: List, primera: int, ocupadas: set, alto: float) -> str:
+    """Une la palabra `primera` con las que le siguen en su fila, mientras estén pegadas."""
+    fila = sorted(
+        (j for j, p in enumerate(palabras)
+         if j not in ocupadas and p[0] >= palabras[primera][0] and _misma_fila(p, palabras[primera])),
+        key=lambda j: palabras[j][0])
+    texto = [palabras[primera][4]]
+    anterior = palabras[primera]
+    for j in fila:
+        if j == primera:
+            continue
+        if palabras[j][0] - anterior[2] > SEPARACION_PALABRAS * alto:
+            break
+        texto.append(palabras[j][4])
+        anterior = palabras[j]
+    return " ".join(texto)
+
+
+def _validar(patron: PatronRegistrado, texto: str) -> Optional[str]:
+    coincidencia = patron.match(texto)
+    if coincidencia is None:
+        return None
+    valor = (coincidencia.group(1) if coincidencia.groups() else coincidencia.group(0)).strip()
+    return valor or None
+
+
+def _valor_de(palabras: List, caja: tuple, patron: PatronRegistrado, ocupadas: set) -> Optional[str]:
+    """
+    Valor de una etiqueta: la primera palabra a su derecha en la misma fila y, si no
+    hay o no tiene el formato esperado, la fila inmediatamente debajo que se solape
+    horizontalmente con la etiqueta.
+    """
+    alto = caja[3] - caja[1]
+    derecha = [j for j, p in enumerate(palabras)
+               if j not in ocupadas and p[0] >= caja[2] - 1 and _misma_fila(p, caja)]
+    if derecha:
+        primera = min(derecha, key=lambda j: palabras[j][0])
+        valor = _validar(patron, _continuar_fila(palabras, primera, ocupadas, alto))
+        if valor is not None:
+            return valor
+    debajo = [j for j, p in enumerate(palabras)
+              if j not in ocupadas and p[1] >= caja[3] - 0.25 * alto
+              and p[1] - caja[3] <= DISTANCIA_DEBAJO * alto
+              and p[0] < caja[2] and p[2] > caja[0]]
+    if debajo:
+        primera = min(debajo, key=lambda j: (palabras[j][1], palabras[j][0]))
+        return _validar(patron, _continuar_fila(palabras, primera, ocupadas, alto))
+    return None
+
+
+def buscar_valores(documento: DocumentContext,
+                   etiquetas: Optional[Dict[str, Tuple[str, str]]] = None) -> Dict[str, str]:
+    """
+    Extrae valores ubicando su etiqueta en la página (`get_text("words")`).
+
+    Las etiquetas de todos los campos se localizan en una sola pasada por las
+    palabras de cada página; el valor se toma por geometría (misma fila a la
+    derecha o justo debajo) y se valida con el patrón del campo. Se usa la primera
+    aparición con un valor válido y se deja de leer páginas cuando ya se tienen
+    todos los campos. Los campos sin valor no aparecen en el resultado.
+
+    Args:
+        documento: Contexto del PDF
+        etiquetas: Etiquetas propias {campo: (etiqueta, patrón del valor)} (por defecto ETIQUETAS_SALUD)
+
+    Returns:
+        Dict[str, str]: Valor encontrado de cada campo
+    """
+    if not EXTRACCION_GEOMETRICA:
+        return {}
+    compiladas = _ETIQUETAS_SALUD if etiquetas is None else compilar_etiquetas(etiquetas)
+    primeras: Dict[str, List[str]] = {}
+    for campo, (tokens, _) in compiladas.items():
+        primeras.setdefault(tokens[0], []).append(campo)
+    valores: Dict[str, str] = {}
+    for num_pagina in range(min(documento.page_count, PAGINAS_GEOMETRIA)):
+        if len(valores) == len(compiladas):
+            break
+        palabras = documento.page_words(num_pagina)
+        encontradas = _ubicar_etiquetas(palabras, primeras, compiladas)
+        # Las palabras de una etiqueta nunca forman parte del valor de otra
+        ocupadas = {j for _, _, indices in encontradas for j in indices}
+        for campo, caja, _ in encontradas:
+            if campo in valores:
+                continue
+            valor = _valor_de(palabras, caja, compiladas[campo][1], ocupadas)
+            if valor is not None:
+                valores[campo] = valor
+    if valores:
+        logger.debug(f"Valores ubicados por etiqueta: {valores}")
+    return valores